@@ -4,6 +4,7 @@ License: LGPL2
 '''
 
 from numpy import zeros
+from numba import njit
 from HSP2.utilities import make_numba_dict
 
 # The clean way to get calculated data from adcalc() into advert() is to use a closure. 
@@ -39,16 +40,16 @@ def adcalc(store, siminfo, uci, ts):
 	else:
 		vol   = 0.0
 	
-	# external time series
-	O = []
-	for timeindex in range(simlen):
-		tarray = []
-		if nexits > 1:
-			for index in range(nexits):
-				tarray.append(ts['O' + str(index+1)][timeindex])
-		else:
-			tarray.append(ts['RO'][timeindex])
-		O.append(tarray)  	 # total rate of outflow per exit: O[simlen, nexits]
+	# external time series, total rate of outflow per exit: O[simlen, nexits]
+	exits = uci['EXITS']
+	if 'O' in exits:       # from HYDR, used in place
+		O = exits['O']
+	elif nexits > 1:
+		O = zeros((simlen, nexits))
+		for index in range(nexits):
+			O[:, index] = ts['O' + str(index+1)][0:simlen]
+	else:
+		O = ts['RO'][0:simlen].reshape((simlen, 1))
 
 	# calculated timeseries for advect()
 	if 'SROVOL' not in ts:
@@ -82,15 +83,15 @@ def adcalc(store, siminfo, uci, ts):
 	return errorsV, ERRMSG
 
 
-#@jit(nopython=True)	
+@njit(cache=True)
 def adcalc_(simlen, delts, nexits, crrat, ks, vol, ADFG, O, VOL, SROVOL, EROVOL, SOVOL, EOVOL):
 	''' Internal adcalc() loop for Numba'''
 	
 	for loop in range(simlen):
 		vols = VOL[loop-1] * 43560  if loop > 0 else vol
 
-		o  = O[loop]
-		os = O[loop-1] if loop > 0 else O[loop]
+		o  = O[loop, :]
+		os = O[loop-1, :] if loop > 0 else O[loop, :]
 		ro = 0.0
 		ros= 0.0
 		for index in range(nexits):
@@ -122,16 +123,18 @@ def adcalc_(simlen, delts, nexits, crrat, ks, vol, ADFG, O, VOL, SROVOL, EROVOL,
 		EROVOL[loop] = cojs * ro  * delts
 		# if nexits > 1:  # determine weighted volume of outflow at start and end of ivl per exit
 		for index in range(nexits):
-			SOVOL[loop][index] = js * os[index] * delts
-			EOVOL[loop][index] = cojs * o[index] * delts
+			SOVOL[loop, index] = js * os[index] * delts
+			EOVOL[loop, index] = cojs * o[index] * delts
 	return
 
 
-#@jit(nopython=True)
-def advect(imat, conc, nexits, vols, vol, srovol, erovol, sovol, eovol):
+@njit(cache=True)
+def advect(imat, conc, nexits, vols, vol, srovol, erovol, sovol, eovol, omat):
 	''' Simulate advection of constituent totally entrained in water.
 	Originally designed to be called as: advect(loop, imat, conc, omat, *ui['adcalcData'])
-	but unit conversions in the calling routine make this impractical'''
+	but unit conversions in the calling routine make this impractical.
+	omat is the caller's array of nexits values, filled with the material leaving
+	through each exit (zero unless nexits > 1)'''
 	
 	# vols   = VOL[loop-1]  if loop > 0 else vol
 	# vol    = VOL[loop]
@@ -140,22 +143,21 @@ def advect(imat, conc, nexits, vols, vol, srovol, erovol, sovol, eovol):
 	# sovol  = SOVOL[loop,:]
 	# eovol  = EOVOL[loop,:]
 
-	omat = 0.0
 	if vol > 0.0:    # reach/res contains water
 		concs = conc
 		conc = (imat + concs * (vols - srovol)) / (vol + erovol)  # material entering during interval, weighted volume of outflow based on conditions at start of ivl (srovol), and weighted volume of outflow based on conditions at end of ivl (erovol)
 		romat = srovol * concs + erovol * conc    # total material leaving reach/res in ivl
-		if nexits > 1:                            # material leaving through each exit gate
-			omat = sovol * concs + eovol * conc   # qty.vol/l.ivl, array calculation
+		for n in range(nexits):                   # material leaving through each exit gate, qty.vol/l.ivl
+			omat[n] = sovol[n] * concs + eovol[n] * conc  if nexits > 1 else 0.0
 	else:                                         # reach/res has gone dry during the interval
 		romat = imat + (conc * vols)  	          # total material leaving during interval = inflow + initial material
-		if nexits > 1 and srovol > 0:              # calculate material leaving through each exit gate
-			omat = (sovol / srovol) * romat       # array calculation
+		for n in range(nexits):                   # calculate material leaving through each exit gate
+			omat[n] = (sovol[n] / srovol) * romat  if nexits > 1 and srovol > 0 else 0.0
 		conc = -1.0e30			
-	return conc, romat, omat
+	return conc, romat
 	
 
-#@jit(nopython=True)
+@njit(cache=True)
 def oxrea(LKFG,wind,cforea,avvele,avdepe,tcginv,reamfg,reak,reakt,expred,exprev,len, delth,tw,delts,delt60,uunits):
 	''' Calculate oxygen reaeration coefficient'''
 	# DELTS  - ???
@@ -181,27 +183,66 @@ def oxrea(LKFG,wind,cforea,avvele,avdepe,tcginv,reamfg,reak,reakt,expred,exprev,
 			korea  = reakt * (delthe / flotim) * (tcginv**(tw - 20.)) * delts
 		else:
 			korea = 0.0
-	elif reamfg == 2:
-		# calculate reaeration coefficient as a power function of average hydraulic
-		# depth and velocity; determine exponents to depth and velocity terms and assign value to reak
-		if avdepe <= 2.0:  # use owen's formulation for reaeration
-			reak   = 0.906
-			exprev = 0.67
-			expred = -1.85
-		else:
-			# calculate transition depth; transition depth determines which method
-			# of calculation is used given the current velocity
-			trandp = 0.0  if avvele < 1.7 else 0.4263 * (avvele**2.9135)
-			if avdepe - trandp <= 0.0:  # use churchill's formulation for reaeration
-				reak   = 0.484
-				exprev = 0.969
-				expred = -1.673
-			else:                       # use o'connor-dobbins formulation for reaeration
-				reak   = 0.538
-				exprev = 0.5
-				expred = -1.5
+	else:
+		if reamfg == 2:
+			# calculate reaeration coefficient as a power function of average hydraulic
+			# depth and velocity; determine exponents to depth and velocity terms and assign value to reak
+			if avdepe <= 2.0:  # use owen's formulation for reaeration
+				reak   = 0.906
+				exprev = 0.67
+				expred = -1.85
+			else:
+				# calculate transition depth; transition depth determines which method
+				# of calculation is used given the current velocity
+				trandp = 0.0  if avvele < 1.7 else 0.4263 * (avvele**2.9135)
+				if avdepe - trandp <= 0.0:  # use churchill's formulation for reaeration
+					reak   = 0.484
+					exprev = 0.969
+					expred = -1.673
+				else:                       # use o'connor-dobbins formulation for reaeration
+					reak   = 0.538
+					exprev = 0.5
+					expred = -1.5
+		# reamfg == 3 uses the power function with user-supplied reak, exprev and expred
 		korea = reak * avvele**exprev * avdepe**expred * tcginv**(tw - 20.0) * delt60  if tw < 66 else  0.999
 
 	if korea > 1.0:
 		korea = 0.999
 	return korea
+
+
+# benth, sink and decbal are shared by the RQUAL sections (OXRX, NUTRX, PLANK, PHCARB)
+
+@njit(cache=True)
+def benth(dox, anaer, brcon1, brcon2, scrfac, depcor, conc):
+	''' simulate benthal release of constituent; release is a step function of aerobic/anaerobic
+	conditions and stream velocity; brcon1 and brcon2 are the aerobic and anaerobic release rates
+	in mg/m2.ivl, scrfac is the scouring factor and depcor converts mg/m2 to mg/l'''
+	releas = brcon1 * scrfac * depcor  if dox > anaer else brcon2 * scrfac * depcor
+	conc += releas
+	return conc, releas
+
+
+@njit(cache=True)
+def sink(vol, avdepe, kset, conc):
+	''' calculate quantity of material settling out of the control volume; kset is expressed
+	as ft/ivl and avdepe as feet, snkmat is expressed as mass.ft3/l.ivl'''
+	if kset > 0.0 and avdepe > 0.17:
+		snkout = conc * (kset / avdepe)  if kset < avdepe else conc   # mass/liter.ivl
+		conc  -= snkout
+		snkmat = snkout * vol
+	else:
+		snkmat = 0.0
+	return conc, snkmat
+
+
+@njit(cache=True)
+def decbal(tamfg, po4fg, decnit, decpo4, tam, no3, po4):
+	''' perform materials balance for transformation from organic to inorganic material by decay in reach water'''
+	if tamfg:
+		tam += decnit   # nitrogen released by decay goes to total ammonia
+	else:
+		no3 += decnit   # or to nitrate if tam is not simulated
+	if po4fg:
+		po4 += decpo4
+	return tam, no3, po4
@@ -5,7 +5,7 @@ Conversion of HSPF HPERAIR.FOR module. '''
 
 
 from numba import njit
-from numpy import empty, zeros, int64
+from numpy import empty, zeros, int64, where
 from HSP2.utilities import hoursval, make_numba_dict
 
 ERRMSGS = ()
@@ -14,21 +14,31 @@ ERRMSGS = ()
 def atemp(store, siminfo, uci, ts):
     ''' high level driver for air temperature module'''
 
+    ui = atemp_setup(store, siminfo, uci, ts)
+
+    ############################################################################
+    if ui['ELDAT'] == 0.0:     # gage at segment elevation, no lapse correction
+        ts['AIRTMP'] = ts['GATMP'][0:siminfo['steps']].copy()
+        errors = zeros(len(ERRMSGS), dtype=int64)
+    else:
+        errors = _atemp_numpy_(ui, ts)           # whole series at once, no kernel needed
+    ############################################################################
+
+    return errors, ERRMSGS
+
+
+def atemp_setup(store, siminfo, uci, ts):
+    ''' puts LAPSE in ts and returns the numba ui used by _atemp_'''
     ts['LAPSE'] = hoursval(siminfo, store['TIMESERIES/LAPSE_Table'], lapselike=True)
 
     ui = make_numba_dict(uci)   # Note: all values coverted to float automatically
     ui['k']      = siminfo['delt']  * 0.000833        # convert to in/timestep
     ui['steps']  = siminfo['steps']
     ui['errlen'] = len(ERRMSGS)
-
-    ############################################################################
-    errors = _atemp_(ui, ts)                     # run ATEMP_ simulation code
-    ############################################################################
-
-    return errors, ERRMSGS
+    return ui
 
 
-# @njit(cache=True)
+@njit(cache=True)
 def _atemp_(ui, ts):
     ''' computes airtemp by correcting gage temp with prec and elevation
     general, ui, ts are Python dictionaries for user input and time series,
@@ -55,3 +65,13 @@ def _atemp_(ui, ts):
         lapse = 0.0035 if PREC[step] > k else LAPSE[step]  # use wet lapse if prec
         AIRTMP[step] = GATMP[step] - lapse * eldat
     return errors
+
+
+def _atemp_numpy_(ui, ts):
+    ''' vectorized equivalent of _atemp_, used by atemp()'''
+    errors = zeros(int(ui['errlen'])).astype(int64)
+    steps = int(ui['steps'])
+
+    lapse = where(ts['PREC'][0:steps] > ui['k'], 0.0035, ts['LAPSE'][0:steps])  # use wet lapse if prec
+    ts['AIRTMP'] = ts['GATMP'][0:steps] - lapse * ui['ELDAT']
+    return errors
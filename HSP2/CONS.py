@@ -24,13 +24,13 @@ NOTE: COADFG flags NOT saved.  Use logic: if ts present, use it; otherwise look
 
 from numpy import zeros
 from HSP2.ADCALC import advect
-from numba import jit
+from numba import njit
 from HSP2.utilities  import make_numba_dict, initm
 
 ERRMSG = []
 
 def cons(store, siminfo, uci, ts):
-	''' Simulate behavior of conservative constituents; calculate concentration 
+	''' Simulate behavior of conservative constituents; calculate concentration
 	of conservative constituents after advection'''
 
 	errorsV = zeros(len(ERRMSG), dtype=int)
@@ -56,38 +56,28 @@ def cons(store, siminfo, uci, ts):
 		if 'NCONS' in uci['PARAMETERS']:
 			ncons = uci['PARAMETERS']['NCONS']
 
+	# constituents are stacked as (ncons, simlen) so loopsub advances all of them in one pass
+	CONV   = zeros(ncons)
+	CON0   = zeros(ncons)
+	ICON   = zeros((ncons, simlen))
+	COADFX = zeros((ncons, simlen))
+	COADCN = zeros((ncons, simlen))
+
 	for index in range(ncons):
 		icon = str(index + 1)
 		parms = uci['CONS' + icon]
-		conid = parms['CONID']   # string name of the conservative constituent
 		con   = parms['CON']     # initial concentration of the conservative
 		concid= parms['CONCID']  # string which specifies the concentration units for the conservative constituent.
 		conv  = parms['CONV']    # conversion factor from QTYID/VOL to the desired concentration units
 		qtyid = parms['QTYID']   # string which specifies the units for inflow or outflow of constituent; e.g. kg
 		name  = 'CONS' + icon    # arbitrary identification, default CONxx
-
-		# preallocate output arrays (always needed)
-		ROCON = ts[name + '_ROCON'] = zeros(simlen)
-		CON   = ts[name + '_CON']   = zeros(simlen)
-		RCON  = ts[name + '_RCON']  = zeros(simlen)
-
-		# preallocate output arrays for atmospheric deposition
-		COADDR = ts[name + '_COADDR'] = zeros(simlen)
-		COADWT = ts[name + '_COADWT'] = zeros(simlen)
-		COADEP = ts[name + '_COADEP'] = zeros(simlen)
-
-		OCON = zeros((simlen, nexits))
-		if nexits > 1:
-			u = uci['SAVE']
-			key1 = name + '_OCON'
-			for i in range(nexits):
-				u[f'{key1}{i + 1}'] = u['OCON']
-			del u['OCON']
+		CONV[index] = conv
+		CON0[index] = con
 
 		# get incoming flow of constituent or zeros;
 		if (name + '_ICON') not in ts:
 			ts[name + '_ICON'] = zeros(simlen)
-		ICON = ts[name + '_ICON'] * conv * 43560 * VOL
+		ICON[index] = ts[name + '_ICON'] * conv * 43560 * VOL
 
 		# # dry deposition; flag: COADFG; monthly COAFXM; value: COADFX
 		# COADFG1 = ui['COADFG1']    # table-type cons-ad-flags
@@ -99,78 +89,109 @@ def cons(store, siminfo, uci, ts):
 		if 'FLAGS' in uci:
 			u = uci['FLAGS']
 			# get atmos dep timeseries
-			coadfg1 = u['COADFG' + str((index * 2) - 1)]
+			coadfg1 = u['COADFG' + str((index * 2) + 1)]
 			if coadfg1 > 0:
-				ts['COADFX'] = initm(siminfo, uci, coadfg1, 'CONS' + str(index) + '_MONTHLY/COADFX', 0.0)
+				ts['COADFX'] = initm(siminfo, uci, coadfg1, name + '_MONTHLY/COADFX', 0.0)
 			elif coadfg1 == -1:
-				ts['COADFX'] = ts['COADFX'+ str(index)]
+				ts['COADFX'] = ts['COADFX'+ icon]
 
-			coadfg2 = u['COADFG' + str(index * 2)]
+			coadfg2 = u['COADFG' + str((index * 2) + 2)]
 			if coadfg2 > 0:
-				ts['COADCN'] = initm(siminfo, uci, coadfg2, 'CONS' + str(index) + '_MONTHLY/COADCN', 0.0)
+				ts['COADCN'] = initm(siminfo, uci, coadfg2, name + '_MONTHLY/COADCN', 0.0)
 			elif coadfg2 == -1:
-				ts['COADCN'] = ts['COADCN' + str(index)]
+				ts['COADCN'] = ts['COADCN' + icon]
 
 		if 'COADFX' not in ts:
 			ts['COADFX'] = zeros(simlen)
 		if 'COADCN' not in ts:
 			ts['COADCN'] = zeros(simlen)
 
-		COADFX = ts['COADFX'] * delt60 / (24.0 * 43560.0)
-		COADCN = ts['COADCN']
+		COADFX[index] = ts['COADFX'] * delt60 / (24.0 * 43560.0)
+		COADCN[index] = ts['COADCN']
 
-		loopsub(SAREA, PREC, VOL, COADFX, COADCN, ICON, simlen, conid, CON, ROCON, OCON, RCON, COADWT, COADDR, COADEP,
-				SROVOL, EROVOL, SOVOL, EOVOL, conv, svol, con, nexits)
+	# preallocate output arrays (always needed)
+	ROCON = zeros((ncons, simlen))
+	CON   = zeros((ncons, simlen))
+	RCON  = zeros((ncons, simlen))
+	OCON  = zeros((ncons, simlen, nexits))
 
-		if nexits > 1:
+	# preallocate output arrays for atmospheric deposition
+	COADDR = zeros((ncons, simlen))
+	COADWT = zeros((ncons, simlen))
+	COADEP = zeros((ncons, simlen))
+
+	loopsub(SAREA, PREC, VOL, COADFX, COADCN, ICON, simlen, CON, ROCON, OCON, RCON, COADWT, COADDR, COADEP,
+			SROVOL, EROVOL, SOVOL, EOVOL, CONV, svol, CON0, nexits)
+
+	if nexits > 1:
+		u = uci['SAVE']
+		for index in range(ncons):
+			key1 = 'CONS' + str(index + 1) + '_OCON'
 			for i in range(nexits):
-				ts[name + '_OCON' + str(i + 1)] = OCON[:, i]
+				u[f'{key1}{i + 1}'] = u['OCON']
+		del u['OCON']
+
+	for index in range(ncons):
+		name = 'CONS' + str(index + 1)
+		ts[name + '_ROCON']  = ROCON[index]
+		ts[name + '_CON']    = CON[index]
+		ts[name + '_RCON']   = RCON[index]
+		ts[name + '_COADDR'] = COADDR[index]
+		ts[name + '_COADWT'] = COADWT[index]
+		ts[name + '_COADEP'] = COADEP[index]
+		if nexits > 1:
+			uci['EXITS'][name + '_OCON'] = OCON[index]
 
 	return errorsV, ERRMSG
 
 
-# @jit(nopython=True)
-def loopsub(SAREA, PREC ,VOL, COADFX, COADCN, ICON, simlen, conid, CON, ROCON, OCON, RCON, COADWT, COADDR, COADEP,
-			SROVOL, EROVOL, SOVOL, EOVOL, conv, svol, con, nexits):
-	''' loop as function to allow Numba to cache compilation'''		
-	
+@njit(cache=True)
+def loopsub(SAREA, PREC ,VOL, COADFX, COADCN, ICON, simlen, CON, ROCON, OCON, RCON, COADWT, COADDR, COADEP,
+			SROVOL, EROVOL, SOVOL, EOVOL, conv, svol, con0, nexits):
+	''' loop as function to allow Numba to cache compilation; every constituent is advanced in the same pass'''
+	ncons = len(conv)
+	con = con0.copy()
+	ocon = zeros(nexits)
+
 	for loop in range(simlen):
 		sarea  = SAREA[loop]
 		prec   = PREC[loop]
 		vol    = VOL[loop] * 43560
 
-		coadfx = COADFX[loop]
-		coadcn = COADCN[loop]
-		if vol > 0.0:
-			icon = ICON[loop] / vol
-		else:
-			icon = ICON[loop]
-
-		coaddr = sarea * conv   * coadfx    # dry deposition; 
-		coadwt = prec  * sarea  * coadcn    # wet deposition;
-
-		adtot = coaddr + coadwt  # total atmospheric deposition
-
-		incon  = icon  + coaddr + coadwt
-
 		srovol = SROVOL[loop]
 		erovol = EROVOL[loop]
 		sovol = SOVOL[loop, :]
 		eovol = EOVOL[loop, :]
-		con, rocon, ocon = advect(incon, con, nexits, svol, vol, srovol, erovol, sovol, eovol)
 
-		svol = vol  # svol is volume at start of time step, update for next time thru
+		for i in range(ncons):
+			coadfx = COADFX[i, loop]
+			coadcn = COADCN[i, loop]
+			if vol > 0.0:
+				icon = ICON[i, loop] / vol
+			else:
+				icon = ICON[i, loop]
 
-		CON[loop]    = con
-		ROCON[loop]  = rocon / conv  # outflow
-		OCON[loop,:] = ocon  / conv
-		RCON[loop]   = con * vol / conv # total storage of constituent
+			coaddr = sarea * conv[i] * coadfx    # dry deposition;
+			coadwt = prec  * sarea   * coadcn    # wet deposition;
 
-		COADWT[loop] = coadwt
-		COADDR[loop] = coaddr
-		COADEP[loop] = adtot
+			adtot = coaddr + coadwt  # total atmospheric deposition
+
+			incon  = icon  + coaddr + coadwt
+
+			con[i], rocon = advect(incon, con[i], nexits, svol, vol, srovol, erovol, sovol, eovol, ocon)
+
+			CON[i, loop]     = con[i]
+			ROCON[i, loop]   = rocon / conv[i]  # outflow
+			OCON[i, loop, :] = ocon  / conv[i]
+			RCON[i, loop]    = con[i] * vol / conv[i] # total storage of constituent
+
+			COADWT[i, loop] = coadwt
+			COADDR[i, loop] = coaddr
+			COADEP[i, loop] = adtot
+
+		svol = vol  # svol is volume at start of time step, update for next time thru
 
-	return	
+	return
 
 def expand_CONS_masslinks(flags, uci, dat, recs):
 	if flags['CONS']:
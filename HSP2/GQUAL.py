@@ -3,8 +3,10 @@ Author: Robert Heaphy, Ph.D.
 License: LGPL2
 '''
 
-from numpy import array, zeros, int64
+from numpy import array, zeros, full, int64
 from math import exp
+from numba import njit, types
+from numba.typed import Dict
 from HSP2.utilities import initm, make_numba_dict, hoursval, dayval
 from HSP2.ADCALC import advect, oxrea
 
@@ -15,6 +17,18 @@ ERRMSGS =('GQUAL: one or more gquals are sediment-associated, but section sedtrn
           'GQUAL: in advqal, the value of denom is zero, and ISQAL and RSQALS should also be zero',       #ERRMSG4
           'GQUAL: in advqal, the value of bsed is zero, and DSQAL and RBQALS should also be zero')        #ERRMSG5
 
+# timeseries computed by _gqual_ for every constituent, saved as GQUALn_<name>
+OUTPUTS = ('ADQAL1', 'ADQAL2', 'ADQAL3', 'ADQAL4', 'ADQAL5', 'ADQAL6', 'ADQAL7',
+           'DDQAL1', 'DDQAL2', 'DDQAL3', 'DDQAL4', 'DDQAL5', 'DDQAL6', 'DDQAL7',
+           'DQAL', 'DSQAL1', 'DSQAL2', 'DSQAL3', 'DSQAL4', 'GQADDR', 'GQADEP', 'GQADWT',
+           'ISQAL4', 'PDQAL', 'RDQAL', 'RODQAL', 'ROSQAL1', 'ROSQAL2', 'ROSQAL3', 'ROSQAL4',
+           'RRQAL', 'RSQAL1', 'RSQAL2', 'RSQAL3', 'RSQAL4', 'RSQAL5', 'RSQAL6', 'RSQAL7',
+           'RSQAL8', 'RSQAL9', 'RSQAL10', 'RSQAL11', 'RSQAL12', 'SQAL1', 'SQAL2', 'SQAL3',
+           'SQAL4', 'SQAL5', 'SQAL6', 'SQDEC1', 'SQDEC2', 'SQDEC3', 'SQDEC4', 'SQDEC5',
+           'SQDEC6', 'SQDEC7', 'TIQAL', 'TROQAL')
+EXIT_OUTPUTS = ('ODQAL', 'OSQAL1', 'OSQAL2', 'OSQAL3', 'TOSQAL')
+
+
 def gqual(store, siminfo, uci, ts):
 	''' Simulate the behavior of a generalized quality constituent'''
 
@@ -27,8 +41,6 @@ def gqual(store, siminfo, uci, ts):
 	(nexits, vol, VOL, SROVOL, EROVOL, SOVOL, EOVOL) = advectData
 	svol = vol * 43560
 
-	ui = make_numba_dict(uci)
-
 	UUNITS = 1  # assume english units for now
 
 	# table-type gq-gendata
@@ -43,7 +55,7 @@ def gqual(store, siminfo, uci, ts):
 
 	ui = uci['PARAMETERS']
 	if 'NGQUAL' in ui:
-		ngqual = ui['NGQUAL']
+		ngqual = int(ui['NGQUAL'])
 		tempfg = ui['TEMPFG']
 		phflag = ui['PHFLAG']
 		roxfg  = ui['ROXFG']
@@ -52,7 +64,6 @@ def gqual(store, siminfo, uci, ts):
 		phytfg = ui['PHYTFG']
 		lat    = ui['LAT']
 	lkfg = int(ui['LKFG'])
-	ecnt = 0
 
 	len_ = 0.0
 	delth= 0.0
@@ -60,10 +71,26 @@ def gqual(store, siminfo, uci, ts):
 		len_  = ui["LEN"] * 5280.0  # mi to feet
 		delth = ui["DELTH"]
 	ts['HRFG'] = hour24Flag(siminfo).astype(float)
-	HRFG = ts['HRFG']
 
-	# NGQ3 = NGQUAL * 3
-	ddqal = zeros((8, ngqual+1))
+	# light data set and season used for photolysis
+	light = (abs(int(lat)) + 5) // 10
+	if light == 0:  # no table for equation, so use 10 deg table
+		light = 1
+	ts['LSET'] = dayval(siminfo, [4, 4, 1, 1, 1, 2, 2, 2, 3, 3, 3, 4])
+
+	# fact1 is a pre-calculated value used in photolysis simulation
+	cfsaex = 1.0
+	if 'CFSAEX' in ui:
+		cfsaex = ui['CFSAEX']
+	fact1 = cfsaex * delt60 / 24.0
+
+	if 'DEPSCR1' not in ts:     # sediment is only needed when SEDTRN is active
+		for name in ('DEPSCR1', 'DEPSCR2', 'DEPSCR3', 'ROSED1', 'ROSED2', 'ROSED3'):
+			ts[name] = zeros(simlen)
+
+	# per-constituent parameters (pms) and stacked arrays (gqs) collected for _gqual_
+	pms = []
+	gqs = []
 
 	for index in range(1, ngqual+1):
 
@@ -118,7 +145,6 @@ def gqual(store, siminfo, uci, ts):
 		if ('GQUAL' + str(index) + '_ISQAL3') not in ts:
 			ts['GQUAL' + str(index) + '_ISQAL3'] = zeros(simlen)
 		ISQAL3 = ts['GQUAL' + str(index) + '_ISQAL3']
-
 		# process flags for this constituent
 
 		# table-type gq-qalfg
@@ -215,6 +241,10 @@ def gqual(store, siminfo, uci, ts):
 			fstdec = ui_parms['FSTDEC'] * delt60 / 24.0 # convert rate from /day to /ivl
 			thfst  = ui_parms['THFST']
 
+		addcpm1 = 0.0
+		addcpm2 = 0.0
+		addcpm3 = 0.0
+		addcpm4 = 0.0
 		adpm1 = zeros(7)
 		adpm2 = zeros(7)
 		adpm3 = zeros(7)
@@ -388,8 +418,6 @@ def gqual(store, siminfo, uci, ts):
 		gamm = zeros(19)
 		delta = zeros(19)
 		kcld = zeros(19)
-		fact1 = 0.0
-		light = 1
 		if qalfg[3] == 1:
 			#  table-type gq-alpha
 			if 'EXTENDEDS_ALPH' in uci:
@@ -483,18 +511,6 @@ def gqual(store, siminfo, uci, ts):
 			if phytfg == 2:
 				ts['PHYTO'] = initm(siminfo, uci, phytfg, 'GQUAL' + str(index) + '_MONTHLY/PHYTO', phy)
 
-			cfsaex = 1.0
-			if 'CFSAEX' in ui:
-				cfsaex = ui['CFSAEX']
-
-			# fact1 is a pre-calculated value used in photolysis simulation
-			fact1 = cfsaex * delt60 / 24.0
-
-			# decide which set of light data to use
-			light = (abs(int(lat)) + 5) // 10
-			if light == 0:  # no table for equation, so use 10 deg table
-				light = 1
-			lset_month = dayval(siminfo, [4, 4, 1, 1, 1, 2, 2, 2, 3, 3, 3, 4])
 
 		reamfg = 0
 		cforea = 0.0
@@ -548,27 +564,27 @@ def gqual(store, siminfo, uci, ts):
 		# table-type gq-daughter
 		c = zeros((8,7))
 		if 'C21' in ui_parms:
-			c[2,1] = ui_parms("C21")
-			c[3,1] = ui_parms("C31")
-			c[4,1] = ui_parms("C41")
-			c[5,1] = ui_parms("C51")
-			c[6,1] = ui_parms("C61")
-			c[7,1] = ui_parms("C71")
-			c[3,2] = ui_parms("C32")
-			c[4,2] = ui_parms("C42")
-			c[5,2] = ui_parms("C52")
-			c[6,2] = ui_parms("C62")
-			c[7,2] = ui_parms("C72")
-			c[4,3] = ui_parms("C43")
-			c[5,3] = ui_parms("C53")
-			c[6,3] = ui_parms("C63")
-			c[7,3] = ui_parms("C73")
-			c[5,4] = ui_parms("C54")
-			c[6,4] = ui_parms("C64")
-			c[7,4] = ui_parms("C74")
-			c[6,5] = ui_parms("C65")
-			c[7,5] = ui_parms("C75")
-			c[7,6] = ui_parms("C76")
+			c[2,1] = ui_parms["C21"]
+			c[3,1] = ui_parms["C31"]
+			c[4,1] = ui_parms["C41"]
+			c[5,1] = ui_parms["C51"]
+			c[6,1] = ui_parms["C61"]
+			c[7,1] = ui_parms["C71"]
+			c[3,2] = ui_parms["C32"]
+			c[4,2] = ui_parms["C42"]
+			c[5,2] = ui_parms["C52"]
+			c[6,2] = ui_parms["C62"]
+			c[7,2] = ui_parms["C72"]
+			c[4,3] = ui_parms["C43"]
+			c[5,3] = ui_parms["C53"]
+			c[6,3] = ui_parms["C63"]
+			c[7,3] = ui_parms["C73"]
+			c[5,4] = ui_parms["C54"]
+			c[6,4] = ui_parms["C64"]
+			c[7,4] = ui_parms["C74"]
+			c[6,5] = ui_parms["C65"]
+			c[7,5] = ui_parms["C75"]
+			c[7,6] = ui_parms["C76"]
 
 		if qalfg[7] == 1: #  one or more quals are sediment-associated
 			sedfg = int(ui['SEDFG'])
@@ -591,233 +607,342 @@ def gqual(store, siminfo, uci, ts):
 					if aux1fg == 0:
 						errors[3] += 1  # ERRMSG3: simulation of volatilization in a lake requires aux1fg on to calculate average depth
 
-		#####################  end PGQUAL
-
-		# get input timeseries
-		AVDEP = ts['AVDEP']
-		PHVAL = ts['PHVAL']
-		TW    = ts['TW']
-		ROC   = ts['ROC']
-		if 'SDCNC' in ts:
-			SDCNC = ts['SDCNC']    # constant, monthly, ts; SDFG, note: interpolate to daily value only
-		if 'PHY' in ts:
-			PHYTO = ts['PHY']      # constant, monthly, ts; PHYTFG, note: interpolate to daily value only
-		if 'CLD' in ts:
-			CLD   = ts['CLD']      # constant, monthly, ts['CLOUD']
-		WIND  = ts['WIND'] * 1609.0 # miles to meters
-		AVVEL = ts['AVVEL']
-		PREC  = ts['PREC']
-		SAREA = ts['SAREA']
-		GQADFX = ts['GQADFX']
-		GQADCN = ts['GQADCN']
+		# light extinction inputs are constant unless their flag selects a timeseries
+		CLOUD = SSED4 = PHYTO = zeros(simlen)
+		if qalfg[3] == 1:
+			CLOUD = ts['CLOUD'] if cldfg == 1 or cldfg == 3 else full(simlen, cld)
+			SSED4 = ts['SSED4'] if sdfg == 1 or sdfg == 3 else full(simlen, sdcnc)
+			PHYTO = ts['PHYTO'] if (phytfg == 1 or phytfg == 3) and 'PHYTO' in ts else full(simlen, phy)
 		if 'BIO' not in ts:
 			ts['BIO'] = zeros(simlen)
-		BIO    = ts['BIO']
-
-		DEPSCR1 = ts['DEPSCR1']
-		DEPSCR2 = ts['DEPSCR2']
-		DEPSCR3 = ts['DEPSCR3']
-		ROSED1 = ts['ROSED1']
-		ROSED2 = ts['ROSED2']
-		ROSED3 = ts['ROSED3']
-
-		# OSED1 = zeros((simlen, nexits))
-		# OSED2 = zeros((simlen, nexits))
-		# OSED3 = zeros((simlen, nexits))
-		OSED1 = []
-		OSED2 = []
-		OSED3 = []
-		for timeindex in range(simlen):
-			tarray1 = []
-			tarray2 = []
-			tarray3 = []
-			if nexits > 1:
-				for index in range(nexits):
-					tarray1.append(ts['OSED1' + str(index + 1)][timeindex])
-					tarray2.append(ts['OSED2' + str(index + 1)][timeindex])
-					tarray3.append(ts['OSED3' + str(index + 1)][timeindex])
-			else:
-				tarray1.append(ts['ROSED1'][timeindex])
-				tarray2.append(ts['ROSED2'][timeindex])
-				tarray3.append(ts['ROSED3'][timeindex])
-			OSED1.append(tarray1)
-			OSED2.append(tarray2)
-			OSED3.append(tarray3)
-
-		# this number is used to adjust reaction rates for temperature
-		# TW20 = TW - 20.0
-
-		name = 'GQUAL' + str(index)  # arbitrary identification
-		# preallocate output arrays (always needed)
-		ADQAL1 = ts[name + '_ADQAL1'] = zeros(simlen)
-		ADQAL2 = ts[name + '_ADQAL2'] = zeros(simlen)
-		ADQAL3 = ts[name + '_ADQAL3'] = zeros(simlen)
-		ADQAL4 = ts[name + '_ADQAL4'] = zeros(simlen)
-		ADQAL5 = ts[name + '_ADQAL5'] = zeros(simlen)
-		ADQAL6 = ts[name + '_ADQAL6'] = zeros(simlen)
-		ADQAL7 = ts[name + '_ADQAL7'] = zeros(simlen)
-		DDQAL1 = ts[name + '_DDQAL1'] = zeros(simlen)
-		DDQAL2 = ts[name + '_DDQAL2'] = zeros(simlen)
-		DDQAL3 = ts[name + '_DDQAL3'] = zeros(simlen)
-		DDQAL4 = ts[name + '_DDQAL4'] = zeros(simlen)
-		DDQAL5 = ts[name + '_DDQAL5'] = zeros(simlen)
-		DDQAL6 = ts[name + '_DDQAL6'] = zeros(simlen)
-		DDQAL7 = ts[name + '_DDQAL7'] = zeros(simlen)
-		DQAL   = ts[name + '_DQAL'] = zeros(simlen)
-		DSQAL1 = ts[name + '_DSQAL1'] = zeros(simlen)
-		DSQAL2 = ts[name + '_DSQAL2'] = zeros(simlen)
-		DSQAL3 = ts[name + '_DSQAL3'] = zeros(simlen)
-		DSQAL4 = ts[name + '_DSQAL4'] = zeros(simlen)
-		GQADDR = ts[name + '_GQADDR'] = zeros(simlen)
-		GQADEP = ts[name + '_GQADEP'] = zeros(simlen)
-		GQADWT = ts[name + '_GQADWT'] = zeros(simlen)
-		ISQAL4 = ts[name + '_ISQAL4'] = zeros(simlen)
-		PDQAL  = ts[name + '_PDQAL'] = zeros(simlen)
-		RDQAL  = ts[name + '_RDQAL'] = zeros(simlen)
-		RODQAL = ts[name + '_RODQAL'] = zeros(simlen)
-		ROSQAL1= ts[name + '_ROSQAL1'] = zeros(simlen)
-		ROSQAL2= ts[name + '_ROSQAL2'] = zeros(simlen)
-		ROSQAL3= ts[name + '_ROSQAL3'] = zeros(simlen)
-		ROSQAL4= ts[name + '_ROSQAL4'] = zeros(simlen)
-		RRQAL  = ts[name + '_RRQAL'] = zeros(simlen)
-		RSQAL1 = ts[name + '_RSQAL1'] = zeros(simlen)
-		RSQAL2 = ts[name + '_RSQAL2'] = zeros(simlen)
-		RSQAL3 = ts[name + '_RSQAL3'] = zeros(simlen)
-		RSQAL4 = ts[name + '_RSQAL4'] = zeros(simlen)
-		RSQAL5 = ts[name + '_RSQAL5'] = zeros(simlen)
-		RSQAL6 = ts[name + '_RSQAL6'] = zeros(simlen)
-		RSQAL7 = ts[name + '_RSQAL7'] = zeros(simlen)
-		RSQAL8 = ts[name + '_RSQAL8'] = zeros(simlen)
-		RSQAL9 = ts[name + '_RSQAL9'] = zeros(simlen)
-		RSQAL10= ts[name + '_RSQAL10'] = zeros(simlen)
-		RSQAL11= ts[name + '_RSQAL11'] = zeros(simlen)
-		RSQAL12= ts[name + '_RSQAL12'] = zeros(simlen)
-		SQAL1  = ts[name + '_SQAL1'] = zeros(simlen)
-		SQAL2  = ts[name + '_SQAL2'] = zeros(simlen)
-		SQAL3  = ts[name + '_SQAL3'] = zeros(simlen)
-		SQAL4  = ts[name + '_SQAL4'] = zeros(simlen)
-		SQAL5  = ts[name + '_SQAL5'] = zeros(simlen)
-		SQAL6  = ts[name + '_SQAL6'] = zeros(simlen)
-		SQDEC1 = ts[name + '_SQDEC1'] = zeros(simlen)
-		SQDEC2 = ts[name + '_SQDEC2'] = zeros(simlen)
-		SQDEC3 = ts[name + '_SQDEC3'] = zeros(simlen)
-		SQDEC4 = ts[name + '_SQDEC4'] = zeros(simlen)
-		SQDEC5 = ts[name + '_SQDEC5'] = zeros(simlen)
-		SQDEC6 = ts[name + '_SQDEC6'] = zeros(simlen)
-		SQDEC7 = ts[name + '_SQDEC7'] = zeros(simlen)
-		TIQAL  = ts[name + '_TIQAL'] = zeros(simlen)
-		TROQAL = ts[name + '_TROQAL'] = zeros(simlen)
-		TOQAL  = zeros((simlen, nexits))
-		ODQAL  = zeros((simlen, nexits))
-		OSQAL1 = zeros((simlen, nexits))
-		OSQAL2 = zeros((simlen, nexits))
-		OSQAL3 = zeros((simlen, nexits))
-		TOSQAL = zeros((simlen, nexits))
 
-		if nexits > 1:
-			u = uci['SAVE']
-			key1 = name + '_ODQAL'
-			for i in range(nexits):
-				u[f'{key1}{i + 1}'] = u['ODQAL']
-			del u['ODQAL']
-			key1 = name + '_OSQAL1'
-			for i in range(nexits):
-				u[f'{key1}{i + 1}'] = u['OSQAL']
-			key1 = name + '_OSQAL2'
-			for i in range(nexits):
-				u[f'{key1}{i + 1}'] = u['OSQAL']
-			key1 = name + '_OSQAL3'
+		# stack this constituent for _gqual_
+		pms.append({'conv': conv, 'dqal': dqal, 'ka': ka, 'kb': kb, 'kn': kn, 'thhyd': thhyd,
+			'kox': kox, 'thox': thox, 'cfgas': cfgas, 'biocon': biocon, 'thbio': thbio, 'biop': biop,
+			'fstdec': fstdec, 'thfst': thfst, 'addcpm1': addcpm1, 'addcpm2': addcpm2, 'addcpm3': addcpm3,
+			'addcpm4': addcpm4, 'phval': phval, 'roc': roc, 'reamfg': reamfg, 'cforea': cforea,
+			'tcginv': tcginv, 'reak': reak, 'reakt': reakt, 'expred': expred, 'exprev': exprev})
+		gqs.append({'QALFG': qalfg, 'GQPM2': gqpm2, 'PHOTPM': photpm, 'ADPM1': adpm1, 'ADPM2': adpm2,
+			'ADPM3': adpm3, 'SQAL': sqal, 'RSED': rsed, 'ALPH': alph, 'GAMM': gamm, 'DELTA': delta,
+			'KCLD': kcld, 'C': c.ravel(),
+			'RSQAL': array([0.0, rsqal1, rsqal2, rsqal3, rsqal4, rsqal5, rsqal6, rsqal7, rsqal8, rsqal9,
+				rsqal10, rsqal11, rsqal12]),
+			'IDQAL': IDQAL, 'ISQAL1': ISQAL1, 'ISQAL2': ISQAL2, 'ISQAL3': ISQAL3, 'GQADFX': ts['GQADFX'],
+			'GQADCN': ts['GQADCN'], 'BIO': ts['BIO'], 'CLOUD': CLOUD, 'SSED4': SSED4, 'PHYTO': PHYTO})
+
+	if nexits > 1:
+		u = uci['SAVE']
+		for index in range(1, ngqual+1):
+			for key in EXIT_OUTPUTS:
+				for i in range(nexits):
+					u[f'GQUAL{index}_{key}{i + 1}'] = u[key.rstrip('123')]
+		for key in ('ODQAL', 'OSQAL', 'TOSQAL'):
+			del u[key]
+
+	# constituents are stacked along the first axis: pm holds scalars (ngqual,), gq holds
+	# (ngqual, n) parameters and (ngqual, steps) timeseries plus the (steps, nexits) exit flows
+	pm = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
+	for key in pms[0]:
+		pm[key] = array([p[key] for p in pms], dtype=float)
+	gq = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:, ::1])
+	for key in gqs[0]:
+		gq[key] = array([g[key] for g in gqs], dtype=float)
+	for key in OUTPUTS + EXIT_OUTPUTS:
+		gq[key] = zeros((ngqual, simlen * (nexits if key in EXIT_OUTPUTS else 1)))
+
+	gq['SOVOL'] = SOVOL
+	gq['EOVOL'] = EOVOL
+	conv = 3.121E-08 if UUNITS == 1 else 2.83E-08
+	exits = uci['EXITS']
+	for j in ('1', '2', '3'):
+		OSED = zeros((simlen, nexits))
+		if nexits == 1:
+			OSED[:, 0] = ts['ROSED' + j]
+		elif 'OSED' + j in exits:    # from SEDTRN
+			OSED = exits['OSED' + j]
+		elif 'OSED' + j + '1' in ts:
 			for i in range(nexits):
-				u[f'{key1}{i + 1}'] = u['OSQAL']
-			del u['OSQAL']
-			key1 = name + '_TOSQAL'
-			for i in range(nexits):
-				u[f'{key1}{i + 1}'] = u['TOSQAL']
-			del u['TOSQAL']
-
-		for loop in range(simlen):
-			# within time loop
-
-			# tw20 may be required for bed decay of qual even if tw is undefined (due to vol=0.0)
-			tw   = TW[loop]
-			tw = (tw - 32.0) * 0.5555   # 5.0 / 9.0
-			tw20 = tw - 20.0           # TW20[loop]
-			if tw <= -10.0:
-				tw20 = 0.0
-			# correct unrealistically high values of tw calculated in htrch
-			if tw >= 50.0:
-				tw20 = 30.0
-			prec = PREC[loop]
-			sarea= SAREA[loop]
-			vol  = VOL[loop] * 43560
-			toqal = TOQAL[loop]
-			tosqal = TOSQAL[loop]
-			if UUNITS == 1:
-				depscr1 = DEPSCR1[loop] / 3.121E-08
-				depscr2 = DEPSCR2[loop] / 3.121E-08
-				depscr3 = DEPSCR3[loop] / 3.121E-08
-				rosed1 = ROSED1[loop] / 3.121E-08
-				rosed2 = ROSED2[loop] / 3.121E-08
-				rosed3 = ROSED3[loop] / 3.121E-08
-				osed1 = OSED1[loop]
-				osed2 = OSED2[loop]
-				osed3 = OSED3[loop]
-				osed1 = [x / 3.121E-08 for x in osed1]
-				osed2 = [x / 3.121E-08 for x in osed2]
-				osed3 = [x / 3.121E-08 for x in osed3]
-			else:
-				depscr1 = DEPSCR1[loop] / 2.83E-08
-				depscr2 = DEPSCR2[loop] / 2.83E-08
-				depscr3 = DEPSCR3[loop] / 2.83E-08
-				rosed1 = ROSED1[loop] / 2.83E-08
-				rosed2 = ROSED2[loop] / 2.83E-08
-				rosed3 = ROSED3[loop] / 2.83E-08
-				osed1 = OSED1[loop]
-				osed2 = OSED2[loop]
-				osed3 = OSED3[loop]
-				osed1 = [x / 2.83E-08 for x in osed1]
-				osed2 = [x / 2.83E-08 for x in osed2]
-				osed3 = [x / 2.83E-08 for x in osed3]
-			isqal1 = ISQAL1[loop]
-			isqal2 = ISQAL2[loop]
-			isqal3 = ISQAL3[loop]
-
-			if UUNITS == 2:  # uci is in metric units
-				avdepm = AVDEP[loop]
-				avdepe = AVDEP[loop] * 3.28
-				avvele = AVVEL[loop] * 3.28
-			else:         # uci is in english units
-				avdepm = AVDEP[loop] * 0.3048
-				avdepe = AVDEP[loop]
-				avvele = AVVEL[loop]
-
-			fact2 = zeros(19)
-			if qalfg[3] > 0:
+				OSED[:, i] = ts['OSED' + j + str(i + 1)]
+		gq['OSED' + j] = OSED / conv
+
+	ui = make_numba_dict(uci)
+	ui['simlen'] = simlen
+	ui['delt60'] = delt60
+	ui['delts']  = delts
+	ui['nexits'] = nexits
+	ui['ngqual'] = ngqual
+	ui['svol']   = svol
+	ui['lat']    = lat
+	ui['lkfg']   = lkfg
+	ui['len_']   = len_
+	ui['delth']  = delth
+	ui['light']  = light
+	ui['fact1']  = fact1
+	ui['errlen'] = len(ERRMSGS)
+
+	############################################################################
+	errors += _gqual_(ui, ts, pm, gq)
+	############################################################################
+
+	for index in range(1, ngqual+1):
+		name = 'GQUAL' + str(index)
+		for key in OUTPUTS:
+			ts[name + '_' + key] = gq[key][index-1]
+		if nexits > 1:
+			for key in EXIT_OUTPUTS:
+				exits[name + '_' + key] = gq[key][index-1].reshape((simlen, nexits))
+
+	return errors, ERRMSGS
+
+
+@njit(cache=True)
+def _gqual_(ui, ts, pm, gq):
+	''' GQUAL processing, all constituents advance together one time step at a time '''
+	errors = zeros(int(ui['errlen'])).astype(int64)
+
+	simlen = int(ui['simlen'])
+	ngqual = int(ui['ngqual'])
+	nexits = int(ui['nexits'])
+	delt60 = ui['delt60']
+	delts  = ui['delts']
+	svol   = ui['svol']
+	lat    = ui['lat']
+	lkfg   = int(ui['lkfg'])
+	len_   = ui['len_']
+	delth  = ui['delth']
+	light  = int(ui['light'])
+	fact1  = ui['fact1']
+	UUNITS = 1
+
+	# per-constituent parameters, rates already converted to /ivl
+	conv    = pm['conv']
+	ka      = pm['ka']
+	kb      = pm['kb']
+	kn      = pm['kn']
+	thhyd   = pm['thhyd']
+	kox     = pm['kox']
+	thox    = pm['thox']
+	cfgas   = pm['cfgas']
+	biocon  = pm['biocon']
+	thbio   = pm['thbio']
+	biop    = pm['biop']
+	fstdec  = pm['fstdec']
+	thfst   = pm['thfst']
+	addcpm1 = pm['addcpm1']
+	addcpm2 = pm['addcpm2']
+	addcpm3 = pm['addcpm3']
+	addcpm4 = pm['addcpm4']
+	phval   = pm['phval']
+	roc     = pm['roc']
+	reamfg  = pm['reamfg']
+	cforea  = pm['cforea']
+	tcginv  = pm['tcginv']
+	reak    = pm['reak']
+	reakt   = pm['reakt']
+	expred  = pm['expred']
+	exprev  = pm['exprev']
+
+	qalfg  = gq['QALFG']
+	gqpm2  = gq['GQPM2']
+	photpm = gq['PHOTPM']
+	adpm1  = gq['ADPM1']
+	adpm2  = gq['ADPM2']
+	adpm3  = gq['ADPM3']
+	rsed   = gq['RSED']
+	alph   = gq['ALPH']
+	gamm   = gq['GAMM']
+	delta  = gq['DELTA']
+	kcld   = gq['KCLD']
+	c      = gq['C'].copy().reshape((ngqual, 8, 7))
+
+	# state variables
+	dqal  = pm['dqal'].copy()
+	sqal  = gq['SQAL'].copy()
+	rsqal = gq['RSQAL'].copy()
+
+	# get input timeseries
+	AVDEP  = ts['AVDEP']
+	AVVEL  = ts['AVVEL']
+	HRFG   = ts['HRFG']
+	LSET   = ts['LSET']
+	PREC   = ts['PREC']
+	SAREA  = ts['SAREA']
+	TW     = ts['TW']
+	VOL    = ts['VOL']
+	WIND   = ts['WIND'] * 1609.0 # miles to meters
+	SROVOL = ts['SROVOL']
+	EROVOL = ts['EROVOL']
+	SOVOL  = gq['SOVOL']
+	EOVOL  = gq['EOVOL']
+
+	DEPSCR1 = ts['DEPSCR1']
+	DEPSCR2 = ts['DEPSCR2']
+	DEPSCR3 = ts['DEPSCR3']
+	ROSED1  = ts['ROSED1']
+	ROSED2  = ts['ROSED2']
+	ROSED3  = ts['ROSED3']
+	OSED1   = gq['OSED1']
+	OSED2   = gq['OSED2']
+	OSED3   = gq['OSED3']
+
+	IDQAL  = gq['IDQAL']
+	ISQAL1 = gq['ISQAL1']
+	ISQAL2 = gq['ISQAL2']
+	ISQAL3 = gq['ISQAL3']
+	GQADFX = gq['GQADFX']
+	GQADCN = gq['GQADCN']
+	BIO    = gq['BIO']
+	CLOUD  = gq['CLOUD']
+	SSED4  = gq['SSED4']
+	PHYTO  = gq['PHYTO']
+
+	# preallocated output arrays (ngqual, simlen)
+	ADQAL1 = gq['ADQAL1']
+	ADQAL2 = gq['ADQAL2']
+	ADQAL3 = gq['ADQAL3']
+	ADQAL4 = gq['ADQAL4']
+	ADQAL5 = gq['ADQAL5']
+	ADQAL6 = gq['ADQAL6']
+	ADQAL7 = gq['ADQAL7']
+	DDQAL1 = gq['DDQAL1']
+	DDQAL2 = gq['DDQAL2']
+	DDQAL3 = gq['DDQAL3']
+	DDQAL4 = gq['DDQAL4']
+	DDQAL5 = gq['DDQAL5']
+	DDQAL6 = gq['DDQAL6']
+	DDQAL7 = gq['DDQAL7']
+	DQAL   = gq['DQAL']
+	DSQAL1 = gq['DSQAL1']
+	DSQAL2 = gq['DSQAL2']
+	DSQAL3 = gq['DSQAL3']
+	DSQAL4 = gq['DSQAL4']
+	GQADDR = gq['GQADDR']
+	GQADEP = gq['GQADEP']
+	GQADWT = gq['GQADWT']
+	ISQAL4 = gq['ISQAL4']
+	PDQAL  = gq['PDQAL']
+	RDQAL  = gq['RDQAL']
+	RODQAL = gq['RODQAL']
+	ROSQAL1= gq['ROSQAL1']
+	ROSQAL2= gq['ROSQAL2']
+	ROSQAL3= gq['ROSQAL3']
+	ROSQAL4= gq['ROSQAL4']
+	RRQAL  = gq['RRQAL']
+	RSQAL1 = gq['RSQAL1']
+	RSQAL2 = gq['RSQAL2']
+	RSQAL3 = gq['RSQAL3']
+	RSQAL4 = gq['RSQAL4']
+	RSQAL5 = gq['RSQAL5']
+	RSQAL6 = gq['RSQAL6']
+	RSQAL7 = gq['RSQAL7']
+	RSQAL8 = gq['RSQAL8']
+	RSQAL9 = gq['RSQAL9']
+	RSQAL10= gq['RSQAL10']
+	RSQAL11= gq['RSQAL11']
+	RSQAL12= gq['RSQAL12']
+	SQAL1  = gq['SQAL1']
+	SQAL2  = gq['SQAL2']
+	SQAL3  = gq['SQAL3']
+	SQAL4  = gq['SQAL4']
+	SQAL5  = gq['SQAL5']
+	SQAL6  = gq['SQAL6']
+	SQDEC1 = gq['SQDEC1']
+	SQDEC2 = gq['SQDEC2']
+	SQDEC3 = gq['SQDEC3']
+	SQDEC4 = gq['SQDEC4']
+	SQDEC5 = gq['SQDEC5']
+	SQDEC6 = gq['SQDEC6']
+	SQDEC7 = gq['SQDEC7']
+	TIQAL  = gq['TIQAL']
+	TROQAL = gq['TROQAL']
+	# (ngqual, simlen * nexits) viewed as (ngqual, simlen, nexits)
+	ODQAL  = gq['ODQAL'].reshape((ngqual, simlen, nexits))
+	OSQAL1 = gq['OSQAL1'].reshape((ngqual, simlen, nexits))
+	OSQAL2 = gq['OSQAL2'].reshape((ngqual, simlen, nexits))
+	OSQAL3 = gq['OSQAL3'].reshape((ngqual, simlen, nexits))
+	TOSQAL = gq['TOSQAL'].reshape((ngqual, simlen, nexits))
+
+	ddqal = zeros((8, ngqual+1))
+	fact2 = zeros(19)
+	osqal1 = zeros(nexits)
+	osqal2 = zeros(nexits)
+	osqal3 = zeros(nexits)
+	odqal  = zeros(nexits)
+
+	for loop in range(simlen):
+		# within time loop
+
+		# tw20 may be required for bed decay of qual even if tw is undefined (due to vol=0.0)
+		tw   = TW[loop]
+		tw = (tw - 32.0) * 0.5555   # 5.0 / 9.0
+		tw20 = tw - 20.0           # TW20[loop]
+		if tw <= -10.0:
+			tw20 = 0.0
+		# correct unrealistically high values of tw calculated in htrch
+		if tw >= 50.0:
+			tw20 = 30.0
+		prec = PREC[loop]
+		sarea= SAREA[loop]
+		vol  = VOL[loop] * 43560
+		if UUNITS == 1:
+			depscr1 = DEPSCR1[loop] / 3.121E-08
+			depscr2 = DEPSCR2[loop] / 3.121E-08
+			depscr3 = DEPSCR3[loop] / 3.121E-08
+			rosed1 = ROSED1[loop] / 3.121E-08
+			rosed2 = ROSED2[loop] / 3.121E-08
+			rosed3 = ROSED3[loop] / 3.121E-08
+		else:
+			depscr1 = DEPSCR1[loop] / 2.83E-08
+			depscr2 = DEPSCR2[loop] / 2.83E-08
+			depscr3 = DEPSCR3[loop] / 2.83E-08
+			rosed1 = ROSED1[loop] / 2.83E-08
+			rosed2 = ROSED2[loop] / 2.83E-08
+			rosed3 = ROSED3[loop] / 2.83E-08
+		osed1 = OSED1[loop, :]     # already converted by gqual()
+		osed2 = OSED2[loop, :]
+		osed3 = OSED3[loop, :]
+
+		if UUNITS == 2:  # uci is in metric units
+			avdepm = AVDEP[loop]
+			avdepe = AVDEP[loop] * 3.28
+			avvele = AVVEL[loop] * 3.28
+		else:         # uci is in english units
+			avdepm = AVDEP[loop] * 0.3048
+			avdepe = AVDEP[loop]
+			avvele = AVVEL[loop]
+
+		srovol = SROVOL[loop]
+		erovol = EROVOL[loop]
+		sovol = SOVOL[loop, :]
+		eovol = EOVOL[loop, :]
+		hr = HRFG[loop]
+
+		# southern hemisphere is 2 seasons out of phase
+		lset = LSET[loop]
+		if  lat < 0:
+			lset += 2
+			if lset > 4:
+				lset -= 4
+
+		for i in range(ngqual):
+			index = i + 1     # constituent number, ddqal and c are indexed from 1
+			qf = qalfg[i]
+
+			fact2[:] = 0.0
+			if qf[3] > 0:
 				# one or more constituents undergoes photolysis decay
 				if avdepe > 0.17:
 					# depth of water in rchres is greater than two inches -
 					# consider photolysis; this criteria will also be applied to other decay processes
-
-					lset = lset_month[loop]
-					# southern hemisphere is 2 seasons out of phase
-					if  lat < 0:
-						lset += 2
-						if lset > 4:
-							lset -= 4
-
-					if cldfg == 1 or cldfg == 3:
-						cld = ts['CLOUD'][loop]
-					if phytfg == 1 or phytfg == 3:
-						if 'PHYTO' in ts:
-							phy = ts['PHYTO'][loop]    # not available until section plank is done
-					if sdfg == 1 or sdfg == 3:
-						sdcnc = ts['SSED4'][loop]
+					cld   = CLOUD[i, loop]
+					phy   = PHYTO[i, loop]
+					sdcnc = SSED4[i, loop]
 					for l in range(1, 19):
 						# evaluate the light extinction exponent- 2.76*klamda*d
-						kl   = alph[l] + gamm[l] * sdcnc + delta[l] * phy
+						kl   = alph[i, l] + gamm[i, l] * sdcnc + delta[i, l] * phy
 						expnt= 2.76 * kl * avdepm * 100.0
 						# evaluate the cloud factor
-						cldl= (10.0 - cld * kcld[l]) / 10.0
+						cldl= (10.0 - cld * kcld[i, l]) / 10.0
 						if expnt <= -20.0:
 							expnt = -20.
 						if expnt >= 20.0:
@@ -826,81 +951,63 @@ def gqual(store, siminfo, uci, ts):
 						# lit is data from the seq file
 						# fact2[l] = cldl * lit[l,lset] * (1.0 - exp(-expnt)) / expnt
 						fact2[l] = cldl * light_factor(l,lset,light) * (1.0 - exp(-expnt)) / expnt
-				else:
-					# depth of water in rchres is less than two inches -photolysis is not considered
-					pass
 
 			korea = 0.0
-			if qalfg[4] > 0:
+			if qf[4] > 0:
 				# prepare to simulate volatilization by finding the oxygen reaeration coefficient
 				wind = 0.0
 				if lkfg == 1:
 					wind =  WIND[loop]
 				if avdepe > 0.17:   # rchres depth is sufficient to consider volatilization
 					# compute oxygen reaeration rate-korea
-					korea = oxrea(lkfg, wind, cforea, avvele, avdepe, tcginv, reamfg, reak, reakt, expred, exprev,
-						  			len_, delth, tw, delts, delt60, UUNITS)
-					# KOREA = OXREA(LKFG,WIND,CFOREA,AVVELE,AVDEPE,TCGINV,REAMFG,REAK,REAKT,EXPRED,EXPREV,LEN, DELTH,TWAT,DELTS,DELT60,UUNITS,KOREA)
-				else:
-					# rchres depth is not sufficient to consider volatilization
-					pass
+					korea = oxrea(lkfg, wind, cforea[i], avvele, avdepe, tcginv[i], reamfg[i], reak[i], reakt[i],
+						expred[i], exprev[i], len_, delth, tw, delts, delt60, UUNITS)
 
 			# get data on inflow of dissolved material
-			gqadfx = GQADFX[loop]
-			gqadcn = GQADCN[loop]
-			gqaddr = sarea * conv * gqadfx  # dry deposition;
-			gqadwt = prec * sarea * gqadcn  # wet deposition;
+			gqaddr = sarea * conv[i] * GQADFX[i, loop]  # dry deposition;
+			gqadwt = prec * sarea * GQADCN[i, loop]     # wet deposition;
 
 			gqadep = gqaddr + gqadwt  # total atmospheric deposition
-			idqal = IDQAL[loop] * conv
+			idqal = IDQAL[i, loop] * conv[i]
 			indqal = idqal + gqaddr + gqadwt
 
 			# simulate advection of dissolved material
-			srovol = SROVOL[loop]
-			erovol = EROVOL[loop]
-			sovol = SOVOL[loop, :]
-			eovol = EOVOL[loop, :]
-			dqal, rodqal, odqal = advect(indqal, dqal, nexits, svol, vol, srovol, erovol, sovol, eovol)
-
-			bio = biop
-			if qalfg[5] > 0:
+			dq, rodqal = advect(indqal, dqal[i], nexits, svol, vol, srovol, erovol, sovol, eovol, odqal)
+
+			bio = biop[i]
+			if qf[5] > 0:
 				# get biomass input, if required (for degradation)
-				bio = BIO[loop]
+				bio = BIO[i, loop]
 
 			if avdepe > 0.17:   #  simulate decay of dissolved material
-				hr = HRFG[loop]
-				ddqal[:,index] = ddecay(qalfg, tw20, ka, kb, kn, thhyd, phval,kox,thox, roc, fact2, fact1, photpm, korea, cfgas,
-					 			biocon, thbio, bio, fstdec, thfst, vol, dqal, hr, delt60)
-				# ddqal[1,index] = DDECAY(QALFG(1,I),TW20,HYDPM(1,I),PHVAL,ROXPM(1,I),ROC,FACT2(1),FACT1,PHOTPM(1,I),KOREA,CFGAS(I),
-				# 						BIOPM(1,I),BIO(I),GENPM(1,I),VOLSP,DQAL(I),HR,DELT60,DDQAL(1,I))
+				ddqal[:,index] = ddecay(qf, tw20, ka[i], kb[i], kn[i], thhyd[i], phval[i], kox[i], thox[i], roc[i],
+					fact2, fact1, photpm[i], korea, cfgas[i], biocon[i], thbio[i], bio, fstdec[i], thfst[i], vol,
+					dq, hr, delt60)
 
 				pdqal = 0.0
 				for k in range(1, 6):
-					if gqpm2[k] == 1:    # this compound is a "daughter"-compute the contribution to it from its "parent(s)"
+					if gqpm2[i, k] == 1:    # this compound is a "daughter"-compute the contribution to it from its "parent(s)"
 						itobe = index - 1
 						for j in range(1,itobe):
-							pdqal = pdqal + ddqal[k,j]*c[j,k]
+							pdqal = pdqal + ddqal[k,j]*c[i,j,k]
 
 				# update the concentration to account for decay and for input
 				# from decay of "parents"- units are conc/l
 				if vol > 0:
-					dqal = dqal + (pdqal - ddqal[7,index])/vol
+					dq = dq + (pdqal - ddqal[7,index])/vol
 			else:
 				# rchres depth is less than two inches - dissolved decay is not considered
 				for l in range(1, 7):
 					ddqal[l,index] = 0.0
-				# 320      CONTINUE
 				pdqal = 0.0
 
 			adqal = zeros(8)
 			dsqal1 = 0.0
 			dsqal2 = 0.0
 			dsqal3 = 0.0
-			dsqal4 = 0.0
-			osqal1 = 0.0
-			osqal2 = 0.0
-			osqal3 = 0.0
-			osqal4 = 0.0
+			osqal1[:] = 0.0
+			osqal2[:] = 0.0
+			osqal3[:] = 0.0
 			rosqal1 = 0.0
 			rosqal2 = 0.0
 			rosqal3 = 0.0
@@ -916,7 +1023,11 @@ def gqual(store, siminfo, uci, ts):
 			dsqal4 = 0.0
 			rosqal4 = 0.0
 
-			if qalfg[7] == 1:   # this constituent is associated with sediment
+			sq = sqal[i]
+			rs = rsed[i]
+			rq = rsqal[i]
+			tosqal = TOSQAL[i, loop]
+			if qf[7] == 1:   # this constituent is associated with sediment
 				if nexits > 1:
 					for n in range(1, nexits):
 						tosqal[n] = 0.0
@@ -926,12 +1037,9 @@ def gqual(store, siminfo, uci, ts):
 
 				# sand
 				# advect this material, including calculation of deposition and scour
-				errors, sqal[1], sqal[4], dsqal1, rosqal1, osqal1 = advqal(isqal1, rsed[1], rsed[4], depscr1, rosed1, osed1,
-																	 nexits, rsqal1, rsqal5, errors)
-				# GQECNT(1),SQAL(J,I),SQAL(J + 3,I),DSQAL(J,I), ROSQAL(J,I),OSQAL(1,J,I)) = ADVQAL (ISQAL(J,I),RSED(J),RSED(J + 3),\
-				# DEPSCR(J),ROSED(J),OSED(1,J),NEXITS,RCHNO, MESSU,MSGFL,DATIM, GQID(1,I),J,RSQAL(J,I),RSQAL(J + 4,I),GQECNT(1),
-				# SQAL(J,I),SQAL(J + 3,I),DSQAL(J,I),ROSQAL(J,I),OSQAL(1,J,I))
-
+				isqal1 = ISQAL1[i, loop]
+				errors, sq[1], sq[4], dsqal1, rosqal1, osqal1 = advqal(isqal1, rs[1], rs[4], depscr1, rosed1, osed1,
+																	 nexits, rq[1], rq[5], errors)
 				isqal4   = isqal4 + isqal1
 				dsqal4  = dsqal4 + dsqal1
 				rosqal4 = rosqal4 + rosqal1
@@ -941,14 +1049,9 @@ def gqual(store, siminfo, uci, ts):
 
 				# silt
 				# advect this material, including calculation of deposition and scour
-				errors, sqal[2], sqal[5], dsqal2, rosqal2, osqal2 = advqal(isqal2, rsed[2], rsed[5], depscr2, rosed2, osed2,
-																	 nexits, rsqal2, rsqal6, errors)
-				# GQECNT(1), SQAL(J, I), SQAL(J + 3, I), DSQAL(J, I), ROSQAL(J, I), OSQAL(1, J, I)) = ADVQAL(
-				# 	ISQAL(J, I), RSED(J), RSED(J + 3), \
-				# 	DEPSCR(J), ROSED(J), OSED(1, J), NEXITS, RCHNO, MESSU, MSGFL, DATIM, GQID(1, I), J, RSQAL(J, I),
-				# 	RSQAL(J + 4, I), GQECNT(1),
-				# 	SQAL(J, I), SQAL(J + 3, I), DSQAL(J, I), ROSQAL(J, I), OSQAL(1, J, I))
-
+				isqal2 = ISQAL2[i, loop]
+				errors, sq[2], sq[5], dsqal2, rosqal2, osqal2 = advqal(isqal2, rs[2], rs[5], depscr2, rosed2, osed2,
+																	 nexits, rq[2], rq[6], errors)
 				isqal4 = isqal4 + isqal2
 				dsqal4 = dsqal4 + dsqal2
 				rosqal4 = rosqal4 + rosqal2
@@ -958,14 +1061,9 @@ def gqual(store, siminfo, uci, ts):
 
 				# clay
 				# advect this material, including calculation of deposition and scour
-				errors, sqal[3], sqal[6], dsqal3, rosqal3, osqal3 = advqal(isqal3, rsed[3], rsed[6], depscr3, rosed3, osed3,
-																	 nexits, rsqal3, rsqal7, errors)
-				# GQECNT(1), SQAL(J, I), SQAL(J + 3, I), DSQAL(J, I), ROSQAL(J, I), OSQAL(1, J, I)) = ADVQAL(
-				# 	ISQAL(J, I), RSED(J), RSED(J + 3), \
-				# 	DEPSCR(J), ROSED(J), OSED(1, J), NEXITS, RCHNO, MESSU, MSGFL, DATIM, GQID(1, I), J, RSQAL(J, I),
-				# 	RSQAL(J + 4, I), GQECNT(1),
-				# 	SQAL(J, I), SQAL(J + 3, I), DSQAL(J, I), ROSQAL(J, I), OSQAL(1, J, I))
-
+				isqal3 = ISQAL3[i, loop]
+				errors, sq[3], sq[6], dsqal3, rosqal3, osqal3 = advqal(isqal3, rs[3], rs[6], depscr3, rosed3, osed3,
+																	 nexits, rq[3], rq[7], errors)
 				isqal4 = isqal4 + isqal3
 				dsqal4 = dsqal4 + dsqal3
 				rosqal4 = rosqal4 + rosqal3
@@ -975,13 +1073,9 @@ def gqual(store, siminfo, uci, ts):
 
 				tiqal  = idqal + isqal4
 				troqal = rodqal + rosqal4
-				if nexits > 1:
-					for n in range(1, nexits):
-						toqal[n] = odqal[n] + tosqal[n]
 
 				if avdepe > 0.17:     # simulate decay on suspended sediment
-					sqal[1], sqal[2], sqal[3], sqdec1, sqdec2, sqdec3 = adecay(addcpm1, addcpm2, tw20, rsed[1], rsed[2], rsed[3], sqal[1], sqal[2], sqal[3])
-					# SQAL((1),I), SQDEC((1),I)) =  ADECAY(ADDCPM(1,I),TW20,RSED(1),SQAL((1),I),SQDEC((1),I))
+					sq[1], sq[2], sq[3], sqdec1, sqdec2, sqdec3 = adecay(addcpm1[i], addcpm2[i], tw20, rs[1], rs[2], rs[3], sq[1], sq[2], sq[3])
 				else:
 					# rchres depth is less than two inches - decay of qual
 					# associated with suspended sediment is not considered
@@ -990,135 +1084,115 @@ def gqual(store, siminfo, uci, ts):
 					sqdec3 = 0.0
 
 				# simulate decay on bed sediment
-				sqal[4], sqal[5], sqal[6], sqdec4, sqdec5, sqdec6 = adecay(addcpm3, addcpm4, tw20, rsed[4], rsed[5], rsed[6], sqal[4], sqal[5], sqal[6])
-				# SQAL((4),I), SQDEC((4),I)) = ADECAY(ADDCPM(3,I),TW20,RSED(4),SQAL((4),I),SQDEC((4),I))
+				sq[4], sq[5], sq[6], sqdec4, sqdec5, sqdec6 = adecay(addcpm3[i], addcpm4[i], tw20, rs[4], rs[5], rs[6], sq[4], sq[5], sq[6])
 
 				# get total decay
 				sqdec7 = sqdec1 + sqdec2 + sqdec3 + sqdec4 + sqdec5 + sqdec6
 
 				if avdepe > 0.17:  # simulate exchange due to adsorption and desorption
-					dqal, sqal, adqal = adsdes(vol, rsed, adpm1, adpm2, adpm3, tw20, dqal, sqal)
-					# DQAL(I), SQAL(1,I), ADQAL(1,I) = ADSDES(VOLSP,RSED(1),ADPM(1,1,I),TW20,DQAL(I),SQAL(1,I),ADQAL(1,I))
+					dq, sq, adqal = adsdes(vol, rs, adpm1[i], adpm2[i], adpm3[i], tw20, dq, sq)
 				else:
 					# rchres depth is less than two inches - adsorption and
 					# desorption of qual is not considered
-					adqal[1] = 0.0
-					adqal[2] = 0.0
-					adqal[3] = 0.0
-					adqal[4] = 0.0
-					adqal[5] = 0.0
-					adqal[6] = 0.0
-					adqal[7] = 0.0
+					adqal[:] = 0.0
 
 				# find total quantity of material on various forms of sediment
-				rsqal4 = 0.0
-				rsqal8 = 0.0
-				rsqal12 = 0.0
-				rsqal1 = sqal[1] * rsed[1]
-				rsqal2 = sqal[2] * rsed[2]
-				rsqal3 = sqal[3] * rsed[3]
-				rsqal4 = rsqal1 + rsqal2 + rsqal3
-				rsqal5 = sqal[4] * rsed[4]
-				rsqal6 = sqal[5] * rsed[5]
-				rsqal7 = sqal[6] * rsed[6]
-				rsqal8 = rsqal5 + rsqal6 + rsqal7
-				rsqal9 = rsqal1 + rsqal5
-				rsqal10 = rsqal2 + rsqal6
-				rsqal11 = rsqal3 + rsqal7
-				rsqal12 = rsqal9 + rsqal10 + rsqal11
+				rq[1] = sq[1] * rs[1]
+				rq[2] = sq[2] * rs[2]
+				rq[3] = sq[3] * rs[3]
+				rq[4] = rq[1] + rq[2] + rq[3]
+				rq[5] = sq[4] * rs[4]
+				rq[6] = sq[5] * rs[5]
+				rq[7] = sq[6] * rs[6]
+				rq[8] = rq[5] + rq[6] + rq[7]
+				rq[9] = rq[1] + rq[5]
+				rq[10] = rq[2] + rq[6]
+				rq[11] = rq[3] + rq[7]
+				rq[12] = rq[9] + rq[10] + rq[11]
 			else:
 				# qual constituent not associated with sediment-total just
 				# above should have been set to zero by run interpreter
 				tiqal = idqal
 				troqal = rodqal
-				if nexits > 1:
-					for n in range(1, nexits):
-						toqal[n] = odqal[n]
 
 			# find total quantity of qual in rchres
-			rdqal = dqal * vol
-			if qalfg[7] == 1:
-				rrqal = rdqal + rsqal12
+			dqal[i] = dq
+			rdqal = dq * vol
+			if qf[7] == 1:
+				rrqal = rdqal + rq[12]
 			else:
 				rrqal = rdqal
 
-			svol = vol  # svol is volume at start of time step, update for next time thru
-
-			ADQAL1[loop] = adqal[1] / conv		# put values for this time step back into TS
-			ADQAL2[loop] = adqal[2] / conv
-			ADQAL3[loop] = adqal[3] / conv
-			ADQAL4[loop] = adqal[4] / conv
-			ADQAL5[loop] = adqal[5] / conv
-			ADQAL6[loop] = adqal[6] / conv
-			ADQAL7[loop] = adqal[7] / conv
-			DDQAL1[loop] = ddqal[1,index] / conv
-			DDQAL2[loop] = ddqal[2, index] / conv
-			DDQAL3[loop] = ddqal[3, index] / conv
-			DDQAL4[loop] = ddqal[4, index] / conv
-			DDQAL5[loop] = ddqal[5, index] / conv
-			DDQAL6[loop] = ddqal[6, index] / conv
-			DDQAL7[loop] = ddqal[7, index] / conv
-			DQAL[loop]   = dqal
-			DSQAL1[loop] = dsqal1 / conv
-			DSQAL2[loop] = dsqal2 / conv
-			DSQAL3[loop] = dsqal3 / conv
-			DSQAL4[loop] = dsqal4 / conv
-			GQADDR[loop] = gqaddr
-			GQADEP[loop] = gqadep
-			GQADWT[loop] = gqadwt
-			ISQAL4[loop] = isqal4
-			ODQAL[loop]  = odqal / conv
-			OSQAL1[loop] = osqal1
-			OSQAL2[loop] = osqal2
-			OSQAL3[loop] = osqal3
-			PDQAL[loop]  = pdqal
-			RDQAL[loop]  = rdqal / conv
-			RODQAL[loop] = rodqal / conv
-			ROSQAL1[loop]= rosqal1
-			ROSQAL2[loop]= rosqal2
-			ROSQAL3[loop]= rosqal3
-			ROSQAL4[loop]= rosqal4
-			RRQAL[loop]  = rrqal / conv
-			RSQAL1[loop] = rsqal1 / conv
-			RSQAL2[loop] = rsqal2 / conv
-			RSQAL3[loop] = rsqal3 / conv
-			RSQAL4[loop] = rsqal4 / conv
-			RSQAL5[loop] = rsqal5 / conv
-			RSQAL6[loop] = rsqal6 / conv
-			RSQAL7[loop] = rsqal7 / conv
-			RSQAL8[loop] = rsqal8 / conv
-			RSQAL9[loop] = rsqal9 / conv
-			RSQAL10[loop]= rsqal10 / conv
-			RSQAL11[loop]= rsqal11 / conv
-			RSQAL12[loop]= rsqal12 / conv
-			SQAL1[loop]  = sqal[1]
-			SQAL2[loop]  = sqal[2]
-			SQAL3[loop]  = sqal[3]
-			SQAL4[loop]  = sqal[4]
-			SQAL5[loop]  = sqal[5]
-			SQAL6[loop]  = sqal[6]
-			SQDEC1[loop] = sqdec1 / conv
-			SQDEC2[loop] = sqdec2 / conv
-			SQDEC3[loop] = sqdec3 / conv
-			SQDEC4[loop] = sqdec4 / conv
-			SQDEC5[loop] = sqdec5 / conv
-			SQDEC6[loop] = sqdec6 / conv
-			SQDEC7[loop] = sqdec7 / conv
-			TIQAL[loop]  = tiqal
-			TOSQAL[loop] = tosqal
-			TROQAL[loop] = troqal / conv
-
-		if nexits > 1:
-			for i in range(nexits):
-				ts[name + '_ODQAL' + str(i + 1)] = ODQAL[:, i]
-				ts[name + '_OSQAL1' + str(i + 1)] = OSQAL1[:, i]
-				ts[name + '_OSQAL2' + str(i + 1)] = OSQAL2[:, i]
-				ts[name + '_OSQAL3' + str(i + 1)] = OSQAL3[:, i]
-				ts[name + '_TOSQAL' + str(i + 1)] = TOSQAL[:, i]
-
-	return errors, ERRMSGS
-
-
+			cv = conv[i]
+			ADQAL1[i, loop] = adqal[1] / cv		# put values for this time step back into TS
+			ADQAL2[i, loop] = adqal[2] / cv
+			ADQAL3[i, loop] = adqal[3] / cv
+			ADQAL4[i, loop] = adqal[4] / cv
+			ADQAL5[i, loop] = adqal[5] / cv
+			ADQAL6[i, loop] = adqal[6] / cv
+			ADQAL7[i, loop] = adqal[7] / cv
+			DDQAL1[i, loop] = ddqal[1, index] / cv
+			DDQAL2[i, loop] = ddqal[2, index] / cv
+			DDQAL3[i, loop] = ddqal[3, index] / cv
+			DDQAL4[i, loop] = ddqal[4, index] / cv
+			DDQAL5[i, loop] = ddqal[5, index] / cv
+			DDQAL6[i, loop] = ddqal[6, index] / cv
+			DDQAL7[i, loop] = ddqal[7, index] / cv
+			DQAL[i, loop]   = dq
+			DSQAL1[i, loop] = dsqal1 / cv
+			DSQAL2[i, loop] = dsqal2 / cv
+			DSQAL3[i, loop] = dsqal3 / cv
+			DSQAL4[i, loop] = dsqal4 / cv
+			GQADDR[i, loop] = gqaddr
+			GQADEP[i, loop] = gqadep
+			GQADWT[i, loop] = gqadwt
+			ISQAL4[i, loop] = isqal4
+			ODQAL[i, loop]  = odqal / cv
+			OSQAL1[i, loop] = osqal1
+			OSQAL2[i, loop] = osqal2
+			OSQAL3[i, loop] = osqal3
+			PDQAL[i, loop]  = pdqal
+			RDQAL[i, loop]  = rdqal / cv
+			RODQAL[i, loop] = rodqal / cv
+			ROSQAL1[i, loop]= rosqal1
+			ROSQAL2[i, loop]= rosqal2
+			ROSQAL3[i, loop]= rosqal3
+			ROSQAL4[i, loop]= rosqal4
+			RRQAL[i, loop]  = rrqal / cv
+			RSQAL1[i, loop] = rq[1] / cv
+			RSQAL2[i, loop] = rq[2] / cv
+			RSQAL3[i, loop] = rq[3] / cv
+			RSQAL4[i, loop] = rq[4] / cv
+			RSQAL5[i, loop] = rq[5] / cv
+			RSQAL6[i, loop] = rq[6] / cv
+			RSQAL7[i, loop] = rq[7] / cv
+			RSQAL8[i, loop] = rq[8] / cv
+			RSQAL9[i, loop] = rq[9] / cv
+			RSQAL10[i, loop]= rq[10] / cv
+			RSQAL11[i, loop]= rq[11] / cv
+			RSQAL12[i, loop]= rq[12] / cv
+			SQAL1[i, loop]  = sq[1]
+			SQAL2[i, loop]  = sq[2]
+			SQAL3[i, loop]  = sq[3]
+			SQAL4[i, loop]  = sq[4]
+			SQAL5[i, loop]  = sq[5]
+			SQAL6[i, loop]  = sq[6]
+			SQDEC1[i, loop] = sqdec1 / cv
+			SQDEC2[i, loop] = sqdec2 / cv
+			SQDEC3[i, loop] = sqdec3 / cv
+			SQDEC4[i, loop] = sqdec4 / cv
+			SQDEC5[i, loop] = sqdec5 / cv
+			SQDEC6[i, loop] = sqdec6 / cv
+			SQDEC7[i, loop] = sqdec7 / cv
+			TIQAL[i, loop]  = tiqal
+			TROQAL[i, loop] = troqal / cv
+
+		svol = vol  # svol is volume at start of time step, update for next time thru
+
+	return errors
+
+
+@njit(cache=True)
 def adecay(addcpm1, addcpm2, tw20, rsed_sand, rsed_silt, rsed_clay, sqal_sand, sqal_silt, sqal_clay):
 	# real  addcpm(2),rsed(3),sqal(3),sqdec(3),tw20
 	''' simulate decay of material in adsorbed state'''
@@ -1146,6 +1220,7 @@ def adecay(addcpm1, addcpm2, tw20, rsed_sand, rsed_silt, rsed_clay, sqal_sand, s
 	return  sqal_sand, sqal_silt, sqal_clay, sqdec_sand, sqdec_silt, sqdec_clay
 
 
+@njit(cache=True)
 def adsdes(vol,rsed,adpm1,adpm2,adpm3,tw20,dqal,sqal):
 	#  adpm(6,3),adqal(7),dqal,rsed(6),sqal(6),tw20,vol
 
@@ -1202,6 +1277,7 @@ def adsdes(vol,rsed,adpm1,adpm2,adpm3,tw20,dqal,sqal):
 	return dqal, sqal, adqal
 
 
+@njit(cache=True)
 def advqal(isqal,rsed,bsed,depscr,rosed,osed,nexits,rsqals,rbqals,errors):
 
 	''' simulate the advective processes, including deposition and
@@ -1263,6 +1339,7 @@ def advqal(isqal,rsed,bsed,depscr,rosed,osed,nexits,rsqals,rbqals,errors):
 	return errors, sqal, bqal, dsqal, rosqal, osqal
 
 
+@njit(cache=True)
 def ddecay (qalfg,tw20,ka,kb,kn,thhyd,phval,kox,thox,roc,fact2,fact1,photpm,korea,cfgas,biocon,thbio,
 			bio,fstdec,thfst,volsp,dqal,hr,delt60):
 	''' estimate decay of dissolved constituent'''
@@ -1326,55 +1403,57 @@ def ddecay (qalfg,tw20,ka,kb,kn,thhyd,phval,kox,thox,roc,fact2,fact1,photpm,kore
 
 	return ddqal
 
+
+# light factors for photolysis, in hspf read from seq file; indexed [light - 1, lset - 1, l - 1]
+LIGHT_FACTORS = array([
+	[
+		[.0102,.0178,.0285,.0327,.0418,.0370,.339,.433,.840,1.16,1.47,1.50,2.74,2.90,2.90,2.80,2.70,3.00],
+		[.000466,.00316,.00937,.0190,.0291,.0265,.329,.438,.837,1.17,1.47,1.50,2.69,2.79,2.80,2.80,2.70,2.50],
+		[.000419,.00287,.00851,.00173,.0266,.0291,.299,.385,.764,1.07,1.36,1.37,2.46,2.52,2.60,2.60,2.50,2.30],
+		[.000320,.00239,.00726,.0151,.0238,.0236,.0292,.344,.696,.980,1.23,1.27,2.26,2.35,2.43,2.30,2.40,2.10],
+	],
+	[
+		[.000351,.00251,.00809,.0181,.0282,.0283,.329,.424,.841,1.17,1.47,1.50,2.68,2.80,2.80,2.80,2.76,2.50],
+		[.000444,.00315,.00961,.0197,.0302,.0303,.347,.447,.883,1.23,1.55,1.58,2.81,2.96,2.90,3.00,2.80,2.70],
+		[.000274,.00220,.00689,.0148,.0233,.0233,.268,.345,.696,.980,1.24,1.26,2.30,2.35,2.42,2.40,2.20,2.26],
+		[.000147,.00147,.00534,.0115,.0188,.0188,.221,.286,.597,.840,1.06,1.09,1.95,2.03,2.07,2.10,2.36,1.60],
+	],
+	[
+		[.000230,.00213,.00726,.0165,.0264,.0269,.320,.414,.827,1.15,1.45,1.48,2.64,2.74,2.76,2.80,2.70,2.50],
+		[.000365,.00232,.00902,.0192,.0302,.0304,.374,.437,.907,1.34,1.59,1.62,2.89,3.03,3.00,3.00,2.90,2.80],
+		[.000135,.00144,.00484,.0116,.0189,.0230,.223,.284,.623,.850,1.09,1.11,2.00,2.07,2.09,2.10,2.10,1.90],
+		[.0000410,.000650,.00276,.00755,.0131,.0134,.170,.219,.475,.669,.850,.880,1.57,1.63,1.67,1.73,1.63,1.60],
+	],
+	[
+		[.000109,.00137,.00296,.00799,.0138,.0142,.178,.230,.526,.676,.890,.923,1.69,1.73,1.78,1.50,1.70,1.60],
+		[.000249,.00232,.00793,.0181,.0291,.0297,.354,.458,.971,1.28,1.43,1.63,2.92,3.05,3.00,3.10,2.90,2.90],
+		[.000109,.00137,.00535,.0138,.02319,.0239,.108,.384,.791,1.11,1.39,1.42,2.52,2.62,2.60,4.70,2.60,2.50],
+		[.0000054,.000156,.00102,.00379,.00753,.00810,.0752,.147,.338,.480,.610,.620,1.12,1.16,1.19,1.39,1.20,1.16],
+	],
+	[
+		[.0000371,.000710,.00355,.00730,.00184,.0196,.266,.348,.724,1.02,1.29,1.32,2.34,2.40,2.44,2.50,2.50,2.30],
+		[.0000079,.00175,.00653,.0163,.0267,.0277,.343,.444,.904,1.26,1.60,1.63,2.90,3.04,3.00,3.10,2.90,2.90],
+		[.000152,.000225,.00129,.00439,.00864,.00920,.124,.166,.365,.517,.660,.680,1.22,1.25,1.31,1.34,1.31,1.24],
+		[.0000004,.0000157,.000178,.00120,.00293,.00368,.0629,.0821,.196,.275,.351,.355,.630,.640,.690,.710,.710,.690],
+	],
+])
+
+
+@njit(cache=True)
 def light_factor(l, lset, light):
-	# light factors for photolysis, in hspf read from seq file
-	vals = [0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0]
-	if light == 1:
-		if lset == 1:
-			vals = [.0102,.0178,.0285,.0327,.0418,.0370,.339,.433,.840,1.16,1.47,1.50,2.74,2.90,2.90,2.80,2.70,3.00]
-		elif lset == 2:
-			vals = [.000466,.00316,.00937,.0190,.0291,.0265,.329,.438,.837,1.17,1.47,1.50,2.69,2.79,2.80,2.80,2.70,2.50]
-		elif lset == 3:
-			vals = [.000419,.00287,.00851,.00173,.0266,.0291,.299,.385,.764,1.07,1.36,1.37,2.46,2.52,2.60,2.60,2.50,2.30]
-		else:
-			vals = [.000320,.00239,.00726,.0151,.0238,.0236,.0292,.344,.696,.980,1.23,1.27,2.26,2.35,2.43,2.30,2.40,2.10]
-	elif light == 2:
-		if lset == 1:
-			vals = [.000351,.00251,.00809,.0181,.0282,.0283,.329,.424,.841,1.17,1.47,1.50,2.68,2.80,2.80,2.80,2.76,2.50]
-		elif lset == 2:
-			vals = [.000444,.00315,.00961,.0197,.0302,.0303,.347,.447,.883,1.23,1.55,1.58,2.81,2.96,2.90,3.00,2.80,2.70]
-		elif lset == 3:
-			vals = [.000274,.00220,.00689,.0148,.0233,.0233,.268,.345,.696,.980,1.24,1.26,2.30,2.35,2.42,2.40,2.20,2.26]
-		else:
-			vals = [.000147,.00147,.00534,.0115,.0188,.0188,.221,.286,.597,.840,1.06,1.09,1.95,2.03,2.07,2.10,2.36,1.60]
-	elif light == 3:
-		if lset == 1:
-			vals = [.000230,.00213,.00726,.0165,.0264,.0269,.320,.414,.827,1.15,1.45,1.48,2.64,2.74,2.76,2.80,2.70,2.50]
-		elif lset == 2:
-			vals = [.000365,.00232,.00902,.0192,.0302,.0304,.374,.437,.907,1.34,1.59,1.62,2.89,3.03,3.00,3.00,2.90,2.80]
-		elif lset == 3:
-			vals = [.000135,.00144,.00484,.0116,.0189,.0230,.223,.284,.623,.850,1.09,1.11,2.00,2.07,2.09,2.10,2.10,1.90]
-		else:
-			vals = [.0000410,.000650,.00276,.00755,.0131,.0134,.170,.219,.475,.669,.850,.880,1.57,1.63,1.67,1.73,1.63,1.60]
-	elif light == 4:
-		if lset == 1:
-			vals = [.000109,.00137,.00296,.00799,.0138,.0142,.178,.230,.526,.676,.890,.923,1.69,1.73,1.78,1.50,1.70,1.60]
-		elif lset == 2:
-			vals = [.000249,.00232,.00793,.0181,.0291,.0297,.354,.458,.971,1.28,1.43,1.63,2.92,3.05,3.00,3.10,2.90,2.90]
-		elif lset == 3:
-			vals = [.000109,.00137,.00535,.0138,.02319,.0239,.108,.384,.791,1.11,1.39,1.42,2.52,2.62,2.60,4.70,2.60,2.50]
-		else:
-			vals = [.0000054,.000156,.00102,.00379,.00753,.00810,.0752,.147,.338,.480,.610,.620,1.12,1.16,1.19,1.39,1.20,1.16]
-	elif light == 5:
-		if lset == 1:
-			vals = [.0000371,.000710,.00355,.00730,.00184,.0196,.266,.348,.724,1.02,1.29,1.32,2.34,2.40,2.44,2.50,2.50,2.30]
-		elif lset == 2:
-			vals = [.0000079,.00175,.00653,.0163,.0267,.0277,.343,.444,.904,1.26,1.60,1.63,2.90,3.04,3.00,3.10,2.90,2.90]
-		elif lset == 3:
-			vals = [.000152,.000225,.00129,.00439,.00864,.00920,.124,.166,.365,.517,.660,.680,1.22,1.25,1.31,1.34,1.31,1.24]
-		else:
-			vals = [.0000004,.0000157,.000178,.00120,.00293,.00368,.0629,.0821,.196,.275,.351,.355,.630,.640,.690,.710,.710,.690]
-	return vals[l-1]
+	''' light factor for wavelength interval l, season set lset and latitude table light '''
+	if light < 1 or light > 5:
+		return 0.0
+	if lset == 1:
+		s = 0
+	elif lset == 2:
+		s = 1
+	elif lset == 3:
+		s = 2
+	else:
+		s = 3
+	return LIGHT_FACTORS[light - 1, s, l - 1]
+
 
 def expand_GQUAL_masslinks(flags, uci, dat, recs):
 	if flags['GQUAL']:
@@ -24,11 +24,12 @@ C         metric to english
 '''
 	
 import numpy as np
+from numba import njit
 from HSP2.ADCALC import advect
-from numpy import zeros, full
-from HSP2.utilities  import make_numba_dict, hourflag, hoursval, initm
+from numpy import zeros, full, where
+from HSP2.utilities  import make_numba_dict, hoursval, initm
+
 
-		
 # METRIC LAPSE DATA
 mlapse = [0.0019, 0.0019, 0.0019, 0.0019, 0.0019, 0.0019, 0.0021, 0.0022, 0.0023, 0.0024,
   0.0026, 0.0026, 0.0027, 0.0027, 0.0028, 0.0028, 0.0027, 0.0026, 0.0024, 0.0023, 0.0022,
@@ -36,6 +37,8 @@ mlapse = [0.0019, 0.0019, 0.0019, 0.0019, 0.0019, 0.0019, 0.0021, 0.0022, 0.0023
 
 ERRMSG = []
 
+
+
 def htrch(store, siminfo, uci, ts):
 	'''Simulate heat exchange and water temperature'''
 
@@ -48,184 +51,184 @@ def htrch(store, siminfo, uci, ts):
 	delt   = siminfo['delt']
 	delt60 = siminfo['delt'] / 60
 
-	DAYFG = hourflag(siminfo, 0, dofirst=True).astype(bool)
-
 	ui = make_numba_dict(uci)
 	nexits = int(ui['NEXITS'])
-	adfg = int(ui['ADFG'])
+	ui['simlen'] = simlen
+	ui['delt60'] = delt60
+	ui['nexits'] = nexits
+	ui['svol']   = vol
+
+	# for table HT-BED-FLAGS
+	if 'BEDFLG' not in ui:
+		ui['BEDFLG'] = 0
+	if 'TGFLG' not in ui:
+		ui['TGFLG'] = 2
+	if 'TSTOP' not in ui:
+		ui['TSTOP'] = 55
+	bedflg = int(ui['BEDFLG'])
+	tstop  = int(ui['TSTOP'])
+
+	tgrnd = 59.0
+	if bedflg == 1 or bedflg == 2:
+		tgrnd  = ui['TGRND']
+
+	# Jobson's bed conduction model weights the last tstop changes in water temperature
+	delh = zeros(tstop)
+	if bedflg == 3 and 'EXTENDEDS_DELH' in uci:
+		ttable = uci['EXTENDEDS_DELH']
+		for i in range(tstop):
+			if 'DELH' + str(i) in ttable:
+				delh[i] = ttable['DELH' + str(i)]
+
+	shadfg = ui['SHADFG'] if 'SHADFG' in ui else 0
+
+	u = uci['PARAMETERS']
+	# process optional monthly arrays to return interpolated data or constant array
+	if 'TGFLG' in u:
+		ts['TGRND'] = initm(siminfo, uci, u['TGFLG'], 'TGRND', tgrnd)
+	else:
+		ts['TGRND'] = full(simlen, tgrnd)
+
+	if not 'IHEAT' in ts:
+		ts['IHEAT'] = zeros(simlen)
+
+	UUNITS = 1  # assume english units for now
+
+	# forcing terms that do not depend on water temperature are computed for the whole run at once
+	eldat  = ui['ELDAT']
+	cfsaex = ui['CFSAEX']
+
+	# calculate solar radiation absorbed(qsolar); solrad, which is expressed in langleys/ivl, is the solar radiation at gage corrected for location of reach;
+	if shadfg == 1:
+		# shadeh() is not implemented; use srad = 1.0 as the solar radiation absorbed by the stream
+		QSOLAR = full(simlen, 1.0 * 10.0)   # 10.0 is the conversion from ly/ivl to kcal/m2.ivl.
+	else:
+		# 0.97 accounts for surface reflection (assumed 3 percent);
+		# cfsaex is the ratio of radiation incident to water surface to gage radiation values (accounts for regional differences, shading of water surface,etc)
+		# 10.0 is the conversion from ly/ivl to kcal/m2.ivl.
+		QSOLAR = 0.97 * cfsaex * ts['SOLRAD'] * 10.0
+
+	# get quantity of precipitation and convert ft/ivl to m/ivl,
+	PREC  = ts['PREC']
+	MPREC = where(PREC > 0.0, PREC / 3.2808 if UUNITS == 1 else PREC, 0.0)
+
+	# calculate cloud cover factor for determination of atmospheric longwave radiation
+	CLDFAC = 1.0 + (0.0017 * (ts['CLOUD']**2))
+
+	WIND   = ts['WIND'] * 5280.0 / 3.28     # get wind movement expressed in m/ivl
+	DEWTMP = (ts['DEWTMP'] - 32.0) * 0.555
+
+	# ratemp -- correct air temperature for elevation differences
+	ts['LAPSE'] = hoursval(siminfo, mlapse, lapselike=True)
+	# find precipitation rate during the interval; prrat is expressed in m/min
+	# use rain period lapse rate expressed as deg c/ft, else dry period lapse rate expressed as deg c/ft
+	LAPS   = where(MPREC / delt > 2.0e-5, 1.94e-03, ts['LAPSE'][0:simlen])
+	# corrected air temperature for the end of each interval; airtmp is expressed in degrees c
+	AIRTMP = (ts['GATMP'] - 32.0) * 0.555 - LAPS * eldat
+	ts['AIRTMP'] = (AIRTMP * 9.0 / 5.0) + 32.0
 
 	TW     = ts['TW']     = zeros(simlen)
-	AIRTMP = ts['AIRTMP'] = zeros(simlen)
 	HTEXCH = ts['HTEXCH'] = zeros(simlen)
 	ROHEAT = ts['ROHEAT'] = zeros(simlen)
 	OHEAT  = zeros((simlen, nexits))
-	
-	HTWCNT= 0
-	elev =  ui['ELEV']
-	eldat  = ui['ELDAT']
-	cfsaex = ui['CFSAEX']
+
+	if nexits > 1:
+		u = uci['SAVE']
+		key = 'OHEAT'
+		for i in range(nexits):
+			u[f'{key}{i + 1}'] = u[key]
+		del u[key]
+
+	############################################################################
+	args = (ui, ts, QSOLAR, MPREC, CLDFAC, WIND, DEWTMP, AIRTMP, delh, VOL, SROVOL, EROVOL, SOVOL, EOVOL,
+		TW, HTEXCH, ROHEAT, OHEAT)
+	_htrch_(*args)
+	############################################################################
+
+	if nexits > 1:
+		uci['EXITS']['OHEAT'] = OHEAT
+
+	return errorsV, ERRMSG
+
+
+@njit(cache=True)
+def _htrch_(ui, ts, QSOLAR, MPREC, CLDFAC, WIND, DEWTMP, AIRTMP, delh, VOL, SROVOL, EROVOL, SOVOL, EOVOL,
+		TW, HTEXCH, ROHEAT, OHEAT):
+	''' HTRCH processing; water temperature is advected and then updated by the heat balance '''
+	simlen = int(ui['simlen'])
+	delt60 = ui['delt60']
+	nexits = int(ui['nexits'])
+	adfg   = int(ui['ADFG'])
+
+	elev   = ui['ELEV']
 	katrad = ui['KATRAD']
 	kcond  = ui['KCOND']
 	kevap  = ui['KEVAP']
 
-	# for table HT-BED-FLAGS
-	if 'BEDFLG' in ui:
-		bedflg = ui['BEDFLG']
-	else:
-		bedflg = 0
-	if 'TGFLG' in ui:
-		tgflg  = ui['TGFLG']
-	else:
-		tgflg = 2
-	if 'TSTOP' in ui:
-		tstop  = ui['TSTOP']
-	else:
-		tstop = 55
+	bedflg = int(ui['BEDFLG'])
+	tstop  = int(ui['TSTOP'])
 
-	tgrnd = 59.0
+	muddep = 0.0
+	kmud   = 0.0
+	kgrnd  = 0.0
 	if bedflg == 1 or bedflg == 2:
 		muddep = ui['MUDDEP']
-		tgrnd  = ui['TGRND']
 		kmud   = ui['KMUD']  * delt60  # convert rate coefficients from kcal/m2/C/hr to kcal/m2/C/ivl
 		kgrnd  = ui['KGRND'] * delt60
 
-	if bedflg == 3:
-		delh  = ui['DELH']
-		delt  = ui['DELT']
-
-	if 'SHADFG' in ui:
-		shadfg = ui['SHADFG']
-	else:
-		shadfg = 0
-
-	# if SHADFG:
-		# pshade()  # not implemented for now
-	
 	# calculate the pressure correction factor for conductive-convective heat transport
 	cfpres= ((288.0 - 0.001981 * elev) / 288.0)**5.256
 
 	tw     = ui['TW']
 	tw     = (tw - 32.0) * 0.555
-	airtmp = ui['AIRTMP']
-	airtmp = (airtmp - 32.0) * 0.555
-	svol = vol
+	svol = ui['svol']
 	rheat  = tw * svol     # compute initial value of heat storage
 
 	# if bedflg == 2:  # compute initial tmud and tmuddt for brock/caupp model
 	tmud   = tw        # assume tmud = tw and
 	tmuddt = -0.1      # tmuddt is small + negative (at midnight)
 
-	############### end of PTHRCH
+	deltt = zeros(tstop + 1)
 
-	u = uci['PARAMETERS']
-	# process optional monthly arrays to return interpolated data or constant array
-	if 'TGFLG' in u:
-		ts['TGRND'] = initm(siminfo, uci, u['TGFLG'], 'TGRND', tgrnd)
-	else:
-		ts['TGRND'] = full(simlen, tgrnd)
 	TGRND = ts['TGRND']
-
-	if not 'IHEAT' in ts:
-		ts['IHEAT'] = zeros(simlen)
 	IHEAT = ts['IHEAT']  # kcal.vol/l.ivl; heat is relative to 0 degreees c
 
 	AVDEP = ts['AVDEP']
 	UUNITS = 1  # assume english units for now
-	AVDEPE = AVDEP  if UUNITS == 1 else AVDEP * 3.28 	# avdepe is the average depth in english units
-
-	SOLRAD = ts['SOLRAD']
-	if shadfg == 1:
-		DSOLAR = ts['DSOLAR']
-	PREC   = ts['PREC']
-	CLOUD  = ts['CLOUD']
-	GATMP  = ts['GATMP']  # get gage air temperature
-	DEWTMP = ts['DEWTMP']
-	WIND   = ts['WIND']  # get wind movement expressed in m/ivl
-	ts['LAPSE'] = hoursval(siminfo, mlapse, lapselike=True)
-	LAPSE  = ts['LAPSE']
-
-	qsolar = 0.0
-	deltt = []
-
-	if nexits > 1:
-		u = uci['SAVE']
-		key = 'OHEAT'
-		for i in range(nexits):
-			u[f'{key}{i + 1}'] = u[key]
-		del u[key]
+	oheat = zeros(nexits)
 
 	for loop in range(simlen):
 
 		tws = tw
 		iheat  = IHEAT[loop] * 0.0089   # conv factor from rchrests.seq     vol * 43560. also needed
-		solrad = SOLRAD[loop]
-		oheat  = 0.0
 
 		vol = VOL[loop]
 		srovol = SROVOL[loop]
 		erovol = EROVOL[loop]
 		sovol  = SOVOL[loop,:]
 		eovol  = EOVOL[loop,:]
-		tw, roheat, oheat = advect(iheat, tw, nexits, svol * 43560, vol * 43560, srovol, erovol, sovol, eovol) # watertemp treated as a concentration
-		#                   advect(imat, conc, nexits, vol, VOL, SROVOL, EROVOL, SOVOL, EOVOL)
+		tw, roheat = advect(iheat, tw, nexits, svol * 43560, vol * 43560, srovol, erovol, sovol, eovol, oheat) # watertemp treated as a concentration
 		svol = vol
 
 		if tw > 66.0:
 			if adfg < 2:
-				# errormsg:  'advect:tw problem ',dtw, airtmp
-				rtw = tw
+				pass  # errormsg:  'advect:tw problem ',dtw, airtmp
 			else:
 				tw = tws
 
 		# simulate heat exchange with the atmosphere
+		qsolar = QSOLAR[loop]
 
-		# calculate solar radiation absorbed(qsolar); solrad, which is expressed in langleys/ivl, is the solar radiation at gage corrected for location of reach;
+		# calculate heat transfer rates for water surface; units are kcal/m2.ivl
 
-		if shadfg == 1:     # perform shading calculations
-			if DAYFG:       # get total daily input radiation
-				dsolar = DSOLAR[loop]
-				# shadeh(srad)  		# use shade module to compute solar radiation absorbed by stream
-				srad = 1.0
-				qsolar = srad * 10.0   # 10.0 is the conversion from ly/ivl to kcal/m2.ivl.
-		else:               # use constant shading factor
-			# 0.97 accounts for surface reflection (assumed 3 percent);
-			# cfsaex is the ratio of radiation incident to water surface to gage radiation values (accounts for regional differences, shading of water surface,etc)
-			# 10.0 is the conversion from ly/ivl to kcal/m2.ivl.
-			qsolar = 0.97 * cfsaex * solrad * 10.0
+		# calculate heat added by precip, assuming temperature is equal to reach/res water temperature
+		qprec = MPREC[loop] * tw * 1000.0
 
-		# calculate heat transfer rates for water surface; units are kcal/m2.ivl
+		cldfac = CLDFAC[loop]
+		wind   = WIND[loop]
+		airtmp = AIRTMP[loop]
 
-		# get quantity of precipitation and convert ft/ivl to m/ivl,
-		prec = PREC[loop]
-		if prec > 0.0:
-			mprec = prec /3.2808 if UUNITS == 1 else prec
-			# calculate heat added by precip, assuming temperature is equal to reach/res water temperature
-			qprec = mprec * tw * 1000.0
-		else:
-			qprec = 0.0
-			mprec = 0.0
-
-		# calculate cloud cover factor for determination of atmospheric longwave radiation
-		cloud = CLOUD[loop]
-		cldfac = 1.0 + (0.0017 * (cloud**2))
-
-		gatmp  = GATMP[loop]     # get gage air temperature
-		gatmp  = (gatmp - 32.0) * 0.555
-		dewtmp = DEWTMP[loop]
-		dewtmp = (dewtmp - 32.0) * 0.555
-		wind   = WIND[loop] * 5280.0 / 3.28     # get wind movement expressed in m/ivl
-		lapse  = LAPSE[loop]
-		# ratemp -- correct air temperature for elevation differences
-		#   find precipitation rate during the interval; prrat is expressed in m/min
-		prrat = mprec / delt
-		if prrat > 2.0e-5:  # use rain period lapse rate expressed as deg c/ft
-			laps = 1.94e-03
-		else:  # use dry period lapse rate expressed as deg c/ft
-			laps = lapse
-		# compute corrected air temperature for the end of the current interval; airtmp is expressed in degrees c
-		airtmp = gatmp - laps * eldat
-
-		avdepe = AVDEPE[loop]
+		avdepe = AVDEP[loop]  if UUNITS == 1 else AVDEP[loop] * 3.28 	# avdepe is the average depth in english units
 		if avdepe > 0.17:
 			# to degrees kelvin to calculate atmospheric longwave radiation
 			twkelv = tw     + 273.16
@@ -245,7 +248,7 @@ def htrch(store, siminfo, uci, ts):
 			# water evaporated during interval in meters/ivl; kevap is the evaporation coefficient
 			# vapor(dewtmp) is vapor pressure of air above water surface in millibars
 			# vapor(tw) is saturation vapor pressure at the water surface in millibars
-			evap = kevap * 1.0e-9 * wind * (vapor(tw) - vapor(dewtmp))
+			evap = kevap * 1.0e-9 * wind * (vapor(tw) - vapor(DEWTMP[loop]))
 
 			# heat loss due to evaporation in kcal/m2.ivl
 			# (597300. - 570.*tw) = latent heat of vaporization
@@ -253,17 +256,14 @@ def htrch(store, siminfo, uci, ts):
 			# changed sign of qevap to make it consistent with other fluxes; ie, positive = heat gain; brb 6/95
 			qevap = (597300.0 - 570.0 * tw) * evap * -1.0
 
-			# bed conduction
-			if bedflg == 1 or bedflg == 2:
-				pass # tgrnd = ???  #user defined ts, monthly or single valued by TGFLG (1 for TS; 2 for constant; 3 for monthly)
-
 			# compute conduction heat flux
 			if bedflg == 1:   # one-layer bed conduction model
 				tgrnd = TGRND[loop]
 				qbed = kmud * (tgrnd - tw)
 			elif bedflg == 2:	# two-layer bed conduction model
 				# Following is subrouting  #$BEDHT2
-				'''Compute bed conduction heat flux using 2-interface model based on Caupp's and Brock's (1994) model of the Truckee.'''
+				# Compute bed conduction heat flux using 2-interface model based on Caupp's and Brock's (1994) model of the Truckee.
+				tgrnd = TGRND[loop]
 
 				cpr = 1000.  # CPR = density * specific heat of water (and mud); CPR = 1 gm/cm3 * 1 kcal/kg/C * 1000 cm3.kg/m3/g = 1000 kcal/m3/C; this model uses CPR for both water and mud, per Caupp
 
@@ -296,13 +296,10 @@ def htrch(store, siminfo, uci, ts):
 				# KMUD is the mud-water heat conductance coefficient (kcal/m2/C/ivl)
 				qbed = (bthalf - tw) * kmud
 				# end BEDHT2
-			elif bedflg == 3:       # Jobson's bed conduction model;
-				# set qbed to 0 initially in order to compute preliminary deltt which will be used later for computing qbed
-				qbed = 0.0
-			else:   # no bed conductance
+			else:   # Jobson's bed conduction model or no bed conductance
+				# for Jobson's model set qbed to 0 initially in order to compute preliminary deltt which will be used later for computing qbed
 				qbed = 0.0
 
-
 			# calculate total heat exchange at water surface; qtotal in kcal/m2.ivl
 			qtotal = qsolar + qlongw + qcon + qevap + qprec + qbed
 
@@ -348,9 +345,6 @@ def htrch(store, siminfo, uci, ts):
 				tw  = 0.04
 			htexch = delttw * vol
 
-			# set all atmospheric/bed fluxes to 0
-			qtotal = qsolar = qlongw = qcon = qevap = qprec = qbed = 0.0
-
 		# update deltt array for next time step of jobsons bed conductance model
 		if bedflg == 3:
 			deltt[0] = 0.0  if tws < -1.0e10 or tw < -1.0e10 else tw - tws
@@ -360,17 +354,13 @@ def htrch(store, siminfo, uci, ts):
 		rheat = tw * vol     # calculate storage of thermal energy in rchres
 
 		TW[loop]    = (tw * 9.0 / 5.0) + 32.0
-		AIRTMP[loop]= (airtmp * 9.0 / 5.0) + 32.0
 		HTEXCH[loop]= htexch * 407960. * 12.
 		ROHEAT[loop]= roheat / 0.0089
 		OHEAT[loop] = oheat / 0.0089
 
-	if nexits > 1:
-		for i in range(nexits):
-			ts['OHEAT' + str(i+1)] = OHEAT[:, i]
-
-	return errorsV, ERRMSG
+	return
 
+@njit(cache=True)
 def vapor(tmp):
 		'''	# define vapor function based on temperature (deg c); vapor pressure is expressed in millibars'''
 		return 33.8639 * ((0.00738 * tmp + 0.8072)**8 - 0.000019 * abs(1.8 * tmp + 48.0) + 0.001316)
@@ -12,12 +12,13 @@ Conversion of no category version of HSPF HRCHHYD.FOR into Python'''
 '''
 
 
-from numpy import zeros, any, full, nan, array, int64
+from numpy import zeros, any, full, nan, array, int64, searchsorted
 from pandas import DataFrame
 from math import sqrt, log10
+from collections import namedtuple
+from weakref import WeakKeyDictionary
 from numba import njit
-from numba.typed import List
-from HSP2.utilities import initm, make_numba_dict
+from HSP2.utilities import initm, make_numba_dict, TSBlock
 
 
 ERRMSGS =('HYDR: SOLVE equations are indeterminate',             #ERRMSG0
@@ -43,6 +44,17 @@ GAM    = 62.4             # density of water
 GRAV   = 32.2             # gravitational acceleration
 AKAPPA = 0.4              # von karmen constant
 
+# FTABLE columns in internal units plus the increments between consecutive rows
+# (last entry 0.0), so routing doesn't recompute them every step
+FTable = namedtuple('FTable', 'rows volume depth sarea dvol ddep dsarea')
+ftables = WeakKeyDictionary()   # store -> {FTBUCI: FTable}, lives as long as the open store
+
+# row layout of the HYDR timeseries block, the kernel addresses rows as SLOT.name;
+# the per exit O and OVOL rows follow these
+TSNAMES = ('IVOL', 'POTEV', 'PREC', 'CONVF', 'PRSUPY', 'RO', 'ROVOL', 'VOL', 'VOLEV', 'IRRDEM',
+           'DEP', 'SAREA', 'USTAR', 'TAU', 'AVDEP', 'AVVEL', 'HRAD', 'TWID')
+SLOT = namedtuple('Slot', TSNAMES)(*range(len(TSNAMES)))
+
 
 def hydr(store, siminfo, uci, ts):
     ''' find the state of the reach/reservoir at the end of the time interval
@@ -99,40 +111,60 @@ def hydr(store, siminfo, uci, ts):
             ts[name] = zeros(steps)
     ts['CONVF'] = initm(siminfo, uci, 'VCONFG', 'MONTHLY_CONVF', 1.0)
 
-    # extract key columns of specified FTable for faster access (1d vs. 2d)
-    rchtab = store[f"FTABLES/{uci['PARAMETERS']['FTBUCI']}"]
-    ts['volumeFT'] = rchtab['Volume'].to_numpy() * VFACT
-    ts['depthFT']  = rchtab['Depth'].to_numpy()
-    ts['sareaFT']  = rchtab['Area'].to_numpy()   * AFACT
-    rchtab = rchtab.to_numpy()
+    # FTABLE shared (read only) by all reaches that use it
+    ftable = get_ftable(store, uci['PARAMETERS']['FTBUCI'])
 
     ui = make_numba_dict(uci) # Note: all values coverted to float automatically
     ui['steps']  = steps
     ui['delt']   = siminfo['delt']
     ui['nexits'] = nexits
     ui['errlen'] = len(ERRMSGS)
-    ui['nrows']  = rchtab.shape[0]
+    ui['nrows']  = ftable.rows.shape[0]
     ui['nodfv']  = any(ODFVF)
 
-    # Numba can't do 'O' + str(i) stuff yet, so do it here. Also need new style lists
-    Olabels = List()
-    OVOLlabels = List()
-    for i in range(nexits):
-        Olabels.append(f'O{i+1}')
-        OVOLlabels.append(f'OVOL{i+1}')
+    # kernel reads and writes rows of one block, names are resolved here
+    block = TSBlock(steps, TSNAMES + (('O', nexits), ('OVOL', nexits)))
+    block.load(ts, ('IVOL', 'POTEV', 'PREC', 'CONVF'))
 
+    # the FTable goes in as its arrays, numba unboxes a namedtuple argument slowly (about 1 ms a call)
     ###########################################################################
-    errors = _hydr_(ui, ts, COLIND, OUTDGT, rchtab, funct, Olabels, OVOLlabels)                  # run reaches simulation code
+    errors = _hydr_(ui, block.data, block['O'], block['OVOL'], COLIND, OUTDGT, funct, *ftable)   # run reaches simulation code
     ###########################################################################
 
-    if 'O'    in ts:  del ts['O']
-    if 'OVOL' in ts:  del ts['OVOL']
+    block.publish(ts, TSNAMES[4:] if ui['AUX1FG'] else TSNAMES[4:10])   # DEP..TWID need AUX1FG
+    if nexits > 1:   # (steps, nexits) views of the per exit rows for ADCALC and the HDF5 writer
+        uci['EXITS']['O']    = block['O'].T
+        uci['EXITS']['OVOL'] = block['OVOL'].T
 
     return errors, ERRMSGS
 
 
+def get_ftable(store, name):
+    ''' FTABLE name from the store in internal units with its row increments,
+    read and converted once per store then shared read only by every reach using it'''
+    tables = ftables.setdefault(store, {})
+    if name not in tables:
+        rchtab = store[f'FTABLES/{name}']
+        rows   = rchtab.to_numpy().astype(float)
+        volume = rchtab['Volume'].to_numpy().astype(float) * VFACT
+        depth  = rchtab['Depth'].to_numpy().astype(float)
+        sarea  = rchtab['Area'].to_numpy().astype(float)   * AFACT
+        ftable = FTable(rows, volume, depth, sarea, increments(volume), increments(depth), increments(sarea))
+        for x in ftable:
+            x.flags.writeable = False
+        tables[name] = ftable
+    return tables[name]
+
+
+def increments(x):
+    ''' x[i+1] - x[i] for each FTABLE row, 0.0 for the last row'''
+    dx = zeros(len(x))
+    dx[:-1] = x[1:] - x[:-1]
+    return dx
+
+
 @njit(cache=True)
-def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
+def _hydr_(ui, data, O, OVOL, COLIND, OUTDGT, funct, rowsFT, volumeFT, depthFT, sareaFT, dvolFT, ddepFT, dsareaFT):
     errors = zeros(int(ui['errlen'])).astype(int64)
 
     steps  = int(ui['steps'])            # number of simulation steps
@@ -148,20 +180,16 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
     DELTH  = ui['DELTH']
     stcor  = ui['STCOR']
 
-    volumeFT = ts['volumeFT']
-    depthFT  = ts['depthFT']
-    sareaFT  = ts['sareaFT']
-
     nodfv  = ui['nodfv']
     ks     = ui['KS']
     coks   = 1 - ks
     facta1 = 1.0 / (coks * delts)
 
     # MAIN loop Initialization
-    IVOL   = ts['IVOL']  * VFACT           # or sum civol, zeros if no inflow ???
-    POTEV  = ts['POTEV'] / 12.0
-    PREC   = ts['PREC']  / 12.0
-    CONVF  = ts['CONVF']
+    IVOL   = data[SLOT.IVOL]  * VFACT           # or sum civol, zeros if no inflow ???
+    POTEV  = data[SLOT.POTEV] / 12.0
+    PREC   = data[SLOT.PREC]  / 12.0
+    CONVF  = data[SLOT.CONVF]
     convf  = CONVF[0]
 
     # faster to preallocate arrays - like MATLAB)
@@ -177,25 +205,21 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
     outdgt[:] = OUTDGT[0,:]
     colind[:] = COLIND[0,:]
 
-    # numba limitation, ts can't have both 1-d and 2-d arrays in save Dict
-    O      = zeros((steps, nexits))
-    OVOL   = zeros((steps, nexits))
-
-    ts['PRSUPY'] = PRSUPY = zeros(steps)
-    ts['RO']     = RO     = zeros(steps)
-    ts['ROVOL']  = ROVOL  = zeros(steps)
-    ts['VOL']    = VOL    = zeros(steps)
-    ts['VOLEV']  = VOLEV  = zeros(steps)
-    ts['IRRDEM'] = IRRDEM = zeros(steps)
-    if AUX1FG:
-        ts['DEP']   = DEP   = zeros(steps)
-        ts['SAREA'] = SAREA = zeros(steps)
-        ts['USTAR'] = USTAR = zeros(steps)
-        ts['TAU']   = TAU   = zeros(steps)
-        ts['AVDEP'] = AVDEP = zeros(steps)
-        ts['AVVEL'] = AVVEL = zeros(steps)
-        ts['HRAD']  = HRAD  = zeros(steps)
-        ts['TWID']  = TWID  = zeros(steps)
+    # output rows, O and OVOL are (nexits, steps)
+    PRSUPY = data[SLOT.PRSUPY]
+    RO     = data[SLOT.RO]
+    ROVOL  = data[SLOT.ROVOL]
+    VOL    = data[SLOT.VOL]
+    VOLEV  = data[SLOT.VOLEV]
+    IRRDEM = data[SLOT.IRRDEM]
+    DEP    = data[SLOT.DEP]
+    SAREA  = data[SLOT.SAREA]
+    USTAR  = data[SLOT.USTAR]
+    TAU    = data[SLOT.TAU]
+    AVDEP  = data[SLOT.AVDEP]
+    AVVEL  = data[SLOT.AVVEL]
+    HRAD   = data[SLOT.HRAD]
+    TWID   = data[SLOT.TWID]
 
     zeroindex = fndrow(0.0, volumeFT)                                           #$1126-1127
     topvolume = volumeFT[-1]
@@ -209,17 +233,18 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
     if nodfv:  # simple interpolation, the hard way!!
         v1 = volumeFT[indx]
         v2 = volumeFT[indx+1]
-        rod1,od1[:] = demand(v1, rowsFT[indx,  :], funct, nexits, delts, convf, colind, outdgt)
-        rod2,od2[:] = demand(v2, rowsFT[indx+1,:], funct, nexits, delts, convf, colind, outdgt)
-        a1 = (v2 - vol) / (v2 - v1)
+        rod1 = demand(v1, rowsFT[indx,  :], funct, nexits, delts, convf, colind, outdgt, od1)
+        rod2 = demand(v2, rowsFT[indx+1,:], funct, nexits, delts, convf, colind, outdgt, od2)
+        a1 = (v2 - vol) / dvolFT[indx]
         o[:] = a1 * od1[:] + (1.0 - a1) * od2[:]
         ro   = (a1 * rod1) + ((1.0 - a1) * rod2)
     else:
-        ro,o[:] = demand(vol, rowsFT[indx,:], funct, nexits, delts, convf, colind, outdgt)  #$1159-1160
+        ro = demand(vol, rowsFT[indx,:], funct, nexits, delts, convf, colind, outdgt, o)  #$1159-1160
 
     # back to PHYDR
     if AUX1FG >= 1:
-        dep, stage, sarea, avdep, twid, hrad = auxil(volumeFT, depthFT, sareaFT, indx, vol, length, stcor, AUX1FG, errors) # initial
+        dep, stage, sarea, avdep, twid, hrad = auxil(volumeFT, depthFT, sareaFT, dvolFT, ddepFT, dsareaFT,
+                                                     indx, vol, length, stcor, AUX1FG, errors) # initial
 
     # hydr-irrig
     irexit = int(ui['IREXIT']) -1    # irexit - exit number for irrigation withdrawals, 0 based ???
@@ -246,19 +271,20 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
                     errors[1] += 1 # ERRMSG1: extrapolation of rchtab will take place
 
                 # DISCH with hydrologic routing
-                indx = fndrow(vol, volumeFT)                 # find row index that brackets the VOL
+                indx = fndrow(vol, volumeFT, indx)           # find row index that brackets the VOL
                 vv1 = volumeFT[indx]
-                rod1,od1[:] = demand(vv1, rowsFT[indx,  :], funct, nexits, delts, convf, colind, outdgt)
+                rod1 = demand(vv1, rowsFT[indx,  :], funct, nexits, delts, convf, colind, outdgt, od1)
                 vv2 = volumeFT[indx+1]
-                rod2,od2[:] = demand(vv2, rowsFT[indx+1,:], funct, nexits, delts, convf, colind, outdgt)
-                aa1 = (vv2 - vol) / (vv2 - vv1)
+                rod2 = demand(vv2, rowsFT[indx+1,:], funct, nexits, delts, convf, colind, outdgt, od2)
+                aa1 = (vv2 - vol) / dvolFT[indx]
                 ro   = (aa1 * rod1)    + ((1.0 - aa1) * rod2)
-                o[:] = (aa1 * od1[:])  + ((1.0 - aa1) * od2[:])
+                for i in range(nexits):
+                    o[i] = (aa1 * od1[i])  + ((1.0 - aa1) * od2[i])
 
                 # back to HYDR
                 if AUX1FG >= 1:     # recompute surface area and depth
-                    dep, stage, sarea, avdep, twid, hrad = auxil(volumeFT, depthFT, sareaFT, indx, vol, length, stcor,
-                                                                 AUX1FG, errors)
+                    dep, stage, sarea, avdep, twid, hrad = auxil(volumeFT, depthFT, sareaFT, dvolFT, ddepFT,
+                                                                 dsareaFT, indx, vol, length, stcor, AUX1FG, errors)
             else:
                 irrdem =  0.0
             #o[irexit] = 0.0                                                   #???? not used anywhere, check if o[irexit]
@@ -288,7 +314,8 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
             rovol = volt
 
             if roseff > 0.0: # numba limitation, cant combine into one line
-                ovol[:] = (rovol/roseff) * oseff[:]
+                for i in range(nexits):
+                    ovol[i] = (rovol/roseff) * oseff[i]
             else:
                 ovol[:] = rovol / nexits
 
@@ -296,7 +323,7 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
             oint = volint * facta1      # == ointsp, so ointsp variable dropped
             if nodfv:
                 # ROUTE
-                rodz,odz[:] = demand(0.0, rowsFT[zeroindex,:], funct, nexits, delts, convf, colind,  outdgt)
+                rodz = demand(0.0, rowsFT[zeroindex,:], funct, nexits, delts, convf, colind,  outdgt, odz)
                 if oint > rodz:
                     # SOLVE - case 1-- outflow demands can be met in full
                     # premov will be used to check whether we are in a trap, arbitrary value
@@ -304,13 +331,13 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
                     move   = 10
 
                     vv1 = volumeFT[indx]
-                    rod1,od1[:] = demand(vv1, rowsFT[indx, :], funct, nexits, delts, convf,colind, outdgt)
+                    rod1 = demand(vv1, rowsFT[indx, :], funct, nexits, delts, convf,colind, outdgt, od1)
                     vv2 = volumeFT[indx+1]
-                    rod2,od2[:] = demand(vv2, rowsFT[indx+1,:], funct, nexits, delts, convf, colind, outdgt)
+                    rod2 = demand(vv2, rowsFT[indx+1,:], funct, nexits, delts, convf, colind, outdgt, od2)
 
                     while move != 0:
                         facta2 = rod1 - rod2
-                        factb2 = vv2 - vv1
+                        factb2 = dvolFT[indx]
                         factc2 = vv2 * rod1 - vv1 * rod2
                         det = facta1 * factb2 - facta2
                         if det <= 0.0:
@@ -330,7 +357,7 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
                                 od1[:] = od2[:]
                                 rod1   = rod2
                                 vv2    = volumeFT[indx+1]
-                                rod2,od2[:] = demand(vv2, rowsFT[indx+1,:], funct, nexits, delts, convf, colind, outdgt)
+                                rod2 = demand(vv2, rowsFT[indx+1,:], funct, nexits, delts, convf, colind, outdgt, od2)
                         elif vol < vv1:
                             indx  -= 1
                             move   = -1
@@ -338,7 +365,7 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
                             od2[:] = od1[:]
                             rod2   = rod1
                             vv1    = volumeFT[indx]
-                            rod1,od1[:] = demand(vv1, rowsFT[indx,:], funct, nexits, delts, convf, colind, outdgt)
+                            rod1 = demand(vv1, rowsFT[indx,:], funct, nexits, delts, convf, colind, outdgt, od1)
                         else:
                             move = 0
 
@@ -358,8 +385,9 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
                         o[:] = 0.0
                     else:
                         diff  = vol - vv1
-                        factr = 0.0 if diff < 0.01 else  diff / (vv2 - vv1)
-                        o[:]  = od1[:] + (od2[:] - od1[:]) * factr
+                        factr = 0.0 if diff < 0.01 else  diff / dvolFT[indx]
+                        for i in range(nexits):
+                            o[i] = od1[i] + (od2[i] - od1[i]) * factr
                 else:
                     # case 2 -- outflow demands cannot be met in full
                     ro  = 0.0
@@ -375,7 +403,7 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
                     indx = zeroindex
             else:
                 # NOROUT
-                rod1,od1[:] = demand(vol, rowsFT[indx,:], funct, nexits, delts, convf, colind, outdgt)
+                rod1 = demand(vol, rowsFT[indx,:], funct, nexits, delts, convf, colind, outdgt, od1)
                 if oint >= rod1: #case 1 -outflow demands are met in full
                     ro   = rod1
                     vol  = volint - coks * ro * delts
@@ -405,13 +433,15 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
                 IRRDEM[step] = irrdem
 
             # estimate the volumes of outflow
-            ovol[:] = (ks * oseff[:] + coks * o[:]) * delts
+            for i in range(nexits):
+                ovol[i] = (ks * oseff[i] + coks * o[i]) * delts
             rovol   = (ks * roseff   + coks * ro)   * delts
 
         # HYDR
         if nexits > 1:
-            O[step,:]    = o[:]    * SFACTA * LFACTA
-            OVOL[step,:] = ovol[:] * VFACTA
+            for i in range(nexits):
+                O[i,step]    = o[i]    * SFACTA * LFACTA
+                OVOL[i,step] = ovol[i] * VFACTA
         PRSUPY[step] = prsupy * AFACTA
         RO[step]     = ro     * SFACTA * LFACTA
         ROVOL[step]  = rovol  * VFACTA
@@ -421,8 +451,9 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
         if AUX1FG:   # compute final depth, surface area
             if vol >= topvolume:
                 errors[1] += 1       # ERRMSG1: extrapolation of rchtab
-            indx = fndrow(vol, volumeFT)
-            dep, stage, sarea, avdep, twid, hrad = auxil(volumeFT, depthFT, sareaFT, indx, vol, length, stcor, AUX1FG, errors)
+            indx = fndrow(vol, volumeFT, indx)
+            dep, stage, sarea, avdep, twid, hrad = auxil(volumeFT, depthFT, sareaFT, dvolFT, ddepFT, dsareaFT,
+                                                         indx, vol, length, stcor, AUX1FG, errors)
             DEP[step]   = dep
             SAREA[step] = sarea * AFACTA
 
@@ -461,27 +492,30 @@ def _hydr_(ui, ts, COLIND, OUTDGT, rowsFT, funct, Olabels, OVOLlabels):
             HRAD[step]  = hrad
             TWID[step]  = twid
     # END MAIN LOOP
-
-    # NUMBA limitation for ts, and saving to HDF5 file is in individual columns
-    if nexits > 1:
-        for i in range(nexits):
-            ts[Olabels[i]]    = O[:,i]
-            ts[OVOLlabels[i]] = OVOL[:,i]
     return errors
 
 
 @njit(cache=True)
-def fndrow(v, volFT):
-    ''' finds highest index in FTable volume column whose volume  < v'''
-    for indx,vol in enumerate(volFT):
-        if v < vol:
-            return indx-1
-    return len(volFT) - 2
+def fndrow(v, volFT, indx=-1):
+    ''' finds highest index in FTable volume column whose volume  < v
+    indx, if given, is the row found on the previous step; rows next to it are tried before the binary search'''
+    nrows = len(volFT)
+    if 0 <= indx < nrows - 1:
+        if volFT[indx] <= v:
+            if v < volFT[indx+1]:
+                return indx
+            if indx + 2 < nrows and v < volFT[indx+2]:
+                return indx + 1
+        elif indx > 0 and volFT[indx-1] <= v:
+            return indx - 1
+
+    indx = searchsorted(volFT, v, side='right')   # first row with volume > v
+    return indx - 1 if indx < nrows else nrows - 2
 
 
 @njit(cache=True)
-def demand(vol, rowFT, funct, nexits, delts, convf, colind, outdgt):
-    od = zeros(nexits)
+def demand(vol, rowFT, funct, nexits, delts, convf, colind, outdgt, od):
+    ''' fills od with the outflow demand of each exit, returns their sum; od is a caller owned buffer'''
     for i in range(nexits):
         col = colind[i]
         icol = int(col)
@@ -507,18 +541,18 @@ def demand(vol, rowFT, funct, nexits, delts, convf, colind, outdgt):
             elif funct[i] == 2: od[i] = max(odfv,odgt)
             elif funct[i] == 3: od[i] = odfv + odgt
             elif funct[i] == 4: od[i] = max(odfv, (vol - odgt) / delts)
-    return od.sum(), od
+    return od.sum()
 
 
 @njit(cache=True)
-def auxil(volumeFT, depthFT, sareaFT, indx, vol, length, stcor, AUX1FG, errors):
+def auxil(volumeFT, depthFT, sareaFT, dvolFT, ddepFT, dsareaFT, indx, vol, length, stcor, AUX1FG, errors):
     '''Compute depth, stage, surface area, average depth, topwidth and hydraulic radius'''
     if vol > 0.0:
         sa1  = sareaFT[indx]
-        a    = sareaFT[indx+1] - sa1
+        a    = dsareaFT[indx]
         b    = 2.0 * sa1
         vol1 = volumeFT[indx]
-        c = -((vol - vol1) / (volumeFT[indx+1] - vol1)) * (b+a)
+        c = -((vol - vol1) / dvolFT[indx]) * (b+a)
 
         rdep2 = 0.5  # initial guess for the Newton's method
         for i in range(MAXLOOPS):
@@ -532,7 +566,7 @@ def auxil(volumeFT, depthFT, sareaFT, indx, vol, length, stcor, AUX1FG, errors):
             errors[4] += 1        # converged outside valid range error message
 
         dep1  = depthFT[indx]
-        dep   = dep1 + rdep2 * (depthFT[indx+1] - dep1)    # manual eq (36)
+        dep   = dep1 + rdep2 * ddepFT[indx]                # manual eq (36)
         sarea = sa1 + a * rdep2
 
         avdep = vol / sarea                           # average depth calculation, manual eq (39)
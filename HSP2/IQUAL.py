@@ -6,7 +6,8 @@ Conversion of HSPF HIMPQUA.FOR module into Python'''
 
 from math import exp
 from numpy import zeros, where, full
-from numba import jit
+from numba import njit, types
+from numba.typed import Dict
 from HSP2.utilities import initm, make_numba_dict, hourflag
 
 
@@ -21,6 +22,11 @@ UNDEFINED: sliqsp
 
 ERRMSG = []
 
+# timeseries computed by _iqual_ for every constituent, saved as IQUALn_<name>
+OUTPUTS = ('SOQUAL', 'SOQC', 'SOQO', 'SQO', 'SOQOC', 'SOQS', 'SOQSP', 'IQADDR', 'IQADWT', 'IQADEP',
+           'SLIQO', 'INFLOW')
+
+
 def iqual(store, siminfo, uci, ts):
 	''' Simulate washoff of quality constituents (other than solids, Heat, dox, and co2)
 	using simple relationships with solids And/or water yield'''
@@ -40,23 +46,25 @@ def iqual(store, siminfo, uci, ts):
 	simlen = siminfo['steps']
 	tindex = siminfo['tindex']
 
-	SURO  = ts['SURO']
-	SOSLD = ts['SOSLD']
-	PREC  = ts['PREC']
-	
 	for name in ['SLIQSX', 'SLIQO', 'SLIQSP']:
 		if name not in ts:
 			ts[name] = full(simlen, -1.0E30)
-	SLIQSX = ts['SLIQSX']
-	SLIQO  = ts['SLIQO']
-	SLIQSP = ts['SLIQSP']
 
 	ui = make_numba_dict(uci)
 	# constituents = ui['CONSTITUENTS']   # (short) names of constituents
-	slifac = ui['SLIFAC']
-	
-	DAYFG = hourflag(siminfo, 0, dofirst=True).astype(bool)
-	# DAYFG[0] = 1
+	ui['simlen'] = simlen
+	ui['delt60'] = delt60
+	ui['nquals'] = nquals
+
+	ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True)
+
+	# per-constituent flags and parameters (pm) and monthly/timeseries inputs (iq), stacked by constituent
+	pm = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
+	for key in ('QSDFG', 'QSOFG', 'SQO', 'WSFAC'):
+		pm[key] = zeros(nquals)
+	iq = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:, ::1])
+	for key in ('POTFW', 'ACQOP', 'SQOLIM', 'IQADFX', 'IQADCN') + OUTPUTS:
+		iq[key] = zeros((nquals, simlen))
 
 	index = 0
 	for constituent in constituents:     # simulate constituent
@@ -64,45 +72,20 @@ def iqual(store, siminfo, uci, ts):
 		# update UI values for this constituent here!
 		ui_flags = uci['IQUAL' + str(index) + '_FLAGS']
 		ui_parms = uci['IQUAL' + str(index) + '_PARAMETERS']
-		name = 'IQUAL' + str(index)  # arbitrary identification
+		i = index - 1
 
 		qualid = ui_flags['QUALID']
 		qtyid  = ui_flags['QTYID']
-		QSDFG  = ui_flags['QSDFG']
-		QSOFG  = ui_flags['QSOFG']
-		VQOFG  = ui_flags['VQOFG']
-		
-		sqo    = ui_parms['SQO']
-		wsqop  = ui_parms['WSQOP']
-		wsfac = 2.30 / wsqop
-
-		# preallocate output arrays (always needed)
-		SOQUAL = ts[name + '_SOQUAL'] = zeros(simlen)
-		SOQC   = ts[name + '_SOQC']   = zeros(simlen)
-		SOQO   = ts[name + '_SOQO'] = zeros(simlen)
-		
-		# preallocate output arrays (QUALOF)
-		SQO    = ts[name + '_SQO']    = zeros(simlen)
-		SOQOC  = ts[name + '_SOQOC']  = zeros(simlen)
-
-		# preallocate output arrays (QUALSD)
-		SOQS   = ts[name + '_SOQS']   = zeros(simlen)
-		SOQSP  = ts[name + '_SOQSP'] = zeros(simlen)
-
-		# preallocate output arrays for atmospheric deposition
-		IQADDR = ts[name + '_IQADDR']   = zeros(simlen)
-		IQADWT = ts[name + '_IQADWT'] = zeros(simlen)
-		IQADEP = ts[name + '_IQADEP'] = zeros(simlen)
-
-		SLIQO  = ts[name + '_SLIQO'] = zeros(simlen)   # lateral inflow
-		INFLOW = ts[name + '_INFLOW'] = zeros(simlen)  # total inflow
-
-		
-		# handle monthly tables
+		pm['QSDFG'][i] = ui_flags['QSDFG']
+		pm['QSOFG'][i] = ui_flags['QSOFG']
+
+		pm['SQO'][i]   = ui_parms['SQO']
+		pm['WSFAC'][i] = 2.30 / ui_parms['WSQOP']
 
-		ts['POTFW'] = initm(siminfo, uci, ui_flags['VPFWFG'], 'IQUAL' + str(index) + '_MONTHLY/POTFW', ui_parms['POTFW'])
-		ts['ACQOP'] = initm(siminfo, uci, ui_flags['VQOFG'], 'IQUAL' + str(index) + '_MONTHLY/ACQOP', ui_parms['ACQOP'])
-		ts['SQOLIM'] = initm(siminfo, uci, ui_flags['VQOFG'], 'IQUAL' + str(index) + '_MONTHLY/SQOLIM', ui_parms['SQOLIM'])
+		# handle monthly tables
+		iq['POTFW'][i]  = initm(siminfo, uci, ui_flags['VPFWFG'], 'IQUAL' + str(index) + '_MONTHLY/POTFW', ui_parms['POTFW'])[0:simlen]
+		iq['ACQOP'][i]  = initm(siminfo, uci, ui_flags['VQOFG'], 'IQUAL' + str(index) + '_MONTHLY/ACQOP', ui_parms['ACQOP'])[0:simlen]
+		iq['SQOLIM'][i] = initm(siminfo, uci, ui_flags['VQOFG'], 'IQUAL' + str(index) + '_MONTHLY/SQOLIM', ui_parms['SQOLIM'])[0:simlen]
 
 		if 'FLAGS' in uci:
 			u = uci['FLAGS']
@@ -122,112 +105,158 @@ def iqual(store, siminfo, uci, ts):
 			ts['IQADFX'] = zeros(simlen)
 		if 'IQADCN' not in ts:
 			ts['IQADCN'] = zeros(simlen)
+		iq['IQADFX'][i] = ts['IQADFX'][0:simlen]
+		iq['IQADCN'][i] = ts['IQADCN'][0:simlen]
+
+	############################################################################
+	_iqual_(ui, ts, pm, iq)
+	############################################################################
+
+	for index in range(1, nquals + 1):
+		name = 'IQUAL' + str(index)  # arbitrary identification
+		for key in OUTPUTS:
+			ts[name + '_' + key] = iq[key][index - 1]
+
+	return errorsV, ERRMSG
+
+
+@njit(cache=True)
+def _iqual_(ui, ts, pm, iq):
+	''' IQUAL processing, all constituents advance together one time step at a time '''
+	simlen = int(ui['simlen'])
+	nquals = int(ui['nquals'])
+	delt60 = ui['delt60']
+	slifac = ui['SLIFAC']
+
+	QSDFG = pm['QSDFG']
+	QSOFG = pm['QSOFG']
+	WSFAC = pm['WSFAC']
+
+	SURO   = ts['SURO']
+	SOSLD  = ts['SOSLD']
+	PREC   = ts['PREC']
+	SLIQSP = ts['SLIQSP']
+	DAYFG  = ts['DAYFG']
+
+	POTFW  = iq['POTFW']
+	ACQOP  = iq['ACQOP']
+	SQOLIM = iq['SQOLIM']
+	IQADFX = iq['IQADFX']
+	IQADCN = iq['IQADCN']
+
+	SOQUAL = iq['SOQUAL']
+	SOQC   = iq['SOQC']
+	SOQO   = iq['SOQO']
+	SQO    = iq['SQO']
+	SOQOC  = iq['SOQOC']
+	SOQS   = iq['SOQS']
+	SOQSP  = iq['SOQSP']
+	IQADDR = iq['IQADDR']
+	IQADWT = iq['IQADWT']
+	IQADEP = iq['IQADEP']
+	SLIQO  = iq['SLIQO']   # lateral inflow
+
+	# state carried between time steps for each constituent
+	sqo    = pm['SQO'].copy()
+	soqo   = zeros(nquals)
+	remqop = zeros(nquals)
+	soqs   = zeros(nquals)
+	soqoc  = zeros(nquals)
+
+	for loop in range(simlen):
+		suro   = SURO[loop]
+		sosld  = SOSLD[loop]
+		dayfg  = DAYFG[loop]
+		sliqsp = SLIQSP[loop]
+		prec   = PREC[loop]
+
+		for i in range(nquals):
+			sliqo  = SLIQO[i, loop]
+			potfw  = POTFW[i, loop]
+			acqop  = ACQOP[i, loop]
 
-		POTFW  = ts['POTFW']
-		ACQOP  = ts['ACQOP']
-		SQOLIM = ts['SQOLIM']
-		IQADFX = ts['IQADFX']
-		IQADCN = ts['IQADCN']
-
-		soqo = 0.0
-		remqop = 0.0
-		soqs = 0.0
-		soqoc = 0.0
-		for loop in range(simlen):
-			suro   = SURO[loop]
-			sosld  = SOSLD[loop]
-			dayfg  = DAYFG[loop]
-			sliqsx = SLIQSX[loop]
-			sliqo  = SLIQO[loop]
-			sliqsp = SLIQSP[loop]
-			potfw  = POTFW[loop]
-			acqop  = ACQOP[loop]
-				
 			# simulate by association with solids
 			suroqs = 0.0
 			soqsp  = 0.0
-			if QSDFG:
+			if QSDFG[i]:
 				# washsd ()
-				if dayfg == 1:      # it is the first interval of the day
-					potfw = POTFW[loop]
-
 				# associate with washoff of solids - units are qty/acre-ivl
 				if sosld == 0.0:
-					soqs = 0.0
+					soqs[i] = 0.0
 				else:
 					if sliqsp >= 0.0:     # lateral inflow has an effect on washoff potency factor
 						soqsp = sliqsp * slifac + potfw * (1.0 - slifac)
-						soqs  = sosld * soqsp
+						soqs[i] = sosld * soqsp
 					else:                 # no effect of lateral inflow
 						soqsp = potfw
-						soqs  = sosld * potfw
+						soqs[i] = sosld * potfw
 				# end washsd()
-				
-				suroqs = soqs
+
+				suroqs = soqs[i]
 
 			# simulate by association with overland flow
 			suroqo = 0.0
 			adtot  = 0.0
 			adfxfx = 0.0
 			adcnfx = 0.0
-			if QSOFG != 0:  #  constituent n is simulated by association with overland flow; the value of qofp refers to the set of overland flow associated parameters to use
-				if QSOFG >= 1:   # standard qualof simulation
+			qsofg = QSOFG[i]
+			if qsofg != 0:  #  constituent n is simulated by association with overland flow; the value of qofp refers to the set of overland flow associated parameters to use
+				if qsofg >= 1:   # standard qualof simulation
 					# washof ()
-					''' Simulate accumulation of a quality constituent on the land surface and its removal using a constant unit rate and by direct washoff by overland flow'''
+					# Simulate accumulation of a quality constituent on the land surface and its removal using a constant unit rate and by direct washoff by overland flow
 					if dayfg == 1:
-						remqop = acqop / SQOLIM[loop]
-						if QSOFG == 1 :   #update storage due to accumulation and removal which occurs independent of runoff - units are qty/acre
-							sqo = acqop + sqo * (1.0 - remqop)
+						remqop[i] = acqop / SQOLIM[i, loop]
+						if qsofg == 1 :   #update storage due to accumulation and removal which occurs independent of runoff - units are qty/acre
+							sqo[i] = acqop + sqo[i] * (1.0 - remqop[i])
 
 					# handle atmospheric deposition
-					adfxfx = IQADFX[loop]  		                    # dry deposition
-					adcnfx = IQADCN[loop] * PREC[loop] * 3630.0 	# wet deposition
+					adfxfx = IQADFX[i, loop]  		            # dry deposition
+					adcnfx = IQADCN[i, loop] * prec * 3630.0 	# wet deposition
 
 					adtot = adfxfx + adcnfx  # total atmospheric deposition
 
-					if QSOFG == 2:  # update storage due to accumulation and removal which occurs independent of runoff - units are qty/acre
-						dummy = remqop + (adtot + sliqo) / (acqop / remqop)
+					if qsofg == 2:  # update storage due to accumulation and removal which occurs independent of runoff - units are qty/acre
+						dummy = remqop[i] + (adtot + sliqo) / (acqop / remqop[i])
 						if dummy > 1.0:
 							dummy = 1.0
-						sqo = acqop * (delt60 / 24.0) + sqo * (1.0 - dummy)**(delt60 / 24.0)
+						sqo[i] = acqop * (delt60 / 24.0) + sqo[i] * (1.0 - dummy)**(delt60 / 24.0)
 
-					sqo = sqo + sliqo + adtot   # update storage
+					sqo[i] = sqo[i] + sliqo + adtot   # update storage
 
 					# simulate washoff by overland flow - units are qty/acre-ivl
-					soqo = 0.0
-					if suro > 0.0 and sqo > 0.0:   # there is some quality constituent (no. qofp) in storage; washoff can occur
-						soqo  = sqo * (1.0 - exp (-suro * wsfac))
-						sqo   = sqo - soqo  # update storage of constituent - units are in qty/acre
+					soqo[i] = 0.0
+					if suro > 0.0 and sqo[i] > 0.0:   # there is some quality constituent (no. qofp) in storage; washoff can occur
+						soqo[i] = sqo[i] * (1.0 - exp (-suro * WSFAC[i]))
+						sqo[i]  = sqo[i] - soqo[i]  # update storage of constituent - units are in qty/acre
 
 					# compute and output concentration - units are qty/acre-in.
-					soqoc = soqo / suro if suro > 0.0 else -1.0e30					
+					soqoc[i] = soqo[i] / suro if suro > 0.0 else -1.0e30
 					# end washof()
-					
-				elif QSOFG == -1:
-					''' special case for ches bay - constant conc of qualof input value of acqop = mg/l and soqo = lb/ac
-					note - this assumes that qty = lb
-					note - acqop is converted to (lb/ac/in) in the run interpeter
-					the computed concs (soqoc and soqc) are reported in qty/ft3; the internal units are lb/ac/in and external units are lb/ft3
-					the storage (sqo) is reported as zero'''
-					acqop = acqop * 0.2266
-					soqo  = suro * acqop
-					soqoc = acqop
-					sqo   = 0.0
-				suroqo = soqo
+
+				elif qsofg == -1:
+					# special case for ches bay - constant conc of qualof input value of acqop = mg/l and soqo = lb/ac
+					# note - this assumes that qty = lb
+					# note - acqop is converted to (lb/ac/in) in the run interpeter
+					# the computed concs (soqoc and soqc) are reported in qty/ft3; the internal units are lb/ac/in and external units are lb/ft3
+					# the storage (sqo) is reported as zero
+					acqop    = acqop * 0.2266
+					soqo[i]  = suro * acqop
+					soqoc[i] = acqop
+					sqo[i]   = 0.0
+				suroqo = soqo[i]
 
 			# sum outflows of constituent n from the land surface
-			SOQUAL[loop] = soqual = suroqs + suroqo
-			SOQC[loop]   = (soqual / suro / 3630.0) if suro > 0.0 else -1.0e30
-			SQO[loop]    = sqo
-			SOQS[loop]   = soqs   
-			SOQOC[loop]  = soqoc / 3630.0     # 3630 converts from ft3 to ac-in
-
-			SOQO[loop]   = soqo
-			SOQSP[loop]  = soqsp
-
-			IQADWT[loop] = adcnfx
-			IQADDR[loop] = adfxfx
-			IQADEP[loop] = adtot
-			
-	return errorsV, ERRMSG
+			SOQUAL[i, loop] = soqual = suroqs + suroqo
+			SOQC[i, loop]   = (soqual / suro / 3630.0) if suro > 0.0 else -1.0e30
+			SQO[i, loop]    = sqo[i]
+			SOQS[i, loop]   = soqs[i]
+			SOQOC[i, loop]  = soqoc[i] / 3630.0     # 3630 converts from ft3 to ac-in
+
+			SOQO[i, loop]   = soqo[i]
+			SOQSP[i, loop]  = soqsp
+
+			IQADWT[i, loop] = adcnfx
+			IQADDR[i, loop] = adfxfx
+			IQADEP[i, loop] = adtot
 
+	return
@@ -4,10 +4,11 @@ Author: Robert Heaphy, Ph.D.
 Conversion of HSPF HIMPWAT.FOR module into Python'''
 
 
-from numpy import zeros, ones, full, nan, int64, float64
+from collections import namedtuple
+from numpy import zeros, ones, full, nan, int64, float64, array
 from math import sqrt
 from numba import njit
-from HSP2.utilities import hourflag, hoursval, initm, make_numba_dict
+from HSP2.utilities import hourflag, hoursval, initm, make_numba_dict, TSBlock
 
 MAXLOOPS  = 100      # newton method max steps
 TOLERANCE = 0.01     # newton method exit tolerance
@@ -15,6 +16,23 @@ TOLERANCE = 0.01     # newton method exit tolerance
 ERRMSGS =  ('IWATER: IROUTE Newton Method did not converge',    #ERRMSG0
   )
 
+# per interval inputs of iwater_step(), rows of a TSBlock in this order; AIRTMP, RAINF, SNOCOV and
+# WYIELD come from SNOW and are passed separately
+INPUTS = ('HR1FG', 'HRFG', 'NSUR', 'PETINP', 'PETMAX', 'PETMIN', 'PREC', 'RETSC', 'SURLI')
+I = namedtuple('IwaterInputs', INPUTS)(*range(len(INPUTS)))
+
+# state carried from one interval to the next
+STATES = ('MSUPY', 'PETADJ', 'RETS', 'SURS', 'DEC', 'SRC')
+X = namedtuple('IwaterStates', STATES)(*range(len(STATES)))
+
+# timeseries computed by iwater_step()
+OUTPUTS = ('IMPEV', 'PET', 'PETADJ', 'RETS', 'SUPY', 'SURI', 'SURO', 'SURS')
+O = namedtuple('IwaterOutputs', OUTPUTS)(*range(len(OUTPUTS)))
+
+# constants of iwater_step()
+PARMS = ('DELT60', 'CSNOFG', 'RTLIFG', 'RTOPFG', 'LSUR', 'SLSUR')
+P = namedtuple('IwaterParms', PARMS)(*range(len(PARMS)))
+
 
 def iwater(store, siminfo, uci, ts):
     ''' Driver for IMPLND IWATER code. CALL: iwater(store, general, ui, ts)
@@ -28,6 +46,23 @@ def iwater(store, siminfo, uci, ts):
     #    WATDIF = WATIN - (SURO + IMPEV)
     #    IMPS   = RETS + SURS
 
+    steps = siminfo['steps']                  # number of simulation points
+
+    pm, x, inp = iwater_setup(store, siminfo, uci, ts)
+    out = TSBlock(steps, OUTPUTS)
+
+    ############################################################################
+    errors = _iwater_(pm, x, inp.data, ts['AIRTMP'], ts['RAINF'], ts['SNOCOV'], ts['WYIELD'],
+        out.data)                                   # run IWATER simulation code
+    ############################################################################
+    out.publish(ts, OUTPUTS)
+
+    return errors, ERRMSGS
+
+
+def iwater_setup(store, siminfo, uci, ts):
+    ''' prepare the inputs of iwater_step(); returns the parameter vector, the initial state
+    and the inputs as a TSBlock'''
     steps   = siminfo['steps']                  # number of simulation points
 
     # insure defined, but not usable - just in case
@@ -60,207 +95,181 @@ def iwater(store, siminfo, uci, ts):
     ts['HRFG'] = hoursval(siminfo, ones(24), dofirst=True).astype(float64)  # numba Dict limitation
 
     ui = make_numba_dict(uci)  # Note: all values coverted to float automatically
-    ui['steps']  = steps
-    ui['delt']   = siminfo['delt']
-    ui['errlen'] = len(ERRMSGS)
+    pm = array([siminfo['delt'] / 60.0, ui.get('CSNOFG', 0.0), ui.get('RTLIFG', 0.0), ui.get('RTOPFG', 0.0),
+        ui['LSUR'], ui['SLSUR']], dtype=float64)
 
-    ############################################################################
-    errors = _iwater_(ui, ts)                       # run IWATER simulation code
-    ############################################################################
+    inp = TSBlock(steps, INPUTS)
+    inp.load(ts, INPUTS)
 
-    return errors, ERRMSGS
+    x = zeros(len(STATES))
+    x[X.RETS]  = ui['RETS']
+    x[X.SURS]  = ui['SURS']
+    x[X.MSUPY] = ui['SURS']
+    x[X.DEC]   = nan
+    x[X.SRC]   = nan
+    return pm, x, inp
 
 
 @njit(cache=True)
-def _iwater_(ui, ts):
-    ''' Simulate the water budget for an impervious land segment. '''
-    errors = zeros(int(ui['errlen'])).astype(int64)      # storage for error counts
-
-    delt60 = ui['delt'] / 60.0          # simulation interval in hours
-    steps  = int(ui['steps'])
-
-    lsur   = ui['LSUR']
-    slsur  = ui['SLSUR']
-
-    RTLIFG = 0
-    if 'RTLIFG' in ui:
-        RTLIFG = int(ui['RTLIFG'])
-    CSNOFG = 0
-    if 'CSNOFG' in ui:
-        CSNOFG = int(ui['CSNOFG'])
-    RTOPFG = 0
-    if 'RTOPFG' in ui:
-        RTOPFG = int(ui['RTOPFG'])
-
-    HRFG   = ts['HRFG'].astype(int64)
-    HR1FG  = ts['HR1FG'].astype(int64)
-    RETSC  = ts['RETSC']
-    NSUR   = ts['NSUR']
-    AIRTMP = ts['AIRTMP']
-    PETMAX = ts['PETMAX']
-    PETMIN = ts['PETMIN']
-    SNOCOV = ts['SNOCOV']
-    SURLI  = ts['SURLI']
-    PETINP = ts['PETINP']
-    RAINF  = ts['RAINF']
-    WYIELD = ts['WYIELD']
-    PREC   = ts['PREC']
-
-    # like MATLAB, much faster to preinitialize variables. Store in ts Dict
-    ts['IMPEV'] = IMPEV = zeros(steps, dtype=float64)
-    ts['PET']   = PET   = zeros(steps, dtype=float64)
-    ts['PETADJ']= PETADJ= zeros(steps, dtype=float64)
-    ts['RETS']  = RETS  = zeros(steps, dtype=float64)
-    ts['SUPY']  = SUPY  = zeros(steps, dtype=float64)
-    ts['SURI']  = SURI  = zeros(steps, dtype=float64)
-    ts['SURO']  = SURO  = zeros(steps, dtype=float64)
-    ts['SURS']  = SURS  = zeros(steps, dtype=float64)
-
-    # initial conditions
-    rets = ui['RETS']
-    surs = ui['SURS']
-    msupy = surs
-
-    # Needed by Numba 0.31
-    dec   = nan
-    src   = nan
-    surse = nan
-    ssupr = nan
-    dummy = nan
-    d     = nan
-    supy  = 0.0
-
-    # MAIN LOOP
-    for step in range(steps):
-        # save on step lookup code - do once per step
-        oldmsupy = msupy
-        retsc = RETSC[step]
-        petinp = PETINP[step]
-
-        if CSNOFG:
-            airtmp = AIRTMP[step]
-            petmax = PETMAX[step]
-            petmin = PETMIN[step]
-            snocov = SNOCOV[step]
-            supy   = RAINF[step] * (1.0 - snocov) + WYIELD[step]
-            if HRFG[step]:
-                petadj = 1.0 - snocov
-                if airtmp < petmax:
-                    if airtmp < petmin:
-                        petadj = 0.0
-                    if petadj > 0.5:
-                        petadj = 0.5
-                PETADJ[step] = petadj
-            pet = petinp * petadj
-        else:
-            supy = PREC[step]
-            pet  = petinp
-        PET[step]  = pet
-        SUPY[step] = supy
-
-        surli = SURLI[step]
-        retsc = RETSC[step]
-        if RTLIFG: # surface lateral inflow (if any) is subject to retention
-            reti = supy + surli
-
-            # RETN
-            rets += reti
-            if rets > retsc:
-                reto = rets - retsc
-                rets = retsc
-            else:
-                reto = 0.0
-            suri = reto
+def _iwater_(pm, x, inp, AIRTMP, RAINF, SNOCOV, WYIELD, out):
+    ''' Simulate the water budget for an impervious land segment, out holds the OUTPUTS rows'''
+    errors = zeros(len(ERRMSGS)).astype(int64)      # storage for error counts
+    o = zeros(len(OUTPUTS))
+    for step in range(out.shape[1]):
+        iwater_step(step, AIRTMP[step], RAINF[step], SNOCOV[step], WYIELD[step], x, o, inp, pm, errors)
+        out[:, step] = o
+    return errors
+
+
+@njit(cache=True)
+def iwater_step(step, airtmp, rainf, snocov, wyield, x, o, inp, pm, errors):
+    ''' advance the water budget one interval; airtmp, rainf, snocov and wyield are this interval's
+    ATEMP/SNOW values, x carries the state and o receives the OUTPUTS of the interval'''
+    delt60 = pm[P.DELT60]           # simulation interval in hours
+    CSNOFG = int(pm[P.CSNOFG])
+    RTLIFG = int(pm[P.RTLIFG])
+    RTOPFG = int(pm[P.RTOPFG])
+    lsur   = pm[P.LSUR]
+    slsur  = pm[P.SLSUR]
+
+    oldmsupy = x[X.MSUPY]
+    petadj   = x[X.PETADJ]
+    rets     = x[X.RETS]
+    surs     = x[X.SURS]
+    dec      = x[X.DEC]
+    src      = x[X.SRC]
+
+    # save on step lookup code - do once per step
+    retsc  = inp[I.RETSC, step]
+    petinp = inp[I.PETINP, step]
+    hr1fg  = int(inp[I.HR1FG, step])
+
+    o[O.PETADJ] = 0.0
+    if CSNOFG:
+        petmax = inp[I.PETMAX, step]
+        petmin = inp[I.PETMIN, step]
+        supy   = rainf * (1.0 - snocov) + wyield
+        if int(inp[I.HRFG, step]):
+            petadj = 1.0 - snocov
+            if airtmp < petmax:
+                if airtmp < petmin:
+                    petadj = 0.0
+                if petadj > 0.5:
+                    petadj = 0.5
+            o[O.PETADJ] = petadj
+        pet = petinp * petadj
+    else:
+        supy = inp[I.PREC, step]
+        pet  = petinp
+
+    surli = inp[I.SURLI, step]
+    if RTLIFG: # surface lateral inflow (if any) is subject to retention
+        reti = supy + surli
+
+        # RETN
+        rets += reti
+        if rets > retsc:
+            reto = rets - retsc
+            rets = retsc
         else:
-            reti = supy
+            reto = 0.0
+        suri = reto
+    else:
+        reti = supy
 
-            # RETN
-            rets += reti
-            if rets > retsc:
-                reto = rets - retsc
-                rets = retsc
-            else:
-                reto = 0.0
-            suri = reto + surli
-        # IWATER
-        msupy = suri + surs
-
-        suro = 0.0
-        if msupy > 0.0002:
-            if RTOPFG:
-                # IROUTE for RTOPFG==True, the way it is done in arm, nps, and hspx
-                if oldmsupy == 0.0 or HR1FG[step]:   # Time to recompute
-                    dummy  = NSUR[step] * lsur
-                    dec = 0.00982 * (dummy/sqrt(slsur))**0.6
-                    src = 1020.0 * sqrt(slsur)/dummy
-
-                sursm = (surs + msupy) * 0.5
-                dummy = sursm * 1.6
-                if suri > 0.0:
-                    d = dec*suri**0.6
-                    if d > sursm:
-                        surse = d
-                        dummy = sursm * (1.0 + 0.6 * (sursm / surse)**3)
-                tsuro = delt60 * src * dummy**1.67
-                suro  = msupy if tsuro > msupy else tsuro
-                surs  = 0.0   if tsuro > msupy else msupy - suro
-            else:
-                # IROUTE for RTOPFG==False
-                if oldmsupy == 0.0 or HR1FG[step]:   # Time to recompute
-                    dummy = NSUR[step] * lsur
-                    dec = 0.00982 * (dummy/sqrt(slsur))**0.6
-                    src = 1020.0 * sqrt(slsur)/dummy
-                ssupr  = suri / delt60
-                surse  = dec * ssupr**0.6 if ssupr > 0.0 else 0.0
-                sursnw = msupy
-                suro   = 0.0
-
-                for count in range(MAXLOOPS):
-                    if ssupr > 0.0:
-                        ratio = sursnw / surse
-                        fact = 1.0 + 0.6 * ratio**3  if ratio <= 1.0 else 1.6
-                    else:
-                        fact  = 1.6
-                        ratio = 1e30
-
-                    ffact  = (delt60 * src * fact**1.667) * (sursnw**1.667)
-                    fsuro  = ffact - suro
-                    dfact  = -1.667 * ffact
-
-                    dfsuro = dfact/sursnw - 1.0
-                    if ratio <= 1.0:
-                        dfsuro += (dfact/(fact * surse)) * 1.8 * ratio**2
-                    dsuro = fsuro / dfsuro
-
-                    suro = suro - dsuro
-                    sursnw = msupy - suro
-
-                    if abs(dsuro / suro) < TOLERANCE:
-                        break
-                else:
-                    errors[0] = errors[0] + 1  # IROUTE did not converge
-                surs = sursnw
+        # RETN
+        rets += reti
+        if rets > retsc:
+            reto = rets - retsc
+            rets = retsc
         else:
-            suro = msupy
-            surs = 0.0
-
-        # EVRETN
-        if rets > 0.0:
-            if pet > rets:
-                impev = rets
-                rets  = 0.0
-            else:
-                impev = pet
-                rets -= impev
+            reto = 0.0
+        suri = reto + surli
+    # IWATER
+    msupy = suri + surs
+
+    suro = 0.0
+    if msupy > 0.0002:
+        if RTOPFG:
+            # IROUTE for RTOPFG==True, the way it is done in arm, nps, and hspx
+            if oldmsupy == 0.0 or hr1fg:   # Time to recompute
+                dummy  = inp[I.NSUR, step] * lsur
+                dec = 0.00982 * (dummy/sqrt(slsur))**0.6
+                src = 1020.0 * sqrt(slsur)/dummy
+
+            sursm = (surs + msupy) * 0.5
+            dummy = sursm * 1.6
+            if suri > 0.0:
+                d = dec*suri**0.6
+                if d > sursm:
+                    surse = d
+                    dummy = sursm * (1.0 + 0.6 * (sursm / surse)**3)
+            tsuro = delt60 * src * dummy**1.67
+            suro  = msupy if tsuro > msupy else tsuro
+            surs  = 0.0   if tsuro > msupy else msupy - suro
         else:
-            impev = 0.0
-        IMPEV[step] = impev
+            # IROUTE for RTOPFG==False
+            if oldmsupy == 0.0 or hr1fg:   # Time to recompute
+                dummy = inp[I.NSUR, step] * lsur
+                dec = 0.00982 * (dummy/sqrt(slsur))**0.6
+                src = 1020.0 * sqrt(slsur)/dummy
+            ssupr  = suri / delt60
+            surse  = dec * ssupr**0.6 if ssupr > 0.0 else 0.0
+            sursnw = msupy
+            suro   = 0.0
+
+            for count in range(MAXLOOPS):
+                if ssupr > 0.0:
+                    ratio = sursnw / surse
+                    fact = 1.0 + 0.6 * ratio**3  if ratio <= 1.0 else 1.6
+                else:
+                    fact  = 1.6
+                    ratio = 1e30
 
-        RETS[step] = rets
-        SURI[step] = suri
-        SURO[step] = suro
-        SURS[step] = surs
-    return errors
+                ffact  = (delt60 * src * fact**1.667) * (sursnw**1.667)
+                fsuro  = ffact - suro
+                dfact  = -1.667 * ffact
 
+                dfsuro = dfact/sursnw - 1.0
+                if ratio <= 1.0:
+                    dfsuro += (dfact/(fact * surse)) * 1.8 * ratio**2
+                dsuro = fsuro / dfsuro
 
+                suro = suro - dsuro
+                sursnw = msupy - suro
 
+                if abs(dsuro / suro) < TOLERANCE:
+                    break
+            else:
+                errors[0] = errors[0] + 1  # IROUTE did not converge
+            surs = sursnw
+    else:
+        suro = msupy
+        surs = 0.0
+
+    # EVRETN
+    if rets > 0.0:
+        if pet > rets:
+            impev = rets
+            rets  = 0.0
+        else:
+            impev = pet
+            rets -= impev
+    else:
+        impev = 0.0
+
+    x[X.MSUPY]  = msupy
+    x[X.PETADJ] = petadj
+    x[X.RETS]   = rets
+    x[X.SURS]   = surs
+    x[X.DEC]    = dec
+    x[X.SRC]    = src
+
+    o[O.IMPEV] = impev
+    o[O.PET]   = pet
+    o[O.RETS]  = rets
+    o[O.SUPY]  = supy
+    o[O.SURI]  = suri
+    o[O.SURO]  = suro
+    o[O.SURS]  = surs
+    return
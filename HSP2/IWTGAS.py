@@ -4,8 +4,8 @@ License: LGPL2
 
 Conversion of HSPF HIMPGAS.FOR module into Python''' 
 
-from numpy import zeros, where, full
-from numba import jit
+from numpy import zeros, where, full, float64
+from numba import njit
 from HSP2.utilities import initm, make_numba_dict, hourflag
 
 ERRMSG = []
@@ -32,6 +32,8 @@ PCFLX3 = IGCF1(3,LEV) * MFACTA
 
 ERRMSG = []
 
+
+
 def iwtgas(store, siminfo, uci, ts):
 	''' Estimate water temperature, dissolved oxygen, and carbon dioxide in the outflows
 	from a impervious land segment. calculate associated fluxes through exit gate'''
@@ -40,29 +42,14 @@ def iwtgas(store, siminfo, uci, ts):
 	simlen = siminfo['steps']
 	tindex = siminfo['tindex']
 
-	ui = make_numba_dict(uci)
-	slifac  = ui['SLIFAC']  # from LAT_FACTOR table
-	sotmp  = ui['SOTMP']
-	sodox  = ui['SODOX']
-	soco2  = ui['SOCO2']
-	elevgc = ((288.0 - 0.00198 *  ui['ELEV']) / 288.0)**5.256
-	
 	for name in ['AIRTMP', 'WYIELD', 'SURO', 'SURLI']:
 		if name not in ts:
 			ts[name] = zeros(simlen)
-			
-	AIRTMP = ts['AIRTMP']
-	WYIELD = ts['WYIELD']
-	SURO   = ts['SURO']
-	SURLI  = ts['SURLI']
-	
+
 	# get surface lateral inflow temp and concentrations
 	for name in ['SLITMP', 'SLIDOX', 'SLICO2']:
 		if name not in ts:
 			ts[name] = full(simlen, -1.0E30)
-	SLITMP = ts['SLITMP']
-	SLIDOX = ts['SLIDOX']
-	SLICO2 = ts['SLICO2']
 
 	u = uci['PARAMETERS']
 	if 'WTFVFG' in u:
@@ -71,24 +58,58 @@ def iwtgas(store, siminfo, uci, ts):
 	else:
 		ts['AWTF'] = full(simlen, u['AWTF'])
 		ts['BWTF'] = full(simlen, u['BWTF'])
-	AWTF = ts['AWTF']
-	BWTF = ts['BWTF']
-	
+
+	ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True).astype(float64)  # numba Dict limitation
+
+	ui = make_numba_dict(uci)
+	ui['simlen'] = simlen
+
+	############################################################################
+	_iwtgas_(ui, ts)
+	############################################################################
+
+	return errorsV, ERRMSG
+
+
+@njit(cache=True)
+def _iwtgas_(ui, ts):
+	''' Estimate water temperature, dissolved oxygen, and carbon dioxide in the outflows
+	from a impervious land segment. calculate associated fluxes through exit gate'''
+	simlen = int(ui['simlen'])
+
+	slifac  = ui['SLIFAC']  # from LAT_FACTOR table
+	sotmp  = ui['SOTMP']
+	sodox  = ui['SODOX']
+	soco2  = ui['SOCO2']
+	elevgc = ((288.0 - 0.00198 *  ui['ELEV']) / 288.0)**5.256
+
+	AIRTMP = ts['AIRTMP']
+	WYIELD = ts['WYIELD']
+	SURO   = ts['SURO']
+	SURLI  = ts['SURLI']
+	SLITMP = ts['SLITMP']
+	SLIDOX = ts['SLIDOX']
+	SLICO2 = ts['SLICO2']
+	DAYFG  = ts['DAYFG']
+
+	# regression intercept and air temperature converted to centigrade once, outside the time loop
+	AWTF  = (ts['AWTF'] - 32.0) * 0.555
+	BWTF  = ts['BWTF']
+	AIRTC = (AIRTMP - 32.0) * 0.555
+
 	# preallocate output arrays
-	SOTMP  = ts['SOTMP']  = full(simlen, -1.0e30)
-	SODOX  = ts['SODOX']  = full(simlen, -1.0e30)
-	SOCO2  = ts['SOCO2']  = full(simlen, -1.0e30)
-	SOHT   = ts['SOHT']   = zeros(simlen)
-	SODOXM = ts['SODOXM'] = zeros(simlen)
-	SOCO2M = ts['SOCO2M'] = zeros(simlen)
-	
-	DAYFG = hourflag(siminfo, 0, dofirst=True).astype(bool)
+	ts['SOTMP']  = SOTMP  = full(simlen, -1.0e30)
+	ts['SODOX']  = SODOX  = full(simlen, -1.0e30)
+	ts['SOCO2']  = SOCO2  = full(simlen, -1.0e30)
+	ts['SOHT']   = SOHT   = zeros(simlen)
+	ts['SODOXM'] = SODOXM = zeros(simlen)
+	ts['SOCO2M'] = SOCO2M = zeros(simlen)
 
 	awtf = AWTF[0]
 	bwtf = BWTF[0]
 
 	for loop in range(simlen):
-		airtc  = (AIRTMP[loop] - 32.0) * 0.555     # convert to centigrade
+		airtc  = AIRTC[loop]
 		suro   = SURO[loop]
 		wyield = WYIELD[loop]
 		surli  = SURLI[loop]
@@ -98,7 +119,7 @@ def iwtgas(store, siminfo, uci, ts):
 		
 		# obtain latest values for temperature calculation parameters
 		if DAYFG[loop] == 1:
-			awtf = (AWTF[loop] - 32.0) * 0.555
+			awtf = AWTF[loop]
 			bwtf = BWTF[loop]
 			
 		if suro > 0.0:   # there is surface outflow
@@ -138,4 +159,4 @@ def iwtgas(store, siminfo, uci, ts):
 		SODOX[loop]  = sodox
 		SOCO2[loop]  = soco2
 
-	return errorsV, ERRMSG
\ No newline at end of file
+	return
@@ -1,169 +1,105 @@
 ''' Copyright (c) 2020 by RESPEC, INC.
 Author: Robert Heaphy, Ph.D.
 License: LGPL2
-'''
 
-from numpy import zeros, array
+Conversion of HSPF HRCHOXR.FOR module into Python. oxrx() is called by the
+RQUAL kernel each interval after DOX and BOD have been advected.'''
+
+from collections import namedtuple
 from math import exp
-from hrchrq import sink
-
-def oxrx(general, ui, ts):
-	''' simulate primary do, bod balances'''
-	
-	delt60 = general['DELT'] / 60.0
-	nexits = general['nexits']
-
-	vol  = ui['VOL']
-	
-	# table-type ox-genparm
-	kbod20 = ui['KBOD20'] * delt60  # convert units from 1/hr to 1/ivl
-	tcbod  = ui['TCBOD']
-	kodset = ui['KODSET'] * delt60  # convert units from 1/hr to 1/ivl
-	supsat = ui['SUPSAT']
-	
-	# table-type ox-init
-	dox   = ui['dox']
-	bod   = ui['bod']
-	satdo = ui['satdo']
-	
-	# other required values
-	REAMFG = ui['REAMFG']   # table-type ox-flags
-	elev   = ui['ELEV']     # table-type elev
-	
-	cfpres = ((288.0 - 0.001981 * elev) / 288.0)**5.256  # pressure correction factor -
-	ui['CFPRES'] = cfpres
-	
-	LKFG = ui['LKFG']
-	if LKFG == 1:
-		cforea = ui['CFOREA']   # reaeration parameter from table-type ox-cforea
-	elif REAMFG == 1:            # tsivoglou method;  table-type ox-tsivoglou
-		reakt  = ui['REAKT']
-		tcginv = ui['TCGINV']
-		len_   = ui['LEN']
-		delth  = ui['DELTH']
-	elif REAMFG == 2:	        # owen/churchill/o'connor-dobbins; table-type ox-tcginv
-		tcginv = ui['TCGINV']
-		reak   = ui['REAK']
-		expred = ui['EXPRED']
-	elif REAMFG == 3:           # user formula - table-type ox-reaparm
-		tcginv = ui['TCGINV']
-		reak   = ui['REAK']
-		expred = ui['EXPRED']
-		
-	if BENRFG == 1:       # benthic release parms - table-type ox-benparm
-		benod  = ui['BENOD'] * delt60  # convert units from 1/hr to 1/ivl
-		tcben  = ui['TCBEN']
-		expod  = ui['EXPOD']
-		exprel = ui['EXPREL']		
-		BRBOD  = array([ui['BRBOD1'] , ui['BRBOD2']])  * delt60  # convert units from 1/hr to 1/ivl
-
-	rdox = dox * vol
-	rbod = bod * vol
-
-	odox = zeros(nexits)
-	odob = zeros(nexits)
-
-	#@jit(nopython = True)
-	''' simulate primary do, bod balances'''
-	def oxrx(idox, ibod, wind, avdepe, avvele, depcor, tw, BENRFG, advData):
-		# advect dissolved oxygen
-		dox, rodox, odox = advect(idox, dox, odox, *advData)
-
-		# advect bod
-		bod, robod, obod = advect(ibod, bod, robod, obod(1))
-
-		if avdepe > 0.17:  # benthal influences are considered
-			# sink bod
-			bod, snkbod = sink(vol, avdepe, kodset, bod, snkbod)
-			snkbod = -snkbod
-
-			if BENRFG == 1:
-				#$OXBEN   # simulate benthal oxygen demand and benthal release of bod, and compute associated fluxes
-				# calculate amount of dissolved oxygen required to satisfy benthal oygen demand (mg/m2.ivl)
-				benox = benod * (tcben**(tw -20.0)) * (1.0 -exp(-expod * dox))
-
-				# adjust dissolved oxygen state variable to acount for oxygen lost to benthos, and compute concentration flux
-				doben = dox
-				dox   = dox - benox * depcor
-				doben = benox * depcor  
-				if dox >= 0.001:
-					doben = benox * depcor
-				else:
-					dox = 0.0
-
-				# calculate benthal release of bod; release is a function of dissolved oxygen
-				# (dox) and a step function of stream velocity; brbod(1) is the aerobic benthal 
-				# release rate; brbod(2) is the base increment to benthal release under 
-				# decreasing do concentration; relbod is expressed as mg bod/m2.ivl
-				relbod = (brbod1 + brbod2 * exp(-exprel * dox)) * scrfac
-
-				# add release to bod state variable and compute concentration flux
-				bod    = bod + relbod * depcor
-				bodbnr = relbod * depcor
-						
-				# end #$OXBEN
-				bendox = -doben * vol
-				bnrbod = bodbnr * vol
-
-		elif LKFG == 1:
-			# calculate oxygen reaeration
-			if not (GQFG == 1 and GQALFG(4) == 1):
-				korea = oxrea(LKFG, wind,cforea,avvele,avdepe,tcginv, reamfg,reak,reakt,expred,exprev,len,
-				delth,tw,delts,delt60,uunits, korea)
-
-			# calculate oxygen saturation level for current water
-			# temperature; satdo is expressed as mg oxygen per liter
-			satdo = 14.652 + tw * (-0.41022 + tw * (0.007991 - 0.7777e-4 * tw))
-
-			# adjust satdo to conform to prevalent atmospheric pressure
-			# conditions; cfpres is the ratio of site pressure to sea level pressure
-			satdo = cfpres * satdo
-			if satdo < 0.0:
-				# warning - this occurs only when water temperature is very high - above
-				# about 66 c.  usually means error in input gatmp (or tw if htrch is not being simulated).      
-				satdo = 0.0   # reset saturation level
-
-			# compute dissolved oxygen value after reaeration,and the reaeration flux
-			dorea  = korea * (satdo - dox)
-			dox    = dox + dorea
-			readox = dorea * vol
-
-			#$BODDEC
-			'''calculate concentration of oxygen required to satisfy computed bod decay'''
-			bodox = (kbod20 * (tcbod**(tw -20.0))) * bod   # bodox is expressed as mg oxygen/liter.ivl
-			if bodox > bod:
-				bodox = bod
-
-			# adjust dissolved oxygen state variable to acount for oxygen lost to bod decay, and compute concentration flux
-			if bodox >= dox:
-				bodox = dox
-				dox   = 0.0
-			else:
-				dox = dox - bodox
-
-			# adjust bod state variable to account for bod decayed
-			bod -= bodox
-			if bod < 0.0001:
-				bod = 0.0
-			# end #$BODDEC
-			
-			boddox = -bodox * vol
-			decbod = -bodox * vol
-
-		else:    # there is too little water to warrant simulation of quality processes
-			bodox  = 0.0
-			
-			readox = 0.0
-			boddox = 0.0
-			bendox = 0.0
-			decbod = 0.0
-			bnrbod = 0.0
-			snkbod = 0.0
-
-		totdox = readox + boddox + bendox
-		totbod = decbod + bnrbod + snkbod
-
-		rdox = dox * vol
-		rbod = bod * vol
-		return dox, bod, satdo, rodo, robod, odo, obod
-	return oxrx
+from numpy import array
+from numba import njit
+from HSP2.ADCALC import oxrea, sink
+
+# parameters (table-types ox-genparm, ox-benparm, ox-cforea, ox-tsivoglou, ox-reaparm)
+# and their defaults; the RQUAL driver supplies LKFG, LEN, DELTH (HYDR), ELEV (HTRCH) and BENRFG
+PARMS = {'KBOD20': 0.0, 'TCBOD': 1.075, 'KODSET': 0.0, 'SUPSAT': 1.15, 'BENOD': 0.0, 'TCBEN': 1.074,
+         'EXPOD': 1.22, 'BRBOD1': 0.0, 'BRBOD2': 0.0, 'EXPREL': 2.82, 'CFOREA': 1.0, 'REAKT': 0.08,
+         'TCGINV': 1.047, 'REAK': 0.0, 'EXPRED': 0.0, 'EXPREV': 0.0, 'REAMFG': 2.0, 'BENRFG': 0.0,
+         'LKFG': 0.0, 'LEN': 0.0, 'DELTH': 0.0, 'ELEV': 0.0}
+PM = namedtuple('OxrxParms', PARMS)(*range(len(PARMS)))
+
+# process fluxes written by oxrx(), mass.ft3/l.ivl
+FLUXES = ('READOX', 'BODDOX', 'BENDOX', 'DECBOD', 'BNRBOD', 'SNKBOD')
+FLUX = namedtuple('OxrxFlux', FLUXES)(*range(len(FLUXES)))
+
+
+def oxrx_parms(ui, delt60):
+	''' parameter vector for oxrx(), rates converted from /hr to /ivl'''
+	pm = array([float(ui.get(name, value)) for name, value in PARMS.items()])
+	for name in ('KBOD20', 'KODSET', 'BENOD', 'BRBOD1', 'BRBOD2'):
+		pm[getattr(PM, name)] *= delt60
+	pm[PM.LEN] *= 5280.0   # miles to feet
+	return pm
+
+
+@njit(cache=True)
+def oxrx(dox, bod, satdo, tw, vol, avdepe, avvele, depcor, scrfac, wind, cfpres, delts, delt60, pm, f):
+	''' simulate primary do and bod balances; returns the new dox, bod and satdo, the reaeration
+	coefficient korea and the bod decay bodox used by NUTRX and PHCARB'''
+	korea = 0.0
+	bodox = 0.0
+	if avdepe > 0.17:   # enough water to warrant simulation of quality processes
+		bod, snkbod = sink(vol, avdepe, pm[PM.KODSET], bod)
+		f[FLUX.SNKBOD] = -snkbod
+
+		if pm[PM.BENRFG] == 1:
+			dox, bod, doben, bodbnr = oxben(dox, bod, tw, depcor, scrfac, pm[PM.BENOD], pm[PM.TCBEN],
+				pm[PM.EXPOD], pm[PM.BRBOD1], pm[PM.BRBOD2], pm[PM.EXPREL])
+			f[FLUX.BENDOX] = -doben  * vol
+			f[FLUX.BNRBOD] =  bodbnr * vol
+
+		korea = oxrea(int(pm[PM.LKFG]), wind, pm[PM.CFOREA], avvele, avdepe, pm[PM.TCGINV], int(pm[PM.REAMFG]),
+			pm[PM.REAK], pm[PM.REAKT], pm[PM.EXPRED], pm[PM.EXPREV], pm[PM.LEN], pm[PM.DELTH], tw, delts, delt60, 1)
+
+		# oxygen saturation at the water temperature, corrected to the site pressure; below zero only above about 66 c
+		satdo = cfpres * (14.652 + tw * (-0.41022 + tw * (0.007991 - 0.7777e-4 * tw)))
+		if satdo < 0.0:
+			satdo = 0.0
+
+		dorea = korea * (satdo - dox)
+		dox  += dorea
+		f[FLUX.READOX] = dorea * vol
+
+		dox, bod, bodox = boddec(dox, bod, tw, pm[PM.KBOD20], pm[PM.TCBOD])
+		f[FLUX.BODDOX] = -bodox * vol
+		f[FLUX.DECBOD] = -bodox * vol
+	return dox, bod, satdo, korea, bodox
+
+
+@njit(cache=True)
+def oxben(dox, bod, tw, depcor, scrfac, benod, tcben, expod, brbod1, brbod2, exprel):
+	''' simulate benthal oxygen demand and benthal release of bod'''
+	# oxygen required to satisfy benthal oxygen demand (mg/m2.ivl)
+	benox = benod * (tcben**(tw - 20.0)) * (1.0 - exp(-expod * dox))
+
+	doben = dox
+	dox   = dox - benox * depcor
+	if dox >= 0.001:
+		doben = benox * depcor
+	else:
+		dox = 0.0
+
+	# benthal release of bod (mg/m2.ivl) is a function of do and a step function of stream velocity
+	relbod = (brbod1 + brbod2 * exp(-exprel * dox)) * scrfac
+	bod   += relbod * depcor
+	return dox, bod, doben, relbod * depcor
+
+
+@njit(cache=True)
+def boddec(dox, bod, tw, kbod20, tcbod):
+	''' calculate oxygen required to satisfy bod decay; bodox is expressed as mg oxygen/liter.ivl'''
+	bodox = (kbod20 * (tcbod**(tw - 20.0))) * bod
+	if bodox > bod:
+		bodox = bod
+
+	if bodox >= dox:
+		bodox = dox
+		dox   = 0.0
+	else:
+		dox -= bodox
+
+	bod -= bodox
+	if bod < 0.0001:
+		bod = 0.0
+	return dox, bod, bodox
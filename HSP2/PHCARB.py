@@ -1,181 +1,113 @@
 ''' Copyright (c) 2020 by RESPEC, INC.
 Author: Robert Heaphy, Ph.D.
 License: LGPL2
-'''
 
+Conversion of HSPF HRCHPHC.FOR module into Python. phcarb() is called by the
+RQUAL kernel each interval after TIC and CO2 have been advected; alkalinity is
+the conservative constituent ALKCON simulated by CONS.'''
+
+from collections import namedtuple
 from math import log10
-from numpy import zeros, array
-
-from HRCHRQ import benth
-from HRCHUT import advect
-
-def phcarb(general, ui, ts):
-	''' simulate ph, carbon dioxide, total inorganic carbon,  and alkalinity'''
-
-	simlen = general('SIMLEN')
-	delt60   = general('DELT') / 60.0   # ???? check
-	ncons  = ui['NCONS']
-	nexits = ui['NEXITS']
-	BENRFG = ui['BENRFG']  # table type BENTH-FLAG  from RQual
-	
-	
-	# flags - table-type ph-parm1
-	phcnt  = ui['PHCNT']    # is the maximum number of iterations to pH solution.
-	alkcon = ui['ALKCON']   # ALKCON  is the number of the conservative substance which is alkalinity.
-	
-	# table-type ph-parm2
-	cfcinv = ui['CFCINV']
-	BRCO2  = array([ui['BRCO21'], ui['BRCO22']]) * delt60    # convert benthal releases from  /hr to  /ivl
-
-	# table-type ph-init
-	tic = ui['TIC']
-	co2 = ui['CO2']
-	ph   = ui['PH']
-	
-
-	anaer  = ui['ANAER']
-
-
-	
-	otic = zeros(nexits)
-	oco2 = zeros(nexits)	
-	
-	if ncons <= 0:
-		ncons = alkcon
-	if alkcon > ncons:
-		pass # errmsg: error - invalid no. for alkcon
-
-
-	#@jit(nopython=True)
-	def phcarb_(dox, bod, alk, itic, ico2, tw, avdepe, scrfac, advData):
-		''' simulate ph, carbon dioxide, total inorganic carbon,  and alkalinity'''
-
-
-		# advect total inorganic carbon
-		tic, rotic, otic = advect(loop, itic, tic, otic, *advData)
-
-		# advect carbon dioxide
-		co2, roco2, oco2 = advect(loop, ico2, co2, oco2, *advData)
-
-		if vol > 0.0:
-			twkelv = tw + 273.16
-
-			# convert tic, co2, and alk to molar concentrations for duration of phcarb section
-			tic = tic / 12000.0
-			co2 = co2 / 12000.0
-			alk = alk / 50000.0
-
-			if avdepe > 0.17:
-				if BENRFG == 1:           # simulate benthal release of co2
-					co2 *= 12000.0        # convert co2 to mg/l for use by benth
-					co2, BRCO2 =  benth(dox, anaer, BRCO2, scrfac, depcor, co2, benco2)
-					co2 /= 12000.0
-				else:                     # benthal release of co2 is not considered
-					benco2 = 0.0
-
-				# calculate molar saturation concentration for co2 (satco2); first, calculate
-				# henry's constant, s, for co2; s is defined as the molar concentration of 
-				# atmospheric co2/partial pressure of co2; cfpres corrects the equation for
-				# effects of elevation differences from sea level
-				s = 10.0**((2385.73 / twkelv) - 14.0184 + 0.0152642 * twkelv)
-				satco2 = 3.16e-04 * cfpres * s
-
-				# calculate increase in co2 due to atmospheric invasion;  the co2 
-				# invasion is based on oxygen reaeration rate for the control volume
-				kcinv  = min(cfcinv * korea, 0.999)
-				inv    = kcinv * (satco2 - co2)
-				invco2 = inv * 12000.0
-
-				# calculate net molar co2 change due to co2 invasion, zooplankton
-				# excretion and respiration, phytoplankton and benthic algae 
-				# respiration, bod decay, and benthal release of co2
-				bodco2 = decco2
-				phyco2 = pyco2
-				zooco2 = zoco2
-				balco2 = baco2
-				totco2 = invco2 + zooco2 + phyco2 + balco2 + bodco2 + benco2
-				deltcd = totco2 / 12000.0
-
-				# calculate change in total inorganic carbon balance due to net co2 change
-				tic = max(tic + deltcd, 0.0)
+from numpy import array
+from numba import njit
+from HSP2.ADCALC import benth
+
+# parameters (table-types ph-parm1, ph-parm2) and their defaults; the RQUAL driver supplies ANAER and BENRFG
+PARMS = {'PHCNT': 50.0, 'ALKCON': 1.0, 'CFCINV': 0.913, 'BRCO21': 62.0, 'BRCO22': 62.0, 'ANAER': 0.005,
+         'BENRFG': 0.0}
+PM = namedtuple('PhcarbParms', PARMS)(*range(len(PARMS)))
+
+# process fluxes written by phcarb(), mass.ft3/l.ivl; the co2 fluxes of bod decay and plankton are
+# written by NUTRX and PLANK
+FLUXES = ('INVCO2', 'BENCO2')
+FLUX = namedtuple('PhcarbFlux', FLUXES)(*range(len(FLUXES)))
+
+
+def phcarb_parms(ui, delt60):
+	''' parameter vector for phcarb(), benthal releases converted from /hr to /ivl'''
+	pm = array([float(ui.get(name, value)) for name, value in PARMS.items()])
+	pm[PM.BRCO21] *= delt60
+	pm[PM.BRCO22] *= delt60
+	return pm
+
+
+@njit(cache=True)
+def phcarb(tic, co2, ph, alk, dox, tw, vol, avdepe, depcor, scrfac, korea, cfpres, decco2, pyco2, zoco2,
+		baco2, pm, f):
+	''' simulate ph, carbon dioxide and total inorganic carbon; returns tic, co2, ph, satco2 and
+	the number of ph solutions that did not converge (0 or 1)'''
+	if vol <= 0.0:   # reach/res has gone dry during the interval; ph is undefined
+		return tic, co2, -1.0e30, -1.0e30, 0
+
+	twkelv = tw + 273.16
+	satco2 = -1.0e30
+	if avdepe > 0.17:
+		if pm[PM.BENRFG] == 1:   # benthal release of co2
+			co2, benco2 = benth(dox, pm[PM.ANAER], pm[PM.BRCO21], pm[PM.BRCO22], scrfac, depcor, co2)
+			f[FLUX.BENCO2] = benco2 * vol
+		else:
+			benco2 = 0.0
 
+		# molar saturation concentration of co2 from henry's constant, corrected for elevation by cfpres
+		s = 10.0**((2385.73 / twkelv) - 14.0184 + 0.0152642 * twkelv)
+		satco2 = 3.16e-04 * cfpres * s
+
+		# co2 invasion is based on the oxygen reaeration rate
+		kcinv  = min(pm[PM.CFCINV] * korea, 0.999)
+		invco2 = kcinv * (satco2 - co2 / 12000.0) * 12000.0
+		f[FLUX.INVCO2] = invco2 * vol
+
+		# net co2 change from invasion, plankton, bod decay and benthal release updates total inorganic carbon
+		tic = max(tic + invco2 + zoco2 + pyco2 + baco2 + decco2 + benco2, 0.0)
+		satco2 *= 12000.0
+
+	# convert tic and alk to molar concentrations
+	ticm = tic / 12000.0
+	alkm = alk / 50000.0
+
+	# ionization product of water and first and second dissociation constants of carbonic acid
+	kwequ = 10.0**(-4470.99 / twkelv + 6.0875 - 0.01706 * twkelv)
+	k1equ = 10.0**(-3404.71 / twkelv + 14.8435 - 0.032786 * twkelv)
+	k2equ = 10.0**(-2902.39 / twkelv + 6.4980 - 0.02379 * twkelv)
+
+	if ph < 0.0:   # undefined (due to no water in reach)
+		ph = 7.0
+	hest   = 10.0**(-ph)
+	hllim  = 0.0
+	hulim  = 1.0
+	coeff1 = alkm + k1equ
+	coeff2 = -kwequ + alkm * k1equ + k1equ * k2equ - ticm * k1equ
+	coeff3 = -2.0 * k1equ * k2equ * ticm - k1equ * kwequ + alkm * k1equ * k2equ
+	coeff4 = -k1equ * k2equ * kwequ
+
+	# newton-raphson solution of the quartic for the hydrogen ion concentration, bracketed by hllim and hulim
+	nerr  = 1
+	hplus = hest
+	for count in range(int(pm[PM.PHCNT])):
+		quadh = (((hest + coeff1) * hest + coeff2) * hest + coeff3) * hest + coeff4
+		dfdh  = ((4.0 * hest + 3.0 * coeff1) * hest + 2.0 * coeff2) * hest + coeff3
+		if dfdh <= 0.0:   # the slope is not meaningful; move the estimate to force convergence
+			if quadh < 0.0:
+				hllim = hest
+				hest *= 10.0
 			else:
-				# too little water to warrant simulation of quality processes; calculate
-				# values of co2 and ph state variables based on only longitudinal advection
-				invco2 = 0.0
-				zooco2 = 0.0
-				phyco2 = 0.0
-				balco2 = 0.0
-				bodco2 = 0.0
-				benco2 = 0.0
-				totco2 = 0.0   # invco2 + zooco2 + phyco2 + balco2 + bodco2 + benco2
-
-			# calculate ionization product of water
-			kwequ = 10.0**(-4470.99 / twkelv + 6.0875 - 0.01706 * twkelv)
-
-			# calculate first dissociation constant of carbonic acid
-			k1equ = 10.0**(-3404.71 / twkelv + 14.8435 - 0.032786 * twkelv)
-
-			# calculate second dissociation constant of carbonic acid
-			k2equ = 10.0**(-2902.39 / twkelv + 6.4980 - 0.02379 * twkelv)
-
-			# assign values to variables and coefficients used in the solution algorithm
-			if ph < 0.0:       # it is undefined (due to no water in reach)
-				ph = 7.0
-			hest   = 10.0**(-ph)
-			hllim  = 0.0
-			hulim  = 1.0
-			coeff1 = alk + k1equ
-			coeff2 = -kwequ + alk * k1equ + k1equ * k2equ - tic * k1equ
-			coeff3 = -2.0 * k1equ * k2equ * tic - k1equ * kwequ + alk * k1equ * k2equ
-			coeff4 = -k1equ * k2equ * kwequ
-
-			#$PHCALC()     ''' calculate ph'''
-			count  = 0
-			while count <= phcnt:
-				count = count + 1
-				# evaluate quadratic and slope for solution equation
-				quadh = (((hest + coeff1) * hest + coeff2) * hest + coeff3) * hest + coeff4
-				dfdh  = ((4.0 * hest + 3.0 * coeff1) * hest + 2.0 * coeff2) * hest + coeff3
-				if dfdh <= 0.0: # slope of solution equation is zero or negative
-					# solution for hplus is not meaningful for such a slope
-					# update values for hllim, hulim, and hest to force convergence
-					if quadh < 0.0:
-						if hest >= hllim:
-							hllim = hest
-							hest  = 10.0 * hest
-						elif hest <= hulim:
-							hulim = hest
-							hest  = 0.10 * hest
-				else:   # calculate new hydrogen ion concentration
-					hplus = hest - quadh / dfdh
-					if abs(hplus - hest) / hplus <= 0.10:
-						break
-					# adjust prior	estimate for next iteration	
-					if   hplus <= hllim:    hest = (hest + hllim) / 2.0
-					elif hplus >= hulim:    hest = (hest + hulim) / 2.0
-					else:                   hest = hplus
+				hulim = hest
+				hest *= 0.1
+		else:
+			hplus = hest - quadh / dfdh
+			if hplus > 0.0 and abs(hplus - hest) <= 0.10 * hplus:
+				nerr = 0
+				break
+			if hplus <= hllim:
+				hest = (hest + hllim) / 2.0
+			elif hplus >= hulim:
+				hest = (hest + hulim) / 2.0
 			else:
-				pass  # ERRMSG:  a satisfactory solution for ph has not been reached		
-			ph = -log10(hplus)
-			# end #$PHCALC()
-			
-			# calculate co2 concentration (molar)
-			co2 = tic / (1.0 + k1equ / hplus + k1equ * k2equ / (hplus**2))
-
-			# convert tic, co2, and alk from moles/liter to mg/liter
-			tic *= 12000.0
-			co2 *= 12000.0
-			alk *= 50000.0
-		else:    # reach/res has gone dry during the interval; set ph equal to an undefined value
-			ph     = -1.0e30
-			invco2 = 0.0
-			zooco2 = 0.0
-			phyco2 = 0.0
-			balco2 = 0.0
-			bodco2 = 0.0
-			benco2 = 0.0
-			totco2 = 0.0  # invco2 + zooco2 + phyco2 + balco2 + bodco2 + benco2
-		
-		return dox, bod, ph, tic, co2, rotic, roco2, otic, oco2, totco2 
-	return pphcarb
+				hest = hplus
+	if hplus <= 0.0:
+		hplus = hest
+	ph = -log10(hplus)
+
+	# co2 concentration from the carbonate equilibrium
+	co2 = ticm / (1.0 + k1equ / hplus + k1equ * k2equ / (hplus**2)) * 12000.0
+	return tic, co2, ph, satco2, nerr
@@ -0,0 +1,232 @@
+''' Copyright (c) 2020 by RESPEC, INC.
+Author: Robert Heaphy, Ph.D.
+License: LGPL2
+
+Fused land segment hydrology. The enabled ATEMP, SNOW and PWATER (PERLND) or
+IWATER (IMPLND) sections advance together in one time loop; the values one
+section hands to the next (AIRTMP, RAINF, SNOCOV, WYIELD, PACKI) stay in
+registers and only the timeseries that are saved or read by later sections
+are written to arrays. phydro_batch() runs many segments in one compiled call,
+parallel over segments.
+Results are the same as running the section drivers one by one.
+'''
+
+from numpy import zeros, full, nan, array, int64, stack
+from numba import njit, prange
+from HSP2.utilities import TSBlock
+from HSP2.ATEMP import atemp_setup, ERRMSGS as ATEMP_ERRMSGS
+import HSP2.SNOW as SNOW
+import HSP2.PWATER as PWATER
+import HSP2.IWATER as IWATER
+
+# sections simulated by phydro(), in execution order
+SECTIONS = {'PERLND': ('ATEMP', 'SNOW', 'PWATER'),
+            'IMPLND': ('ATEMP', 'SNOW', 'IWATER')}
+
+# timeseries of the fused sections read by later sections
+DOWNSTREAM = {'PERLND': {'SEDMNT': ('RAINF', 'SNOCOV', 'SURO', 'SURS'),
+                         'PSTEMP': ('AIRTMP',),
+                         'PWTGAS': ('AGWO', 'IFWO', 'SURO', 'WYIELD'),
+                         'PQUAL':  ('AGWO', 'IFWO', 'PERO', 'SURO')},
+              'IMPLND': {'SOLIDS': ('SURO', 'SURS'),
+                         'IWTGAS': ('AIRTMP', 'SURO', 'WYIELD'),
+                         'IQUAL':  ('SURO',)}}
+
+WATER = {'PERLND': PWATER, 'IMPLND': IWATER}
+
+# the kernel's per interval outputs and errors of either water section
+NWATER  = max(len(PWATER.OUTPUTS), len(IWATER.OUTPUTS))
+NWERROR = max(len(PWATER.ERRMSGS), len(IWATER.ERRMSGS))
+
+
+def phydro(store, siminfo, uci, ts, flags, saveall=False, operation='PERLND'):
+    ''' runs the enabled SECTIONS of one land segment in a single time loop
+    CALL: phydro(store, siminfo, uci, ts, flags, saveall, operation)
+       uci maps each enabled section name to its ui dictionary
+       flags is the segment's ACTIVITY table
+       returns {section: (errors, ERRMSGS)}'''
+    seg = phydro_setup(store, siminfo, uci, ts, flags, saveall, operation)
+    names = sorted(seg['keep'] & seg['computed'])
+    kept = keep_rows(seg['outputs'], names)
+    out = TSBlock(siminfo['steps'], names)
+
+    ############################################################################
+    serrors, werrors = _phydro_(seg['fg'], *seg['args'], *kept, out.data)
+    ############################################################################
+
+    return phydro_finish(seg, ts, out, serrors, werrors)
+
+
+def phydro_batch(store, siminfo, ucis, tss, flagss, saveall=False, operation='PERLND'):
+    ''' runs the SECTIONS of several land segments with the same enabled sections and DELT
+    in one compiled call, parallel over segments; lists ucis, tss and flagss are as uci, ts and
+    flags of phydro(). Returns the list of phydro() results'''
+    segs = [phydro_setup(store, siminfo, uci, ts, flags, saveall, operation)
+        for uci, ts, flags in zip(ucis, tss, flagss)]
+
+    # the batch writes the union of the kept timeseries, each segment publishes its own
+    names = sorted(set().union(*(seg['keep'] & seg['computed'] for seg in segs)))
+    kept = keep_rows(segs[0]['outputs'], names)
+    out = zeros((len(segs), len(names), siminfo['steps']))
+    serrors = zeros((len(segs), len(SNOW.ERRMSGS)), dtype=int64)
+    werrors = zeros((len(segs), NWERROR), dtype=int64)
+
+    fg = stack([seg['fg'] for seg in segs])
+    args = [stack(arrays) for arrays in zip(*(seg['args'] for seg in segs))]
+    ############################################################################
+    _phydro_batch_(fg, *args, *kept, out, serrors, werrors)
+    ############################################################################
+
+    results = []
+    for n, (seg, ts) in enumerate(zip(segs, tss)):
+        block = TSBlock(siminfo['steps'], names)
+        block.data = out[n]
+        results.append(phydro_finish(seg, ts, block, serrors[n], werrors[n]))
+    return results
+
+
+def phydro_setup(store, siminfo, uci, ts, flags, saveall, operation):
+    ''' runs the setup of the enabled sections in the order of the unfused drivers (SNOW sets
+    siminfo['ICEFG'] used by PWATER); returns a dict of the kernel arguments and the names'''
+    steps = siminfo['steps']
+    sections = SECTIONS[operation]
+    water = WATER[operation]
+    atempfg, snowfg, waterfg = (bool(flags[name]) for name in sections)
+
+    keep = set()
+    for name in sections:
+        if name in uci and 'SAVE' in uci[name]:
+            keep |= {k for k, v in uci[name]['SAVE'].items() if v or saveall}
+    for name, needed in DOWNSTREAM[operation].items():
+        if flags[name]:
+            keep.update(needed)
+
+    dummy, dummy2 = zeros(0), zeros((0, 0))
+    apm, GATMP, PREC, LAPSE = zeros(2), dummy, dummy, dummy
+    if atempfg:
+        ui = atemp_setup(store, siminfo, uci['ATEMP'], ts)
+        apm[:] = ui['ELDAT'], ui['k']
+        GATMP, PREC, LAPSE = ts['GATMP'][0:steps], ts['PREC'][0:steps], ts['LAPSE'][0:steps]
+
+    spm, sx, sinp, SVP = dummy, dummy, dummy2, dummy
+    if snowfg:
+        spm, sx, inp = SNOW.snow_setup(store, siminfo, uci['SNOW'], ts)
+        sinp, SVP = inp.data, ts['SVP']
+
+    wpm, wx, winp, hwtfg = dummy, dummy, dummy2, 0
+    if waterfg and water is PWATER:
+        wpm, wx, inp, hwtfg = PWATER.pwater_setup(store, siminfo, uci['PWATER'], ts)
+        winp = inp.data
+    elif waterfg:
+        wpm, wx, inp = IWATER.iwater_setup(store, siminfo, uci['IWATER'], ts)
+        winp = inp.data
+
+    # timeseries the kernel reads instead of computing, nan when undefined
+    AIRTMP, RAINF, SNOCOV, WYIELD, PACKI = (ts[name][0:steps] if name in ts else full(steps, nan)
+        for name in ('AIRTMP', 'RAINF', 'SNOCOV', 'WYIELD', 'PACKI'))
+
+    # the outputs are the same for every segment of a batch, HWTFG only drops them from computed
+    outputs = (('AIRTMP',) if atempfg else (), SNOW.OUTPUTS if snowfg else (), water.OUTPUTS if waterfg else ())
+    waterfg = waterfg and not hwtfg
+    return {'fg': array([atempfg, snowfg, waterfg, water is IWATER], dtype=int64),
+            'args': (apm, GATMP, PREC, LAPSE, AIRTMP, spm, sx, sinp, SVP, RAINF, SNOCOV, WYIELD, PACKI, wpm,
+                     wx, winp),
+            'outputs': outputs,
+            'computed': set(outputs[0] + outputs[1] + (outputs[2] if waterfg else ())),
+            'keep': keep,
+            'sections': sections,
+            'water': water,
+            'delt': siminfo['delt'],
+            'icefg': int(siminfo.get('ICEFG', 0)),
+            'hwtfg': hwtfg}
+
+
+def keep_rows(outputs, names):
+    ''' (kernel output index, out row) arrays of the kept timeseries of each section'''
+    rows = {name: row for row, name in enumerate(names)}
+    return [array([(i, rows[name]) for i, name in enumerate(c) if name in rows], dtype=int64).reshape(-1, 2)
+        for c in outputs]
+
+
+def phydro_finish(seg, ts, out, serrors, werrors):
+    ''' publishes a segment's kept timeseries in ts and returns {section: (errors, ERRMSGS)}'''
+    names = [name for name in out.slots if name in seg['keep'] and name in seg['computed']]
+
+    # computed timeseries that are not kept must not be read from stale placeholders
+    for name in seg['computed'] - set(names):
+        ts.pop(name, None)
+    out.publish(ts, names)
+
+    water = seg['water']
+    serrors, werrors = serrors.copy(), werrors[0:len(water.ERRMSGS)].copy()
+    if seg['fg'][1] and seg['delt'] > 360 and seg['icefg']:
+        serrors[0] += 1
+    if seg['hwtfg']:
+        werrors[9] += 1
+
+    return {'ATEMP': (zeros(len(ATEMP_ERRMSGS), dtype=int64), ATEMP_ERRMSGS),
+            'SNOW': (serrors, SNOW.ERRMSGS),
+            seg['sections'][2]: (werrors, water.ERRMSGS)}
+
+
+@njit(cache=True, parallel=True)
+def _phydro_batch_(fg, apm, GATMP, PREC, LAPSE, AIRTMP, spm, sx, sinp, SVP, RAINF, SNOCOV, WYIELD, PACKI,
+        wpm, wx, winp, akeep, skeep, wkeep, out, serrors, werrors):
+    ''' _phydro_ for each segment, the leading axis of every array'''
+    for n in prange(out.shape[0]):
+        s, w = _phydro_(fg[n], apm[n], GATMP[n], PREC[n], LAPSE[n], AIRTMP[n], spm[n], sx[n], sinp[n], SVP[n],
+            RAINF[n], SNOCOV[n], WYIELD[n], PACKI[n], wpm[n], wx[n], winp[n], akeep, skeep, wkeep, out[n])
+        serrors[n, :] = s
+        werrors[n, :] = w
+
+
+@njit(cache=True)
+def _phydro_(fg, apm, GATMP, PREC, LAPSE, AIRTMP, spm, sx, sinp, SVP, RAINF, SNOCOV, WYIELD, PACKI,
+        wpm, wx, winp, akeep, skeep, wkeep, out):
+    ''' ATEMP, SNOW and PWATER or IWATER for each interval; fg flags the enabled sections and
+    IMPLND, the inputs of a disabled section's results come from the timeseries arrays.
+    The keep arrays list (output index, out row)'''
+    serrors = zeros(len(SNOW.ERRMSGS)).astype(int64)
+    werrors = zeros(NWERROR).astype(int64)
+    so = zeros(len(SNOW.OUTPUTS))
+    wo = zeros(NWATER)
+
+    atempfg, snowfg, waterfg, imperv = fg[0], fg[1], fg[2], fg[3]
+    eldat = apm[0]
+    k     = apm[1]
+
+    for step in range(out.shape[1]):
+        if atempfg:
+            if eldat == 0.0:    # gage at segment elevation, no lapse correction
+                airtmp = GATMP[step]
+            else:
+                lapse = 0.0035 if PREC[step] > k else LAPSE[step]  # use wet lapse if prec
+                airtmp = GATMP[step] - lapse * eldat
+        else:
+            airtmp = AIRTMP[step]
+
+        if snowfg:
+            SNOW.snow_step(step, airtmp, sx, so, sinp, SVP, spm)
+            rainf  = so[SNOW.O.RAINF]
+            snocov = so[SNOW.O.SNOCOV]
+            wyield = so[SNOW.O.WYIELD]
+            packi  = so[SNOW.O.PACKI]
+        else:
+            rainf  = RAINF[step]
+            snocov = SNOCOV[step]
+            wyield = WYIELD[step]
+            packi  = PACKI[step]
+
+        if waterfg and imperv:
+            IWATER.iwater_step(step, airtmp, rainf, snocov, wyield, wx, wo, winp, wpm, werrors)
+        elif waterfg:
+            PWATER.pwater_step(step, airtmp, rainf, snocov, wyield, packi, wx, wo, winp, wpm, werrors)
+
+        # only the kept timeseries are written
+        for i in range(akeep.shape[0]):
+            out[akeep[i, 1], step] = airtmp
+        for i in range(skeep.shape[0]):
+            out[skeep[i, 1], step] = so[skeep[i, 0]]
+        for i in range(wkeep.shape[0]):
+            out[wkeep[i, 1], step] = wo[wkeep[i, 0]]
+    return serrors, werrors
@@ -1,617 +1,111 @@
 ''' Copyright (c) 2020 by RESPEC, INC.
 Author: Robert Heaphy, Ph.D.
 License: LGPL2
-'''
-
-from math import log10, exp
-
-def  plank(general, ui, ts):
-	'''Simulate behavior of plankton populations and associated reactions'''
-
-	limit = ['', 'LIT', 'NON', 'TEM', 'NIT',' PO4', 'NONE', 'WAT']
-	simlen = general['SIMLEN']
-	delt60  = general['DELT'] / 60.0
-	
-	
-	# flags - table-type PLNK-FLAGS
-	PHYFG  = ui['PHYFG']
-	ZOOFG  = ui['ZOOFG']
-	BALFG  = ui['BALFG']
-	SDLTFG = ui['SDLTFG']
-	AMRFG  = ui['AMRFG']
-	DECFG  = ui['DECFG']
-	NSFG   = ui['NSFG']
-	ZFOOD  = ui['ZFOOD']
-	BNPFG  = ui['BNPFG']
-	
-	if ZOOFG == 1 and PHYFG == 0:
-		pass # ERRMSG: error - zooplankton cannot be simulated without phytoplankton
-	if NSFG == 1 and TAMFG == 0:
-		pass # ERRMSG: error - ammonia cannot be included in n supply if it is not
-	if PO4FG == 0:
-		pass # ERRMSG: error - phosphate must be simulated if plankton are being
-
-	if BALFG == 2:   # user has selected multiple species with more complex kinetics
-		# additional benthic algae flags - table-type BENAL-FLAG
-		numbal  = ui['NUMBAL']
-		BINVFG  = ui['BINVFG']
-		BFIXFG1 = ui['BFIXFG1'] 
-		BFIXFG2 = ui['BFIXFG2'] 
-		BFIXFG3 = ui['BFIXFG3'] 
-		BFIXFG4 = ui['BFIXFG4'] 
-	else:
-		numbal = balfg          # single species or none
-		
-	if HTFG == 0:     # fraction of surface exposed - table-type surf-exposed
-		cfsaex = ui['CFSAEX']
-
-	# table-type plnk-parm1
-	ratclp = ui['RATCLP']
-	nonref = ui['NONREF']
-	litsed = ui['LITSED']
-	alnpr  = ui['ALNPR']
-	extb   = ui['EXTB']
-	malgr  = ui['MALGR'] * delt60
-	paradf = ui['PARADF']
-	refr = 1.0 - nonref       # define fraction of biomass which is refractory material	
-
-	# compute derived conversion factors
-	cvbc   = bpcntc / 100.0
-	cvnrbo = nonref * cvbo
-	cvpb   = 31.0 / (1000.0 * cvbp)
-	cvbcl  = 31.0 * ratclp / cvpb
-
-	# table-type plnk-parm2
-	cmmlt  = ui['CMMLT']
-	cmmn   = ui['CMMN']
-	cmmnp  = ui['CMMNP']
-	cmmp   = ui['CMMP']
-	talgrh = ui['TALGRH']
-	talgrl = ui['TALGRL']
-	talgrm = ui['TALGRM']
-
-	# table-type plnk-parm3
-	alr20 = ui['ALR20'] * delt60   	# convert rates from 1/hr to 1/ivl
-	aldl  = ui['ALDL']  * delt60 
-	oxald = ui['OXALD'] * delt60
-	naldh = ui['NALDH'] * delt60
-	paldh = ui['PALDH']
-
-	# table-type plnk-parm4
-	nmingr = ui['NMINGR']
-	pmingr = ui['PMINGR']
-	cmingr = ui['CMINGR']
-	lmingr = ui['LMINGR']
-	nminc  = ui['NMINC']
-
-	# phytoplankton-specific parms - table-type phyto-parm
-	# this table must always be input so that REFSET is read
-	seed   = ui['SEED']
-	mxstay = ui['MXSTAY']
-	oref   = ui['OREF'] 
-	claldh = ui['CLALDH']
-	physet = ui['PHYSET'] * delt60	# change settling rates to units of 1/ivl
-	refset = ui['REFSET'] * delt60	# change settling rates to units of 1/ivl
-
-	if PHYFG == 1 and ZOOFG == 1:   # zooplankton-specific parameters  
-		# table-type zoo-parm1
-		mzoeat = ui['MZOEAT'] * delt60   # convert rates from 1/hr to 1/ivl
-		zfil20 = ui['ZFIL20'] * delt60   # convert rates from 1/hr to 1/ivl
-		zres20 = ui['ZRES20'] * delt60   # convert rates from 1/hr to 1/ivl
-		zd     = ui['ZD']     * delt60   # convert rates from 1/hr to 1/ivl
-		oxzd   = ui['OXZD']   * delt60   # convert rates from 1/hr to 1/ivl
-		# table-type zoo-parm2
-		tczfil = ui['TCZFIL']
-		tczres = ui['TCZRES']
-		zexdel = ui['ZEXDEL']
-		zomass = ui['ZOMASS']	
-	
-	if BALFG >= 1:    #   benthic algae-specific parms; table-type benal-parm
-		mbal   = ui['MBAL']   / cvpb   # convert maximum benthic algae to micromoles of phosphorus
-		cfbalr = ui['CFBALR']
-		cfbalg = ui['CFBALG']
-		minbal = ui['MINBAL'] / cvpb   # convert maximum benthic algae to micromoles of phosphorus
-		campr  = ui['CAMPR']
-		fravl  = ui['FRAVL']
-		nmaxfx = ui['NMAXFX']
-	
-		if BALFG == 2:  # user has selected multiple species with more complex kinetics
-			mbalgr = zeros(numbal)  # ??? + 1
-			tcbalg = zeros(numbal)
-			cmmnb =  zeros(numbal)
-			cmmpb =  zeros(numbal)
-			cmmd1 =  zeros(numbal)
-			cmmd2 =  zeros(numbal)
-			cslit =  zeros(numbal)
-			
-			balr20 = zeros(numbal)
-			tcbalr = zeros(numbal)
-			cslof1 = zeros(numbal)
-			cslof2 = zeros(numbal)
-			grores = zeros(numbal)		
-			DO 55 I= 1, NUMBAL 
-				# species-specific growth parms - table type benal-grow
-				mbalgr[I] = ui['MBALGR']  * delt60
-				tcbalg[I] = ui['TCBALG']
-				cmmnb[I] =  ui['CMMNB']
-				cmmpb[I] =  ui['CMMPB']
-				cmmd1[I] =  ui['CMMD1']
-				cmmd2[I] =  ui['CMMD2']
-				cslit[I] =  ui['CSLIT']
-				# species-specific resp and scour parms - table type benal-resscr
-				balr20[I] = ui['BALR20']  * delt60
-				tcbalr[I] = ui['TCBALR']
-				cslof1[I] = ui['CSLOF1']  * delt60
-				cslof2[I] = ui['CSLOF2']
-				grores[I] = ui['GRORES']
-
-			#  grazing and disturbance parms - table-type benal-graze
-			cremvl = ui['CREMVL']
-			cmmbi  = ui['CMMBI']
-			binv   = ui['BINV']
-			tcgraz = ui['TCGRAZ']
-
-			cremvl = (cremvl / cvpb) / hrpyr * delt60
-
-			IF SDLTFG == 2:	# turbidity regression parms - table-type benal-light
-				ctrbq1 = ui['CTRBQ1']
-				ctrbq2 = ui['CTRBQ2']
-				cktrb1 = ui['CKTRB1']
-				cktrb2 = ui['CKTRB2']	
-
-			IF BINVFG == 3:      # monthly benthic invertebrate density - table-type mon-binv
-				binvm = ui['BINVM']
-
-		# table-type benal-riff1
-		frrif  = ui['FRRIF']	
-		cmmv   = ui['CMMV']
-		rifcq1 = ui['RIFCQ1']
-		rifcq2 = ui['RIFCQ2']
-		rifcq3 = ui['RIFCQ3']
-
-		# table-type benal-riff2
-		rifvf1 = ui['RIFVF1'] 
-		rifvf2 = ui['RIFVF2']
-		rifvf3 = ui['RIFVF3']
-		rifvf4 = ui['RIFVF4']
-
-		rifdf1 = ui['RIFDF1']
-		rifdf2 = ui['RIFDF2']
-		rifdf3 = ui['RIFDF3']
-		rifdf4 = ui['RIFDF4']
-
-	# table-type plnk-init
-	phyto = ui['PHYTO']
-	zoo   = ui['ZOO']
-	benal = ui['BENAL']
-	orn   = ui['ORN']
-	orp   = ui['ORP']
-	orc   = ui['ORC']
-
-
-	
-	# atmospheric deposition flags
-	PLADFG = array(ui['PLADFG'])   # six  PLADFG1 to PLADFG6;  table-type PLNK-AD-FLAGS
-	DO 30 J= 1, 3
-		if PLADFG(N) > 0:  # monthly flux must be read
-			PLAFXM[J] = array(ui[('PLAFXM',J)])
-			IF UUNITS == 1:     # convert from lb/ac.day to mg.ft3/l.ft2.ivl
-				PLAFXM[J] *= 0.3677 * DELT60 / 24.0
-			ELIF UUNITS == 2:	      # convert from kg/ha.day to mg.m3/l.m2.ivl
-				PLAFXM[J] *= 0.1 * DELT60 / 24.0
-	# Note: get PLAFX array from monthly (above), constant, or time series
-	# PLAFX is dimension (simlen, 3)
-	# same with PLADCN 
-
-	# compute atmospheric deposition influx; [N, P, C]
-	DO 10 I= 1, 3
-		PLADDR[I] = SAREA * PLADFX[I]          # dry deposition
-		PLADWT(I) = PREC * SAREA * PLADCN[I]   # wet deposition
-		PLADEP(I) = PLADDR(I) + PLADWT(I)	
-	
-	if PHYFG == 0:   # initialize fluxes of inactive constituent
-		rophyt = 0.0
-		do 60 i= 1, nexits
-			ophyt(i)= 0.0
-		phydox = 0.0
-		phybod = 0.0
-		phytam = 0.0
-		phyno3 = 0.0
-		phypo4 = 0.0
-		phyorn = 0.0
-		phyorp = 0.0
-		phyorc = 0.0
-		pyco2  = 0.0
-		dthphy = 0.0
-		grophy = 0.0
-		totphy = 0.0
-
-	if ZOOFG == 1:   # convert zoo to mg/l
-		zoo = zoo * zomass
-	else:   #  zooplankton not simulated, but use default values
-		# initialize fluxes of inactive constituent
-		rozoo = 0.0
-		do 70 i= 1, nexits
-			ozoo(i) = 0.0
-		zoodox = 0.0
-		zoobod = 0.0
-		zootam = 0.0
-		zoono3 = 0.0
-		zoopo4 = 0.0
-		zooorn = 0.0
-		zooorp = 0.0
-		zooorc = 0.0
-		zoophy = 0.0
-		zoco2  = 0.0
-		grozoo = 0.0
-		dthzoo = 0.0
-		totzoo = 0.0
-
-	if numbal == 1:      # single species
-		benal(1) = rval(3)        # points to  table-type plnk-init above for rvals
-	elif numbal >= 2:      # multiple species - table-type benal-init
-		benal = ???  # how to get multiples???
-	else                     # no benthic algae simulated
-		baldox = 0.0
-		balbod = 0.0
-		baltam = 0.0
-		balno3 = 0.0
-		balpo4 = 0.0
-		balorn = 0.0
-		balorp = 0.0
-		balorc = 0.0
-		baco2 = 0.0
-		do 75 i= 1, 3
-			do 73 j= 1, 4
-				flxbal(i,j)= 0.0
-			# 73       continue
-		# 75     continue
-
-	# compute derived quantities
-	phycla = phyto * cvbcl
-	do 80 i= 1, numbal
-		balcla(i) = benal(i) * cvbcl
-	# 80   continue
-	if vol > 0.0:   # compute initial summary concentrations
-		do 90 i= 1, 3
-			lsnh4(i) = rsnh4(i) / vol
-			lspo4(i) = rspo4(i) / vol
-		# 90     continue
-		
-		torn,torp,torc,potbod,tn,tp = pksums (phyfg,zoofg,tamfg,no2fg,po4fg,adnhfg,adpofg,
-		cvbn,cvbp,cvbc,cvbo,cvnrbo,phyto,zoo,orn,orp,orc, no3,tam,no2,lsnh4(1),lsnh4(2),
-		lsnh4(3),po4,lspo4(1),lspo4(2),lspo4(3),bod,torn,torp,torc,potbod,tn,tp)
-	else    # undefined summary concentrations
-		torn   = -1.0e30
-		torp   = -1.0e30
-		torc   = -1.0e30
-		potbod = -1.0e30
-		tn     = -1.0e30
-		tp     = -1.0e30
-
-
-	@jit(nopython = True)
-	def plank(dox, bod, iphyto, izoo, iorn, iorp, iorc, tw, wash, solrad, prec, sarea, advData):
-		'''Simulate behavior of plankton populations and associated reactions'''
-		if PHYFG == 1:   # phytoplankton simulated
-			# advecvt phytoplankton
-			phyto, rophyt,ophyt =  advplk(iphyto,vols,srovol,vol,erovol,sovol, eovol,nexits,oref,mxstay,seed,delts,phyto,rophyt,ophyt)
-			phyto, snkphy = sink(vol,avdepe,physet, phyto,snkphy)
-			snkphy = -snkphy
-
-			if ZOOFG == 1:    # zooplankton on; advect zooplankton
-				zoo, rozoo,ozoo = advplk (izoo,vols,srovol,vol,erovol,sovol,eovol,nexits,oref,mxstay,seed,delts,zoo,rozoo,ozoo)
-		
-		# advect organic nitrogen
-		inorn = iorn + pladep(1)
-		dor,roorn,oorn = advect (inorn, dor, roorn, oorn)
-		dor, snkorn = sink(vol, avdepe, refset, dor, snkorn)
-		snkorn = -snkorn
-
-		# advect organic phosphorus
-		inorp = iorp + pladep(2)
-		orp, roorp, oorp = advect(inorp, orp, roorp, oorp)
-		orp, snkorp = sink(vol, avdepe, refset, orp, snkorp)
-		snkorp = -snkorp
-
-		# advect total organic carbon
-		inorc = iorc + pladep(3)
-		orc, roorc, oorc = advect (inorc, orc, roorc, oorc)
-		orc, snkorc = sink (vol, avdepe, refset, orc, snkorc)
-		snkorc = -snkorc
-
-		if avdepe > 0.17:   # enough water to warrant computation of water quality reactions
-			if frrif < 1.0:                                          
-				# make adjustments to average water velocity and depth for the  
-				# portion of the reach that consists of riffle areas.
-				if ro < rifcq1:    # below first cutoff flow
-					i= 1
-				elif ro < rifcq2:   # below second cutoff flow
-					i= 2
-				elif ro < rifcq3:   # below third cutoff flow
-					i= 3
-				else:                        # above third cutoff flow
-					i= 4
-
-				# calculate the adjusted velocity and depth for riffle sections
-				balvel = rifvel(i) * avvele
-				baldep = rifdep(i) * avdepe
-			else:                      # use full depth and velocity
-				balvel = avvele
-				baldep = avdepe
-														
-			# calculate solar radiation absorbed; solrad is the solar radiation at gage,
-			# corrected for location of reach; 0.97 accounts for surface reflection
-			# (assumed 3 per cent); cfsaex is the ratio of radiation incident to water
-			# surface to gage radiation values (accounts for regional differences, shading
-			# of water surface, etc); inlit is a measure of light intensity immediately below
-			# surface of reach/res and is expressed as ly/min, adjusted for fraction that is
-			# photosynthetically active.
-
-			inlit = 0.97 * cfsaex * solrad / delt * paradf
-			if SDLTFG == 1:		 # estimate contribution of sediment to light extinction
-				extsed = litsed * ssed(4)
-			elif SDLTFG == 2:   # equations from dssamt for estimating the extinction coefficient based on discharge and turbidity
-				# estimate turbidity based on linear regression on flow
-				turb = ctrbq1 * ro**ctrbq2
-		
-				# estimate the portion of the extinction coefficient due to
-				# sediment based upon a system-wide regression of total
-				# extinction to turbidity, and then subtracting the
-				# base extinction coefficient
-				extsed = (cktrb1 * turb**cktrb2) - extb                         
-				if extsed < 0.0:         # no effective sediment shading
-					extsed = 0.0
-			else:                        # sediment light extinction not considered
-				extsed = 0.0
-
-			# calculate contribution of phytoplankton to light extinction (self-shading)
-			extcla = 0.00452 * phyto * cvbcl
-
-			# calculate light available for algal growth,  litrch only called here
-			phylit,ballit,cflit = litrch (inlit,extb,extcla,extsed,avdepe,baldep,phyfg,balfg,phylit,ballit,cflit)
-
-			if PHYFG == 1:   # simulate phytoplankton, phyrx only called here
-				call phyrx
-		 i               (phylit,tw,talgrl,talgrh,talgrm,malgr,cmmp,
-		 i                cmmnp,tamfg,amrfg,nsfg,cmmn,cmmlt,delt60,
-		 i                cflit,alr20,cvbpn,phfg,decfg,cvbpc,paldh,
-		 i                naldh,claldh,aldl,aldh,anaer,oxald,alnpr,
-		 i                cvbo,refr,cvnrbo,cvpb,cvbcl,limit,co2,
-		 i                nmingr,pmingr,cmingr,lmingr,nminc,
-		 m                po4,no3,tam,dox,orn,orp,orc,bod,phyto,
-		 o                limphy,pyco2,phycla,dophy,bodphy,tamphy,
-		 o                no3phy,po4phy,phdth,phgro,ornphy,orpphy,
-		 o                orcphy)
-
-				# compute associated fluxes
-				phydox = dophy *  vol
-				phybod = bodphy * vol
-				phytam = tamphy * vol
-				phyno3 = no3phy * vol
-				phypo4 = po4phy * vol
-				dthphy = -phdth * vol
-				grophy = phgro  * vol
-				phyorn = ornphy * vol
-				phyorp = orpphy * vol
-				phyorc = orcphy * vol
-
-				if ZOOFG == 1:    # simulate zooplankton, zorx only called here
-					call zorx
-		 i                (zfil20,tczfil,tw,phyto,mzoeat,zexdel,cvpb,
-		 i                 zres20,tczres,anaer,zomass,tamfg,refr,
-		 i                 zfood,zd,oxzd,cvbn,cvbp,cvbc,cvnrbo,cvbo,
-		 m                 dox,bod,zoo,orn,orp,orc,tam,no3,po4,
-		 o                 zeat,zoco2,dozoo,bodzoo,nitzoo,po4zoo,
-		 o                 zgro,zdth,zorn,zorp,zorc)
-
-					# compute associated fluxes
-					zoodox = -dozoo * vol
-					zoobod = bodzoo * vol
-					if TAMFG != 0:   # ammonia on, so nitrogen excretion goes to ammonia
-						zootam = nitzoo * vol
-					else             # ammonia off, so nitrogen excretion goes to nitrate
-						zoono3 = nitzoo * vol
-					zoopo4 = po4zoo * vol
-					zoophy = -zeat  * vol
-					zooorn = zorn   * vol
-					zooorp = zorp   * vol
-					zooorc = zorc   * vol
-					grozoo = zgro   * vol
-					dthzoo = -zdth  * vol
-					totzoo = grozoo + dthzoo
-
-					# update phytoplankton state variable to account for zooplankton predation
-					phyto = phyto - zeat
-					# convert phytoplankton expressed as mg biomass/l to chlorophyll a expressed as ug/l
-					phycla = phyto * cvbcl
-				totphy = snkphy + zoophy + dthphy + grophy
-
-			if BALFG == 1:     # simulate benthic algae
-				call balrx
-		 i               (ballit,tw,talgrl,talgrh,talgrm,malgr,cmmp,
-		 i                cmmnp,tamfg,amrfg,nsfg,cmmn,cmmlt,delt60,
-		 i                cflit,alr20,cvbpn,phfg,decfg,cvbpc,paldh,
-		 i                naldh,aldl,aldh,anaer,oxald,cfbalg,cfbalr,
-		 i                alnpr,cvbo,refr,cvnrbo,cvpb,mbal,depcor,
-		 i                limit,cvbcl,co2,nmingr,pmingr,cmingr,lmingr,
-		 i                nminc,
-		 m                po4,no3,tam,dox,orn,orp,orc,bod,benal(1),
-		 o                limbal(1),baco2,balcla(1),dobalg,bodbal,
-		 o                tambal,no3bal,po4bal,bgro(1),bdth(1),ornbal,
-		 o                orpbal,orcbal)
-
-				#compute associated fluxes
-				baldox = dobalg * vol
-				balbod = bodbal * vol
-				baltam = tambal * vol
-				balno3 = no3bal * vol
-				balpo4 = po4bal * vol
-				balorn = ornbal * vol
-				balorp = orpbal * vol
-				balorc = orcbal * vol
-				grobal(1) = bgro(1)
-				dthbal(1) = -bdth(1)
-			elif BALFG == 2:   # simulate enhanced benthic algae equations from dssamt
-				# then perform reactions, balrx2 only called here
-				
-				
-				po4,no3,tam,dox,orn,orp,orc,bod,benal, limbal,baco2,balcla,dobalg,bodbal,tambal,
-				no3bal,po4bal,bgro,bdth,ornbal,orpbal, orcbal = balrx2 (ballit,tw,tamfg,nsfg,delt60,cvbpn,phfg,decfg,
-				cvbpc,alnpr,cvbo,refr,cvnrbo,cvpb,depcor,
-				limit,cvbcl,co2,numbal,mbalgr,cmmpb,cmmnb,
-				balr20,tcbalg,balvel,cmmv,bfixfg,cslit,cmmd1,
-				cmmd2,tcbalr,frrif,cremvl,cmmbi,binv,tcgraz,
-				cslof1,cslof2,minbal,fravl,bnpfg,campr,nmingr,
-				pmingr,cmingr,lmingr,nminc,nmaxfx,grores,
-
-				# compute associated fluxes
-				baldox = dobalg * vol
-				balbod = bodbal * vol
-				baltam = tambal * vol
-				balno3 = no3bal * vol
-				balpo4 = po4bal * vol
-				balorn = ornbal * vol
-				balorp = orpbal * vol
-				balorc = orcbal * vol
-				do 20 i= 1, numbal
-					grobal(i) = bgro(i)
-					dthbal(i) = -bdth(i)
-		else     # not enough water in reach/res to warrant simulation of quality processes
-			phyorn = 0.0
-			balorn = 0.0
-			zooorn = 0.0
-			phyorp = 0.0
-			balorp = 0.0
-			zooorp = 0.0
-			phyorc = 0.0
-			balorc = 0.0
-			zooorc = 0.0
-			pyco2  = 0.0
-			baco2  = 0.0
-			zoco2  = 0.0
-			phydox = 0.0
-			zoodox = 0.0
-			baldox = 0.0
-			phybod = 0.0
-			zoobod = 0.0
-			balbod = 0.0
-			phytam = 0.0
-			zootam = 0.0
-			baltam = 0.0
-			phyno3 = 0.0
-			zoono3 = 0.0
-			balno3 = 0.0
-			phypo4 = 0.0
-			zoopo4 = 0.0
-			balpo4 = 0.0
-
-			if PHYFG == 1:  # water scarcity limits phytoplankton growth
-				limc  = 'WAT'
-				read (limc,1000) limphy
-				phycla = phyto * cvbcl
-				grophy = 0.0
-				dthphy = 0.0
-				zoophy = 0.0
-				totphy= snkphy
-			if BALFG == 1:   # water scarcity limits benthic algae growth
-				limc = 'WAT'
-				read (limc,1000) limbal(1)
-				balcla(1) = benal(1) * cvbcl
-				grobal(1) = 0.0
-				dthbal(1) = 0.0
-			elif BALFG == 2: # water scarcity limits benthic algae growth
-				limc = 'WAT'
-				do 30 i= 1, numbal
-					read (limc,1000) limbal(i)
-					balcla(i) = benal(i) * cvbcl
-					grobal(i) = 0.0
-					dthbal(i) = 0.0
-			if ZOOFG == 1:    # water scarcity limits zooplankton growth
-				grozoo= 0.0
-				dthzoo= 0.0
-				totzoo= 0.0
-
-		if BALFG:   # store final benthic sums and fluxes in common block
-			tbenal(1) = 0.0
-			grotba = 0.0
-			dthtba = 0.0
-			do 40 i= 1, numbal
-				flxbal(1,i) = grobal(i)
-				flxbal(2,i) = dthbal(i)
-				flxbal(3,i) = grobal(i) + dthbal(i)
-				tbenal(1)   = tbenal(1) + benal(i)
-				grotba      = grotba + grobal(i)
-			tbenal(2) = tbenal(1) * cvbcl
-			tottba    = grotba + dthtba
-
-		# compute final process fluxes for oxygen, nutrients and organics
-		totdox = readox + boddox + bendox + nitdox + phydox + zoodox + baldox
-		totbod = decbod + bnrbod + snkbod + denbod + phybod + zoobod + balbod
-		totno3 = nitno3 + denno3 + bodno3 + phyno3 + zoono3 + balno3
-		tottam = nittam + volnh3 + bnrtam + bodtam + phytam + zootam + baltam
-		totpo4 = bnrpo4 + bodpo4 + phypo4 + zoopo4 + balpo4
-
-		totorn = snkorn + phyorn + zooorn + balorn
-		totorp = snkorp + phyorp + zooorp + balorp
-		totorc = snkorc + phyorc + zooorc + balorc
-
-		# compute summaries of total organics, total n and p, and potbod concentrations
-		if vol > 0.0:     # compute summary concentrations
-			do 45 i= 1, 3
-				lsnh4(i) = rsnh4(i) / vol
-				lspo4(i) = rspo4(i) / vol
-
-			itorn,itorp,itorc,dumval,itotn,itotp = 	pksums (phyfg,zoofg,tamfg,no2fg,
-			po4fg,adnhfg,adpofg,cvbn,cvbp,cvbc,cvbo,cvnrbo,phyto,zoo,orn,orp,orc,
-			no3,tam,no2,lsnh4(1),lsnh4(2),lsnh4(3),po4, lspo4(1),lspo4(2),lspo4(3),
-			bod,itorn,itorp,itorc,dumval,itotn,itotp))
-		else:   #   undefined summary concentrations
-			torn   = -1.0e30
-			torp   = -1.0e30
-			torc   = -1.0e30
-			potbod = -1.0e30
-			tn     = -1.0e30
-			tp     = -1.0e30
-
-		# total inflows
-		inno3 = ino3 + nuadep(1)
-		intam = itam + nuadep(2)
-		inpo4 = ipo4 + nuadep(3)
-		itorn,itorp,itorc,dumval,itotn,itotp) = pksums (phyfg,zoofg,tamfg,no2fg,
-		po4fg,adnhfg,adpofg,cvbn,cvbp,cvbc,cvbo,cvnrbo,iphyto,izoo,inorn,inorp,
-		inorc,inno3,intam,ino2,isnh4(1),isnh4(2),isnh4(3), inpo4,ispo4(1),
-		ispo4(2),ispo4(3),ibod, itorn,itorp,itorc,dumval,itotn,itotp)
-
-		# total outflows
-		rotorn,rotorp,rotorc,dumval,rototn,rototp = pksums (phyfg,zoofg,tamfg,no2fg,po4fg,
-		adnhfg,adpofg,cvbn,cvbp,cvbc,cvbo,cvnrbo,rophyt,rozoo,roorn,roorp, roorc,rono3,
-		rotam,rono2,rosnh4(1),rosnh4(2),rosnh4(3),ropo4,rospo4(1),rospo4(2),rospo4(3),robod,
-		rotorn,rotorp,rotorc,dumval,rototn,rototp)
-
-		if nexits > 1:   # outflows by exit
-			do 50 i= 1, nexits
-				otorn(i),otorp(i),otorc(i),dumval,ototn(i), ototp(i) 
-				=  pksums 
-				(phyfg,zoofg,
-				tamfg,no2fg,po4fg,adnhfg,adpofg,cvbn,cvbp,cvbc,cvbo,cvnrbo,ophyt(i),ozoo(i),
-				oorn(i),oorp(i),oorc(i),ono3(i),otam(i),ono2(i), osnh4(i,1),osnh4(i,2),
-				osnh4(i,3),opo4(i), ospo4(i,1),ospo4(i,2),ospo4(i,3),obod(i),otorn(i),
-				otorp(i),otorc(i),dumval,ototn(i),ototp(i))
-
-		# cbrb  added call to ammion to redistribute tam after algal influence
-		nh3,nh4 = ammion(tw, phval, tam, nh3, nh4)
-		return (dox, bod, orn, orp, orc, torn, torp, torc, potbod, phyto, zoo, benal, 
-		 phycla, balcla, rophyto, rozoo, robenal, rophycla, robalcla, ophyto, ozoo, 
-		 obenal, ophycla, obalcla, binv, pladfx, pladcn)
-
-	return nutrx
-
-
-def advplk(iplank,vols,srovol,vol,erovol,sovol,eovol,nexits,oref,mxstay,seed,delts,plank,roplk,oplk):
-	''' advect plankton'''
-	
-	# calculate concentration of plankton not subject to advection during interval
+
+Conversion of HSPF HRCHPLK.FOR module into Python. plank() is called by the
+RQUAL kernel each interval after the plankton and dead organics have been
+advected (phytoplankton and zooplankton with advplk()).
+
+NOTE: the enhanced multi-species benthic algae of BALFG = 2 (BENAL-* tables)
+are simulated as the single species of BALFG = 1, SDLTFG = 2 turbidity
+regressions and atmospheric deposition of organics (PLADFG) are not
+simulated yet; rqual() reports them as errors.'''
+
+from collections import namedtuple
+from math import exp
+from numpy import array, where
+from numba import njit
+from HSP2.ADCALC import advect, sink, decbal
+
+# flags and parameters (table-types plnk-flags, plnk-parm1..4, phyto-parm, zoo-parm1..2, benal-parm,
+# benal-riff1..2, conv-val1) and their defaults; the RQUAL driver supplies TAMFG, PO4FG, PHFG, ANAER
+# and CFSAEX; OREF is the 'O' column of the PLANK parameters; the conversion factors after REFR are derived
+PARMS = {'PHYFG': 0.0, 'ZOOFG': 0.0, 'BALFG': 0.0, 'SDLTFG': 0.0, 'AMRFG': 0.0, 'DECFG': 0.0,
+         'NSFG': 0.0, 'ZFOOD': 1.0, 'TAMFG': 1.0, 'PO4FG': 1.0, 'PHFG': 0.0, 'ANAER': 0.005, 'CFSAEX': 1.0,
+         'RATCLP': 0.6, 'NONREF': 0.5, 'LITSED': 0.0, 'ALNPR': 1.0, 'EXTB': 0.0, 'MALGR': 0.3, 'PARADF': 1.0,
+         'CMMLT': 0.033, 'CMMN': 0.045, 'CMMNP': 0.0284, 'CMMP': 0.015, 'TALGRH': 95.0, 'TALGRL': 43.0,
+         'TALGRM': 77.0, 'ALR20': 0.004, 'ALDH': 0.01, 'ALDL': 0.001, 'OXALD': 0.03, 'NALDH': 0.0,
+         'PALDH': 0.0, 'NMINGR': 0.001, 'PMINGR': 0.001, 'CMINGR': 0.001, 'LMINGR': 0.001, 'NMINC': 0.001,
+         'SEED': 0.0, 'MXSTAY': 0.0, 'OREF': 0.5, 'CLALDH': 50.0, 'PHYSET': 0.0, 'REFSET': 0.0,
+         'MZOEAT': 0.055, 'ZFIL20': 0.0, 'ZRES20': 0.0015, 'ZD': 0.0001, 'OXZD': 0.03, 'TCZFIL': 1.17,
+         'TCZRES': 1.07, 'ZEXDEL': 0.7, 'ZOMASS': 0.0003, 'MBAL': 600.0, 'CFBALR': 1.0, 'CFBALG': 1.0,
+         'MINBAL': 0.0001, 'FRRIF': 1.0, 'RIFCQ1': 0.0, 'RIFCQ2': 0.0, 'RIFCQ3': 0.0, 'RIFVF1': 1.0,
+         'RIFVF2': 1.0, 'RIFVF3': 1.0, 'RIFVF4': 1.0, 'RIFDF1': 1.0, 'RIFDF2': 1.0, 'RIFDF3': 1.0,
+         'RIFDF4': 1.0, 'CVBO': 1.98, 'CVBPC': 106.0, 'CVBPN': 16.0, 'BPCNTC': 49.0,
+         'REFR': 0.0, 'CVBP': 0.0, 'CVBN': 0.0, 'CVBC': 0.0, 'CVPB': 0.0, 'CVBCL': 0.0, 'CVNRBO': 0.0}
+PM = namedtuple('PlankParms', PARMS)(*range(len(PARMS)))
+
+# parameters converted from /hr (or ft/hr) to /ivl
+RATES = ('MALGR', 'ALR20', 'ALDH', 'ALDL', 'OXALD', 'PHYSET', 'REFSET', 'MZOEAT', 'ZFIL20', 'ZRES20',
+         'ZD', 'OXZD')
+
+# process fluxes written by plank(), mass.ft3/l.ivl except GROBAL and DTHBAL (mg/m2.ivl)
+FLUXES = ('SNKPHY', 'ZOOPHY', 'DTHPHY', 'GROPHY', 'GROZOO', 'DTHZOO', 'GROBAL', 'DTHBAL',
+          'SNKORN', 'SNKORP', 'SNKORC', 'PHYORN', 'PHYORP', 'PHYORC', 'ZOOORN', 'ZOOORP', 'ZOOORC',
+          'BALORN', 'BALORP', 'BALORC', 'PHYDOX', 'ZOODOX', 'BALDOX', 'PHYBOD', 'ZOOBOD', 'BALBOD',
+          'PHYTAM', 'ZOOTAM', 'BALTAM', 'PHYNO3', 'ZOONO3', 'BALNO3', 'PHYPO4', 'ZOOPO4', 'BALPO4',
+          'PHYCO2', 'ZOOCO2', 'BALCO2')
+FLUX = namedtuple('PlankFlux', FLUXES)(*range(len(FLUXES)))
+AREAL = ('GROBAL', 'DTHBAL')
+
+
+def plank_parms(ui, delt60):
+	''' parameter vector for plank() and advplk(), rates converted to /ivl and temperatures to deg c'''
+	pm = array([float(ui.get(name, value)) for name, value in PARMS.items()])
+	if 'O' in ui:
+		pm[PM.OREF] = ui['O']
+	for name in RATES:
+		pm[getattr(PM, name)] *= delt60
+	for name in ('TALGRH', 'TALGRL', 'TALGRM'):
+		pm[getattr(PM, name)] = (pm[getattr(PM, name)] - 32.0) * 0.5555
+
+	# derived conversion factors from biomass to oxygen, carbon, nitrogen, phosphorus and chlorophyll a
+	cvbp = (31.0 * pm[PM.BPCNTC]) / (1200.0 * pm[PM.CVBPC])
+	pm[PM.CVBP]   = cvbp
+	pm[PM.CVBN]   = 14.0 * pm[PM.CVBPN] * cvbp / 31.0
+	pm[PM.CVBC]   = pm[PM.BPCNTC] / 100.0
+	pm[PM.CVPB]   = 31.0 / (1000.0 * cvbp)
+	pm[PM.CVBCL]  = 31.0 * pm[PM.RATCLP] / pm[PM.CVPB]
+	pm[PM.CVNRBO] = pm[PM.NONREF] * pm[PM.CVBO]
+	pm[PM.REFR]   = 1.0 - pm[PM.NONREF]
+
+	# benthic algae limits expressed as umoles of phosphorus per m2
+	pm[PM.MBAL]   /= pm[PM.CVPB]
+	pm[PM.MINBAL] /= pm[PM.CVPB]
+	return pm
+
+
+def pksums(pm, NO2FG, PHYTO, ZOO, ORN, ORP, ORC, NO3, TAM, NO2, PO4, BOD, VOL):
+	''' summaries of total organic n, p, c, potential bod and total n, p for the whole run;
+	ZOO is in mg/l, undefined where the reach is dry'''
+	tval = BOD / pm[PM.CVBO]
+	potbod = BOD.copy()
+	if pm[PM.PHYFG]:
+		tval = tval + PHYTO
+		potbod = potbod + pm[PM.CVNRBO] * PHYTO
+		if pm[PM.ZOOFG]:
+			tval = tval + ZOO
+			potbod = potbod + pm[PM.CVNRBO] * ZOO
+
+	torn = ORN + pm[PM.CVBN] * tval
+	torp = ORP + pm[PM.CVBP] * tval
+	torc = ORC + pm[PM.CVBC] * tval
+	tn = torn + NO3
+	if pm[PM.TAMFG]:
+		tn = tn + TAM
+	if NO2FG:
+		tn = tn + NO2
+	tp = torp + PO4 if pm[PM.PO4FG] else torp
+
+	dry = VOL <= 0.0
+	return {name: where(dry, -1.0e30, value) for name, value in
+		(('TORN', torn), ('TORP', torp), ('TORC', torc), ('POTBOD', potbod), ('TN', tn), ('TP', tp))}
+
+
+@njit(cache=True)
+def advplk(iplank, plank, nexits, vols, vol, srovol, erovol, sovol, eovol, oref, mxstay, seed, delts, oplk):
+	''' advect plankton; the concentration stay is not subject to advection during the interval.
+	oplk is filled with the plankton leaving through each exit'''
 	oflo = (srovol + erovol) / delts
 	if oref > 0.0 and oflo / oref <= 100.0:
 		stay = (mxstay - seed) * (2.0**(-oflo / oref)) + seed
@@ -619,1037 +113,456 @@ def advplk(iplank,vols,srovol,vol,erovol,sovol,eovol,nexits,oref,mxstay,seed,del
 		stay = seed
 
 	if plank > stay:
-		# convert stay to units of mass; this mass will be converted
-		# back to units of concentration based on the volume of the
-		# reach/res at the end of the interval
+		# the mass that stays is converted back to a concentration with the volume at the end of the interval
 		mstay = stay * vols
-
-		# determine concentration of plankton subject to advection;
-		# this value is passed into subroutine advect
-		plnkad = plank - stay
-
-		# advect plankton
-		plnkad, roplk, oplk = advect(iplank,plnkad,roplk,oplk)
-
-		# determine final concentration of plankton in reach/res after advection
+		plnkad, roplk = advect(iplank, plank - stay, nexits, vols, vol, srovol, erovol, sovol, eovol, oplk)
 		plank = plnkad + mstay / vol  if vol > 0.0 else plnkad
-	else:       # no plankton leaves the reach/res
-		roplk   = 0.0
-		oplk[:] = 0.0
+	else:   # no plankton leaves the reach/res
+		roplk = 0.0
+		for n in range(nexits):
+			oplk[n] = 0.0
 		mstay = plank * vols
-		plank = (mstay + iplank) / vol if vol > 0.0 else -1.0e30
-	return plank, roplk, oplk
-
-
-def algro(light,po4,no3,tw,talgrl,talgrh,talgrm,malgr, cmmp,cmmnp,TAMFG,AMRFG,tam,NSFG,cmmn,cmmlt,
-	alr20,cflit,delt60,limit,nmingr,pmingr,lmingr,limr,gro,res):
-
-	''' calculate unit growth and respiration rates for algae
-	population; both are expressed in units of per interval'''
-
-	if light > lmingr:    # sufficient light to support growth
-		if po4 > pmingr and no3 > nmingr:  # sufficient nutrients to support growth
-			if  talgrh > tw > talgrl:      # water temperature allows growth
-				if tw < talgrm:  		  # calculate temperature correction fraction
-					tcmalg = (tw - talgrl) / (talgrm - talgrl)
-				else:
-					# no temperature correction to maximum unit growth rate
-					# is necessary; water temperature is in the optimum
-					# range for phytoplankton growth
-					tcmalg = 1.0
-
-				# perform temperature correction to maximum unit growth
-				# rate; units of malgrt are per interval
-				malgrt = malgr * tcmalg
-
-				# calculate maximum phosphorus limited unit growth rate
-				grop = malgrt * po4 * no3 / ((po4 + cmmp) * (no3 + cmmnp))
-
-				# calculate the maximum nitrogen limited unit growth rate
-				if TAMFG:       # consider influence of tam on growth rate
-					if AMRFG:   # calculate tam retardation to nitrogen limited growth rate
-						malgn = malgrt - 0.757 * tam + 0.051 * no3
-
-						# check that calculated unit growth rate does not
-						# exceed maximum allowable growth rate
-						if malgn > malgrt:
-							malgn = malgrt
-						else:
-							# check that calculated unit growth rate is not
-							# less than .001 of the maximum unit growth rate;
-							# if it is, set the unit growth rate equal to .001
-							# of the maximum unit growth rate
-							lolim = 0.001 * malgrt
-							if malgn < lolim:
-								malgn = lolim
-					else:    # ammonia retardation is not considered
-						malgn = malgrt
-
-					if NSFG:   # include tam in nitrogen pool for calculation of nitrogen limited growth rate
-						mmn = no3 + tam
-					else:     # tam is not included in nitrogen pool for calculation of nitrogen limited growth
-						mmn = no3
-				else:            # tam is not simulated
-					malgn = malgrt
-					mmn  = no3
-
-				# calculate the maximum nitrogen limited unit growth rate
-				gron = (malgn * mmn) / (cmmn + mmn)
-
-				# calculate the maximum light limited unit growth rate
-				grol = (malgrt * light) / (cmmlt + light)
-				if grop < gron and grop < grol:
-					gro = grop
-					lim = 'po4'
-				elif gron < grol:
-					gro = gron
-					lim = 'nit'
-				else:
-					gro = grol
-					lim = 'lit'
-				if gro < 0.000001 * delt60:
-					gro = 0.0
-
-				if gro > 0.95 * malgrt:
-					# there is no limiting factor to cause less than maximum growth rate
-					lim = 'none'
-
-				# adjust growth rate if control volume is not entirely	
-				# contained within the euphotic zone; e.g. if only one
-				# half of the control volume is in the euphotic zone, gro
-				# would be reduced to one half of its specified value
-				gro = gro * cflit
-			else:            # water temperature does not allow algal growth
-				gro = 0.0
-				lim = 'tem'
-		else:               # no algal growth occurs; necessary nutrients are not available
-			gro = 0.0
-			lim = 'non'
-	else:                    # no algal growth occurs; necessary light is not available
-		gro = 0.0
-		lim = 'lit'
-
-	# calculate unit algal respiration rate; res is expressed in
-	# units of per interval; alr20 is the respiration rate at 20 degrees c
-	res = alr20 * tw / 20.0
-	return lim, gro, res
-
-
-
-def baldth(nsfg,no3,tam,po4,paldh,naldh,aldl,aldh,mbal,dox,anaer,oxald,bal,depcor,dthbal):
-	''' calculate benthic algae death'''
-
-	# determine whether to use high or low unit death rate; all
-	# unit death rates are expressed in units of per interval
-
-	# determine available inorganic nitrogen pool for test of nutrient scarcity
-	nit = no3 + tam  if NSFG else no3
-	if po4 > paldh and nit > naldh:   # unit death rate is not incremented by nutrient scarcity check for benthic algae overcrowding
-		balmax = mbal * depcor
-		if bal < balmax:   # unit death rate is not incremented by benthic algae overcrowding
-			ald  = aldl
-			slof = 0.0
+		plank = (mstay + iplank) / vol  if vol > 0.0 else -1.0e30
+	return plank, roplk
+
+
+@njit(cache=True)
+def plank(dox, bod, no3, tam, po4, co2, phyto, zoo, benal, orn, orp, orc, tw, vol, avdepe, avvele, depcor,
+		solrad, ssed, ro, delt60, pm, f):
+	''' simulate behavior of plankton populations and associated reactions; zoo is in mg/l.
+	returns the new states and the co2 uptake or release of phytoplankton, zooplankton and
+	benthic algae (pyco2, zoco2, baco2) for PHCARB'''
+	phyfg = pm[PM.PHYFG]
+	zoofg = pm[PM.ZOOFG]
+	balfg = pm[PM.BALFG]
+
+	if phyfg:
+		phyto, snkphy = sink(vol, avdepe, pm[PM.PHYSET], phyto)
+		f[FLUX.SNKPHY] = -snkphy
+	orn, snkorn = sink(vol, avdepe, pm[PM.REFSET], orn)
+	orp, snkorp = sink(vol, avdepe, pm[PM.REFSET], orp)
+	orc, snkorc = sink(vol, avdepe, pm[PM.REFSET], orc)
+	f[FLUX.SNKORN] = -snkorn
+	f[FLUX.SNKORP] = -snkorp
+	f[FLUX.SNKORC] = -snkorc
+
+	pyco2 = 0.0
+	zoco2 = 0.0
+	baco2 = 0.0
+	if avdepe <= 0.17:   # not enough water in reach/res to warrant simulation of quality processes
+		return dox, bod, no3, tam, po4, phyto, zoo, benal, orn, orp, orc, pyco2, zoco2, baco2
+
+	baldep = avdepe
+	if pm[PM.FRRIF] < 1.0:
+		# adjust depth for the portion of the reach that consists of riffles
+		if ro < pm[PM.RIFCQ1]:
+			i = 0
+		elif ro < pm[PM.RIFCQ2]:
+			i = 1
+		elif ro < pm[PM.RIFCQ3]:
+			i = 2
 		else:
-			# augment unit death rate to account for benthic algae
-			# overcrowding; set bal value equal to maximum; calculate
-			# amount of benthic algae in excess of mbal; these benthic
-			# algae are added to aldth
-			ald  = aldh
-			slof = bal - balmax
-			bal  = balmax
-	else:   # augment unit death rate to account for nutrient scarcity
-		ald = aldh
-
-	if dox < anaer:    # conditions are anaerobic, augment unit death rate
-		ald += oxald
-
-	# use unit death rate to compute death rate; dthbal is expressed
-	# as umoles of phosphorus per liter per interval
-	return (ald * bal) + slof     # dthbal
-
-
-def balrx(ballit,tw,talgrl,talgrh,talgrm,malgr,cmmp, cmmnp,tamfg,amrfg,nsfg,cmmn,cmmlt,delt60,
-	cflit,alr20,cvbpn,phfg,decfg,cvbpc,paldh, naldh,aldl,aldh,anaer,oxald,cfbalg,cfbalr,
-	alnpr,cvbo,refr,cvnrbo,cvpb,mbal,depcor,limit,cvbcl,co2,nmingr,pmingr,cmingr,lmingr,
-	nminc, po4,no3,tam,dox,orn,orp,orc,bod,benal, limbal,baco2,balcla,dobalg,bodbal,tambal,
-	no3bal,po4bal,balgro,bdth,balorn,balorp,balorc):
-	''' simulate behavior of benthic algae in units of umoles p per
-	liter; these units are used internally within balrx so that
-	algal subroutines may be shared by phyto and balrx; externally,
-	the benthic algae population is expressed in terms of areal
-	mass, since the population is resident entirely on the
-	bottom surface'''
-
-	# convert benal to units of umoles phosphorus/l (bal) for internal calculations
-	bal = (benal / cvpb) * depcor
-
-	# compute unit growth and respiration rates for benthic algae; determine growth limiting factor
-	limbal,gro,res = algro(ballit,po4,no3,tw,talgrl,talgrh,talgrm,malgr,cmmp, cmmnp,tamfg,amrfg,
-	tam,nsfg,cmmn,cmmlt,alr20, cflit,delt60,limit,nmingr,pmingr,lmingr,limbal,gro,res)
-
-	# calculate net growth rate of algae; grobal is expressed as
-	# umoles phosphorus per liter per interval; benthic algae growth
-	# will be expressed in terms of volume rather than area for the
-	# duration of the subroutines subordinate to balrx; the output
-	# values for benthic algae are converted to either mg biomass per
-	# sq meter or mg chla per sq meter, whichever the user
-	# specifies; cfbalg and cfbalr are the specified ratio of benthic
-	# algae growth rate to phytoplankton growth rate and ratio of
-	# benthic algae respiration rate to phytoplankton respiration
-	# rate, respectively
-
-	grobal = (gro * cfbalg - res * cfbalr) * bal
-	if grobal > 0.0:  # adjust growth rate to account for limitations imposed by availability of required nutrients
-		grtotn = grobal
-		grobal = grochk (po4,no3,tam,phfg,decfg,co2,cvbpc,cvbpn,nsfg,nmingr,pmingr,cmingr,i0,grtotn,grobal)
-
-	# calculate benthic algae death, baldth only called here
-	dthbal = baldth(nsfg,no3,tam,po4,paldh,naldh,aldl,aldh,mbal,dox,anaer,oxald,bal,depcor,dthbal)
-
-	bal += grobal  # determine the new benthic algae population
-
-	# adjust net growth rate, if necessary, so that population does not fall below minimum level
-	minbal = 0.0001 * depcor
-	if bal < minbal:
-		grobal += minbal - bal
-		bal     = minbal
-	bal -= dthbal
-
-	# adjust death rate, if necessary, so that population does not drop below minimum level
-	if bal < minbal:
-		dthbal = dthbal - (minbal - bal)
-		bal    = minbal
-
-	# update do state variable to account for net effect of benthic algae photosynthesis and respiration
-	dobalg = cvpb * cvbo * grobal
-	# dox   = dox + (cvpb*cvbo*grobal)
-	if dox > -dobalg:
-		dox = dox + dobalg
-	else:
-		dobalg = -dox
-		dox    = 0.0
-
-	# calculate amount of refractory organic constituents which result from benthic algae death
-	balorn = refr * dthbal * cvbpn * 0.014
-	balorp = refr * dthbal * 0.031
-	balorc = refr * dthbal * cvbpc * 0.012
-
-	# calculate amount of nonrefractory organics (bod) which result from benthic algae death
-	bodbal = cvnrbo * cvpb * dthbal
-
-	# perform materials balance resulting from benthic algae death
-	orn,orp,orc,bod = orgbal(balorn,balorp,balorc,bodbal,orn,orp,orc,bod)
-
-	# perform materials balance resulting from uptake of nutrients by benthic algae
-	po4,tam,no3,baco2,tambal,no3bal,po4bal = nutrup(grobal,nsfg,cvbpn,alnpr,cvbpc,phfg,decfg,nminc,baco2,tambal,no3bal,po4bal)
-	baco2 = -baco2
-
-	# convert bal back to external units; benal is expressed as
-	# mg biomass/m2 and balcla is expressed as ug chlorophyll a/m2
-	benal  = (bal * cvpb) / depcor
-	balgro = (grobal * cvpb) / depcor
-	bdth   = (dthbal * cvpb) / depcor
-	balcla = benal * cvbcl
-
-	return po4,no3,tam,dox,orn,orp,orc,bod,benal, limbal,baco2,balcla,dobalg,bodbal,tambal,no3bal,po4bal,balgro,bdth,balorn,balorp,balorc
+			i = 3
+		baldep = pm[PM.RIFDF1 + i] * avdepe
+
+	# light intensity immediately below the surface (ly/min), adjusted for the fraction that is
+	# photosynthetically active; 0.97 accounts for surface reflection
+	inlit  = 0.97 * pm[PM.CFSAEX] * solrad / (delt60 * 60.0) * pm[PM.PARADF]
+	extsed = pm[PM.LITSED] * ssed  if pm[PM.SDLTFG] == 1 else 0.0
+	extcla = 0.00452 * phyto * pm[PM.CVBCL]   # self-shading by phytoplankton
+	phylit, ballit, cflit = litrch(inlit, pm[PM.EXTB], extcla, extsed, avdepe, baldep, phyfg, balfg)
+
+	if phyfg:
+		po4, no3, tam, dox, orn, orp, orc, bod, phyto, pyco2, dophy, bodphy, tamphy, no3phy, po4phy, phdth, \
+			phgro, ornphy, orpphy, orcphy = phyrx(phylit, tw, cflit, co2, delt60, pm, po4, no3, tam, dox, orn,
+			orp, orc, bod, phyto)
+		f[FLUX.PHYDOX] = dophy  * vol
+		f[FLUX.PHYBOD] = bodphy * vol
+		f[FLUX.PHYTAM] = tamphy * vol
+		f[FLUX.PHYNO3] = no3phy * vol
+		f[FLUX.PHYPO4] = po4phy * vol
+		f[FLUX.PHYCO2] = pyco2  * vol
+		f[FLUX.DTHPHY] = -phdth * vol
+		f[FLUX.GROPHY] = phgro  * vol
+		f[FLUX.PHYORN] = ornphy * vol
+		f[FLUX.PHYORP] = orpphy * vol
+		f[FLUX.PHYORC] = orcphy * vol
+
+		if zoofg:
+			dox, bod, zoo, orn, orp, orc, tam, no3, po4, zeat, zoco2, dozoo, bodzoo, nitzoo, po4zoo, zgro, \
+				zdth, zorn, zorp, zorc = zorx(tw, phyto, pm, dox, bod, zoo, orn, orp, orc, tam, no3, po4)
+			f[FLUX.ZOODOX] = -dozoo  * vol
+			f[FLUX.ZOOBOD] = bodzoo  * vol
+			if pm[PM.TAMFG]:   # nitrogen excretion goes to ammonia, else to nitrate
+				f[FLUX.ZOOTAM] = nitzoo * vol
+			else:
+				f[FLUX.ZOONO3] = nitzoo * vol
+			f[FLUX.ZOOPO4] = po4zoo * vol
+			f[FLUX.ZOOCO2] = zoco2  * vol
+			f[FLUX.ZOOPHY] = -zeat  * vol
+			f[FLUX.ZOOORN] = zorn   * vol
+			f[FLUX.ZOOORP] = zorp   * vol
+			f[FLUX.ZOOORC] = zorc   * vol
+			f[FLUX.GROZOO] = zgro   * vol
+			f[FLUX.DTHZOO] = -zdth  * vol
+
+			phyto -= zeat   # account for zooplankton predation
+
+	if balfg:
+		po4, no3, tam, dox, orn, orp, orc, bod, benal, baco2, dobalg, bodbal, tambal, no3bal, po4bal, bgro, \
+			bdth, ornbal, orpbal, orcbal = balrx(ballit, tw, cflit, co2, delt60, depcor, pm, po4, no3, tam,
+			dox, orn, orp, orc, bod, benal)
+		f[FLUX.BALDOX] = dobalg * vol
+		f[FLUX.BALBOD] = bodbal * vol
+		f[FLUX.BALTAM] = tambal * vol
+		f[FLUX.BALNO3] = no3bal * vol
+		f[FLUX.BALPO4] = po4bal * vol
+		f[FLUX.BALCO2] = baco2  * vol
+		f[FLUX.BALORN] = ornbal * vol
+		f[FLUX.BALORP] = orpbal * vol
+		f[FLUX.BALORC] = orcbal * vol
+		f[FLUX.GROBAL] = bgro
+		f[FLUX.DTHBAL] = -bdth
+	return dox, bod, no3, tam, po4, phyto, zoo, benal, orn, orp, orc, pyco2, zoco2, baco2
+
+
+@njit(cache=True)
+def algro(light, po4, no3, tam, tw, cflit, delt60, pm):
+	''' calculate unit growth and respiration rates for algae population; both are expressed
+	in units of per interval'''
+	gro = 0.0
+	if light > pm[PM.LMINGR] and po4 > pm[PM.PMINGR] and no3 > pm[PM.NMINGR] \
+			and pm[PM.TALGRH] > tw > pm[PM.TALGRL]:
+		# temperature correction to the maximum unit growth rate; none in the optimum range
+		talgrl = pm[PM.TALGRL]
+		talgrm = pm[PM.TALGRM]
+		tcmalg = (tw - talgrl) / (talgrm - talgrl)  if tw < talgrm else 1.0
+		malgrt = pm[PM.MALGR] * tcmalg
+
+		# maximum phosphorus limited unit growth rate
+		grop = malgrt * po4 * no3 / ((po4 + pm[PM.CMMP]) * (no3 + pm[PM.CMMNP]))
+
+		# maximum nitrogen limited unit growth rate
+		malgn = malgrt
+		mmn   = no3
+		if pm[PM.TAMFG]:
+			if pm[PM.AMRFG]:   # tam retardation to nitrogen limited growth rate
+				malgn = malgrt - 0.757 * tam + 0.051 * no3
+				malgn = min(max(malgn, 0.001 * malgrt), malgrt)
+			if pm[PM.NSFG]:    # tam is part of the nitrogen pool
+				mmn = no3 + tam
+		gron = (malgn * mmn) / (pm[PM.CMMN] + mmn)
+
+		# maximum light limited unit growth rate
+		grol = (malgrt * light) / (pm[PM.CMMLT] + light)
+
+		gro = min(grop, gron, grol)
+		if gro < 0.000001 * delt60:
+			gro = 0.0
 
+		# growth only occurs in the part of the control volume within the euphotic zone
+		gro *= cflit
 
-def grochk (po4,no3,tam,phfg,decfg,co2,cvbpc,cvbpn,nsfg,nmingr,pmingr,cmingr,nfixfg,grtotn, grow):
-	''' check whether computed growth rate demands too much of any
-	nutrient; adjust growth rate, if necessary, so that at least
-	minimum allowed level of each nutrient remains after growth'''
+	# unit algal respiration rate; alr20 is the respiration rate at 20 degrees c
+	res = pm[PM.ALR20] * tw / 20.0
+	return gro, res
 
-	# calculate growth rate which results in minimum free po4
-	# remaining after growth; uplimp is expressed as umoles
-	# phosphorus per liter per interval
-	uplimp = (po4 - pmingr) * 32.29
 
-	# calculate growth rate which results in minimum free
-	# inorganic nitrogen remaining after growth; uplimn is expressed
-	# as umoles phosphorus per interval
-	if NSFG == 0:    # tam is not considered as a possible nutrient
-		uplimn = (no3 - nmingr) * 71.43 / cvbpn
-	else:
-		uplimn = (no3 + tam - nmingr) * 71.43 / cvbpn
+@njit(cache=True)
+def grochk(po4, no3, tam, co2, pm, grtotn, grow):
+	''' adjust growth rate, if necessary, so that at least the minimum allowed level of
+	each nutrient remains after growth; rates are umoles phosphorus per liter per interval'''
+	uplimp = (po4 - pm[PM.PMINGR]) * 32.29
+	nit    = no3 + tam  if pm[PM.NSFG] else no3
+	uplimn = (nit - pm[PM.NMINGR]) * 71.43 / pm[PM.CVBPN]
 
 	uplimc = 1.0e30
-	if PHFG and PHFG != 2 and DECFG == 0:
-		# phcarb is on, and co2 is being considered as a possible
-		# limiting nutrient to algal growth
-		if co2 >= 0.0:
-			# calculate growth rate which results in minimum free
-			# carbon dioxide remaining after growth; uplimc is expressed
-			# as umoles phosphorus per liter per interval
-			uplimc = (co2 - cmingr) * 83.33 / cvbpc
-
-	# calculate difference between available nutrient concentrations and
-	# nutrients needed for modeled growth; amount needed for growth may differ 
-	# for n if nitrogen-fixation occurs in any of the algal types
-	uplimp -= grow
-	uplimn -= grtotn
-	uplimc -= grow
-
-	# check that calculated growth does not result in less than
-	# minimum allowed concentrations of orthophosphate, inorganic
-	# nitrogen, or carbon dioxide; if it does, adjust growth
-	if NFIXFG:                       # n-fixation is not occurring for this algal type
-		uplim = min(uplimp, uplimn, uplimc)
-	else:                           # n-fixation is occurring, nitrogen does not limit growth
-		uplim = min(uplimp, uplimc)
+	if pm[PM.PHFG] and pm[PM.DECFG] == 0 and co2 >= 0.0:   # co2 is a possible limiting nutrient
+		uplimc = (co2 - pm[PM.CMINGR]) * 83.33 / pm[PM.CVBPC]
+
+	uplim = min(uplimp - grow, uplimn - grtotn, uplimc - grow)
 	if uplim < 0.0:   # reduce growth rate to limit
 		grow += uplim
 	return grow
 
 
-def litrch(inlit, extb, extcla, extsed, avdepe, baldep, PHYFG, BALFG, phylit, ballit, cflit):
-	''' calculate light correction factor to algal growth (cflit); 
-	determine amount of light available to phytoplankton and benthic algae'''
-	ln01 = 4.60517   # minus natural log 0.01
-	if inlit > 0.0:
-		# calculate extinction of light based on the base extinction
-		# coefficient of the water incremented by self-shading effects
-		# of phytoplankton and light extinction due to total sediment
-		# suspension
-		extco = extb + extcla + extsed
-
-		# calculate euphotic depth; euphotic depth is the distance,
-		# in feet, below the surface of the water body at which one
-		# percent of incident light is present
-		eudep = ln01 / extco
-		if eudep < avdepe:
-			# calculate fraction of layer which is contained in the
-			# euphotic zone; this fraction, cflit, will be multiplied
-			# by calculated growth in algro to assure that growth only
-			# occurs in the euphotic zone
-			cflit = eudep / avdepe
-			if cflit < 0.0001:
-				cflit = 0.0
-		else:
-			cflit = 1.0
-
-		if PHYFG:
-			# calculate amount of light available to phytoplankton; all
-			# phytoplankton are assumed to be at mid-depth of the reach;
-			# light is expressed as langleys per minute
-			phylit = inlit * exp(-extco * (0.5 * min(eudep, avdepe)))
-			if phylit < 0.0001:
-				phylit = 0.0
-
-		if BALFG:
-			# calculate amount of light available to benthic algae; all
-			# benthic algae are assumed to be at the bottom depth of the
-			# reach;light is expressed as langleys per minute
-			ballit = inlit * exp(-extco * baldep)
-			if ballit < 0.0001:
-				ballit = 0.0
-	else:   # there is no incident solar radiation; algal growth cannot occur
-		cflit  = 0.0
-		phylit = 0.0
-		ballit = 0.0
+@njit(cache=True)
+def litrch(inlit, extb, extcla, extsed, avdepe, baldep, phyfg, balfg):
+	''' calculate light correction factor to algal growth (cflit); determine amount of light
+	available to phytoplankton and benthic algae; returns phylit, ballit, cflit'''
+	if inlit <= 0.0:   # no incident solar radiation; algal growth cannot occur
+		return 0.0, 0.0, 0.0
+
+	# light extinction by the water, phytoplankton self-shading and suspended sediment
+	extco = extb + extcla + extsed
+
+	# euphotic depth is where one percent of incident light is present; 4.60517 is -ln(0.01)
+	eudep = 4.60517 / extco
+	cflit = 1.0
+	if eudep < avdepe:   # fraction of the layer which is in the euphotic zone
+		cflit = eudep / avdepe
+		if cflit < 0.0001:
+			cflit = 0.0
+
+	phylit = 0.0
+	if phyfg:   # phytoplankton are assumed to be at mid-depth of the euphotic layer
+		phylit = inlit * exp(-extco * (0.5 * min(eudep, avdepe)))
+		if phylit < 0.0001:
+			phylit = 0.0
+	ballit = 0.0
+	if balfg:   # benthic algae are at the bottom of the reach
+		ballit = inlit * exp(-extco * baldep)
+		if ballit < 0.0001:
+			ballit = 0.0
 	return phylit, ballit, cflit
 
 
-def nutrup(grow, NSFG, cvbpn, alnpr, cvbpc, PHFG, DECFG, nminc, po4, tam, no3, alco2, tamalg, no3alg, po4alg):
-	''' perform materials balance for transformation from inorganic to
-	organic material; uptake of po4, no3, tam, and co2 are considered'''
-
-	# calculate po4 balance subsequent to algal uptake or release;
-	# 0.031 is the conversion from umoles p per liter to mg of p per liter
-	po4    = po4 - 0.031 * grow
+@njit(cache=True)
+def nutrup(grow, pm, po4, tam, no3):
+	''' materials balance for transformation from inorganic to organic material; uptake of po4,
+	no3, tam and co2 are considered; returns po4, tam, no3, alco2, tamalg, no3alg, po4alg'''
+	# 0.031 converts umoles p per liter to mg p per liter
+	po4   -= 0.031 * grow
 	po4alg = -0.031 * grow
+
 	tamalg = 0.0
-	if NSFG:
-		# calculate tam balance subsequent to algal uptake or release
-		# express calculated growth rate in terms of equivalent
-		# nitrogen; grown is expressed as umoles nitrogen per interval
-		grown = grow * cvbpn
-		if grow < 0.0:  # algal respiration exceeds growth
-			# nitrogen released by respiration is released in the form of tam
-			# no uptake or release of no3 occurs
+	if pm[PM.NSFG]:
+		grown = grow * pm[PM.CVBPN]   # umoles nitrogen per interval
+		if grow < 0.0:   # respiration exceeds growth, released nitrogen is tam
 			altam = grown
 			alno3 = 0.0
 		else:
-			# calculate amount of n uptake which is no3 and amount which is tam
-			alno3 = alnpr * grown
+			alno3 = pm[PM.ALNPR] * grown
 			altam = grown - alno3
-			# check that computed uptake of no3 does not consume more
-			# than 99 percent of available free no3; if it does, satisfy
-			# excess demand with free tam; no3lim is expressed as umoles
-			# n per liter per interval
+			# uptake may not consume more than 99 percent of free no3 or tam, the other satisfies the excess
 			no3lim = 70.72 * no3
 			if alno3 > no3lim:
 				altam += alno3 - no3lim
 				alno3  = no3lim
 			else:
-				# check that calculated uptake of tam does not consume
-				# more than 99 percent of available free tam; if it does,
-				# satisfy excess demand with free no3; tamlim is expressed
-				# as umoles n per liter per interval
 				tamlim = 70.72 * tam
 				if altam > tamlim:
 					alno3 += altam - tamlim
-					altam = tamlim
+					altam  = tamlim
 
-		# calculate net uptake or release of tam by algae; .014 is
-		# the conversion from umoles of n per liter per interval to
-		# mg n per liter per interval
-		tams   = tam
+		# 0.014 converts umoles n per liter to mg n per liter
 		tamalg = -0.014 * altam
-		tam    = tam - 0.014 * altam
-		if tam < nminc:
-			tamalg = -tams
-			tam    = 0.0
-
+		if tam + tamalg < pm[PM.NMINC]:
+			tamalg = -tam
+		tam += tamalg
 	else:   # all inorganic n is in the form of no3
-		alno3 = grow * cvbpn
+		alno3 = grow * pm[PM.CVBPN]
 
-	# calculate no3 balance subsequent to algal uptake or release;
-	# eliminate insignificant values of no3
-	no3s   = no3
 	no3alg = -0.014 * alno3
-	no3    = no3 - 0.014 * alno3
-	if no3 < nminc:
-		no3alg = -no3s
-		no3    = 0.0
-		
-	if PHFG and DECFG == 0:   # calculate amount of algal uptake of co2 in mg co2-c/liter
-		alco2 = grow * cvbpc * 0.012
-	else:
-		alco2 = 0.0
-	return po4, tam, no3, alco2, tamalg, no3alg, po4alg
-
-
-def orgbal(dthorn, dthorp, dthorc, dthbod, orn, orp, orc, bod):
-	''' perform materials balance for transformation from living to dead organic material'''
-
-	# calculate dead refractory organic nitrogen balance subsequent to plankton death;
-	# plankton death may be either algal death, zooplankton death, or phytoplankton
-	# filtered by zooplankton but not assimilated
-	orn += dthorn
-
-	# calculate dead refractory organic phosphorus balance subsequent to plankton death
-	orp += dthorp
-
-	# calculate dead refractory organic carbon balance subsequent to plankton death
-	orc += dthorc
-
-	# calculate bod balance subsequent to plankton death
-	bod += dthbod
-
-	return orn, orp, orc, bod
+	if no3 + no3alg < pm[PM.NMINC]:
+		no3alg = -no3
+	no3 += no3alg
 
-
-def phydth(nsfg,no3,tam,po4,paldh,naldh,phycla,claldh,aldl,aldh,dox,anaer,oxald,stc,dthphy):
-	''' calculate phytoplankton death'''
-
-	# determine whether to use high or low unit death rate; all unit
-	# death rates are expressed in units of per interval
-	# determine available inorganic nitrogen pool for test of nutrient scarcity
-	nit = no3 + tam  if nsfg else  no3
-	if po4 > paldh and nit > naldh:
-		# unit death rate is not incremented by nutrient scarcity
-		# check for phytoplankton overcrowding
-		if phycla < claldh:    # unit death rate is not incremented by phytoplankton overcrowding
-			ald = aldl
-		else:
-			ald = aldh   # augment unit death rate to account for overcrowding
-	else: 		# augment unit death rate to account for nutrient scarcity
-		ald = aldh
-
-	# augment unit death rate if conditions are anaerobic
-	if dox < anaer:
-		ald += oxald
-
-	# use unit death rate to compute death rate; aldth is expressed
-	# as umoles of phosphorus per liter per interval
-	return ald * stc                   # dthphy
+	alco2 = 0.0
+	if pm[PM.PHFG] and pm[PM.DECFG] == 0:   # algal uptake of co2 in mg co2-c/liter
+		alco2 = grow * pm[PM.CVBPC] * 0.012
+	return po4, tam, no3, alco2, tamalg, no3alg, po4alg
 
 
-def phyrx(phylit,tw,talgrl,talgrh,talgrm,malgr,cmmp,cmmnp,tamfg,amrfg,nsfg,cmmn,cmmlt,delt60,cflit,alr20,cvbpn,phfg,decfg,cvbpc,paldh,
-	naldh,claldh,aldl,aldh,anaer,oxald,alnpr,cvbo,refr,cvnrbo,cvpb,cvbcl,limit,co2,nmingr,pmingr,cmingr,lmingr,nminc,
-	po4,no3,tam,dox,orn,orp,orc,bod,phyto,limphy,pyco2,phycla,dophy,bodphy,tamphy,no3phy,po4phy,phdth,phgro,phyorn,phyorp,phyorc):
+@njit(cache=True)
+def phyrx(phylit, tw, cflit, co2, delt60, pm, po4, no3, tam, dox, orn, orp, orc, bod, phyto):
 	''' simulate behavior of phytoplankton, as standing crop, in units of umoles p per liter'''
+	cvpb = pm[PM.CVPB]
+	stc    = phyto / cvpb
+	phycla = phyto * pm[PM.CVBCL]
 
-	# convert phyto to units of umoles phosphorus (stc) and ug chlorophyll a/l (phycla) for internal calculations
-	stc    = phyto / vpb
-	phycla = phyto * cvbcl
+	gro, res = algro(phylit, po4, no3, tam, tw, cflit, delt60, pm)
 
-	# compute unit growth and respiration rates for phytoplankton;
-	# determine growth limiting factor
-	limphy,gro,res = algro(phylit,po4,no3,tw,talgrl,talgrh,talgrm,malgr,cmmp,cmmnp,tamfg,amrfg,
-	tam,nsfg,cmmn,cmmlt,alr20,cflit,delt60,limit,nmingr,pmingr,lmingr,limphy,gro,res)
-
-	# calculate net growth rate of phytoplankton; grophy is
-	# expressed as umol phosphorus per liter per interval
+	# net growth rate of phytoplankton, umol phosphorus per liter per interval
 	grophy = (gro - res) * stc
+	if grophy > 0.0:   # limit growth to the available nutrients
+		grophy = grochk(po4, no3, tam, co2, pm, grophy, grophy)
 
-	if grophy > 0.0:
-		# adjust growth rate to account for limitations imposed by
-		# availability of required nutrients
-		grtotn = grophy
-		nmingr,pmingr,cmingr,i0,grtotn,grophy = grochk (po4,no3,tam,phfg,decfg,co2,cvbpc,cvbpn,nsfg,nmingr,pmingr,cmingr,i0,grtotn,grophy)
-
-	# calculate phytoplankton death
-	dthphy = phydth(nsfg,no3,tam,po4,paldh,naldh,phycla,claldh,aldl,aldh,dox,anaer,oxald,stc,dthphy)
-
-	# determine the new phytoplankton population
+	# phytoplankton death; unit death rate is increased by nutrient scarcity, overcrowding and anaerobic conditions
+	nit = no3 + tam  if pm[PM.NSFG] else no3
+	if po4 > pm[PM.PALDH] and nit > pm[PM.NALDH] and phycla < pm[PM.CLALDH]:
+		ald = pm[PM.ALDL]
+	else:
+		ald = pm[PM.ALDH]
+	if dox < pm[PM.ANAER]:
+		ald += pm[PM.OXALD]
+	dthphy = ald * stc
+
+	# new population, kept above the minimum level by adjusting growth and then death.
+	# As in HSPF the shortfall is subtracted from grophy, so at the minimum level the
+	# growth, PHYDOX (DOXFLUXPHYTO) and PHYCO2 fluxes are negative while stc is restored
 	stc += grophy
-
-	# adjust net growth rate, if necessary, so population does not fall below minimum level
-	if stc < .0025:
-		grophy -= (0.0025 - stc)
+	if stc < 0.0025:
+		grophy -= 0.0025 - stc
 		stc     = 0.0025
 	stc -= dthphy
-
-	# adjust death rate, if necessary, so that population does not drop below minimum level
-	if stc < .0025:
-		dthphy -= (0.0025 - stc)
+	if stc < 0.0025:
+		dthphy -= 0.0025 - stc
 		stc     = 0.0025
 
-	# update do state variable to account for net effect of phytoplankton photosynthesis and respiration
-	dophy = cvpb * cvbo * grophy
+	# net effect of photosynthesis and respiration on do
+	dophy = cvpb * pm[PM.CVBO] * grophy
 	if dox > -dophy:
 		dox += dophy
 	else:
 		dophy = -dox
 		dox   = 0.0
 
-	# calculate amount of refractory organic constituents which result from phytoplankton death
-	phyorn = refr * dthphy * cvbpn * 0.014
+	# refractory organics and bod from phytoplankton death
+	refr   = pm[PM.REFR]
+	phyorn = refr * dthphy * pm[PM.CVBPN] * 0.014
 	phyorp = refr * dthphy * 0.031
-	phyorc = refr * dthphy * cvbpc * 0.012
-
-	# calculate amount of nonrefractory organics (bod) which result from phytoplankton death
-	phybd  = cvnrbo * cvpb * dthphy
-	bodphy = phybd
-
-	# perform materials balance resulting from phytoplankton death
-	orn,orp,orc,bod = orgbal(phyorn,phyorp,phyorc,phybd, orn,orp,orc,bod)
-
-	# perform materials balance resulting from uptake of nutrients by phytoplankton
-	po4,tam,no3,pyco2,tamphy,no3phy,po4phy = nutrup (grophy,nsfg,cvbpn,alnpr,cvbpc,phfg,decfg,nminc,po4,tam,no3,pyco2,tamphy,no3phy,po4phy)
-	pyco2 = -pyco2
-
-	# convert stc to units of mg biomass/l (phyto) and ug chlorophyll a/l (phycla)
-	phyto  = stc    * cvpb
-	phgro  = grophy * cvpb
-	phdth  = dthphy * cvpb
-	phycla = phyto  * cvbcl
-
-	return po4,no3,tam,dox,orn,orp,orc,bod,phyto,limphy,pyco2,phycla,dophy,bodphy,tamphy,no3phy,po4phy,phdth,phgro,phyorn,phyorp,phyorc
-
-
-def zorx(zfil20,tczfil,tw,phyto,mzoeat,zexdel,cvpb,zres20,tczres,anaer,zomass,tamfg,refr,
-	zfood,zd,oxzd,cvbn,cvbp,cvbc,cvnrbo,cvbo,dox,bod,zoo,orn,orp,orc,tam,no3,po4,zeat,zco2,dozoo,zbod,znit,zpo4,
-	zogr,zdth,zorn,zorp,zorc):
-	''' calculate zooplankton population balance'''
-
-	# calculate zooplankton unit grazing rate expressed as liters
-	# of water filtered per mg zooplankton per interval
-	zfil = zfil20 * (tczfil**(tw - 20.0))
-
-	# calculate mass of phytoplankton biomass ingested per mg
-	# zooplankton per interval
-	zoeat = zfil * phyto
-
-	# check that calculated unit ingestion rate does not exceed
-	# maximum allowable unit ingestion rate (mzoeat); if it does,
-	# set unit ingestion rate equal to mzoeat
-	if zoeat >= mzoeat:
-		zoeat = mzoeat
-		# nonrefractory portion of excretion is only partially
-		# decomposed; zexdec is the fraction of nonrefractory
-		# material which is decomposed
-		zexdec = zexdel
-	else:
-		# calculated unit ingestion rate is acceptable
-		# all nonrefractory excretion is decomposed
-		zexdec = 1.0
-
-	# calculate phytoplankton consumed by zooplankton; zeat is
-	# expressed as mg biomass per interval
+	phyorc = refr * dthphy * pm[PM.CVBPC] * 0.012
+	bodphy = pm[PM.CVNRBO] * cvpb * dthphy
+	orn += phyorn
+	orp += phyorp
+	orc += phyorc
+	bod += bodphy
+
+	po4, tam, no3, alco2, tamphy, no3phy, po4phy = nutrup(grophy, pm, po4, tam, no3)
+
+	phyto = stc * cvpb
+	return po4, no3, tam, dox, orn, orp, orc, bod, phyto, -alco2, dophy, bodphy, tamphy, no3phy, po4phy, \
+		dthphy * cvpb, grophy * cvpb, phyorn, phyorp, phyorc
+
+
+@njit(cache=True)
+def zorx(tw, phyto, pm, dox, bod, zoo, orn, orp, orc, tam, no3, po4):
+	''' calculate zooplankton population balance; zoo and the mass fluxes are mg biomass per liter'''
+	cvpb  = pm[PM.CVPB]
+	refr  = pm[PM.REFR]
+	zfood = pm[PM.ZFOOD]
+
+	# unit ingestion rate, limited to the maximum (mzoeat); above it the nonrefractory portion of
+	# excretion is only partially decomposed (zexdel)
+	zoeat = pm[PM.ZFIL20] * (pm[PM.TCZFIL]**(tw - 20.0)) * phyto
+	zexdec = 1.0
+	if zoeat >= pm[PM.MZOEAT]:
+		zoeat  = pm[PM.MZOEAT]
+		zexdec = pm[PM.ZEXDEL]
+
+	# ingestion may not reduce phytoplankton below 0.0025 umoles p per liter
 	zeat = zoeat * zoo
-
-	# check that calculated ingestion does not reduce phytoplankton
-	# concentration to less than .0025 umoles p; if it does, adjust
-	# ingestion so that .0025 umoles of phytoplankton (expressed as p) remain
 	if phyto - zeat < 0.0025 * cvpb:
-		zeat = phyto - (0.0025 * cvpb)
+		zeat = phyto - 0.0025 * cvpb
 
-	# calculate zooplankton assimilation efficiency
+	# assimilation efficiency for high, medium or low quality food
 	if zfood == 1:
-		# calculate assimilation efficiency resulting from ingestion
-		# of high quality food; zeff is dimensionless
-		zeff = -0.06 * phyto + 1.03
-		if zeff > 0.99:    		# set upper limit on efficiency at 99 percent
-			zeff = 0.99
+		zeff = min(-0.06 * phyto + 1.03, 0.99)
 	elif zfood == 2:
-		# calculate assimilation efficiency resulting from ingestion of medium quality food
-		zeff = -0.03 * phyto + 0.47
-		if zeff < 0.20:  		# set lower limit on efficiency at 20 percent
-			zeff = 0.20
+		zeff = max(-0.03 * phyto + 0.47, 0.20)
 	else:
-		# calculate assimilation efficiency resulting from ingestion of low quality food
-		zeff = -0.013 * phyto + 0.17
-		if zeff < 0.03:
-			zeff= 0.03   # # set lower limit on efficiency at 3 percent
-
-	# calculate zooplankton growth; zogr is expressed as mg biomass per liter per interval
+		zeff = max(-0.013 * phyto + 0.17, 0.03)
 	zogr = zeff * zeat
 
-	# calculate total zooplankton excretion (zexmas),excretion
-	# decomposed to inorganic constituents (zingex), excretion
-	# released as dead refractory constituents (zrefex), and
-	# excretion released as dead nonrefractory material (znrfex)
+	# excretion split into refractory, decomposed (inorganic) and nonrefractory dead material
 	zexmas = zeat - zogr
 	zrefex = refr * zexmas
 	zingex = zexdec * (zexmas - zrefex)
 	znrfex = zexmas - zrefex - zingex
 
-	# calculate zooplankton respiration; zres is expressed as mg
-	# biomass per liter per interval
-	zres = zres20 * (tczres**(tw - 20.0)) * zoo
+	zres = pm[PM.ZRES20] * (pm[PM.TCZRES]**(tw - 20.0)) * zoo
+	zdth = pm[PM.ZD] * zoo  if dox > pm[PM.ANAER] else (pm[PM.ZD] + pm[PM.OXZD]) * zoo
 
-	# calculate zooplankton death; zdth is expressed as mg biomass per liter per interval
-	if dox > anaer:
-		# calculate death using aerobic death rate
-		zdth = zd * zoo
-	else:
-		# calculate death using sum of aerobic death rate and anaerobic increment
-		zdth = (zd + oxzd) * zoo
-
-	# calculate zooplankton population after growth, respiration,
-	# and death; adjust respiration and death, if necessary, to
-	# assure minimum population of zooplankton
-	# first, account for net growth (growth - respiration)
-	zoo += zogr - zres
-
-	# maintain minimum population of .03 organisms per liter; zomass
-	# is a user specified conversion factor from organisms/l to mg biomass/l
-	lolim = 0.03 * zomass
+	# net growth, then death, keeping a minimum population of 0.03 organisms per liter
+	lolim = 0.03 * pm[PM.ZOMASS]
+	zoo  += zogr - zres
 	if zoo < lolim:
-		zres = zres + zoo - lolim
-		zoo  = lolim
+		zres += zoo - lolim
+		zoo   = lolim
 
-	# subtract oxygen required to satisfy zooplankton respiration from do state variable
+	# oxygen required by respiration; a deficit is carried as bod
 	dozoo = 1.1 * zres
 	dox  -= dozoo
-	zbod = 0.0
-	if dox < 0.0:            # include oxygen deficit in bod value
+	zbod  = 0.0
+	if dox < 0.0:
 		zbod = -dox
 		dox  = 0.0
 
-	# subtract computed zooplankton death from zooplankton state variable
-	zoo = zoo - zdth
+	zoo -= zdth
 	if zoo < lolim:
-		zdth = zdth + zoo - lolim
-		zoo  = lolim
-
-	# calculate amount of inorganic constituents which are released
-	# by zooplankton respiration and inorganic excretion
-	znit = (zingex + zres) * cvbn
-	zpo4 = (zingex + zres) * cvbp
-	zco2 = (zingex + zres) * cvbc
-
-	# update state variables for inorganic constituents to account
-	# for additions from zooplankton respiration and inorganic excretion
-	tam, no3, po4 = decbal(tamfg, i1, znit, zpo4, tam, no3, po4)
-
-	# calculate amount of refractory organic constituents which result from zooplankton death and excretion
-	zorn = ((refr * zdth) + zrefex) * cvbn
-	zorp = ((refr * zdth) + zrefex) * cvbp
-	zorc = ((refr * zdth) + zrefex) * cvbc
-
-	# calculate amount of nonrefractory organics (bod) which result from zooplankton death and excretion
-	zbod = zbod + (zdth * cvnrbo) + (znrfex * cvbo)
-	orn, orp, orc, bod = orgbal(zorn, zorp, zorc, zbod, orn, orp, orc, bod)
-	return  dox,bod,zoo,orn,orp,orc,tam,no3,po4,zeat,zco2,dozoo,zbod,znit,zpo4,zogr,zdth,zorn,zorp,zorc
-
-
-def pksums(PHYFG,ZOOFG,TAMFG,NO2FG,PO4FG,ADNHFG,ADPOFG,cvbn,cvbp,cvbc,cvbo,cvnrbo,phyto,zoo,orn,
-	orp,orc,no3,tam,no2,snh41,snh42,snh43,po4,spo41,spo42,spo43,bod, torn,torp,torc,potbod,tn,tp):
-	''' computes summaries of: total organic n, p, c; total n, p; potbod'''
-
-	tval = bod / cvbo
-	if PHYFG == 1:
-		tval += phyto
-		if zoofg == 1:
-			tval += zoo
-
-	torn   = orn + cvbn * tval
-	torp   = orp + cvbp * tval
-	torc   = orc + cvbc * tval
-	potbod = bod
-	tn     = torn + no3
-	if TAMFG == 1:
-		tn = tn + tam
-	if NO2FG == 1:
-		tn = tn + no2
-	if ADNHFG == 1:
-		tn = tn + snh41 + snh42 + snh43
-	tp = torp
-	if PO4FG == 1:
-		tp = tp + po4
-	if ADPOFG == 1:
-		tp = tp + spo41 + spo42 + spo43
-	if PHYFG == 1:
-		potbod = potbod + (cvnrbo * phyto)
-		if zoofg == 1:
-			potbod = potbod + (cvnrbo * zoo)
-	return torn, torp, torc, potbod, tn, tp
-
-
-def algro2 (ballit,po4,no3,tw,mbalgr,cmmp,tamfg,tam, nsfg,cmmn,balr20,delt60,limit,tcbalg,balvel,
-	cmmv,bfixfg,cslit,cmmd1,cmmd2,sumba,tcbalr, nmingr,pmingr,lmingr,nmaxfx,grores,
-	nfixfg,limr,groba,resba):
-
-	''' calculate unit growth and respiration rates for benthic algae using more
-	complex kinetics; both are expressed in units of per interval'''
-
-	if ballit > lmingr:      # sufficient light to support growth
-		if po4 > pmingr and no3 > nmingr:   # sufficient nutrients to support growth
-
-			# calculate temperature correction fraction
-			tcmbag = tcbalg**(tw - 20.0)
-
-			# calculate velocity limitation on nutrient availability
-			grofv = balvel / (cmmv + balvel)
-
-			# calculate phosphorus limited unit growth factor
-			grofp = po4 * grofv / (cmmp + po4 * grofv)
-
-			# calculate the nitrogen limited unit growth factor
-			if TAMFG:   # consider influence of tam on growth rate
-				if NSFG:
-					# include tam in nitrogen pool for calculation of
-					# nitrogen limited growth rate
-					mmn = no3 + tam
-				else:
-					# tam is not included in nitrogen pool for calculation
-					# of nitrogen limited growth
-					mmn = no3
-			else:
-				mmn = no3  # tam is not simulated
-
-			if BFIXFG != 1:   # calculate the maximum nitrogen limited unit growth rate
-				nfixfg = 0
-				grofn = (mmn * grofv) / (cmmn + mmn * grofv)
-			else:
-				# n-fixing blue-green algae; determine if available nitrogen 
-				# concentrations are high enough to suppress nitrogen fixation
-				if mmn >= nmaxfx:
-					nfixfg = 0
-					grofn = (mmn * grofv) / (cmmn + mmn * grofv)
-				else:
-					nfixfg = 1   # available nitrogen concentrations do not suppress n-fixation
-					grofn = 1.0  # nitrogen does not limit growth rate
-
-				# calculate the maximum light limited unit growth rate
-				grofl = (ballit / cslit) * exp(1.0 - (ballit / cslit))
-
-				# calculate density limitation on growth rate
-				grofd = (cmmd1 * sumba + cmmd2) / (sumba + cmmd2)
-				if grofp < grofn and grofp < grofl:  # phosphorus limited
-					gromin = grofp
-					lim = 'po4'
-				elif grofn < grofl:                  # nitrogen limited
-					gromin = grofn
-					lim = 'nit'
-				else:                                # light limited
-					gromin = grofl
-					lim = 'lit'
-				if gromin > 0.95:  # there is no limiting factor to cause less than maximum growth rate
-					lim = 'none'
-				# calculate overall growth rate in units of per interval
-				groba = mbalgr * tcmbag * gromin * grofd
-				if groba < 1.0e-06 * delt60:
-					groba = 0.0
-		else:    # no algal growth occurs; necessary nutrients are not available
-			groba = 0.0
-			lim   ='non'
-	else:        # no algal growth occurs; necessary light is not available
-		groba = 0.0
-		lim = 'lit'
-
-	# calculate unit algal respiration rate in units of per interval
-	# balr20 is the benthic algal respiration rate at 20 degrees c
-	resba = balr20 * tcbalr**(tw - 20.0) + grores * groba
-	return  nfixfg, groba, resba
-
-def balrem(crem,sumba,sumbal,cmmbi,tcgraz,tw,binv,bal,cslof1,cslof2,balvel,remba):
-	''' calculate benthic algae removal due to macroinvertebrates and scouring, based
-	upon equations from dssamt. This subroutine provides similar functionality for the
-	enhanced periphyton kinetics (balrx2) that baldth provides for the original hspf benthic algae (balrx).'''
-
-	# calculate the total benthic algae removed per interval due to grazing and disturbance of macroinvertebrates
-	reminv = crem * (sumba / (sumba + cmmbi)) * tcgraz**(tw - 20.0) * binv
-
-	# calculate portion of total algae removed represented by the present benthic algal group
-	remba = reminv * bal / sumbal
-
-	# calculate scour loss rate of benthic algae in per interval
-	maxvel = log(1.0 / cslof1) / cslof2
-	slof   = cslof1 * exp(cslof2 * balvel) if balvel < maxvel else 1.0
-
-	# calculate amount of present benthic algae group removed through grazing, disturbance, and scouring
-	remba += slof * bal
-	return remba
-
-
-def nutup2 (grow,nsfg,cvbpn,alnpr,cvbpc,phfg,decfg, bnpfg,campr,sumgrn,nminc,  po4,tam,no3, alco2,tamalg,no3alg,po4alg):
-	''' perform materials balance for transformation from inorganic to
-	organic material; uptake of po4, no3, tam, and co2 are considered.
-	used instead of nutrup by the balrx2 subroutine; adds a
-	calculated nitrogen preference function and adjustments for 
-	n-fixation to the nutrup code.'''
-	
-	nmgpum = 0.0140067
-	cmgpum = 0.012011
-	pmgpum = 0.0309738
-	prct99 = 0.99
-
-	# calculate po4 balance subsequent to algal uptake or release;
-	# pmgpum is the conversion from umoles p per liter to mg of p per liter
-	po4    = po4 - pmgpum * grow
-	po4alg = -pmgpum * grow
-	tamalg = 0.0
-	if NSFG:
-		# calculate tam balance subsequent to algal uptake or release
-		# express calculated growth rate in terms of equivalent
-		# nitrogen; grown is expressed as umoles nitrogen per interval;
-		# use accumulated growth that affects available n (sumgrn)
-		grown = sumgrn * cvbpn
-		if sumgrn < 0.0:      # algal respiration exceeds growth
-			# nitrogen released by respiration is released in the form of tam; no uptake or release of no3 occurs
-			altam = grown
-			alno3 = 0.0
-		else:   # calculate amount of n uptake which is no3 and amount which is tam
-			# check nitrogen preference flag; if bnpfg.ne.1 use original
-			# approach of %no3, if bnpfg.eq.1 use preference function
-			# from dssamt/ssamiv
-			if BNPFG == 1:
-				# use dssamt ammonia preference function, equal to 1-alnpr
-				alnpr2 = 1.0 - (campr * tam) / (campr * tam + no3)
-			else:
-				alnpr2 = alnpr
-			alno3 = alnpr2 * grown
-			altam = grown - alno3
-			# check that computed uptake of no3 does not consume more
-			# than 99 percent of available free no3; if it does, satisfy
-			# excess demand with free tam; no3lim is expressed as umoles
-			# n per liter per interval
-			# no3lim= (prct99/nmgpum)*no3
-			if alno3 > no3lim:
-				altam = altam + alno3 - no3lim
-				alno3 = no3lim
-			else:
-				# check that calculated uptake of tam does not consume
-				# more than 99 percent of available free tam; if it does,
-				# satisfy excess demand with free no3; tamlim is expressed
-				# as umoles n per liter per interval
-				tamlim = (prct99 / nmgpum) * tam
-				if altam > tamlim:
-					alno3 = alno3 + altam - tamlim
-					altam = tamlim
-		# calculate net uptake or release of tam by algae; .014 is
-		# the conversion from umoles of n per liter per interval to
-		# mg n per liter per interval
-		tams   = tam
-		tamalg = -nmgpum * altam
-		tam    = tam - nmgpum * altam
-		if tam < nminc:
-			tamalg = -tams
-			tam    = 0.0
-	else:     # all inorganic n is in the form of no3
-		alno3 = sumgrn * cvbpn
-
-	# calculate no3 balance subsequent to algal uptake or release;
-	# eliminate insignificant values of no3
-	no3s   = no3
-	no3alg = -nmgpum * alno3
-	no3    = no3 - nmgpum * alno3
-	if no3 < nminc:
-		no3alg = -no3s
-		no3    = 0.0
-
-	# calculate amount of algal uptake of co2; alco2 is expressed as mg co2-c/liter
-	alco2 = grow * cvbpc * cmgpum  if PHFG and DECFG == 0 else 0.0
-
-	return po4, tam, no3, alco2, tamalg, no3alg, po4alg
-
-
+		zdth += zoo - lolim
+		zoo   = lolim
+
+	# inorganic constituents released by respiration and inorganic excretion
+	znit = (zingex + zres) * pm[PM.CVBN]
+	zpo4 = (zingex + zres) * pm[PM.CVBP]
+	zco2 = (zingex + zres) * pm[PM.CVBC]
+	tam, no3, po4 = decbal(pm[PM.TAMFG], 1, znit, zpo4, tam, no3, po4)
+
+	# refractory organics and bod from death and excretion
+	zorn = ((refr * zdth) + zrefex) * pm[PM.CVBN]
+	zorp = ((refr * zdth) + zrefex) * pm[PM.CVBP]
+	zorc = ((refr * zdth) + zrefex) * pm[PM.CVBC]
+	zbod += (zdth * pm[PM.CVNRBO]) + (znrfex * pm[PM.CVBO])
+	orn += zorn
+	orp += zorp
+	orc += zorc
+	bod += zbod
+	return dox, bod, zoo, orn, orp, orc, tam, no3, po4, zeat, zco2, dozoo, zbod, znit, zpo4, zogr, zdth, \
+		zorn, zorp, zorc
+
+
+@njit(cache=True)
+def balrx(ballit, tw, cflit, co2, delt60, depcor, pm, po4, no3, tam, dox, orn, orp, orc, bod, benal):
+	''' simulate behavior of benthic algae in units of umoles p per liter internally; externally
+	the population is expressed as mg biomass per m2 of bottom surface'''
+	cvpb = pm[PM.CVPB]
+	bal  = (benal / cvpb) * depcor
+
+	gro, res = algro(ballit, po4, no3, tam, tw, cflit, delt60, pm)
+
+	# cfbalg and cfbalr are the ratios of benthic algae to phytoplankton growth and respiration rates
+	grobal = (gro * pm[PM.CFBALG] - res * pm[PM.CFBALR]) * bal
+	if grobal > 0.0:
+		grobal = grochk(po4, no3, tam, co2, pm, grobal, grobal)
+
+	# benthic algae death; overcrowding above mbal sloughs the excess
+	nit = no3 + tam  if pm[PM.NSFG] else no3
+	slof = 0.0
+	if po4 > pm[PM.PALDH] and nit > pm[PM.NALDH]:
+		balmax = pm[PM.MBAL] * depcor
+		if bal < balmax:
+			ald = pm[PM.ALDL]
+		else:
+			ald  = pm[PM.ALDH]
+			slof = bal - balmax
+	else:
+		ald = pm[PM.ALDH]
+	if dox < pm[PM.ANAER]:
+		ald += pm[PM.OXALD]
+	dthbal = (ald * bal) + slof
+
+	# new population, kept above the minimum level by adjusting growth and then death
+	minbal = pm[PM.MINBAL] * depcor
+	bal += grobal
+	if bal < minbal:
+		grobal += minbal - bal
+		bal     = minbal
+	bal -= dthbal
+	if bal < minbal:
+		dthbal -= minbal - bal
+		bal     = minbal
 
-def balrx2(ballit,tw,TAMFG,NSFG,delt60,cvbpn,PHFG,DECFG,cvbpc,alnpr,cvbo,refr,cvnrbo,cvpb,
-	depcor,limit,cvbcl,co2,numbal,mbalgr,cmmpb,cmmnb,balr20,tcbalg,balvel,cmmv,BFIXFG,
-	cslit,cmmd1,cmmd2,tcbalr,frrif,cremvl,cmmbi,binv,tcgraz,cslof1,cslof2,minbal,
-	fravl,BNPFG,campr,nmingr,pmingr,cmingr,lmingr,nminc,nmaxfx,grores,
-	po4,no3,tam,dox,orn,orp,orc,bod,benal,limbal,baco2,balcla,dobalg,bodbal,tambal,
-	no3bal,po4bal,balgro,bdth,balorn,balorp,balorc):
-
-	''' simulate behavior of up to four types of benthic algae using
-	algorithms adapted from the dssamt model.  this subroutine was
-	adapted from balrx'''
-	nmgpum = 0.0140067
-	cmgpum = 0.012011
-	pmgpum = 0.0309738
-
-	# compute total biomass of all benthic algal types
-	sumba = 0.0
-	do 10 i= 1, numbal
-		sumba = sumba + benal(i)
-	# 10   continue
-	
-	# convert to umoles p/l
-	sumbal = (sumba / cvpb) * depcor * frrif
-
-	# initialize variables for cumulative net growth/removal
-	# of benthic algae types, and for growth affecting available n conc.
-	grotot = 0.0
-	grtotn = 0.0
-	sumgro = 0.0
-	sumgrn = 0.0
-	sumdth = 0.0
-
-	for i in range(numbal):    # do 20 i = 1, numbal
-		# convert benal to units of umoles phosphorus/l (bal) for
-		# internal calculations, and adjust for % riffle to which
-		# periphyton are limited
-		bal(i) = (benal(i) / cvpb) * depcor * frrif
-
-		# compute unit growth and respiration rates
-		nfixfg,limbal(i),groba,resba = algro2 (ballit,po4,no3,tw,mbalgr(i),cmmpb(i),tamfg,tam,nsfg,cmmnb(i),balr20(i),
-		delt60,limit,tcbalg(i),balvel,cmmv,bfixfg(i),cslit(i),cmmd1(i),cmmd2(i),sumba,tcbalr(i),
-		nmingr,pmingr,lmingr,nmaxfx,grores(i), nfixfg,limbal(i),groba,resba)
-
-		# calculate net growth rate of algae; grobal is expressed as
-		# umoles phosphorus per liter per interval; benthic algae growth
-		# will be expressed in terms of volume rather than area for the
-		# duration of the subroutines subordinate to balrx; the output
-		# values for benthic algae are converted to either mg biomass per
-		# sq meter or mg chla per sq meter, whichever the user specifies
-		grobal(i) = (groba- resba) * bal(i)
-
-		# track growth that affects water column available n concentrations
-		if NFIXFG != 1:     # algae are not fixing n, net growth affects concentrations
-			groban = grobal(i)
-		else:               # algae that are fixing n affect water column n through respiration only
-			groban = -resba * bal(i)
-
-		# calculate cumulative net growth of algal types simulated so far
-		grotot = grotot + grobal(i)
-
-		# calculate cumulative algal growth that affects available n
-		grtotn = grtotn + groban
-
-		if grobal(i) > 0.0 and grotot > 0.0:
-			# check that cumulative growth rate of algal types does not exceed
-			# limitations imposed by the availability of required nutrients;
-			# if so, reduce growth rate of last algal type
-
-			grotmp = grotot # set temporary variable for comparison purposes
-			grotot = grochk (po4,no3,tam,phfg,decfg,co2,cvbpc,cvbpn,nsfg,nmingr,pmingr,cmingr,nfixfg,grtotn,grotot)
-			if grotot < 0.0:            # this should never happen
-				grotot = 0.0
-
-			# compare nutrient-checked growth to original cumulative total,
-			if grotot < grotmp:
-				# adjust growth rate of last algal type
-				grobal(i) = grobal(i) - (grotmp - grotot)
-				# track changes in growth that affect available n concentrations
-				if nfixfg != 1:     # n-fixation not occurring, all growth affects n
-					groban = grobal(i)
-				else:  # n-fixation is occurring, proportionately adjust respiration (groban)
-					groban = groban * grotot / grotmp
-
-		# calculate benthic algae removal
-		crem = cremvl * depcor * frrif
-		cslof1(i), cslof2(i), balvel, dthbal(i) = balrem (crem,sumba,sumbal,cmmbi,tcgraz,tw,binv,bal(i),
-		cslof1(i),cslof2(i),balvel, dthbal(i))
-
-		# add the net growth
-		bal(i) = bal(i) + grobal(i)
-
-		balmin = minbal * depcor * frrif
-		if bal(i) < balmin and grobal(i) < 0.0:   # adjust net growth rate so that population does not fall below minimum level
-			grotm2 = grobal(i)      # set temporary variable for growth
-			grobal(i) = grobal(i) + (balmin- bal(i))
-			bal(i) = balmin
-			# adjust growth that affects available n concentrations
-			if NFIXFG != 1:     # n-fixation not occurring, all growth affects n
-				groban = grobal(i)
-			else:                # n-fixation is occurring, proportionately adjust respiration (groban)
-				groban = groban * grobal(i) / grotm2
-
-		# subtract death/removal
-		bal(i) = bal(i) - dthbal(i)
-		if bal(i) < balmin:  # adjust death rate so that population does not drop below minimum level
-			dthbal(i) = dthbal(i) - (balmin- bal(i))
-			if dthbal(i) < 0.0:
-				dthbal(i) = 0.0
-			bal(i) = balmin
-
-		# calculate total net growth and removal of all benthic algae types
-		sumgro = sumgro + grobal(i)
-		sumdth = sumdth + dthbal(i)
-		sumgrn = sumgrn + groban
-		# update internal loop tracking variables for cumulative growth 
-		# to account for grochk and minimum biomass adjustments
-		grotot = sumgro
-		grtotn = sumgrn
-	# 20   continue
-
-	# update do state variable to account for net effect of benthic algae photosynthesis and respiration
-	dobalg = cvpb * cvbo * sumgro
-	if dox > -dobalg:          # enough oxygen available to satisfy demand
+	dobalg = cvpb * pm[PM.CVBO] * grobal
+	if dox > -dobalg:
 		dox += dobalg
-	else:                      # take only available oxygen
+	else:
 		dobalg = -dox
 		dox    = 0.0
 
-	# calculate amount of refractory organic constituents which result from benthic algae death
-	balorn = refr * sumdth * cvbpn * nmgpum
-	balorp = refr * sumdth * pmgpum
-	balorc = refr * sumdth * cvbpc * cmgpum
-
-	# add to orc the carbon associated with nutrients immediately
-	# released to the available pool from removed benthic algal biomass
-	balorc = balorc + fravl * (1.0 - refr) * sumdth * cvbpc * cmgpum
-
-	# calculate amount of nonrefractory organics (bod) which result from benthic algae death
-	bodbal = cvnrbo * (1.0 - fravl) * cvpb * sumdth
-
-	# perform materials balance resulting from benthic algae death
-	orn,orp,orc,bod = orgbal (balorn,balorp,balorc,bodbal,orn,orp,orc,bod)
-
-	# perform materials balance resulting from uptake of nutrients by benthic algae
-	po4,tam,no3,baco2,tambal,no3bal,po4bal = nutup2 (sumgro,nsfg,cvbpn,alnpr,cvbpc,phfg,decfg,bnpfg,
-	campr,sumgrn,nminc,po4,tam,no3,baco2,tambal,no3bal,po4bal)
-	baco2 = -baco2
-
-	# update available nutrient pools with nutrients immediately
-	# released from benthic algal biomass removal processes; nutrients
-	# immediately cycled are calculated as a fraction (fravl) of the
-	# nonrefractory biomass
-	avlpho = fravl * (1.0 - refr) * sumdth * pmgpum
-	po4    = po4 + avlpho
-	po4bal = po4bal + avlpho
-
-	# nitrogen is released as tam if tam is simulated otherwise as no3
-	avlnit = fravl * (1.0 - refr) * sumdth * cvbpn * nmgpum
-	if TAMFG:
-		tam = tam + avlnit
-		tambal = tambal + avlnit
-	else:
-		no3 = no3 + avlnit
-		no3bal = no3bal + avlnit
-
-	# convert biomass to units of mg biomass/m2 and ug chlorophyll a/m2
-	do 30 i = 1, numbal
-		benal(i)  = (bal(i) * cvpb) / (depcor * frrif)
-		balgro(i) = (grobal(i) *cvpb) / (depcor * frrif)
-		bdth(i)   =   (dthbal(i) *cvpb) /(depcor * frrif)
-		balcla(i) =  benal(i) * cvbcl
-		# 30   continue
-
-	return  po4,no3,tam,dox,orn,orp,orc,bod,benal,limbal,baco2,balcla,dobalg,bodbal,tambal,no3bal,po4bal,balgro,bdth,balorn,balorp,balorc
-
+	refr   = pm[PM.REFR]
+	balorn = refr * dthbal * pm[PM.CVBPN] * 0.014
+	balorp = refr * dthbal * 0.031
+	balorc = refr * dthbal * pm[PM.CVBPC] * 0.012
+	bodbal = pm[PM.CVNRBO] * cvpb * dthbal
+	orn += balorn
+	orp += balorp
+	orc += balorc
+	bod += bodbal
+
+	po4, tam, no3, alco2, tambal, no3bal, po4bal = nutrup(grobal, pm, po4, tam, no3)
+
+	benal = (bal * cvpb) / depcor
+	return po4, no3, tam, dox, orn, orp, orc, bod, benal, -alco2, dobalg, bodbal, tambal, no3bal, po4bal, \
+		(grobal * cvpb) / depcor, (dthbal * cvpb) / depcor, balorn, balorp, balorc
@@ -6,7 +6,8 @@ Conversion of HSPF HPERQUA.FOR module into Python'''
 
 from math import exp
 from numpy import zeros, where, full
-from numba import jit
+from numba import njit, types
+from numba.typed import Dict
 from HSP2.utilities import initm, make_numba_dict, hourflag
 
 ''' DESIGN NOTES
@@ -23,6 +24,10 @@ FACTA  = 1.0
 CFACTA = 2.7548E-04
 PFACTA = 1.0
 
+# timeseries computed by _pqual_ for every constituent
+OUTPUTS = ('SQO', 'SOQSP', 'SOQOC', 'SOQC', 'IOQC', 'AOQC', 'POQC', 'WASHQS', 'SCRQS', 'SOQS', 'SOQO',
+           'SOQUAL', 'IOQUAL', 'AOQUAL', 'POQUAL', 'PQADDR', 'PQADWT', 'PQADEP', 'SLIQO', 'INFLOW')
+
 
 def pqual(store, siminfo, uci, ts):
 	''' Simulate quality constituents (other than sediment, heat, dox, and co2)
@@ -43,24 +48,24 @@ def pqual(store, siminfo, uci, ts):
 	simlen = siminfo['steps']
 	tindex = siminfo['tindex']
 
-	for name in ['SURO', 'IFWO', 'AGWO', 'PERO', 'WSSD', 'SCRSD']:
+	for name in ['SURO', 'IFWO', 'AGWO', 'PERO', 'WSSD', 'SCRSD', 'SLIQSP', 'ILIQC', 'ALIQC']:
 		if name not in ts:
 			ts[name] = zeros(simlen)
-	SURO  = ts['SURO']
-	IFWO  = ts['IFWO']
-	AGWO  = ts['AGWO']
-	PERO  = ts['PERO']
-	WSSD  = ts['WSSD']
-	SCRSD = ts['SCRSD']
-	PREC  = ts['PREC']
 
 	ui = make_numba_dict(uci)
-	sdlfac = ui['SDLFAC']
-	slifac = ui['SLIFAC']
-	ilifac = ui['ILIFAC']
-	alifac = ui['ALIFAC']
+	ui['simlen'] = simlen
+	ui['delt60'] = delt60
+	ui['nquals'] = nquals
+
+	ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True)
 
-	DAYFG = hourflag(siminfo, 0, dofirst=True).astype(bool)
+	# per-constituent flags and parameters (pm) and monthly/timeseries inputs (pq), stacked by constituent
+	pm = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
+	for key in ('QSDFG', 'QSOFG', 'QIFWFG', 'QAGWFG', 'SQO', 'WSFAC'):
+		pm[key] = zeros(nquals)
+	pq = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:, ::1])
+	for key in ('POTFW', 'POTFS', 'ACQOP', 'SQOLIM', 'IOQCP', 'AOQCP', 'PQADFX', 'PQADCN') + OUTPUTS:
+		pq[key] = zeros((nquals, simlen))
 
 	index = 0
 	for constituent in constituents:     # simulate constituent
@@ -68,62 +73,30 @@ def pqual(store, siminfo, uci, ts):
 		# update UI values for this constituent here!
 		ui_flags = uci['PQUAL' + str(index) + '_FLAGS']
 		ui_parms = uci['PQUAL' + str(index) + '_PARAMETERS']
-		name = 'IQUAL' + str(index)  # arbitrary identification
+		i = index - 1
 
 		qualid = ui_flags['QUALID']
 		qtyid  = ui_flags['QTYID']
-		QSDFG  = ui_flags['QSDFG']
-		QSOFG  = ui_flags['QSOFG']
-		QIFWFG = ui_flags['QIFWFG']
-		QAGWFG = ui_flags['QAGWFG']
-		sqo    = ui_parms['SQO']
-		wsqop  = ui_parms['WSQOP']
-		wsfac = 2.30 / wsqop
-
-		# preallocate output arrays (always needed)
-		SQO    = ts[name + '_SQO']    = zeros(simlen)
-
-		# preallocate output arrays (QUALSD)
-		SOQSP = ts[name + '_SOQSP'] = zeros(simlen)
-
-		# preallocate output arrays (QUALOF)
-		SOQOC = ts[name + '_SOQOC'] = zeros(simlen)
-		SOQC = ts[name + '_SOQC'] = zeros(simlen)
-		IOQC = ts[name + '_IOQC'] = zeros(simlen)
-		AOQC = ts[name + '_AOQC'] = zeros(simlen)
-		POQC = ts[name + '_POQC'] = zeros(simlen)
-
-		WASHQS = ts[name + '_WASHQS'] = zeros(simlen)
-		SCRQS  = ts[name + '_SCRQS'] = zeros(simlen)
-		SOQS   = ts[name + '_SOQS'] = zeros(simlen)
-		SOQO   = ts[name + '_SOQO'] = zeros(simlen)
-		SOQS   = ts[name + '_SOQS']   = zeros(simlen)
-		SOQUAL = ts[name + '_SOQUAL'] = zeros(simlen)
-		IOQUAL = ts[name + '_IOQUAL'] = zeros(simlen)
-		AOQUAL = ts[name + '_AOQUAL'] = zeros(simlen)
-		POQUAL = ts[name + '_POQUAL'] = zeros(simlen)
-
-		# preallocate output arrays for atmospheric deposition
-		PQADDR = ts[name + '_PQADDR'] = zeros(simlen)
-		PQADWT = ts[name + '_PQADWT'] = zeros(simlen)
-		PQADEP = ts[name + '_PQADEP'] = zeros(simlen)
-
-		SLIQO = ts[name + '_SLIQO'] = zeros(simlen)  # lateral inflow
-		INFLOW = ts[name + '_INFLOW'] = zeros(simlen)  # total inflow
-
-		for name in ['SLIQSP', 'ILIQC', 'ALIQC']:
-			if name not in ts:
-				ts[name] = zeros(simlen)
-		SLIQSP = ts['SLIQSP']
-		ILIQC  = ts['ILIQC']
-		ALIQC  = ts['ALIQC']
-
-		ts['POTFW'] = initm(siminfo, uci, ui_flags['VPFWFG'], 'PQUAL' + str(index) + '_MONTHLY/POTFW', ui_parms['POTFW'])
-		ts['POTFS'] = initm(siminfo, uci, ui_flags['VPFSFG'], 'PQUAL' + str(index) + '_MONTHLY/POTFS', ui_parms['POTFS'])
-		ts['ACQOP'] = initm(siminfo, uci, ui_flags['VQOFG'], 'PQUAL' + str(index) + '_MONTHLY/ACQOP', ui_parms['ACQOP'])
-		ts['SQOLIM'] = initm(siminfo, uci, ui_flags['VQOFG'], 'PQUAL' + str(index) + '_MONTHLY/SQOLIM', ui_parms['SQOLIM'])
-		ts['IOQCP'] = initm(siminfo, uci, ui_flags['VIQCFG'], 'PQUAL' + str(index) + '_MONTHLY/IOQC', ui_parms['IOQC'])
-		ts['AOQCP'] = initm(siminfo, uci, ui_flags['VAQCFG'], 'PQUAL' + str(index) + '_MONTHLY/AOQC', ui_parms['AOQC'])
+		pm['QSDFG'][i]  = ui_flags['QSDFG']
+		pm['QSOFG'][i]  = ui_flags['QSOFG']
+		pm['QIFWFG'][i] = ui_flags['QIFWFG']
+		pm['QAGWFG'][i] = ui_flags['QAGWFG']
+		pm['SQO'][i]    = ui_parms['SQO']
+		pm['WSFAC'][i]  = 2.30 / ui_parms['WSQOP']
+
+		pq['POTFW'][i]  = initm(siminfo, uci, ui_flags['VPFWFG'], 'PQUAL' + str(index) + '_MONTHLY/POTFW', ui_parms['POTFW'])[0:simlen]
+		pq['POTFS'][i]  = initm(siminfo, uci, ui_flags['VPFSFG'], 'PQUAL' + str(index) + '_MONTHLY/POTFS', ui_parms['POTFS'])[0:simlen]
+		pq['ACQOP'][i]  = initm(siminfo, uci, ui_flags['VQOFG'], 'PQUAL' + str(index) + '_MONTHLY/ACQOP', ui_parms['ACQOP'])[0:simlen]
+		pq['SQOLIM'][i] = initm(siminfo, uci, ui_flags['VQOFG'], 'PQUAL' + str(index) + '_MONTHLY/SQOLIM', ui_parms['SQOLIM'])[0:simlen]
+
+		# interflow and groundwater concentrations in qty/acre-inch
+		pq['IOQCP'][i] = initm(siminfo, uci, ui_flags['VIQCFG'], 'PQUAL' + str(index) + '_MONTHLY/IOQC', ui_parms['IOQC'])[0:simlen] * 3630.0
+		if ui_flags['VIQCFG'] == 3 or ui_flags['VIQCFG'] == 4:
+			pq['IOQCP'][i] *= 6.238e-5
+		pq['AOQCP'][i] = initm(siminfo, uci, ui_flags['VAQCFG'], 'PQUAL' + str(index) + '_MONTHLY/AOQC', ui_parms['AOQC'])[0:simlen] * 3630.0
+		if ui_flags['VAQCFG'] == 3 or ui_flags['VAQCFG'] == 4:
+			pq['AOQCP'][i] *= 6.238e-5
+
 		if 'FLAGS' in uci:
 			u = uci['FLAGS']
 			# get atmos dep timeseries
@@ -142,49 +115,113 @@ def pqual(store, siminfo, uci, ts):
 			ts['PQADFX'] = zeros(simlen)
 		if 'PQADCN' not in ts:
 			ts['PQADCN'] = zeros(simlen)
+		pq['PQADFX'][i] = ts['PQADFX'][0:simlen]
+		pq['PQADCN'][i] = ts['PQADCN'][0:simlen]
+
+	############################################################################
+	_pqual_(ui, ts, pm, pq)
+	############################################################################
+
+	for index in range(1, nquals + 1):
+		name = 'IQUAL' + str(index)  # arbitrary identification
+		for key in OUTPUTS:
+			ts[name + '_' + key] = pq[key][index - 1]
+
+	return errorsV, ERRMSG
+
+
+@njit(cache=True)
+def _pqual_(ui, ts, pm, pq):
+	''' PQUAL processing, all constituents advance together one time step at a time '''
+	simlen = int(ui['simlen'])
+	nquals = int(ui['nquals'])
+	delt60 = ui['delt60']
+	slifac = ui['SLIFAC']
+	ilifac = ui['ILIFAC']
+	alifac = ui['ALIFAC']
+
+	QSDFG  = pm['QSDFG']
+	QSOFG  = pm['QSOFG']
+	QIFWFG = pm['QIFWFG']
+	QAGWFG = pm['QAGWFG']
+	WSFAC  = pm['WSFAC']
+
+	SURO   = ts['SURO']
+	IFWO   = ts['IFWO']
+	AGWO   = ts['AGWO']
+	PERO   = ts['PERO']
+	WSSD   = ts['WSSD']
+	SCRSD  = ts['SCRSD']
+	PREC   = ts['PREC']
+	SLIQSP = ts['SLIQSP']
+	ILIQC  = ts['ILIQC']
+	ALIQC  = ts['ALIQC']
+	DAYFG  = ts['DAYFG']
+
+	POTFW  = pq['POTFW']
+	POTFS  = pq['POTFS']
+	ACQOP  = pq['ACQOP']
+	SQOLIM = pq['SQOLIM']
+	IOQCP  = pq['IOQCP']
+	AOQCP  = pq['AOQCP']
+	PQADFX = pq['PQADFX']
+	PQADCN = pq['PQADCN']
+
+	SQO    = pq['SQO']
+	SOQSP  = pq['SOQSP']
+	SOQOC  = pq['SOQOC']
+	SOQC   = pq['SOQC']
+	IOQC   = pq['IOQC']
+	AOQC   = pq['AOQC']
+	POQC   = pq['POQC']
+	WASHQS = pq['WASHQS']
+	SCRQS  = pq['SCRQS']
+	SOQS   = pq['SOQS']
+	SOQO   = pq['SOQO']
+	SOQUAL = pq['SOQUAL']
+	IOQUAL = pq['IOQUAL']
+	AOQUAL = pq['AOQUAL']
+	POQUAL = pq['POQUAL']
+	PQADDR = pq['PQADDR']
+	PQADWT = pq['PQADWT']
+	PQADEP = pq['PQADEP']
+	SLIQO  = pq['SLIQO']   # lateral inflow
+
+	# state carried between time steps for each constituent
+	sqo    = pm['SQO'].copy()
+	soqo   = zeros(nquals)
+	remqop = zeros(nquals)
+	soqs   = zeros(nquals)
+	soqoc  = zeros(nquals)
+
+	for loop in range(simlen):
+		dayfg  = DAYFG[loop]
+		suro   = SURO[loop]
+		ifwo   = IFWO[loop]
+		agwo   = AGWO[loop]
+		pero   = PERO[loop]
+		wssd   = WSSD[loop]
+		scrsd  = SCRSD[loop]
+		sliqsp = SLIQSP[loop]
+		iliqc  = ILIQC[loop]
+		aliqc  = ALIQC[loop]
+		prec   = PREC[loop]
+
+		for i in range(nquals):
+			sliqo  = SLIQO[i, loop]
+			potfw  = POTFW[i, loop]
+			potfs  = POTFS[i, loop]
+			acqop  = ACQOP[i, loop]
+			sqolim = SQOLIM[i, loop]
 
-		POTFW  = ts['POTFW']
-		POTFS  = ts['POTFS']
-		ACQOP  = ts['ACQOP']
-		SQOLIM = ts['SQOLIM']
-		IOQCP  = ts['IOQCP']
-		AOQCP  = ts['AOQCP']
-		PQADFX = ts['PQADFX']
-		PQADCN = ts['PQADCN']
-
-		soqo = 0.0
-		remqop = 0.0
-		soqs = 0.0
-		for loop in range(simlen):
-			dayfg  = DAYFG[loop]
-			suro   = SURO[loop]
-			ifwo   = IFWO[loop]
-			agwo   = AGWO[loop]
-			pero   = PERO[loop]
-			wssd   = WSSD[loop]
-			scrsd  = SCRSD[loop]
-			sliqsp = SLIQSP[loop]   # undefined name: SLIQSP ???
-			sliqo  = SLIQO[loop]    #  undefined name: SLIQO ???
-			potfw  = POTFW[loop]
-			potfs  = POTFS[loop]
-			acqop  = ACQOP[loop]
-			sqolim = SQOLIM[loop]
-			ioqc   = IOQCP[loop]
-			aoqc   = AOQCP[loop]
-			iliqc  = ILIQC[loop]
-			aliqc  = ALIQC[loop]
-			
 			# simulate by association with sediment
 			suroqs = 0.0
 			soqsp  = -1.0e30
 			scrqs  = 0.0
 			washqs = 0.0
-			if QSDFG:
+			if QSDFG[i]:
 				# qualsd()
-				''' Simulate removal of a quality constituent from the land surface by association with sediment'''
-				if dayfg:     # it is the first interval of the day
-					potfw = POTFW[loop]
-					potfs = POTFS[loop]
+				# Simulate removal of a quality constituent from the land surface by association with sediment
 
 				# associate with washoff of detached sediment - units are qty/acre-ivl
 				if wssd == 0.0:
@@ -196,13 +233,13 @@ def pqual(store, siminfo, uci, ts):
 
 				# associate with scouring of soil matrix - units are qty/acre-ivl
 				scrqs = 0.0  if scrsd == 0.0 else scrsd * potfs
-				soqs = washqs + scrqs  # sum removals
+				soqs[i] = washqs + scrqs  # sum removals
 
 				# calculate effective outflow potency factor
 				lsosed = wssd + scrsd
-				soqsp = soqs / lsosed  if lsosed > 0.0 else -1.0e30
+				soqsp = soqs[i] / lsosed  if lsosed > 0.0 else -1.0e30
 
-				suroqs = soqs
+				suroqs = soqs[i]
 				# end of qualsd()
 
 			# simulate by association with overland flow
@@ -210,49 +247,50 @@ def pqual(store, siminfo, uci, ts):
 			adtot  = 0.0
 			adfxfx = 0.0
 			adcnfx = 0.0
-			if QSOFG:   #constituent n is simulated by association with overland flow;
+			qsofg = QSOFG[i]
+			if qsofg:   #constituent n is simulated by association with overland flow;
 				# qualof()
-				''' Simulate accumulation of a quality constituent on the land surface and its removal by a constant unit rate and by overland flow'''	
+				# Simulate accumulation of a quality constituent on the land surface and its removal by a constant unit rate and by overland flow
 				if dayfg:
-					remqop = acqop / sqolim
+					remqop[i] = acqop / sqolim
 
-					if QSOFG == 1:
+					if qsofg == 1:
 						# update storage due to accumulation and removal which occurs independent of runoff - units are qty/acre
-						sqo = acqop + sqo * (1.0 - remqop)
+						sqo[i] = acqop + sqo[i] * (1.0 - remqop[i])
 
 				# handle atmospheric deposition
-				adfxfx = PQADFX[loop]  # dry deposition
-				adcnfx = PQADCN[loop] * PREC[loop] * 3630.0 # wet deposition
+				adfxfx = PQADFX[i, loop]  # dry deposition
+				adcnfx = PQADCN[i, loop] * prec * 3630.0 # wet deposition
 
 				adtot = adfxfx + adcnfx  # total atmospheric deposition
 				intot = adtot + sliqo             	# add lateral inflow
 
-				if QSOFG == 2:  # update storage due to accumulation and removal which occurs independent of runoff - units are qty/acre
-					dummy = remqop + intot / (acqop / remqop)
+				if qsofg == 2:  # update storage due to accumulation and removal which occurs independent of runoff - units are qty/acre
+					dummy = remqop[i] + intot / (acqop / remqop[i])
 					if dummy > 1.0:
 						dummy = 1.0
-					sqo = acqop * (delt60 / 24.0) + sqo * (1.0 - dummy)**(delt60 / 24.0)
+					sqo[i] = acqop * (delt60 / 24.0) + sqo[i] * (1.0 - dummy)**(delt60 / 24.0)
 
-				sqo = sqo + intot    	# update storage
+				sqo[i] = sqo[i] + intot    	# update storage
 
 				# simulate washoff by overland flow - units are qty/acre-ivl
-				soqo = 0.0
-				if suro > 0.0 and sqo > 0.0:  # there is overland flow # there is some quality constituent (no. qofp) in storage, washoff can occur
-					dummy = suro * wsfac
+				soqo[i] = 0.0
+				if suro > 0.0 and sqo[i] > 0.0:  # there is overland flow # there is some quality constituent (no. qofp) in storage, washoff can occur
+					dummy = suro * WSFAC[i]
 					if dummy < 1.0e-5:
-						soqo = 0.0  # washoff too small for stable calculation - set to zero
+						soqo[i] = 0.0  # washoff too small for stable calculation - set to zero
 					else:           # calculate washoff
 						dummy = 1.0 - exp(-dummy)
-						soqo  = sqo * dummy
+						soqo[i] = sqo[i] * dummy
 
 						# update storage of constituent - units are in qty/acre
-						sqo = sqo - soqo
+						sqo[i] = sqo[i] - soqo[i]
 
 				# compute and output concentration - units are qty/acre-inch
-				soqoc = soqo / suro  if suro > 0.0 else -1.0e30  # soqoc not used ???
+				soqoc[i] = soqo[i] / suro  if suro > 0.0 else -1.0e30  # soqoc not used ???
 				# end qualof()
-				
-				suroqo = soqo
+
+				suroqo = soqo[i]
 
 			# sum outflows of constituent n from the land surface
 			soqual = suroqs + suroqo
@@ -264,12 +302,10 @@ def pqual(store, siminfo, uci, ts):
 			soqc = soqual / suro  if suro > 0.0 else -1.0e30
 
 			# simulate quality constituent in interflow
-			if QIFWFG != 0:
+			if QIFWFG[i] != 0:
 				# qualif()
-				'''Simulate quality constituents by fixed concentration in interflow'''
-				ioqc = IOQCP[loop] * 3630.0
-				if ui_flags['VIQCFG'] == 3 or ui_flags['VIQCFG'] == 4:
-					ioqc = ioqc * 6.238e-5
+				# Simulate quality constituents by fixed concentration in interflow
+				ioqc = IOQCP[i, loop]   # already in qty/acre-inch
 
 				# simulate constituents carried by interflow - units are qty/acre-ivl
 				if ifwo > 0.0:      # there is interflow
@@ -277,26 +313,24 @@ def pqual(store, siminfo, uci, ts):
 					ioqual = ioqce * ifwo
 				else:   # no interflow
 					ioqce  = -1.0e30
-					ioqual = 0.0				
+					ioqual = 0.0
 				# qualif()
 
 				poqual = poqual + ioqual   # cumulate outflow
-				
+
 			# simulate quality constituent in active groundwater outflow
-			if QAGWFG:   #	constituent n is present in groundwater
+			if QAGWFG[i]:   #	constituent n is present in groundwater
 				# qualgw()
-				''' Simulate quality constituents by fixed concentration in groundwater flow'''
-				aoqc = AOQCP[loop] * 3630.0
-				if ui_flags['VAQCFG'] == 3 or ui_flags['VAQCFG'] == 4:
-					aoqc = aoqc * 6.238e-5
-					
+				# Simulate quality constituents by fixed concentration in groundwater flow
+				aoqc = AOQCP[i, loop]   # already in qty/acre-inch
+
 				# simulate constituents carried by groundwater flow - units are qty/acre-ivl
 				if agwo > 0.0:      # there is baseflow
 					aoqce  = aliqc * alifac + aoqc * (1.0- alifac)  if aliqc >= 0.0 else aoqc   # kufac bit definedn aliqc bit defubed
 					aoqual = aoqce * agwo
 				else:             # no baseflow
 					aoqce  = -1.0e30
-					aoqual = 0.0				
+					aoqual = 0.0
 				# end of qualgw()
 
 				poqual = poqual + aoqual   # cumulate outflow
@@ -304,30 +338,29 @@ def pqual(store, siminfo, uci, ts):
 			poqc = poqual / pero  if pero > 0.0 else -1.0e30
 
 			# end of constituent computations, save
-			SOQUAL[loop] = soqual
-			IOQUAL[loop] = ioqual
-			AOQUAL[loop] = aoqual
-			POQUAL[loop] = poqual
-
-			SQO[loop]    = sqo
-			SOQSP[loop]  = soqsp
-			if soqoc > -1:
-				SOQOC[loop] = soqoc / 3630.0  # 3630 converts from ft3 to ac-in
+			SOQUAL[i, loop] = soqual
+			IOQUAL[i, loop] = ioqual
+			AOQUAL[i, loop] = aoqual
+			POQUAL[i, loop] = poqual
+
+			SQO[i, loop]    = sqo[i]
+			SOQSP[i, loop]  = soqsp
+			if soqoc[i] > -1:
+				SOQOC[i, loop] = soqoc[i] / 3630.0  # 3630 converts from ft3 to ac-in
 			else:
-				SOQOC[loop] = soqoc
-			SOQC[loop]   = soqc / 3630.0
-			IOQC[loop]   = (ioqual / ifwo / 3630.0) if ifwo > 0.0 else -1.0e30
-			AOQC[loop]   = (aoqual / agwo / 3630.0) if agwo > 0.0 else -1.0e30
-			POQC[loop]   = poqc / 3630.0 if pero > 0.0 else -1.0e30
-
-			WASHQS[loop] = washqs
-			SCRQS[loop]  = scrqs
-			SOQS[loop]   = soqs
-			SOQO [loop]  = soqo
-
-			PQADWT[loop] = adcnfx
-			PQADDR[loop] = adfxfx
-			PQADEP[loop] = adtot
-	
-	return errorsV, ERRMSG
-
+				SOQOC[i, loop] = soqoc[i]
+			SOQC[i, loop]   = soqc / 3630.0
+			IOQC[i, loop]   = (ioqual / ifwo / 3630.0) if ifwo > 0.0 else -1.0e30
+			AOQC[i, loop]   = (aoqual / agwo / 3630.0) if agwo > 0.0 else -1.0e30
+			POQC[i, loop]   = poqc / 3630.0 if pero > 0.0 else -1.0e30
+
+			WASHQS[i, loop] = washqs
+			SCRQS[i, loop]  = scrqs
+			SOQS[i, loop]   = soqs[i]
+			SOQO[i, loop]   = soqo[i]
+
+			PQADWT[i, loop] = adcnfx
+			PQADDR[i, loop] = adfxfx
+			PQADEP[i, loop] = adtot
+
+	return
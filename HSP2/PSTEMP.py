@@ -6,7 +6,7 @@ Conversion of HSPF HPERTMP.FOR module into Python'''
 
 ''' NOTE: needs lots of Celcius temp conversions, in and out'''
 
-from numpy import zeros, where, ones, float64, full
+from numpy import zeros, where, ones, float64, full, int64
 from numba import njit
 from HSP2.utilities  import hoursval, initm, make_numba_dict
 
@@ -21,18 +21,53 @@ ERRMSG = ['SLTMP temperature less than 100C',   # MSG0
 MINTMP = -100
 MAXTMP = 100
 
+
 def pstemp(store, siminfo, uci, ts):
 	'''Estimate soil temperatures in a pervious land segment'''
-	errorsV = zeros(len(ERRMSG), dtype=int)
-	
+
 	simlen = siminfo['steps']
 	tindex = siminfo['tindex']
 
-	ui = make_numba_dict(uci)
-	if 'TSOPFG' in ui:
-		TSOPFG = ui['TSOPFG']
+	u = uci['PARAMETERS']
+	if 'SLTVFG' in u:
+		ts['ASLT'] = initm(siminfo, uci, u['SLTVFG'], 'MONTHLY_ASLT', u['ASLT'])
+		ts['BSLT'] = initm(siminfo, uci, u['SLTVFG'], 'MONTHLY_BSLT', u['BSLT'])
+	else:
+		ts['ASLT'] = full(simlen, u['ASLT'])
+		ts['BSLT'] = full(simlen, u['BSLT'])
+	if 'ULTVFG' in u:
+		ts['ULTP1'] = initm(siminfo, uci, u['ULTVFG'], 'MONTHLY_ULTP1', u['ULTP1'])
+		ts['ULTP2'] = initm(siminfo, uci, u['ULTVFG'], 'MONTHLY_ULTP2', u['ULTP2'])
 	else:
-		TSOPFG = 0
+		ts['ULTP1'] = full(simlen, u['ULTP1'])
+		ts['ULTP2'] = full(simlen, u['ULTP2'])
+	if 'LGTVFG' in u:
+		ts['LGTP1'] = initm(siminfo, uci, u['LGTVFG'], 'MONTHLY_LGTP1', u['LGTP1'])
+		ts['LGTP2'] = initm(siminfo, uci, u['LGTVFG'], 'MONTHLY_LGTP2', u['LGTP2'])
+	else:
+		ts['LGTP1'] = full(simlen, u['LGTP1'])
+		ts['LGTP2'] = full(simlen, u['LGTP2'])
+
+	ts['HRFG'] = hoursval(siminfo, ones(24), dofirst=True).astype(float64)  # numba Dict limitation
+
+	ui = make_numba_dict(uci)
+	ui['simlen'] = simlen
+	ui['errlen'] = len(ERRMSG)
+
+	############################################################################
+	errorsV = _pstemp_(ui, ts)
+	############################################################################
+
+	return errorsV, ERRMSG
+
+
+@njit(cache=True)
+def _pstemp_(ui, ts):
+	''' Estimate soil temperatures in a pervious land segment '''
+	errorsV = zeros(int(ui['errlen'])).astype(int64)
+	simlen = int(ui['simlen'])
+
+	TSOPFG = ui['TSOPFG'] if 'TSOPFG' in ui else 0.0
 	AIRTFG = int(ui['AIRTFG'])
 
 	# initial conditions
@@ -51,42 +86,22 @@ def pstemp(store, siminfo, uci, ts):
 		lgtmp = ui['LGTMP']
 
 	# preallocate storage
-	AIRTC = ts['AIRTC'] = zeros(simlen)
-	SLTMP = ts['SLTMP'] = zeros(simlen)
-	ULTMP = ts['ULTMP'] = zeros(simlen)
-	LGTMP = ts['LGTMP'] = zeros(simlen)
+	ts['AIRTC'] = AIRTC = zeros(simlen)
+	ts['SLTMP'] = SLTMP = zeros(simlen)
+	ts['ULTMP'] = ULTMP = zeros(simlen)
+	ts['LGTMP'] = LGTMP = zeros(simlen)
 	
 	AIRTMP = ts['AIRTMP']
+	HRFG   = ts['HRFG']
 
-	u = uci['PARAMETERS']
-	if 'SLTVFG' in u:
-		ts['ASLT'] = initm(siminfo, uci, u['SLTVFG'], 'MONTHLY_ASLT', u['ASLT'])
-		ts['BSLT'] = initm(siminfo, uci, u['SLTVFG'], 'MONTHLY_BSLT', u['BSLT'])
-	else:
-		ts['ASLT'] = full(simlen, u['ASLT'])
-		ts['BSLT'] = full(simlen, u['BSLT'])
-	if 'ULTVFG' in u:
-		ts['ULTP1'] = initm(siminfo, uci, u['ULTVFG'], 'MONTHLY_ULTP1', u['ULTP1'])
-		ts['ULTP2'] = initm(siminfo, uci, u['ULTVFG'], 'MONTHLY_ULTP2', u['ULTP2'])
-	else:
-		ts['ULTP1'] = full(simlen, u['ULTP1'])
-		ts['ULTP2'] = full(simlen, u['ULTP2'])
-	if 'LGTVFG' in u:
-		ts['LGTP1'] = initm(siminfo, uci, u['LGTVFG'], 'MONTHLY_LGTP1', u['LGTP1'])
-		ts['LGTP2'] = initm(siminfo, uci, u['LGTVFG'], 'MONTHLY_LGTP2', u['LGTP2'])
-	else:
-		ts['LGTP1'] = full(simlen, u['LGTP1'])
-		ts['LGTP2'] = full(simlen, u['LGTP2'])
-
-	ASLT  = ts['ASLT']
+	# monthly regression intercepts converted to centigrade once, outside the time loop
+	ASLT  = (ts['ASLT'] - 32.0) * 0.555
 	BSLT  = ts['BSLT']
 	ULTP1 = ts['ULTP1']
 	ULTP2 = ts['ULTP2']
 	LGTP1 = ts['LGTP1']
 	LGTP2 = ts['LGTP2']
-
-	ts['HRFG'] = hoursval(siminfo, ones(24), dofirst=True).astype(float64)  # numba Dict limitation
-	HRFG = ts['HRFG']
+	AULT  = (ULTP1 - 32.0) * 0.555
 
 	airts = AIRTMP[0]
 
@@ -100,13 +115,13 @@ def pstemp(store, siminfo, uci, ts):
 
 		# determine soil temperatures - units are deg c temperature of surface layer is always estimated using a linear regression with air temperature
 		if hrfg:    # it is time to update surface layer temperature
-			aslt = (ASLT[loop]- 32.0) * 0.555
+			aslt = ASLT[loop]
 			bslt = BSLT[loop]
 			sltmp = aslt + bslt * airtc
 
 		if TSOPFG == 1: # compute subsurface temperature using regression and monthly values
 			if hrfg:   # it is time to update subsurface temperatures temperature of upper layer is computed by regression with air temperature
-				ault  = (ULTP1[loop]- 32.0) * 0.555
+				ault  = AULT[loop]
 				bult  = ULTP2[loop]
 				ultmp = ault + bult * airtc
 
@@ -162,4 +177,4 @@ def pstemp(store, siminfo, uci, ts):
 		ULTMP[loop] = (ultmp* 9.0 / 5.0) + 32.0
 		LGTMP[loop] = lgtmp
 
-	return errorsV, ERRMSG
\ No newline at end of file
+	return errorsV
@@ -4,8 +4,8 @@ License: LGPL2
 
 Conversion of HSPF HPERGAS.FOR module into Python''' 
 
-from numpy import zeros, where, full
-from numba import jit
+from numpy import zeros, where, full, float64
+from numba import njit
 from HSP2.utilities import initm, make_numba_dict, hourflag
 
 
@@ -34,24 +34,6 @@ def pwtgas(store, siminfo, uci, ts):
     delt    = siminfo['delt']
     tindex  = siminfo['tindex']
 
-    ui = make_numba_dict(uci)
-    elevgc = ((288.0 - 0.00198 * ui['ELEV'])  /288.0)**5.256
-
-    CSNOFG = int(ui['CSNOFG'])
-    sotmp  = ui['SOTMP']
-    iotmp  = ui['IOTMP']
-    aotmp  = ui['AOTMP']
-    sodox  = ui['SODOX']
-    soco2  = ui['SOCO2']
-    iodox  = ui['IODOX']
-    ioco2  = ui['IOCO2']
-    aodox  = ui['AODOX']
-    aoco2  = ui['AOCO2']
-    sdlfac = ui['SDLFAC']
-    slifac = ui['SLIFAC']
-    ilifac = ui['ILIFAC']
-    alifac = ui['ALIFAC']
-
     u = uci['PARAMETERS']
     if 'IDVFG' in u:
         ts['IDOXP'] = initm(siminfo, uci, u['IDVFG'], 'MONTHLY_IDOXP', u['IDOXP'])
@@ -62,24 +44,70 @@ def pwtgas(store, siminfo, uci, ts):
     else:
         ts['ICO2P'] = full(simlen, u['ICO2P'])
     if 'GDVFG' in u:
-        gdvfg = u['GDVFG']
         ts['ADOXP'] = initm(siminfo, uci, u['GDVFG'], 'MONTHLY_ADOXP', u['ADOXP'])
     else:
-        gdvfg = 0
         ts['ADOXP'] = full(simlen, u['ADOXP'])
     if 'GCVFG' in u:
         ts['ACO2P'] = initm(siminfo, uci, u['GCVFG'], 'MONTHLY_ACO2P', u['ACO2P'])
     else:
         ts['ACO2P'] = full(simlen, u['ACO2P'])
 
-    IDOXP = ts['IDOXP']
-    ICO2P = ts['ICO2P']
-    ADOXP = ts['ADOXP']
-    ACO2P = ts['ACO2P']
-
     for name in ['WYIELD', 'SURO', 'IFWO', 'AGWO', 'SURLI', 'IFWLI', 'AGWLI']:
         if name not in ts:
             ts[name] = zeros(simlen)
+
+    for name in ['SLTMP', 'ULTMP', 'LGTMP', 'SLITMP', 'SLIDOX', 'SLICO2']:
+        if name not in ts:
+            ts[name] = full(simlen, -1.0E30)
+
+    for name in ['ILITMP', 'ILIDOX', 'ILICO2']:
+        if name not in ts:
+            ts[name] = full(simlen, -1.0E30)
+
+    for name in ['ALITMP', 'ALIDOX', 'ALICO2']:
+        if name not in ts:
+            ts[name] = full(simlen, -1.0E30)
+
+    ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True).astype(float64)  # numba Dict limitation
+
+    ui = make_numba_dict(uci)
+    ui['simlen'] = simlen
+
+    ############################################################################
+    _pwtgas_(ui, ts)
+    ############################################################################
+
+    return errorsV, ERRMSG
+
+
+@njit(cache=True)
+def _pwtgas_(ui, ts):
+    ''' Estimate water temperature, dissolved oxygen, and carbon dioxide in the outflows
+    from a pervious landsegment. calculate associated fluxes through exit gates'''
+    simlen = int(ui['simlen'])
+
+    elevgc = ((288.0 - 0.00198 * ui['ELEV'])  /288.0)**5.256
+
+    CSNOFG = int(ui['CSNOFG'])
+    sotmp  = ui['SOTMP']
+    iotmp  = ui['IOTMP']
+    aotmp  = ui['AOTMP']
+    sodox  = ui['SODOX']
+    soco2  = ui['SOCO2']
+    iodox  = ui['IODOX']
+    ioco2  = ui['IOCO2']
+    aodox  = ui['AODOX']
+    aoco2  = ui['AOCO2']
+    sdlfac = ui['SDLFAC']
+    slifac = ui['SLIFAC']
+    ilifac = ui['ILIFAC']
+    alifac = ui['ALIFAC']
+    gdvfg  = ui['GDVFG'] if 'GDVFG' in ui else 0.0
+
+    IDOXP  = ts['IDOXP']
+    ICO2P  = ts['ICO2P']
+    ADOXP  = ts['ADOXP']
+    ACO2P  = ts['ACO2P']
     WYIELD = ts['WYIELD']
     SURO   = ts['SURO']
     IFWO   = ts['IFWO']
@@ -87,55 +115,42 @@ def pwtgas(store, siminfo, uci, ts):
     SURLI  = ts['SURLI']
     IFWLI  = ts['IFWLI']
     AGWLI  = ts['AGWLI']
-
-    for name in ['SLTMP', 'ULTMP', 'LGTMP', 'SLITMP', 'SLIDOX', 'SLICO2']:
-        if name not in ts:
-            ts[name] = full(simlen, -1.0E30)
     SLTMP  = ts['SLTMP']
     ULTMP  = ts['ULTMP']
     LGTMP  = ts['LGTMP']
     SLITMP = ts['SLITMP']
     SLIDOX = ts['SLIDOX']
     SLICO2 = ts['SLICO2']
-
-    for name in ['ILITMP', 'ILIDOX', 'ILICO2']:
-        if name not in ts:
-            ts[name] = full(simlen, -1.0E30)
     ILITMP = ts['ILITMP']
     ILIDOX = ts['ILIDOX']
     ILICO2 = ts['ILICO2']
-
-    for name in ['ALITMP', 'ALIDOX', 'ALICO2']:
-        if name not in ts:
-            ts[name] = full(simlen, -1.0E30)
     ALITMP = ts['ALITMP']
     ALIDOX = ts['ALIDOX']
     ALICO2 = ts['ALICO2']
+    DAYFG  = ts['DAYFG']
 
     # preallocate output arrays
-    SOTMP  = ts['SOTMP']  = zeros(simlen)
-    IOTMP  = ts['IOTMP']  = zeros(simlen)
-    AOTMP  = ts['AOTMP']  = zeros(simlen)
-    SODOX  = ts['SODOX']  = zeros(simlen)
-    SOCO2  = ts['SOCO2']  = zeros(simlen)
-    IODOX  = ts['IODOX']  = zeros(simlen)
-    IOCO2  = ts['IOCO2']  = zeros(simlen)
-    AODOX  = ts['AODOX']  = zeros(simlen)
-    AOCO2  = ts['AOCO2']  = zeros(simlen)
-    SOHT   = ts['SOHT']   = zeros(simlen)
-    IOHT   = ts['IOHT']   = zeros(simlen)
-    AOHT   = ts['AOHT']   = zeros(simlen)
-    POHT   = ts['POHT']   = zeros(simlen)
-    SODOXM = ts['SODOXM'] = zeros(simlen)
-    SOCO2M = ts['SOCO2M'] = zeros(simlen)
-    IODOXM = ts['IODOXM'] = zeros(simlen)
-    IOCO2M = ts['IOCO2M'] = zeros(simlen)
-    AODOXM = ts['AODOXM'] = zeros(simlen)
-    AOCO2M = ts['AOCO2M'] = zeros(simlen)
-    PODOXM = ts['PODOXM'] = zeros(simlen)
-    POCO2M = ts['POCO2M'] = zeros(simlen)
-
-    DAYFG = hourflag(siminfo, 0, dofirst=True).astype(bool)
+    ts['SOTMP']  = SOTMP  = zeros(simlen)
+    ts['IOTMP']  = IOTMP  = zeros(simlen)
+    ts['AOTMP']  = AOTMP  = zeros(simlen)
+    ts['SODOX']  = SODOX  = zeros(simlen)
+    ts['SOCO2']  = SOCO2  = zeros(simlen)
+    ts['IODOX']  = IODOX  = zeros(simlen)
+    ts['IOCO2']  = IOCO2  = zeros(simlen)
+    ts['AODOX']  = AODOX  = zeros(simlen)
+    ts['AOCO2']  = AOCO2  = zeros(simlen)
+    ts['SOHT']   = SOHT   = zeros(simlen)
+    ts['IOHT']   = IOHT   = zeros(simlen)
+    ts['AOHT']   = AOHT   = zeros(simlen)
+    ts['POHT']   = POHT   = zeros(simlen)
+    ts['SODOXM'] = SODOXM = zeros(simlen)
+    ts['SOCO2M'] = SOCO2M = zeros(simlen)
+    ts['IODOXM'] = IODOXM = zeros(simlen)
+    ts['IOCO2M'] = IOCO2M = zeros(simlen)
+    ts['AODOXM'] = AODOXM = zeros(simlen)
+    ts['AOCO2M'] = AOCO2M = zeros(simlen)
+    ts['PODOXM'] = PODOXM = zeros(simlen)
+    ts['POCO2M'] = POCO2M = zeros(simlen)
 
     for loop in range(simlen):
         dayfg   = DAYFG[loop]
@@ -303,4 +318,4 @@ def pwtgas(store, siminfo, uci, ts):
         AODOXM[loop] = aodoxm
         AOCO2M[loop] = aoco2m
 
-    return errorsV, ERRMSG
\ No newline at end of file
+    return
@@ -1,261 +1,424 @@
 ''' Copyright (c) 2020 by RESPEC, INC.
 Author: Robert Heaphy, Ph.D.
 License: LGPL2
-'''
 
-from numpy import where
-from HRCHOXR import oxrx
-from HRCHNUT import nutrx
-from HRCHPLK import plank
-from HRCHPHC import phcarb
+Conversion of HSPF HRCHRQL.FOR module into Python. The biochemical sections of
+RCHRES (OXRX, NUTRX, PLANK and PHCARB) are simulated together: rqual() runs as
+the OXRX activity and _rqual_ advects one state vector shared by the sections,
+then calls oxrx(), nutrx(), plank() and phcarb() each interval. The NUTRX, PLANK
+and PHCARB activities only save their results.'''
 
-UUNITS = 1
+from collections import namedtuple
+from numpy import array, zeros, full, where, int64
+from numba import njit
+from HSP2.ADCALC import advect
+from HSP2.utilities import make_numba_dict, initm
+from HSP2 import OXRX, NUTRX, PLANK, PHCARB
+from HSP2.OXRX import oxrx, oxrx_parms
+from HSP2.NUTRX import nutrx, nutrx_parms, ammion
+from HSP2.PLANK import plank, plank_parms, advplk, pksums
+from HSP2.PHCARB import phcarb, phcarb_parms
 
+ERRMSGS = ('PHCARB: the ph solution did not converge in PHCNT iterations',                       #ERRMSG0
+           'PLANK: zooplankton cannot be simulated without phytoplankton',                      #ERRMSG1
+           'PLANK: nitrogen fixation (NSFG) requires total ammonia (NUTRX NH3FG) to be simulated', #ERRMSG2
+           'PLANK: phosphate must be simulated (NUTRX PO4FG) when plankton are simulated',      #ERRMSG3
+           'PHCARB: alkalinity (CONS constituent ALKCON) is not simulated, zero is used',       #ERRMSG4
+           'NUTRX: adsorption of NH4 and PO4 on sediment (ADNHFG, ADPOFG) is not simulated',    #ERRMSG5
+           'NUTRX, PLANK: atmospheric deposition (NUADFG, PLADFG) is not simulated',            #ERRMSG6
+           'PLANK: BALFG = 2 benthic algae are simulated as the single species of BALFG = 1',   #ERRMSG7
+           'PLANK: SDLTFG = 2 turbidity regressions are not simulated, no sediment extinction') #ERRMSG8
 
+MFACTA = 6.2428e-5   # mg.ft3/l to lb
 
-def RQUAL(general, ui, ts):
+# advected state variables (concentrations, ZOO in mg/l) and the section that simulates each
+STATES  = ('DOX', 'BOD', 'NO3', 'TAM', 'NO2', 'PO4', 'PHYTO', 'ZOO', 'ORN', 'ORP', 'ORC', 'TIC', 'CO2')
+SECTION = ('OXRX', 'OXRX', 'NUTRX', 'NUTRX', 'NUTRX', 'NUTRX', 'PLANK', 'PLANK', 'PLANK', 'PLANK', 'PLANK',
+           'PHCARB', 'PHCARB')
+S = namedtuple('RqualState', STATES)(*range(len(STATES)))
+
+# MASS-LINK target group and member subscript to inflow timeseries, lb/ivl
+INFLOWS = {('OXIF', '1'): 'IDOX', ('OXIF', '2'): 'IBOD',
+           ('NUIF1', '1'): 'INO3', ('NUIF1', '2'): 'ITAM', ('NUIF1', '3'): 'INO2', ('NUIF1', '4'): 'IPO4',
+           ('PKIF', '1'): 'IPHYTO', ('PKIF', '2'): 'IZOO', ('PKIF', '3'): 'IORN', ('PKIF', '4'): 'IORP',
+           ('PKIF', '5'): 'IORC', ('PHIF', '1'): 'ITIC', ('PHIF', '2'): 'ICO2'}
+
+# timeseries computed by _rqual_ that are not advected
+AUXILIARY = ('SATDO', 'NH3', 'NH4', 'BENAL', 'PH', 'SATCO2')
+A = namedtuple('RqualAux', AUXILIARY)(*range(len(AUXILIARY)))
+
+# process fluxes of all sections side by side, each section writes its own slice
+FLUXES = OXRX.FLUXES + NUTRX.FLUXES + PLANK.FLUXES + PHCARB.FLUXES
+OXF = 0
+NUF = OXF + len(OXRX.FLUXES)
+PKF = NUF + len(NUTRX.FLUXES)
+PHF = PKF + len(PLANK.FLUXES)
+
+TOTALS = {'TOTDOX': ('READOX', 'BODDOX', 'BENDOX', 'NITDOX', 'PHYDOX', 'ZOODOX', 'BALDOX'),
+          'TOTBOD': ('DECBOD', 'BNRBOD', 'SNKBOD', 'PHYBOD', 'ZOOBOD', 'BALBOD'),
+          'TOTNO3': ('NITNO3', 'DENNO3', 'BODNO3', 'PHYNO3', 'ZOONO3', 'BALNO3'),
+          'TOTTAM': ('NITTAM', 'VOLNH3', 'BNRTAM', 'BODTAM', 'PHYTAM', 'ZOOTAM', 'BALTAM'),
+          'TOTPO4': ('BNRPO4', 'BODPO4', 'PHYPO4', 'ZOOPO4', 'BALPO4'),
+          'TOTPHY': ('SNKPHY', 'ZOOPHY', 'DTHPHY', 'GROPHY'),
+          'TOTZOO': ('GROZOO', 'DTHZOO'),
+          'TOTORN': ('SNKORN', 'PHYORN', 'ZOOORN', 'BALORN'),
+          'TOTORP': ('SNKORP', 'PHYORP', 'ZOOORP', 'BALORP'),
+          'TOTORC': ('SNKORC', 'PHYORC', 'ZOOORC', 'BALORC'),
+          'TOTCO2': ('INVCO2', 'BENCO2', 'BODCO2', 'PHYCO2', 'ZOOCO2', 'BALCO2')}
+
+# SAVE table groups of each section and the timeseries they select; O<state> are exit outputs,
+# saved as O<state><exit> when the reach has more than one exit
+GROUPS = {'OXRX':   {'OXIF': ('IDOX', 'IBOD'), 'OXCF1': ('RODOX', 'ROBOD'), 'OXCF2': ('ODOX', 'OBOD'),
+                     'OXCF3': ('READOX', 'BODDOX', 'BENDOX', 'TOTDOX'),
+                     'OXCF4': ('DECBOD', 'BNRBOD', 'SNKBOD', 'TOTBOD')},
+          'NUTRX':  {'DNUST': ('NO3', 'TAM', 'NO2', 'PO4', 'NH4', 'NH3'),
+                     'NUIF1': ('INO3', 'ITAM', 'INO2', 'IPO4'),
+                     'NUCF1': ('RONO3', 'ROTAM', 'RONO2', 'ROPO4'),
+                     'NUCF9': ('ONO3', 'OTAM', 'ONO2', 'OPO4'),
+                     'NUCF4': ('NITNO3', 'DENNO3', 'BODNO3', 'TOTNO3'),
+                     'NUCF5': ('NITTAM', 'VOLNH3', 'BNRTAM', 'BODTAM', 'TOTTAM'),
+                     'NUCF6': ('BNRPO4', 'BODPO4', 'TOTPO4'),
+                     'NUCF7': ('NITNO2',),
+                     'NUCF8': ('NITDOX', 'BODCO2')},
+          'PLANK':  {'TBENAL': ('BENAL', 'BALCLA'),
+                     'PKST3': ('ORN', 'ORP', 'ORC', 'TORN', 'TORP', 'TORC', 'POTBOD'),
+                     'PKST4': ('TN', 'TP'),
+                     'PKIF': ('IPHYTO', 'IZOO', 'IORN', 'IORP', 'IORC'),
+                     'PKCF1': ('ROPHYTO', 'ROZOO', 'ROORN', 'ROORP', 'ROORC'),
+                     'PKCF2': ('OPHYTO', 'OZOO', 'OORN', 'OORP', 'OORC'),
+                     'PKCF5': ('SNKPHY', 'SNKORN', 'SNKORP', 'SNKORC'),
+                     'PKCF6': ('ZOOPHY', 'DTHPHY', 'GROPHY', 'TOTPHY', 'GROZOO', 'DTHZOO', 'TOTZOO'),
+                     'PKCF7': ('GROBAL', 'DTHBAL'),
+                     'PKCF8': ('PHYORN', 'ZOOORN', 'BALORN', 'TOTORN', 'PHYORP', 'ZOOORP', 'BALORP',
+                               'TOTORP', 'PHYORC', 'ZOOORC', 'BALORC', 'TOTORC'),
+                     'PKCF9': ('PHYDOX', 'ZOODOX', 'BALDOX', 'PHYBOD', 'ZOOBOD', 'BALBOD'),
+                     'PKCF10': ('PHYTAM', 'ZOOTAM', 'BALTAM', 'PHYNO3', 'ZOONO3', 'BALNO3', 'PHYPO4',
+                                'ZOOPO4', 'BALPO4', 'PHYCO2', 'ZOOCO2', 'BALCO2')},
+          'PHCARB': {'PHST': ('TIC', 'CO2', 'PH'), 'PHIF': ('ITIC', 'ICO2'), 'PHCF1': ('ROTIC', 'ROCO2'),
+                     'PHCF2': ('OTIC', 'OCO2'), 'PHCF3': ('INVCO2', 'BENCO2', 'TOTCO2')}}
+
+
+def rqual(store, siminfo, uci, ts):
 	''' Simulate constituents involved in biochemical transformations'''
+	errors = zeros(len(ERRMSGS)).astype(int64)
+	simlen = siminfo['steps']
+	delt60 = siminfo['delt'] / 60.0  # delt60 - simulation time interval in hours
+	delts  = siminfo['delt'] * 60.0
+
+	(nexits, vol, VOL, SROVOL, EROVOL, SOVOL, EOVOL) = uci['advectData']
+	nexits = int(nexits)
+
+	u = uci['PARAMETERS']
+	nutfg = int(u['NUTFG'])
+	plkfg = int(u['PLKFG'])
+	phfg  = int(u['PHFG'])
+
+	# the uci of every section, with the shared RQUAL flags and scour parameters added
+	rq = make_numba_dict(uci['RQUAL'])
+	benrfg = rq.get('BENRFG', 0.0)
+	ox = make_numba_dict(uci)
+	ox['BENRFG'] = benrfg
+	nu = make_numba_dict(uci['NUTRX']) if nutfg else make_numba_dict({})
+	nu['BENRFG'] = benrfg
+	pk = make_numba_dict(uci['PLANK']) if plkfg else make_numba_dict({})
+	ph = make_numba_dict(uci['PHCARB']) if phfg else make_numba_dict({})
+	ph['BENRFG'] = benrfg
+
+	pmox = oxrx_parms(ox, delt60)
+	pmnu = nutrx_parms(nu, delt60)
+	for name in ('TAMFG', 'PO4FG', 'ANAER'):   # PLANK and PHCARB use the NUTRX flags and anaerobic limit
+		pk[name] = pmnu[getattr(NUTRX.PM, name)]
+		ph[name] = pmnu[getattr(NUTRX.PM, name)]
+	pk['PHFG'] = float(phfg)
+	if u.get('HTFG', 0):
+		pk['CFSAEX'] = u['CFSAEX']
+	pmpk = plank_parms(pk, delt60)
+	pmph = phcarb_parms(ph, delt60)
+
+	if plkfg:
+		if pmpk[PLANK.PM.ZOOFG] and not pmpk[PLANK.PM.PHYFG]:
+			errors[1] += 1   # ERRMSG1: zooplankton cannot be simulated without phytoplankton
+		if pmpk[PLANK.PM.NSFG] and not pmpk[PLANK.PM.TAMFG]:
+			errors[2] += 1   # ERRMSG2: nitrogen fixation requires tam
+		if not pmpk[PLANK.PM.PO4FG]:
+			errors[3] += 1   # ERRMSG3: phosphate must be simulated
+
+	# options not simulated yet would give wrong results, they are reported
+	if nutfg and (nu.get('ADNHFG', 0.0) or nu.get('ADPOFG', 0.0)):
+		errors[5] += 1   # ERRMSG5: nh4 and po4 adsorption
+	deposition  = [nu[name] for name in nu.keys() if name.startswith('NUADFG')] if nutfg else []
+	deposition += [pk[name] for name in pk.keys() if name.startswith('PLADFG')] if plkfg else []
+	if any(deposition):
+		errors[6] += 1   # ERRMSG6: atmospheric deposition
+	if plkfg and pmpk[PLANK.PM.BALFG] == 2:
+		errors[7] += 1   # ERRMSG7: multi species benthic algae
+	if plkfg and pmpk[PLANK.PM.SDLTFG] == 2:
+		errors[8] += 1   # ERRMSG8: turbidity regressions
+
+	# states simulated in this reach, their initial values and the section they belong to
+	active = {'OXRX': True, 'NUTRX': nutfg, 'PLANK': plkfg, 'PHCARB': phfg}
+	ACTIVE = array([active[section] for section in SECTION], dtype=float)
+	if nutfg:
+		ACTIVE[S.TAM] = pmnu[NUTRX.PM.TAMFG]
+		ACTIVE[S.NO2] = pmnu[NUTRX.PM.NO2FG]
+		ACTIVE[S.PO4] = pmnu[NUTRX.PM.PO4FG]
+	if plkfg:
+		ACTIVE[S.PHYTO] = pmpk[PLANK.PM.PHYFG]
+		ACTIVE[S.ZOO]   = pmpk[PLANK.PM.ZOOFG] * pmpk[PLANK.PM.PHYFG]
+	zomass = pmpk[PLANK.PM.ZOMASS]
+	c = array([ox.get(name, 0.0) if SECTION[i] == 'OXRX' else nu.get(name, 0.0) if SECTION[i] == 'NUTRX'
+		else pk.get(name, 0.0) if SECTION[i] == 'PLANK' else ph.get(name, 0.0) for i, name in enumerate(STATES)])
+	c[S.ZOO] *= zomass   # organisms/l to mg/l
+	c *= ACTIVE
+
+	# inflows converted from lb/ivl to mg.ft3/l
+	INFLOW = zeros((simlen, len(STATES)))
+	for (group, sub), name in INFLOWS.items():
+		if name in ts and ACTIVE[getattr(S, name[1:])]:
+			INFLOW[:, getattr(S, name[1:])] = ts[name][0:simlen] / MFACTA
+
+	# ph used by ammonia volatilization and ionization (NUTRX PHFLAG: 1 timeseries or PHCARB, 2 constant, 3 monthly)
+	phflag = int(pmnu[NUTRX.PM.PHFLAG])
+	phval  = nu.get('PHVAL', 7.0)
+	if phflag == 1 and 'PHVAL' in ts and not phfg:
+		PHVAL = ts['PHVAL'][0:simlen]
+	else:
+		PHVAL = initm(siminfo, uci['NUTRX'], phflag == 3, 'MONTHLY_PHVAL', phval) if nutfg else full(simlen, phval)
+
+	ALK = zeros(simlen)
+	if phfg:
+		name = f'CONS{int(pmph[PHCARB.PM.ALKCON])}_CON'
+		if name in ts:
+			ALK = ts[name][0:simlen]
+		else:
+			errors[4] += 1   # ERRMSG4: alkalinity is not simulated
+
+	for name in ('AVDEP', 'AVVEL', 'WIND', 'SOLRAD', 'SSED4', 'RO'):
+		if name not in ts:
+			ts[name] = zeros(simlen)
+	TW = ts['TW'][0:simlen] if 'TW' in ts else full(simlen, 68.0)
+	TW = (TW - 32.0) * 0.5555
+	TW = where(TW < -100.0, 20.0, TW)   # fix undefined temps if present
+	WIND = ts['WIND'][0:simlen] * 1609.0   # miles/ivl to m/ivl
+	SSED = ts['SSED4'][0:simlen] if u.get('SEDFG', 0) else zeros(simlen)
+
+	# atmospheric pressure correction, from the HTRCH elevation if heat is simulated
+	elev = u['ELEV'] if u.get('HTFG', 0) else ox.get('ELEV', 0.0)
+	pmox[OXRX.PM.ELEV] = elev
+
+	ui = make_numba_dict({})
+	ui['simlen'] = simlen
+	ui['delt60'] = delt60
+	ui['delts']  = delts
+	ui['nexits'] = nexits
+	ui['svol']   = vol * 43560.0
+	ui['cfpres'] = ((288.0 - 0.001981 * elev) / 288.0)**5.256
+	ui['NUTFG']  = nutfg
+	ui['PLKFG']  = plkfg
+	ui['PHFG']   = phfg
+	ui['PHCFG']  = float(phflag == 1 and phfg)   # ph of the ammonia reactions comes from PHCARB
+	ui['BENRFG'] = benrfg
+	ui['SCRVEL'] = rq.get('SCRVEL', 10.0)
+	ui['SCRMUL'] = rq.get('SCRMUL', 2.0)
+	ui['SATDO']  = ox.get('SATDO', 0.0)
+	ui['PH']     = ph.get('PH', 7.0)
+	ui['BENAL']  = pk.get('BENAL', 0.0)
+	ui['errlen'] = len(ERRMSGS)
+
+	CONC  = zeros((simlen, len(STATES)))
+	ROMAT = zeros((simlen, len(STATES)))
+	OMAT  = zeros((simlen, nexits, len(STATES)))
+	FLX   = zeros((simlen, len(FLUXES)))
+	AUX   = zeros((simlen, len(AUXILIARY)))
 
-	simlen = general['SIMLEN']
-	
-	BENRFG = ui['BENFGX']   # table-type benth-flag
-
-	# table type ACTIVITY
-	NUTFG = ui['NUTFG']
-	PLKFG = ui['PLKFG']
-	PHFG  = ui['PLKFG']
-	
-	# get external time series
-	PREC  = ts['PREC']
-	SAREA = ts['SAREA']
-	AVDEP = ts['AVDEP']
-	AVVEL = ts['AVVEL']
-	TW    = ts['TW'] 
-	if LKFG = 1:
-		WIND  = ts['WIND']
-	
-	nexits, vol, VOL, SROVOL, EROVOL, SOVOL, EOVOL = ui['advectData']
-	
-	TW     = where(TW < -100.0, 20.0, TW)  # fix undefined temps if present
-	AVDEPE = where(UUNITS == 2, AVDEP * 3.28, AVDEP)  # convert to english units) in feet
-	AVVELE = where(UUNITS == 2, AVVEL * 3.28, AVVEL)  # convert to english units)
-	DEPCOR = where(avdepe > 0.0, 3.28084e-3 / AVDEPE, -1.e30)  # # define conversion factor from mg/m2 to mg/l
-	if BENRFG == 1: 
-		scrvel = ui['SCRVEL']   # table-type scour-parms
-		scrmul = ui['SCRMUL']   # table-type scour-parms
-		SCRFAC = where(AVVELE > scrvel, scrmul, 1.0)   # calculate scouring factor
-	
-	# use Closures to capture 'ui' data to minimize calling arguments.
-	#### OXRX  ####
-	
-	IDOX  = ts['IDOX']  # optional, input flow
-	IBOD  = ts['IBOD']  # optional, input flow	
-	
-	# preallocate storage for OXRX calculated results
-	DOX   = ts['DOX']   = zeros(simlen)   # concentration, state variable
-	BOD   = ts['BOD']   = zeros(simlen)   # concentration, state variable
-	SATDO = ts['SATDO'] = zeros(simlen)   # concentration, state variable
-	RODOX = ts['RODOX'] = zeros(simlen)             # reach outflow of DOX
-	ROBOD = ts['ROBOD'] = zeros(simlen)             # reach outflow of BOD
-	ODOX  = ts['ODOX']  = zeros((simlen, nexits))   # reach outflow per gate of DOX
-	OBOD  = ts['OBOD']  = zeros((simlen, nexits))   # reach outflow per gate of BOD
-	
-	oxrx = poxrx()  # returns Numba accelerated function in closure
-	
-	if NUTFG:
-		# get NUTRX specific time series
-		INO3 = ts['INO3']   # optional, input
-		INH3 = ts['INH3']   # optional, input
-		INO2 = ts['INO2']   # optional, input
-		IPO4 = ts['IPO4']   # optional, input
-		
-		NUAFX = setit()  # NUAFXM monthly, constant or time series
-		NUACN = setit()  # NUACNM monthly, constant or time series
-		
-		# preallocate storage for computed time series
-		NO3   = ts['NO3']   = zeros(simlen)   # concentration, state variable
-		NO2   = ts['NO2']   = zeros(simlen)   # concentration, state variable
-		NH3   = ts['NH3']   = zeros(simlen)   # concentration, state variable
-		PO4   = ts['PO4']   = zeros(simlen)   # concentration, state variable 
-		TAM   = ts['TAM']   = zeros(simlen)   # concentration, state variable
-		RONO3 = ts['RONO3'] = zeros(simlen)   # outflow
-		RONO2 = ts['RONO2'] = zeros(simlen)   # outflow
-		RONH3 = ts['RONH3'] = zeros(simlen)   # outflow
-		ROPO4 = ts['ROPO4'] = zeros(simlen)   # outflow
-		ONO3  = ts['ONO3']  = zeros((simlen, NEXITS))   # outflow
-		ONO2  = ts['ONO2']  = zeros((simlen, NEXITS))   # outflow
-		ONH3  = ts['ONH3']  = zeros((simlen, NEXITS))   # outflow
-		OPO4  = ts['OPO4']  = zeros((simlen, NEXITS))   # outflow
-		 
-		nutrx = pnutrx()  # returns Numba accelerated function in closure		
-		
-	if PLKFG:
-		# get PLANK specific time series
-		IPHYTO = ts['IPHYTO']   # optional
-		IZOO   = ts['IZOO']     # optional
-		IORN   = ts['IORN']     # optional
-		IORP   = ts['IORP']     # optional
-		IORC   = ts['IORC']     # optional
-		WASH   = ts['WASH']
-		SOLRAD = ts['SOLRAD']
-		 
-		# preallocate arrays for better performance
-		ORN    = ts['PKST3_ORN']    = zeros(simlen)  # state variable
-		ORP    = ts['PKST3_ORP']    = zeros(simlen)  # state variable
-		ORC    = ts['PKST3_ORC']    = zeros(simlen)  # state variable
-		TORN   = ts['PKST3_TORN']   = zeros(simlen)  # state variable
-		TORP   = ts['PKST3_TORP']   = zeros(simlen)  # state variable
-		TORC   = ts['PKST3_TORC']   = zeros(simlen)  # state variable
-		POTBOD = ts['PKST3_POTBOD'] = zeros(simlen)  # state variable
-		
-		PHYTO  = ts['PHYTO']        = zeros(simlen)  # concentration
-		ZOO    = ts['ZOO']          = zeros(simlen)  # concentration
-		BENAL  = ts['BENAL']        = zeros(simlen)  # concentration
-		PHYCLA = ts['PHYCLA']       = zeros(simlen)  # concentration
-		BALCLA = ts['BALCLA']       = zeros(simlen)  # concentration
-		
-		ROPHYTO  = ts['ROPHYTO']  = zeros(simlen)  # total outflow
-		ROZOO    = ts['ROZOO']    = zeros(simlen)  # total outflow
-		ROBENAL  = ts['ROBENAL']  = zeros(simlen)  # total outflow
-		ROPHYCLA = ts['ROPHYCLA'] = zeros(simlen)  # total outflow
-		ROBALCLA = ts['ROBALCLA'] = zeros(simlen)  # total outflow
-		
-		OPHYTO  = ts['OPHYTO']  = zeros((simlen, nexits)) # outflow by gate	
-		OZOO    = ts['OZOO']    = zeros((simlen, nexits)) # outflow by gate	 	
-		OBENAL  = ts['OBENAL']  = zeros((simlen, nexits)) # outflow by gate	 	
-		OPHYCLA = ts['OPHYCLA'] = zeros((simlen, nexits)) # outflow by gate	 	
-		OBALCLA = ts['OBALCLA'] = zeros((simlen, nexits)) # outflow by gate	 	
-		
-		BINV   = setit()   # ts (BINVFG==1), monthly (BINVFG)
-		PLADFX = setit()   # time series, monthly(PLAFXM)
-		PLADCN = setit()   # time series, monthly(PLAFXM)		
-		
-		plank = pplank()  # returns Numba accelerated function in closure
-	
-	if PHFG:
-		# get PHCARB() specific external time series
-		ALK  = ts['CON']    # ALCON only
-		ITIC = ts['ITIC']   # or zero if not present
-		ICO2 = ts['ICO2']   # or zero if not present
-
-		
-		# preallocate output arrays for speed
-		PH     = ts['PH']    = zeros(simlen)            # state variable
-		TIC    = ts['TIC']   = zeros(simlen)            # state variable
-		CO2    = ts['CO2']   = zeros(simlen)            # state variable
-		ROTIC  = ts['ROTIC'] = zeros(simlen)            # reach total outflow
-		ROCO2  = ts['ROCO2'] = zeros(simlen)            # reach total outflow
-		OTIC   = ts['OTIC']  = zeros((simlen, nexits))  # outflow by exit
-		OCO2   = ts['OCO2']  = zeros((simlen, nexits))  # outflow by exit
-		TOTCO2 = ts['TOTCO2'] = zeros(simlen)            #  ??? computed, but not returned???			
-
-		phcarb = pphcarb()  # returns Numba accelerated function in closure
-		
-	############## master simulation loop  #####################	
+	############################################################################
+	args = (ui, c, ACTIVE, pmox, pmnu, pmpk, pmph, INFLOW, PHVAL, ALK, TW, ts['AVDEP'], ts['AVVEL'], WIND,
+		ts['SOLRAD'], SSED, ts['RO'], VOL, SROVOL, EROVOL, SOVOL, EOVOL, CONC, ROMAT, OMAT, FLX, AUX)
+	errors += _rqual_(*args)
+	############################################################################
 
+	CONC[:, S.ZOO] = where(CONC[:, S.ZOO] < -1.0e29, -1.0e30, CONC[:, S.ZOO] / zomass)   # mg/l to organisms/l
+	exits = uci['EXITS']
+	for i, name in enumerate(STATES):
+		if not ACTIVE[i]:
+			continue
+		ts[name] = CONC[:, i]
+		ts['RO' + name] = ROMAT[:, i] * MFACTA
+		ts['I'  + name] = INFLOW[:, i] * MFACTA
+		if nexits > 1:
+			exits['O' + name] = OMAT[:, :, i] * MFACTA
+	for i, name in enumerate(AUXILIARY):
+		ts[name] = AUX[:, i]
+	for i, name in enumerate(FLUXES):
+		ts[name] = FLX[:, i] if name in PLANK.AREAL else FLX[:, i] * MFACTA
+	for name, members in TOTALS.items():
+		ts[name] = sum(ts[member] for member in members)
+
+	if plkfg:
+		cvbcl = pmpk[PLANK.PM.CVBCL]
+		ts['PHYCLA'] = where(ts['PHYTO'] < -1.0e29, -1.0e30, ts['PHYTO'] * cvbcl) if 'PHYTO' in ts else zeros(simlen)
+		ts['BALCLA'] = ts['BENAL'] * cvbcl
+		sums = pksums(pmpk, pmnu[NUTRX.PM.NO2FG], CONC[:, S.PHYTO], CONC[:, S.ZOO] * zomass, CONC[:, S.ORN],
+			CONC[:, S.ORP], CONC[:, S.ORC], CONC[:, S.NO3], CONC[:, S.TAM], CONC[:, S.NO2], CONC[:, S.PO4],
+			CONC[:, S.BOD], VOL)
+		ts.update(sums)
+
+	# the SAVE tables list HSPF groups, select their members
+	for section in GROUPS:
+		usection = uci if section == 'OXRX' else uci[section]
+		if 'SAVE' in usection:
+			expand_save(usection['SAVE'], section, nexits)
+	return errors, ERRMSGS
+
+
+def rqual_section(store, siminfo, uci, ts):
+	''' NUTRX, PLANK and PHCARB are simulated by rqual() in the OXRX activity, running them as
+	activities saves their results'''
+	return zeros(0).astype(int64), ()
+
+
+def expand_save(u, section, nexits):
+	''' replace the group names of a section's SAVE table by the timeseries they select'''
+	for group, names in GROUPS[section].items():
+		if group not in u:
+			continue
+		flag = u.pop(group)
+		for name in names:
+			if name[0] == 'O' and name[1:] in STATES:   # exit outputs
+				for i in range(nexits if nexits > 1 else 0):
+					u[f'{name}{i + 1}'] = flag
+			else:
+				u[name] = max(flag, u.get(name, 0))
+	return
+
+
+def expand_RQUAL_masslinks(flags, uci, dat, recs):
+	''' one mass link record per advected state of the simulated sections'''
+	active = {'OXRX': flags['OXRX'], 'NUTRX': flags['NUTRX'], 'PLANK': flags['PLANK'], 'PHCARB': flags['PHCARB']}
+	if not active['OXRX']:
+		return recs
+	for (group, sub), name in INFLOWS.items():
+		section = SECTION[getattr(S, name[1:])]
+		if not active[section]:
+			continue
+		rec = {}
+		rec['MFACTOR'] = dat.MFACTOR
+		rec['SGRPN'] = section
+		if dat.SGRPN == "ROFLOW":
+			rec['SMEMN'] = 'RO' + name[1:]
+			rec['SMEMSB1'] = ''
+		else:
+			rec['SMEMN'] = 'O' + name[1:]
+			rec['SMEMSB1'] = dat.SMEMSB1
+		rec['SMEMSB2'] = ''
+		rec['TMEMN'] = name
+		rec['TMEMSB1'] = ''
+		rec['TMEMSB2'] = ''
+		rec['SVOL'] = dat.SVOL
+		recs.append(rec)
+	return recs
+
+
+@njit(cache=True)
+def _rqual_(ui, c, ACTIVE, pmox, pmnu, pmpk, pmph, INFLOW, PHVAL, ALK, TW, AVDEP, AVVEL, WIND, SOLRAD, SSED,
+		RO, VOL, SROVOL, EROVOL, SOVOL, EOVOL, CONC, ROMAT, OMAT, FLX, AUX):
+	''' RQUAL processing; all states are advected, then the sections update them in HSPF order'''
+	errors = zeros(int(ui['errlen'])).astype(int64)
+
+	simlen = int(ui['simlen'])
+	nexits = int(ui['nexits'])
+	delt60 = ui['delt60']
+	delts  = ui['delts']
+	svol   = ui['svol']
+	cfpres = ui['cfpres']
+	nutfg  = int(ui['NUTFG'])
+	plkfg  = int(ui['PLKFG'])
+	phfg   = int(ui['PHFG'])
+	phcfg  = int(ui['PHCFG'])
+	benrfg = int(ui['BENRFG'])
+	scrvel = ui['SCRVEL']
+	scrmul = ui['SCRMUL']
+	supsat = pmox[OXRX.PM.SUPSAT]
+	oref   = pmpk[PLANK.PM.OREF]
+	mxstay = pmpk[PLANK.PM.MXSTAY]
+	seed   = pmpk[PLANK.PM.SEED]
+	zomass = pmpk[PLANK.PM.ZOMASS]
+
+	satdo = ui['SATDO']
+	ph    = ui['PH']
+	benal = ui['BENAL']
+	satco2 = -1.0e30
+	nstate = len(c)
+	omat   = zeros(nexits)
 
 	for loop in range(simlen):
-		avdepe = AVDEPE[loop]
-		avvele = AVVELE[loop]
+		vol    = VOL[loop] * 43560.0
+		srovol = SROVOL[loop]
+		erovol = EROVOL[loop]
+		sovol  = SOVOL[loop, :]
+		eovol  = EOVOL[loop, :]
+
+		# advect all simulated states; plankton with the concentration that stays in the reach
+		for k in range(nstate):
+			if ACTIVE[k]:
+				if k == S.PHYTO or k == S.ZOO:
+					mx = mxstay if k == S.PHYTO else mxstay * zomass
+					sd = seed if k == S.PHYTO else seed * zomass
+					c[k], romat = advplk(INFLOW[loop, k], c[k], nexits, svol, vol, srovol, erovol, sovol,
+						eovol, oref, mx, sd, delts, omat)
+				else:
+					c[k], romat = advect(INFLOW[loop, k], c[k], nexits, svol, vol, srovol, erovol, sovol,
+						eovol, omat)
+				ROMAT[loop, k] = romat
+				OMAT[loop, :, k] = omat
+
 		tw     = TW[loop]
-		depcor = DEPCOR[loop]
-		
-		advData = nexits, vol, VOL[loop], SROVOL[loop], EROVOL[loop], SOVOL[loop], EOVOL[loop]		
-		
-		# simulate primary do and bod balances
-		(dox, bod, satdo, rodo, robod, odo, 
-		obod) = oxrx(
-		IDOX[loop], IBOD[loop], WIND[loop], avdepe, avvele, tw, depcor, BENRFG, advData)   
-		
-		
-	
-		if NUTFG == 1:  # simulate primary inorganic nitrogen and phosphorus balances
-			(dox, bod, NO3[loop], NO2[loop], NH3[loop], PO4[loop], TAM[loop], RONO3[loop],
-			 RONO2[loop], RONH3[loop], ROPO4[loop], ONO3[loop], ONO2[loop], ONH3[loop],
-			 OPO4[loop]) = nutrx(
-			 dox, bod, tw, INO3[loop], INH3[loop], INO2[loop], IPO4[loop], NUAFX[loop],
-			 NUACN[loop], PREC[loop], SAREA[loop], advData) 
-			
-			if PLKFG == 1:    # simulate plankton populations and associated reactions
-				(dox, bod, ORN[loop], ORP[loop], ORC[loop], TORN[loop], TORP[loop],
-				 TORC[loop], POTBOD[loop], PHYTO[loop], ZOO[loop], BENAL[loop], 
-				 PHYCLA[loop], BALCLA[loop], ROPHYTO[loop], ROZOO[loop], ROBENAL[loop],
-				 ROPHYCLA[loop], ROBALCLA[loop], OPHYTO[loop], OZOO[loop], 
-				 OBENAL[loop], OPHYCLA[loop], OBALCLA[loop], BINV[loop], PLADFX[loop], 
-				 PLADCN[loop]) = plank(
-				 dox, bod, IPHYTO[loop], IZOO[loop], IORN[loop], IORP[loop], 
-				 IORC[loop], tw, WASH[loop], SOLRAD[loop], PREC[loop], SAREA[loop], advData)
-				
-				if PHFG == 1:   # simulate ph and carbon species
-					
-					(dox, bod, PH[loop], TIC[loop], CO2[loop], ROTIC[loop],
-					 ROCO2[loop], OTIC[loop], OCO2[loop], TOTCO2[loop], 	
-					 ) = phcarb(
-					 dox, bod, ALK[loop], ITIC[loop], ICO2[loop], tw, avdepe, SCRFAC[loop],  advData)
-	
-			
-			# update totals of nutrients
-			rno3  = no3 * vol
-			rtam  = tam * vol
-			rno2  = no2 * vol
-			rpo4  = po4 * vol
-			rnh4  = nh4 * vol
-			rnh3  = nh3 * vol
-			rrno3 = no3 * vol
-			rrtam = tam * vol
-			if ADNHFG == 1:  
-				rrtam += rsnh4(4)  # add adsorbed suspended nh4 to dissolved
-			
-			rrno2 = no2 * vol
-			rrpo4 = po4 * vol
-			if ADPOFG == 1:  
-				rrpo4 += rspo4(4) # add adsorbed suspended po4 to dissolved
-
-		# check do level; if dox exceeds user specified level of supersaturation, then release excess do to the atmosphere
-		doxs = dox
-		if dox > supsat * satdo:
-			dox = supsat * satdo
-		readox = readox + (dox - doxs) * vol
-		totdox = readox + boddox + bendox + nitdox + phydox + zoodox + baldox
-		
-		# update dissolved totals and totals of nutrients
-		rdox = dox * vol
-		rbod = bod * vol
-	return
+		avdepe = AVDEP[loop]
+		avvele = AVVEL[loop]
+		depcor = 3.28084e-3 / avdepe  if avdepe > 0.0 else -1.0e30   # conversion factor from mg/m2 to mg/l
+		scrfac = scrmul  if benrfg == 1 and avvele > scrvel else 1.0  # scouring factor
+		wind   = WIND[loop]
+		phval  = ph  if phcfg else PHVAL[loop]
 
+		f = FLX[loop, :]
+		dox, bod, satdo, korea, bodox = oxrx(c[S.DOX], c[S.BOD], satdo, tw, vol, avdepe, avvele, depcor, scrfac,
+			wind, cfpres, delts, delt60, pmox, f[OXF:NUF])
 
-#@jit(nopython=True)
-def benth (dox, anaer, BRCON, scrfac, depcor, conc):
-	''' simulate benthal release of constituent'''
-	# calculate benthal release of constituent; release is a step function of aerobic/anaerobic conditions, and stream velocity;
-	# scrfac, the scouring factor dependent on stream velocity and depcor, the conversion factor from mg/m2 to mg/l,
-	# both calculated in rqual; releas is expressed in mg/m2.ivl
-	releas = BRCON[0] * scrfac * depcor  if dox > anaer else BRCON[1] * scrfac * depcor
-	conc  += releas
-	return conc, releas
+		no3, tam, no2, po4 = c[S.NO3], c[S.TAM], c[S.NO2], c[S.PO4]
+		decco2 = 0.0
+		if nutfg:
+			dox, no3, tam, no2, po4, decco2 = nutrx(dox, no3, tam, no2, po4, tw, phval, vol, avdepe, depcor,
+				scrfac, korea, wind, bodox, delts, delt60, pmnu, f[NUF:PKF])
 
+		pyco2 = zoco2 = baco2 = 0.0
+		if plkfg:
+			co2 = c[S.CO2]  if phfg else -1.0
+			dox, bod, no3, tam, po4, c[S.PHYTO], c[S.ZOO], benal, c[S.ORN], c[S.ORP], c[S.ORC], pyco2, zoco2, \
+				baco2 = plank(dox, bod, no3, tam, po4, co2, c[S.PHYTO], c[S.ZOO], benal, c[S.ORN], c[S.ORP],
+				c[S.ORC], tw, vol, avdepe, avvele, depcor, SOLRAD[loop], SSED[loop], RO[loop], delt60, pmpk,
+				f[PKF:PHF])
 
-#@jit(nopython=True)
-def decbal(TAMFG, PO4FG, decnit, decpo4, tam, no3, po4):
-	''' perform materials balance for transformation from organic to inorganic material by decay in reach water'''
-	if TAMFG:
-		tam += decnit   # add nitrogen transformed to inorganic nitrogen by biomass decomposition
-	else:
-		no3 += decnit   # add nitrogen transformed to inorganic nitrogen by biomass decomposition
-	if PO4FG:   # add phosphorus transformed to inorganic phosphorus by biomass decomposition to po4 state variable
-		po4 += decpo4
-	return tam, no3, po4
-
-
-#@jit(nopython=True)
-def sink (vol, avdepe, kset, conc, snkmat):
-	''' calculate quantity of material settling out of the control volume; determine the change in concentration as a result of sinking'''
-	if kset > 0.0 and avdepe > 0.17:
-		# calculate concentration change due to outgoing material; snkout is expressed in mass/liter/ivl; kset is expressed as ft/ivl and avdepe as feet
-		snkout = conc * (kset / avdepe)  if kset < avdepe else conc  # calculate portion of material which settles out of the control volume during time step; snkout is expressed as mass/liter.ivl; conc is the concentration of material in the control volume
-		conc  -= snkout        # calculate remaining concentration of material in the control volume
-		snkmat = snkout * vol    # find quantity of material that sinks out; units are  mass.ft3/l.ivl in english system, and mass.m3/l.ivl in metric system
-	else:
-		snkout = 0.0
-		snkmat = 0.0		
-	return conc, snkmat
+		if phfg:
+			c[S.TIC], c[S.CO2], ph, satco2, nerr = phcarb(c[S.TIC], c[S.CO2], ph, ALK[loop], dox, tw, vol, avdepe,
+				depcor, scrfac, korea, cfpres, decco2, pyco2, zoco2, baco2, pmph, f[PHF:])
+			errors[0] += nerr
+
+		# dissolved oxygen is limited to the allowed supersaturation; the excess leaves by reaeration
+		if vol > 0.0 and avdepe > 0.17 and dox > supsat * satdo:
+			dored = dox - supsat * satdo
+			dox  -= dored
+			f[OXF + OXRX.FLUX.READOX] -= dored * vol
+
+		c[S.DOX], c[S.BOD], c[S.NO3], c[S.TAM], c[S.NO2], c[S.PO4] = dox, bod, no3, tam, no2, po4
+		CONC[loop, :] = c
+
+		if nutfg and ACTIVE[S.TAM]:
+			nh3, nh4 = ammion(tw, phval, tam)
+			AUX[loop, A.NH3] = nh3
+			AUX[loop, A.NH4] = nh4
+		AUX[loop, A.SATDO]  = satdo
+		AUX[loop, A.BENAL]  = benal
+		AUX[loop, A.PH]     = ph
+		AUX[loop, A.SATCO2] = satco2
+		svol = vol
+	return errors
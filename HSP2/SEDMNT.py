@@ -4,13 +4,14 @@ License: LGPL2
 
 Conversion of HSPF HPERSED.FOR module into Python''' 
 
-from numpy import zeros, where, int64, full
+from numpy import zeros, where, int64, full, float64
 from numba import njit
 from HSP2.utilities  import initm, make_numba_dict, hourflag
 
 ERRMSG = []
 
 
+
 # english system
 MFACTA = 1.0
 
@@ -27,62 +28,73 @@ def sedmnt(store, siminfo, uci, ts):
 	simlen = siminfo['steps']
 	tindex = siminfo['tindex']
 
-	ui = make_numba_dict(uci)  # Note: all values converted to float automatically
-	if 'VSIVFG' in ui:
-		VSIVFG = ui['VSIVFG']
-	else:
-		VSIVFG = 0
-	if 'SDOPFG' in ui:
-		SDOPFG = ui['SDOPFG']
-	else:
-		SDOPFG = 0
-	CSNOFG = int(ui['CSNOFG'])
-	smpf   = ui['SMPF']
-	krer   = ui['KRER']
-	jrer   = ui['JRER']
-	affix  = ui['AFFIX']
-	nvsi   = ui['NVSI'] * delt / 1440.
-	kser   = ui['KSER']
-	jser   = ui['JSER']
-	kger   = ui['KGER']
-	jger   = ui['JGER']
-
 	u = uci['PARAMETERS']
 	if 'CRVFG' in u:
 		ts['COVERI'] = initm(siminfo, uci, u['CRVFG'], 'MONTHLY_COVER', u['COVER'])
 	else:
 		ts['COVERI'] = full(simlen, u['COVER'])
-	COVERI = ts['COVERI']
-	cover = COVERI[0]   # for numba
 
 	if 'VSIVFG' in u:
 		ts['NVSI'] = initm(siminfo, uci, u['VSIVFG'], 'MONTHLY_NVSI', u['NVSI'])
 	else:
 		ts['NVSI'] = full(simlen, u['NVSI'])
-	NVSI = ts['NVSI'] * delt / 1440.
 
-	if 'RAINF' in ts:
-		RAIN = ts['RAINF']
-	else:
-		RAIN = ts['PREC']
-		
 	for name in ['PREC', 'SLSED', 'SNOCOV', 'SURO', 'SURS']:
 		if name not in ts:
 			ts[name] = zeros(simlen)
+
+	# DAYFG = where(tindex.hour==1, True, False)   # ??? need to check if minute == 0
+	ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True).astype(float64)  # numba Dict limitation
+
+	ui = make_numba_dict(uci)  # Note: all values converted to float automatically
+	ui['simlen'] = simlen
+	ui['delt']   = delt
+
+	############################################################################
+	_sedmnt_(ui, ts)
+	############################################################################
+
+	return errorsV, ERRMSG
+
+
+@njit(cache=True)
+def _sedmnt_(ui, ts):
+	''' Simulate detachment, washoff and scour of sediment on a pervious land segment '''
+	simlen = int(ui['simlen'])
+	delt   = ui['delt']
+
+	VSIVFG = ui['VSIVFG'] if 'VSIVFG' in ui else 0.0
+	SDOPFG = ui['SDOPFG'] if 'SDOPFG' in ui else 0.0
+	CSNOFG = int(ui['CSNOFG'])
+	smpf   = ui['SMPF']
+	krer   = ui['KRER']
+	jrer   = ui['JRER']
+	affix  = ui['AFFIX']
+	nvsi   = ui['NVSI'] * delt / 1440.
+	kser   = ui['KSER']
+	jser   = ui['JSER']
+	kger   = ui['KGER']
+	jger   = ui['JGER']
+
+	COVERI = ts['COVERI']
+	cover  = COVERI[0]
+	NVSI   = ts['NVSI'] * delt / 1440.
+	RAIN   = ts['RAINF'] if 'RAINF' in ts else ts['PREC']
 	PREC   = ts['PREC']
 	SLSED  = ts['SLSED']
 	SNOCOV = ts['SNOCOV']
 	SURO   = ts['SURO']
 	SURS   = ts['SURS']
-	
+	DAYFG  = ts['DAYFG']
+
 	# preallocate output arrays
-	DETS  = ts['DETS']  = zeros(simlen)
-	WSSD  = ts['WSSD']  = zeros(simlen)
-	SCRSD = ts['SCRSD'] = zeros(simlen)
-	SOSED = ts['SOSED'] = zeros(simlen)
-	COVER = ts['COVER'] = zeros(simlen)
+	ts['DETS']  = DETS  = zeros(simlen)
+	ts['WSSD']  = WSSD  = zeros(simlen)
+	ts['SCRSD'] = SCRSD = zeros(simlen)
+	ts['SOSED'] = SOSED = zeros(simlen)
+	ts['COVER'] = COVER = zeros(simlen)
 
-        # HSPF 12.5 has only one sediment block
+	# HSPF 12.5 has only one sediment block
 	dets = ui['DETS']
 
 	# BLOCK SPECIFIC VALUES
@@ -108,9 +120,6 @@ def sedmnt(store, siminfo, uci, ts):
 	delt60 = delt / 60.0  # simulation interval in hours
 	stcap = delt60 * kser * (surs / delt60)**jser if SDOPFG else 0.0
 
-	# DAYFG = where(tindex.hour==1, True, False)   # ??? need to check if minute == 0
-	DAYFG = hourflag(siminfo, 0, dofirst=True).astype(bool)
-	
 	DRYDFG = 1
 	
 	for loop in range(simlen):
@@ -224,4 +233,4 @@ def sedmnt(store, siminfo, uci, ts):
 		SOSED[loop] = sosed
 		COVER[loop] = cover
 
-	return errorsV, ERRMSG
\ No newline at end of file
+	return
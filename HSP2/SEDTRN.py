@@ -5,28 +5,97 @@ License: LGPL2
 
 from numpy import array, zeros, where
 from math import log10, exp
+from numba import njit
 from HSP2.ADCALC import advect
 from HSP2.utilities  import make_numba_dict
 
 ERRMSG = []
 
+
+
 def sedtrn(store, siminfo, uci, ts):
 	''' Simulate behavior of inorganic sediment'''
 
 	errorsV = zeros(len(ERRMSG), dtype=int)
 
 	simlen = siminfo['steps']
-	delt   = siminfo['delt']
-	delt60 = siminfo['delt'] / 60
-	delts  = siminfo['delt'] * 60
 
 	advectData = uci['advectData']
 	(nexits, vol, VOL, SROVOL, EROVOL, SOVOL, EOVOL) = advectData
-	vol = vol * 43560
 
 	ui = make_numba_dict(uci)
-	svol = vol
 	nexits = int(ui['NEXITS'])
+	ui['simlen'] = simlen
+	ui['delt']   = siminfo['delt']
+	ui['nexits'] = nexits
+	ui['svol']   = vol
+
+	# SILT and CLAY tables share parameter names, so prefix them for the numba dict
+	for name in ('SILT', 'CLAY'):
+		for key, value in uci[name].items():
+			ui[f'{name}_{key}'] = float(value)
+
+	if not 'ISED1' in ts:
+		ts['ISED1'] = zeros(simlen)
+	if not 'ISED2' in ts:
+		ts['ISED2'] = zeros(simlen)
+	if not 'ISED3' in ts:
+		ts['ISED3'] = zeros(simlen)
+
+	htfg = int(ui['HTFG'])
+	sandfg = ui['SANDFG']
+	if htfg == 1:
+		TW = ts['TW']
+	elif sandfg != 3:
+		TW = where(ts['TW'] < -100.0, 20.0, ts['TW'])
+	else:
+		TW = zeros(simlen)   # water temperature is not used by the power function method
+
+	OSED1 = zeros((simlen, nexits))
+	OSED2 = zeros((simlen, nexits))
+	OSED3 = zeros((simlen, nexits))
+	OSED4 = zeros((simlen, nexits))
+	if nexits > 1:
+		u = uci['SAVE']
+		key1 = 'OSED1'
+		key2 = 'OSED2'
+		key3 = 'OSED3'
+		key4 = 'OSED4'
+		for i in range(nexits):
+			u[f'{key1}{i + 1}'] = u[key1]
+			u[f'{key2}{i + 1}'] = u[key2]
+			u[f'{key3}{i + 1}'] = u[key3]
+			u[f'{key4}{i + 1}'] = u[key4]
+		del u[key1]
+		del u[key2]
+		del u[key3]
+		del u[key4]
+
+	############################################################################
+	args = (ui, ts, TW, VOL, SROVOL, EROVOL, SOVOL, EOVOL, OSED1, OSED2, OSED3, OSED4)
+	_sedtrn_(*args)
+	############################################################################
+
+	if nexits > 1:
+		exits = uci['EXITS']
+		exits['OSED1'] = OSED1
+		exits['OSED2'] = OSED2
+		exits['OSED3'] = OSED3
+		exits['OSED4'] = OSED4
+
+	return errorsV, ERRMSG
+
+
+@njit(cache=True)
+def _sedtrn_(ui, ts, TW, VOL, SROVOL, EROVOL, SOVOL, EOVOL, OSED1, OSED2, OSED3, OSED4):
+	''' SEDTRN processing '''
+	simlen = int(ui['simlen'])
+	delt60 = ui['delt'] / 60
+	delts  = ui['delt'] * 60
+	nexits = int(ui['nexits'])
+
+	vol  = ui['svol'] * 43560
+	svol = vol
 
 	# table SANDFG
 	sandfg = ui['SANDFG']   # 1: Toffaleti method, 2:Colby method, 3:old HSPF power function
@@ -50,11 +119,11 @@ def sedtrn(store, siminfo, uci, ts):
 	if UUNITS == 1:
 		db50e = db50
 		db50m = db50 * 304.8
-	else: 
+	else:
 		db50e = db50 * 3.28
-		db50m = db50 * 1000.0	
+		db50m = db50 * 1000.0
 	slope = delth / len_
-	
+
 	# SAND PARAMETERS; table SAND-PM
 	if UUNITS == 1:
 		sand_d = ui['D'] * 0.0833
@@ -67,36 +136,34 @@ def sedtrn(store, siminfo, uci, ts):
 	sand_expsnd = ui['EXPSND']
 
 	# SILT PARAMETERS; table SILT-CLAY-PM --- note: first occurance is silt
-	ui_silt = uci['SILT']
 	if UUNITS == 1:
-		silt_d = ui_silt['D'] * 0.0833
-		silt_w = ui_silt['W'] * delts * 0.0254 # convert settling velocity from m/sec to m/ivl
+		silt_d = ui['SILT_D'] * 0.0833
+		silt_w = ui['SILT_W'] * delts * 0.0254 # convert settling velocity from m/sec to m/ivl
 	else:
-		silt_d = ui_silt['D'] * 0.001
-		silt_w = ui_silt['W'] * delts *  0.001  # convert settling velocity from m/sec to m/ivl
-	silt_rho   = ui_silt['RHO']
-	silt_taucd = ui_silt['TAUCD']
-	silt_taucs = ui_silt['TAUCS']
-	silt_m     = ui_silt['M'] * delt60 / 24.0 * 4.880 # convert erodibility coeff from /day to /ivl
-	
+		silt_d = ui['SILT_D'] * 0.001
+		silt_w = ui['SILT_W'] * delts *  0.001  # convert settling velocity from m/sec to m/ivl
+	silt_rho   = ui['SILT_RHO']
+	silt_taucd = ui['SILT_TAUCD']
+	silt_taucs = ui['SILT_TAUCS']
+	silt_m     = ui['SILT_M'] * delt60 / 24.0 * 4.880 # convert erodibility coeff from /day to /ivl
+
 	# CLAY PARAMETERS; table SILT-CLAY-PM --- note: second occurance is clay
-	ui_clay = uci['CLAY']
 	if UUNITS == 1:
-		clay_d = ui_clay['D'] * 0.0833
-		clay_w = ui_clay['W'] * delts * 0.0254 # convert settling velocity from m/sec to m/ivl
+		clay_d = ui['CLAY_D'] * 0.0833
+		clay_w = ui['CLAY_W'] * delts * 0.0254 # convert settling velocity from m/sec to m/ivl
 	else:
-		clay_d = ui_clay['D'] * 0.001
-		clay_w = ui_clay['W'] * delts * 0.001  # convert settling velocity from m/sec to m/ivl
-	clay_rho   = ui_clay['RHO']
-	clay_taucd = ui_clay['TAUCD']
-	clay_taucs = ui_clay['TAUCS']
-	clay_m     = ui_clay['M']	* delt60 / 24.0 * 4.880 # convert erodibility coeff from /day to /ivl
-	
+		clay_d = ui['CLAY_D'] * 0.001
+		clay_w = ui['CLAY_W'] * delts * 0.001  # convert settling velocity from m/sec to m/ivl
+	clay_rho   = ui['CLAY_RHO']
+	clay_taucd = ui['CLAY_TAUCD']
+	clay_taucs = ui['CLAY_TAUCS']
+	clay_m     = ui['CLAY_M']	* delt60 / 24.0 * 4.880 # convert erodibility coeff from /day to /ivl
+
 	# bed sediment conditions; table BED-INIT
 	beddep      = ui['BEDDEP']
 	sand_bedfr  = ui['SANDFR']
 	silt_bedfr  = ui['SILTFR']
-	clay_bedfr  = ui['CLAYFR']	
+	clay_bedfr  = ui['CLAYFR']
 	total_bedfr = sand_bedfr + silt_bedfr + clay_bedfr
 	if abs(total_bedfr - 1.0) > 0.01:
 		pass # error message: sum of bed sediment fractions is not close enough to 1.0
@@ -115,25 +182,10 @@ def sedtrn(store, siminfo, uci, ts):
 	HRAD =  ts['HRAD']
 	TWID =  ts['TWID']
 
-	if not 'ISED1' in ts:
-		ts['ISED1'] = zeros(simlen)
-	if not 'ISED2' in ts:
-		ts['ISED2'] = zeros(simlen)
-	if not 'ISED3' in ts:
-		ts['ISED3'] = zeros(simlen)
-
 	ISED1 = ts['ISED1']   # if present, else ISED is identically zero;  sand
 	ISED2 = ts['ISED2']   # if present, else ISED is identically zero;  silt
 	ISED3 = ts['ISED3']   # if present, else ISED is identically zero;  clay
-	ISED4 = ISED1 + ISED2 + ISED3
 
-	htfg = int(ui['HTFG'])
-	if htfg == 1:
-		TW = ts['TW']
-	if htfg == 0 and sandfg != 3:
-		TW = ts['TW']
-		TW = where(TW < -100.0, 20.0, TW)
-	
 	# preallocate storage for computed time series
 	# WASH     = ts['WASH']    = zeros(simlen)    # washload concentration, state variable
 	# SAND     = ts['SAND']    = zeros(simlen)    # sandload oncentration, state variable
@@ -171,25 +223,6 @@ def sedtrn(store, siminfo, uci, ts):
 	ROSED2 = ts['ROSED2'] = zeros(simlen)  # Total outflows of sediment from the rchres - silt
 	ROSED3 = ts['ROSED3'] = zeros(simlen)  # Total outflows of sediment from the rchres - clay
 	ROSED4 = ts['ROSED4'] = zeros(simlen)  # Total outflows of sediment from the rchres - total
-	OSED1 = zeros((simlen, nexits))
-	OSED2 = zeros((simlen, nexits))
-	OSED3 = zeros((simlen, nexits))
-	OSED4 = zeros((simlen, nexits))
-	if nexits > 1:
-		u = uci['SAVE']
-		key1 = 'OSED1'
-		key2 = 'OSED2'
-		key3 = 'OSED3'
-		key4 = 'OSED4'
-		for i in range(nexits):
-			u[f'{key1}{i + 1}'] = u[key1]
-			u[f'{key2}{i + 1}'] = u[key2]
-			u[f'{key3}{i + 1}'] = u[key3]
-			u[f'{key4}{i + 1}'] = u[key4]
-		del u[key1]
-		del u[key2]
-		del u[key3]
-		del u[key4]
 
 	fact = 1.0 / total_bedfr  # normalize fractions to sum to one
 	sand_bedfr *= fact
@@ -223,6 +256,8 @@ def sedtrn(store, siminfo, uci, ts):
 	wsande = sand_w * 3.28 / delts  # convert fall velocity from m/ivl to ft/sec
 
 	#################### END PSED
+	osed2 = zeros(nexits)
+	osed3 = zeros(nexits)
 
 	for loop in range(simlen):
 
@@ -262,7 +297,7 @@ def sedtrn(store, siminfo, uci, ts):
 		erovol = EROVOL[loop]
 		sovol = SOVOL[loop, :]
 		eovol = EOVOL[loop, :]
-		silt_ssed2, rosed2, osed2 = advect(ised2, silt_ssed2, nexits, svol, vol, srovol, erovol, sovol, eovol)
+		silt_ssed2, rosed2 = advect(ised2, silt_ssed2, nexits, svol, vol, srovol, erovol, sovol, eovol, osed2)
 		silt_rsed2 = silt_ssed2 * vol  	# calculate exchange between bed and suspended sediment
 		# vols = svol
 	
@@ -273,7 +308,7 @@ def sedtrn(store, siminfo, uci, ts):
 			depscr2 = 0.0
 		silt_ssed2 = silt_rsed2 / vol if vol > 0.0 else -1.0e30
 
-		clay_ssed3, rosed3, osed3 = advect(ised3, clay_ssed3, nexits, svol, vol, srovol, erovol, sovol, eovol)
+		clay_ssed3, rosed3 = advect(ised3, clay_ssed3, nexits, svol, vol, srovol, erovol, sovol, eovol, osed3)
 		clay_rsed3 = clay_ssed3 * vol  	# calculate exchange between bed and suspended sediment
 
 		# consider deposition and scour
@@ -292,6 +327,7 @@ def sedtrn(store, siminfo, uci, ts):
 		# simulate sandload.  done after washload because washload affects sand transport if the colby method is used
 		# Following code is #$SANDLD()
 		sands = sand_ssed1  # save starting concentration value
+		psand = 0.0
 		if vol > 0.0:          # rchres contains water
 			if rom > 0.0 and avdepe > 0.17:   # there is outflow from the rchres- perform advection
 				# calculate potential value of sand
@@ -449,10 +485,10 @@ def sedtrn(store, siminfo, uci, ts):
 			ROSED2[loop] = rosed2 * 3.121E-08
 			ROSED3[loop] = rosed3 * 3.121E-08
 			ROSED4[loop] = rosed4 * 3.121E-08
-			OSED1[loop] = osed1 * 3.121E-08
-			OSED2[loop] = osed2 * 3.121E-08
-			OSED3[loop] = osed3 * 3.121E-08
-			OSED4[loop] = osed4 * 3.121E-08
+			OSED1[loop, :] = osed1 * 3.121E-08
+			OSED2[loop, :] = osed2 * 3.121E-08
+			OSED3[loop, :] = osed3 * 3.121E-08
+			OSED4[loop, :] = osed4 * 3.121E-08
 		else:
 			RSED1[loop] = sand_rsed1 * 2.83E-08
 			RSED2[loop] = silt_rsed2 * 2.83E-08
@@ -475,21 +511,15 @@ def sedtrn(store, siminfo, uci, ts):
 			ROSED2[loop] = rosed2 * 2.83E-08
 			ROSED3[loop] = rosed3 * 2.83E-08
 			ROSED4[loop] = rosed4 * 2.83E-08
-			OSED1[loop] = osed1 * 2.83E-08
-			OSED2[loop] = osed2 * 2.83E-08
-			OSED3[loop] = osed3 * 2.83E-08
-			OSED4[loop] = osed4 * 2.83E-08
+			OSED1[loop, :] = osed1 * 2.83E-08
+			OSED2[loop, :] = osed2 * 2.83E-08
+			OSED3[loop, :] = osed3 * 2.83E-08
+			OSED4[loop, :] = osed4 * 2.83E-08
 
-	if nexits > 1:
-		for i in range(nexits):
-			ts['OSED1' + str(i+1)] = OSED1[:, i]
-			ts['OSED2' + str(i + 1)] = OSED2[:, i]
-			ts['OSED3' + str(i + 1)] = OSED3[:, i]
-			ts['OSED4' + str(i + 1)] = OSED4[:, i]
-
-	return errorsV, ERRMSG
+	return
 
 
+@njit(cache=True)
 def bdexch (avdepm, w, tau, taucd, taucs, m, vol, frcsed, susp, bed):
 	''' simulate deposition and scour of a cohesive sediment fraction- silt or clay'''
 	if w > 0.0 and tau < taucd and susp > 1.0e-30:    # deposition will occur
@@ -515,6 +545,85 @@ def bdexch (avdepm, w, tau, taucd, taucs, m, vol, frcsed, susp, bed):
 ''' Sediment Transport in Alluvial Channels, 1963-65 by Bruce Colby.
 This report explains the following empirical algorithm.'''
 
+# Colby charts, built once at import; numba treats these globals as read-only constants
+G = zeros((5,9,7))      # defined by Figure 26
+G[1, 1, 1], G[2, 1, 1], G[3, 1, 1], G[4, 1, 1] = 1.0,   0.30,   0.06,    0.00
+G[1, 2, 1], G[2, 2, 1], G[3, 2, 1], G[4, 2, 1] = 3.00,  3.30,   2.50,    2.00
+G[1, 3, 1], G[2, 3, 1], G[3, 3, 1], G[4, 3, 1] = 5.40,  9.0,    10.0,    20.0
+G[1, 4, 1], G[2, 4, 1], G[3, 4, 1], G[4, 4, 1] = 11.0,  26.0,   50.0,   150.0
+G[1, 5, 1], G[2, 5, 1], G[3, 5, 1], G[4, 5, 1] = 17.0,  49.0,   130.0,  500.0
+G[1, 6, 1], G[2, 6, 1], G[3, 6, 1], G[4, 6, 1] = 29.0,  101.0,  400.0,  1350.0
+G[1, 7, 1], G[2, 7, 1], G[3, 7, 1], G[4, 7, 1] = 44.0,  160.0,  700.0,  2500.0
+G[1, 8, 1], G[2, 8, 1], G[3, 8, 1], G[4, 8, 1] = 60.0,  220.0,  1000.0, 4400.0
+G[1, 1, 2], G[2, 1, 2], G[3, 1, 2], G[4, 1, 2] = 0.38,  0.06,   0.0,    0.0
+G[1, 2, 2], G[2, 2, 2], G[3, 2, 2], G[4, 2, 2] = 1.60,  1.20,   0.65,   0.10
+G[1, 3, 2], G[2, 3, 2], G[3, 3, 2], G[4, 3, 2] = 3.70,  5.0,    4.0,    3.0
+G[1, 4, 2], G[2, 4, 2], G[3, 4, 2], G[4, 4, 2] = 10.0,  18.0,   30.0,   52.0
+G[1, 5, 2], G[2, 5, 2], G[3, 5, 2], G[4, 5, 2] = 17.0,  40.0,   80.0,   160.0
+G[1, 6, 2], G[2, 6, 2], G[3, 6, 2], G[4, 6, 2] = 36.0,  95.0,   230.0,  650.0
+G[1, 7, 2], G[2, 7, 2], G[3, 7, 2], G[4, 7, 2] = 60.0,  150.0,  415.0,  1200.0
+G[1, 8, 2], G[2, 8, 2], G[3, 8, 2], G[4, 8, 2] = 81.0,  215.0,  620.0,  1500.0
+G[1, 1, 3], G[2, 1, 3], G[3, 1, 3], G[4, 1, 3] = 0.14,  0.0,    0.0,    0.0
+G[1, 2, 3], G[2, 2, 3], G[3, 2, 3], G[4, 2, 3] = 1.0,   0.60,   0.15,   0.0
+G[1, 3, 3], G[2, 3, 3], G[3, 3, 3], G[4, 3, 3] = 3.30,  3.00,   1.70,   0.50
+G[1, 4, 3], G[2, 4, 3], G[3, 4, 3], G[4, 4, 3] = 11.0,  15.0,   17.0,   14.0
+G[1, 5, 3], G[2, 5, 3], G[3, 5, 3], G[4, 5, 3] = 20.0,  35.0,   49.0,   70.0
+G[1, 6, 3], G[2, 6, 3], G[3, 6, 3], G[4, 6, 3] = 44.0,  85.0,   150.0,  250.0
+G[1, 7, 3], G[2, 7, 3], G[3, 7, 3], G[4, 7, 3] = 71.0,  145.0,  290.0,  500.0
+G[1, 8, 3], G[2, 8, 3], G[3, 8, 3], G[4, 8, 3] = 100.0, 202.0,  400.0,  700.0
+G[1, 1, 4], G[2, 1, 4], G[3, 1, 4], G[4, 1, 4] = 0.0,   0.0,    0.0,    0.0
+G[1, 2, 4], G[2, 2, 4], G[3, 2, 4], G[4, 2, 4] = 0.70,  0.30,   0.06,   0.0
+G[1, 3, 4], G[2, 3, 4], G[3, 3, 4], G[4, 3, 4] = 2.9,   2.3,    1.0,    0.06
+G[1, 4, 4], G[2, 4, 4], G[3, 4, 4], G[4, 4, 4] = 11.5,  13.0,   12.0,   7.0
+G[1, 5, 4], G[2, 5, 4], G[3, 5, 4], G[4, 5, 4] = 22.0,  31.0,   40.0,   50.0
+G[1, 6, 4], G[2, 6, 4], G[3, 6, 4], G[4, 6, 4] = 47.0,  84.0,   135.0,  210.0
+G[1, 7, 4], G[2, 7, 4], G[3, 7, 4], G[4, 7, 4] = 75.0,  140.0,  240.0,  410.0
+G[1, 8, 4], G[2, 8, 4], G[3, 8, 4], G[4, 8, 4] = 106.0, 190.0,  350.0,  630.0
+G[1, 1, 5], G[2, 1, 5], G[3, 1, 5], G[4, 1, 5] = 0.0,   0.0,    0.0,    0.0
+G[1, 2, 5], G[2, 2, 5], G[3, 2, 5], G[4, 2, 5] = 0.44,  0.06,   0.0,    0.0
+G[1, 3, 5], G[2, 3, 5], G[3, 3, 5], G[4, 3, 5] = 2.8,   1.8,    0.6,    0.0
+G[1, 4, 5], G[2, 4, 5], G[3, 4, 5], G[4, 4, 5] = 12.0,  12.5,   10.0,   4.5
+G[1, 5, 5], G[2, 5, 5], G[3, 5, 5], G[4, 5, 5] = 24.0,  30.0,   35.0,   37.0
+G[1, 6, 5], G[2, 6, 5], G[3, 6, 5], G[4, 6, 5] = 52.0,  78.0,   120.0,  190.0
+G[1, 7, 5], G[2, 7, 5], G[3, 7, 5], G[4, 7, 5] = 83.0,  180.0,  215.0,  380.0
+G[1, 8, 5], G[2, 8, 5], G[3, 8, 5], G[4, 8, 5] = 120.0, 190.0,  305.0,  550.0
+G[1, 1, 6], G[2, 1, 6], G[3, 1, 6], G[4, 1, 6] = 0.0,   0.0,    0.0,    0.0
+G[1, 2, 6], G[2, 2, 6], G[3, 2, 6], G[4, 2, 6] = 0.3,   0.0,    0.0,    0.0
+G[1, 3, 6], G[2, 3, 6], G[3, 3, 6], G[4, 3, 6] = 2.9,   1.4,    0.3,    0.0
+G[1, 4, 6], G[2, 4, 6], G[3, 4, 6], G[4, 4, 6] = 14.0,  11.0,   7.7,    3.0
+G[1, 5, 6], G[2, 5, 6], G[3, 5, 6], G[4, 5, 6] = 27.0,  29.0,   30.0,   30.0
+G[1, 6, 6], G[2, 6, 6], G[3, 6, 6], G[4, 6, 6] = 57.0,  75.0,   110.0,  170.0
+G[1, 7, 6], G[2, 7, 6], G[3, 7, 6], G[4, 7, 6] = 90.0,  140.0,  200.0,  330.0
+G[1, 8, 6], G[2, 8, 6], G[3, 8, 6], G[4, 8, 6] = 135.0, 190.0,  290.0,  520.0
+
+F = zeros((6,11))    # defined by Figure 24
+F[1, 1],  F[2, 1],  F[3, 1],  F[4, 1],  F[5, 1]  = 1.0,  1.1,  1.6,   2.6,   4.2
+F[1, 2],  F[2, 2],  F[3, 2],  F[4, 2],  F[5, 2]  = 1.0,  1.1,  1.65,  2.75,  4.9
+F[1, 3],  F[2, 3],  F[3, 3],  F[4, 3],  F[5, 3]  = 1.0,  1.1,  1.7,   3.0,   5.5
+F[1, 4],  F[2, 4],  F[3, 4],  F[4, 4],  F[5, 4]  = 1.0,  1.12, 1.9,   3.6,   7.0
+F[1, 5],  F[2, 5],  F[3, 5],  F[4, 5],  F[5, 5]  = 1.0,  1.17, 2.05,  4.3,   8.7
+F[1, 6],  F[2, 6],  F[3, 6],  F[4, 6],  F[5, 6]  = 1.0,  1.2,  2.3,   5.5,   11.2
+F[1, 7],  F[2, 7],  F[3, 7],  F[4, 7],  F[5, 7]  = 1.0,  1.22, 2.75,  8.0,   22.0
+F[1, 8],  F[2, 8],  F[3, 8],  F[4, 8],  F[5, 8]  = 1.0,  1.25, 3.0,   9.6,   29.0
+F[1, 9],  F[2, 9],  F[3, 9],  F[4, 9],  F[5, 9]  = 1.0,  1.3,  3.5,   12.0,  43.0
+F[1, 10], F[2, 10], F[3, 10], F[4, 10], F[5, 10] = 1.0,  1.4,  4.9,   22.0,  120.0
+
+T = array([[1.2,  1.15, 1.10, 0.96, 0.90, 0.85, 0.82],
+	   [1.35, 1.25, 1.12, 0.92, 0.86, 0.80, 0.75],
+	   [1.60, 1.40, 1.20, 0.89, 0.80, 0.72, 0.66],
+	   [2.00, 1.65, 1.30, 0.85, 0.72, 0.63, 0.55]]).T                     # Temperature adjustment, Figure 24
+
+DF   = array([0.10, 0.20, 0.30, 0.60, 1.00, 2.00, 6.00, 10.00, 20.00, 1.E2])               # Depths for Figure 24
+CF   = array([0.00, 1.E4, 5.E4, 1.E5, 1.5E5])  	                       # Concentrations of sediment for Figure 24
+P    = array([0.60, 0.90, 1.0, 1.0, 0.83, 0.60, 0.40, 0.25, 0.15, 0.09, 0.05])  # Percentage Effect for Figure 24
+DP   = array([0.10, 0.15, 0.20, 0.30, 0.40, 0.50, 0.60, 0.70, 0.80, 0.90, 1.00]) # Median diameters for Figure 24
+DG   = array([0.10, 1.00, 10.0, 100.0])                              # Depth values for Figure 26
+VG   = array([1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 10.0])           # Velocity values for Figure 26
+D50G = array([0.10, 0.20, 0.30, 0.40, 0.60, 0.80])                  # Median values for figure 26
+TEMP = array([32.0, 40.0, 50.0, 70.0, 80.0, 90.0, 100.0])  # Temperatures for lookup in Figure 26
+
+
+@njit(cache=True)
 def colby(v, db50, fhrad, fsl, tempr):
 # 	Colby's method to calculate the capacity of the flow to transport sand.
 #
@@ -525,82 +634,6 @@ def colby(v, db50, fhrad, fsl, tempr):
 #         temperature..................tmpr....deg f.......32-100 deg.
 #         fine sediment concentration..fsl.....mg/liter....0-200000 ppm
 #         total sediment load..........gsi.....ton/day.ft..
-	G = zeros((5,9,7))      # defined by Figure 26
-	G[1, 1, 1], G[2, 1, 1], G[3, 1, 1], G[4, 1, 1] = 1.0,   0.30,   0.06,    0.00
-	G[1, 2, 1], G[2, 2, 1], G[3, 2, 1], G[4, 2, 1] = 3.00,  3.30,   2.50,    2.00
-	G[1, 3, 1], G[2, 3, 1], G[3, 3, 1], G[4, 3, 1] = 5.40,  9.0,    10.0,    20.0
-	G[1, 4, 1], G[2, 4, 1], G[3, 4, 1], G[4, 4, 1] = 11.0,  26.0,   50.0,   150.0
-	G[1, 5, 1], G[2, 5, 1], G[3, 5, 1], G[4, 5, 1] = 17.0,  49.0,   130.0,  500.0
-	G[1, 6, 1], G[2, 6, 1], G[3, 6, 1], G[4, 6, 1] = 29.0,  101.0,  400.0,  1350.0
-	G[1, 7, 1], G[2, 7, 1], G[3, 7, 1], G[4, 7, 1] = 44.0,  160.0,  700.0,  2500.0
-	G[1, 8, 1], G[2, 8, 1], G[3, 8, 1], G[4, 8, 1] = 60.0,  220.0,  1000.0, 4400.0
-	G[1, 1, 2], G[2, 1, 2], G[3, 1, 2], G[4, 1, 2] = 0.38,  0.06,   0.0,    0.0
-	G[1, 2, 2], G[2, 2, 2], G[3, 2, 2], G[4, 2, 2] = 1.60,  1.20,   0.65,   0.10
-	G[1, 3, 2], G[2, 3, 2], G[3, 3, 2], G[4, 3, 2] = 3.70,  5.0,    4.0,    3.0
-	G[1, 4, 2], G[2, 4, 2], G[3, 4, 2], G[4, 4, 2] = 10.0,  18.0,   30.0,   52.0
-	G[1, 5, 2], G[2, 5, 2], G[3, 5, 2], G[4, 5, 2] = 17.0,  40.0,   80.0,   160.0
-	G[1, 6, 2], G[2, 6, 2], G[3, 6, 2], G[4, 6, 2] = 36.0,  95.0,   230.0,  650.0
-	G[1, 7, 2], G[2, 7, 2], G[3, 7, 2], G[4, 7, 2] = 60.0,  150.0,  415.0,  1200.0
-	G[1, 8, 2], G[2, 8, 2], G[3, 8, 2], G[4, 8, 2] = 81.0,  215.0,  620.0,  1500.0
-	G[1, 1, 3], G[2, 1, 3], G[3, 1, 3], G[4, 1, 3] = 0.14,  0.0,    0.0,    0.0
-	G[1, 2, 3], G[2, 2, 3], G[3, 2, 3], G[4, 2, 3] = 1.0,   0.60,   0.15,   0.0
-	G[1, 3, 3], G[2, 3, 3], G[3, 3, 3], G[4, 3, 3] = 3.30,  3.00,   1.70,   0.50
-	G[1, 4, 3], G[2, 4, 3], G[3, 4, 3], G[4, 4, 3] = 11.0,  15.0,   17.0,   14.0
-	G[1, 5, 3], G[2, 5, 3], G[3, 5, 3], G[4, 5, 3] = 20.0,  35.0,   49.0,   70.0
-	G[1, 6, 3], G[2, 6, 3], G[3, 6, 3], G[4, 6, 3] = 44.0,  85.0,   150.0,  250.0
-	G[1, 7, 3], G[2, 7, 3], G[3, 7, 3], G[4, 7, 3] = 71.0,  145.0,  290.0,  500.0
-	G[1, 8, 3], G[2, 8, 3], G[3, 8, 3], G[4, 8, 3] = 100.0, 202.0,  400.0,  700.0
-	G[1, 1, 4], G[2, 1, 4], G[3, 1, 4], G[4, 1, 4] = 0.0,   0.0,    0.0,    0.0
-	G[1, 2, 4], G[2, 2, 4], G[3, 2, 4], G[4, 2, 4] = 0.70,  0.30,   0.06,   0.0
-	G[1, 3, 4], G[2, 3, 4], G[3, 3, 4], G[4, 3, 4] = 2.9,   2.3,    1.0,    0.06
-	G[1, 4, 4], G[2, 4, 4], G[3, 4, 4], G[4, 4, 4] = 11.5,  13.0,   12.0,   7.0
-	G[1, 5, 4], G[2, 5, 4], G[3, 5, 4], G[4, 5, 4] = 22.0,  31.0,   40.0,   50.0
-	G[1, 6, 4], G[2, 6, 4], G[3, 6, 4], G[4, 6, 4] = 47.0,  84.0,   135.0,  210.0
-	G[1, 7, 4], G[2, 7, 4], G[3, 7, 4], G[4, 7, 4] = 75.0,  140.0,  240.0,  410.0
-	G[1, 8, 4], G[2, 8, 4], G[3, 8, 4], G[4, 8, 4] = 106.0, 190.0,  350.0,  630.0
-	G[1, 1, 5], G[2, 1, 5], G[3, 1, 5], G[4, 1, 5] = 0.0,   0.0,    0.0,    0.0
-	G[1, 2, 5], G[2, 2, 5], G[3, 2, 5], G[4, 2, 5] = 0.44,  0.06,   0.0,    0.0
-	G[1, 3, 5], G[2, 3, 5], G[3, 3, 5], G[4, 3, 5] = 2.8,   1.8,    0.6,    0.0
-	G[1, 4, 5], G[2, 4, 5], G[3, 4, 5], G[4, 4, 5] = 12.0,  12.5,   10.0,   4.5
-	G[1, 5, 5], G[2, 5, 5], G[3, 5, 5], G[4, 5, 5] = 24.0,  30.0,   35.0,   37.0
-	G[1, 6, 5], G[2, 6, 5], G[3, 6, 5], G[4, 6, 5] = 52.0,  78.0,   120.0,  190.0
-	G[1, 7, 5], G[2, 7, 5], G[3, 7, 5], G[4, 7, 5] = 83.0,  180.0,  215.0,  380.0
-	G[1, 8, 5], G[2, 8, 5], G[3, 8, 5], G[4, 8, 5] = 120.0, 190.0,  305.0,  550.0
-	G[1, 1, 6], G[2, 1, 6], G[3, 1, 6], G[4, 1, 6] = 0.0,   0.0,    0.0,    0.0
-	G[1, 2, 6], G[2, 2, 6], G[3, 2, 6], G[4, 2, 6] = 0.3,   0.0,    0.0,    0.0
-	G[1, 3, 6], G[2, 3, 6], G[3, 3, 6], G[4, 3, 6] = 2.9,   1.4,    0.3,    0.0
-	G[1, 4, 6], G[2, 4, 6], G[3, 4, 6], G[4, 4, 6] = 14.0,  11.0,   7.7,    3.0
-	G[1, 5, 6], G[2, 5, 6], G[3, 5, 6], G[4, 5, 6] = 27.0,  29.0,   30.0,   30.0
-	G[1, 6, 6], G[2, 6, 6], G[3, 6, 6], G[4, 6, 6] = 57.0,  75.0,   110.0,  170.0
-	G[1, 7, 6], G[2, 7, 6], G[3, 7, 6], G[4, 7, 6] = 90.0,  140.0,  200.0,  330.0
-	G[1, 8, 6], G[2, 8, 6], G[3, 8, 6], G[4, 8, 6] = 135.0, 190.0,  290.0,  520.0
-	  
-	F = zeros((6,11))    # defined by Figure 24
-	F[1, 1],  F[2, 1],  F[3, 1],  F[4, 1],  F[5, 1]  = 1.0,  1.1,  1.6,   2.6,   4.2
-	F[1, 2],  F[2, 2],  F[3, 2],  F[4, 2],  F[5, 2]  = 1.0,  1.1,  1.65,  2.75,  4.9
-	F[1, 3],  F[2, 3],  F[3, 3],  F[4, 3],  F[5, 3]  = 1.0,  1.1,  1.7,   3.0,   5.5
-	F[1, 4],  F[2, 4],  F[3, 4],  F[4, 4],  F[5, 4]  = 1.0,  1.12, 1.9,   3.6,   7.0
-	F[1, 5],  F[2, 5],  F[3, 5],  F[4, 5],  F[5, 5]  = 1.0,  1.17, 2.05,  4.3,   8.7
-	F[1, 6],  F[2, 6],  F[3, 6],  F[4, 6],  F[5, 6]  = 1.0,  1.2,  2.3,   5.5,   11.2
-	F[1, 7],  F[2, 7],  F[3, 7],  F[4, 7],  F[5, 7]  = 1.0,  1.22, 2.75,  8.0,   22.0
-	F[1, 8],  F[2, 8],  F[3, 8],  F[4, 8],  F[5, 8]  = 1.0,  1.25, 3.0,   9.6,   29.0
-	F[1, 9],  F[2, 9],  F[3, 9],  F[4, 9],  F[5, 9]  = 1.0,  1.3,  3.5,   12.0,  43.0
-	F[1, 10], F[2, 10], F[3, 10], F[4, 10], F[5, 10] = 1.0,  1.4,  4.9,   22.0,  120.0
-	  
-	T = array([[1.2,  1.15, 1.10, 0.96, 0.90, 0.85, 0.82], 
-			   [1.35, 1.25, 1.12, 0.92, 0.86, 0.80, 0.75],
-			   [1.60, 1.40, 1.20, 0.89, 0.80, 0.72, 0.66], 
-			   [2.00, 1.65, 1.30, 0.85, 0.72, 0.63, 0.55]]).T                     # Temperature adjustment, Figure 24
-
-	DF   = array([0.10, 0.20, 0.30, 0.60, 1.00, 2.00, 6.00, 10.00, 20.00, 1.E2])               # Depths for Figure 24	
-	CF   = array([0.00, 1.E4, 5.E4, 1.E5, 1.5E5])  	                       # Concentrations of sediment for Figure 24
-	P    = array([0.60, 0.90, 1.0, 1.0, 0.83, 0.60, 0.40, 0.25, 0.15, 0.09, 0.05])  # Percentage Effect for Figure 24
-	DP   = array([0.10, 0.15, 0.20, 0.30, 0.40, 0.50, 0.60, 0.70, 0.80, 0.90, 1.00]) # Median diameters for Figure 24
-	DG   = array([0.10, 1.00, 10.0, 100.0])                              # Depth values for Figure 26
-	VG   = array([1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 10.0])           # Velocity values for Figure 26
-	D50G = array([0.10, 0.20, 0.30, 0.40, 0.60, 0.80])                  # Median values for figure 26
-	TEMP = array([32.0, 40.0, 50.0, 70.0, 80.0, 90.0, 100.0])  # Temperatures for lookup in Figure 26
-	  
 	ferror = 0
 	d50err = 0
 	hrerr  = 0
@@ -611,10 +644,11 @@ def colby(v, db50, fhrad, fsl, tempr):
 	id1   = 0
 	iv1   = 0
 	it1   = 0
+	ip1   = 0
 	if not 0.80 >= db50 >=  0.10:  # D50G limits
 		ferror = 1
 		d50err = 1
-		return
+		return 0.0, ferror, d50err, hrerr, velerr
 	for id501, db50x in enumerate(D50G):
 		if db50x > db50:
 			break
@@ -626,7 +660,7 @@ def colby(v, db50, fhrad, fsl, tempr):
 	if not 100.0 >= fhrad >= 0.10:  # DG limits
 		ferror = 1
 		hrerr  = 1
-		return
+		return 0.0, ferror, d50err, hrerr, velerr
 	for id1,dgx in enumerate(DG):
 		if fhrad > dgx:
 			break
@@ -639,7 +673,7 @@ def colby(v, db50, fhrad, fsl, tempr):
 	if not 10.0 >= v >= 1.0:  # VG limits
 		ferror = 1
 		velerr = 1
-		return
+		return 0.0, ferror, d50err, hrerr, velerr
 	for iv1, vx in enumerate(VG):
 		if vx > v:
 			break
@@ -653,9 +687,9 @@ def colby(v, db50, fhrad, fsl, tempr):
 	x = zeros((3,3))
 	xa= zeros(3)
 	xg= zeros(3)
-	for i,i1 in [(1, id1), (2, id2)]:                # DO 200 I= 1,2;   I1    = II(I)
-		for j, j1 in [(1, iv1), (2, iv2)]:           # DO 190 J= 1,2;  J1    = JJ(J)
-			for k, k1 in [(1, id501), (2, id502)]:   # DO 180 K= 1,2; K1    = KK(K)
+	for i,i1 in ((1, id1), (2, id2)):                # DO 200 I= 1,2;   I1    = II(I)
+		for j, j1 in ((1, iv1), (2, iv2)):           # DO 190 J= 1,2;  J1    = JJ(J)
+			for k, k1 in ((1, id501), (2, id502)):   # DO 180 K= 1,2; K1    = KK(K)
 				if G[i1,j1,k1] > 0.0:
 					x[j,k] = log10(G[i1,j1,k1])					
 				else:	
@@ -705,7 +739,7 @@ def colby(v, db50, fhrad, fsl, tempr):
 		if fsl > 1.0E+4:
 			if1 = 4
 			if2 = 5
-			ERRMSG = '***** SUBROUTINE COLBY -- FSL WENT > 1.E+4'
+			# ERRMSG: '***** SUBROUTINE COLBY -- FSL WENT > 1.E+4'
 		else:	
 			for if1, cfx in enumerate(CF):
 				if cfx > fsl:
@@ -742,6 +776,7 @@ def colby(v, db50, fhrad, fsl, tempr):
 	return gtuc * (cfd * tcf + 1.0), ferror, d50err, hrerr, velerr
 
 
+@njit(cache=True)
 def toffaleti(v, fdiam, fhrad, slope, tempr, vset):
 	''' Toffaleti's method to calculate the capacity of the flow to transport sand.'''
 
@@ -771,12 +806,12 @@ def toffaleti(v, fdiam, fhrad, slope, tempr, vset):
 	elif afunc <= 0.660:  ac = (afunc / 0.0036)**0.67
 	elif afunc <= 0.720:  ac = (afunc / 0.29)**4.17
 	elif afunc <= 1.25:   ac = 48.0
-	elif afunc >  1.25:   ac = (afunc / 0.304)**2.74
+	else:                 ac = (afunc / 0.304)**2.74
 
 	k4func = afunc * slope * d65 * 1.0e5
 	if   k4func <= 0.24:   k4 = 1.0
 	elif k4func <= 0.35:   k4 = (k4func**1.10) * 4.81
-	elif k4func >  0.35:   k4 = (k4func** (-1.05)) * 0.49
+	else:                  k4 = (k4func** (-1.05)) * 0.49
 
 	ack4 = ac * k4
 	if ack4 - 16.0 < 0.0:
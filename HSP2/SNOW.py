@@ -2,6 +2,10 @@
 Author: Robert Heaphy, Ph.D.
 License: LGPL2
 Conversion of HSPF 12.2 HPERSNO module into Python
+Set NUMBA_DISABLE_JIT=1 to run _snow_ and its helpers in the Python interpreter
+for debugging. A module flag could only swap the top level call; the compiled
+helpers (vapor, snow_step) are also called from the fused PHYDRO kernel, and
+only numba's own switch reaches all of them.
 '''
 
 
@@ -13,15 +17,17 @@ pack, pakin, pakdif not saved since trival recalulation from saved data
 '''
 
 
-from numpy import zeros, ones, full, nan, int64
+from collections import namedtuple
+from numpy import zeros, ones, full, nan, int64, array
 from math import sqrt, floor
 from numba import njit
-from HSP2.utilities import hourflag, monthval, hoursval, make_numba_dict, initm
+from HSP2.utilities import hourflag, monthval, hoursval, make_numba_dict, initm, TSBlock
 
 ERRMSGS = ('Snow simulation cannot function properly with delt> 360',   #ERRMSG0
  )
 
 
+
 def snow(store, siminfo, uci, ts):
     ''' high level driver for SNOW module
     CALL: snow(store, general, ui, ts)
@@ -30,7 +36,49 @@ def snow(store, siminfo, uci, ts):
        ui is a dictionary with segment specific HSPF UCI like data
        ts is a dictionary with segment specific timeseries'''
 
-    steps   = siminfo['steps']                # number of simulation timesteps
+    steps = siminfo['steps']                # number of simulation timesteps
+
+    pm, x, inp = snow_setup(store, siminfo, uci, ts)
+    out = TSBlock(steps, OUTPUTS)
+
+    ############################################################################
+    errors = _snow_(pm, x, inp.data, ts['AIRTMP'], ts['SVP'], out.data)
+    ############################################################################
+    out.publish(ts, OUTPUTS)
+
+    if siminfo['delt'] > 360 and int(siminfo['ICEFG']):
+        errors[0] += 1
+
+    return errors, ERRMSGS
+
+
+# per interval inputs of snow_step(), rows of a TSBlock in this order
+INPUTS = ('CCFACT', 'CLOUD', 'COVIND', 'DTMPG', 'HR6IND', 'HRFG', 'KMELT', 'MGMELT', 'MWATER', 'PREC',
+          'SEASONS', 'SHADE', 'SNOEVP', 'SNOWCF', 'SOLRAD', 'WINMOV')
+I = namedtuple('SnowInputs', INPUTS)(*range(len(INPUTS)))
+
+# state carried from one interval to the next
+STATES = ('PREC', 'DEWTMP', 'SNOTMP', 'SKYCLR', 'RDNSN', 'DULL', 'PACKF', 'PDEPTH', 'COVINX', 'RDENPF',
+          'COMPCT', 'VAP', 'SATVAP', 'SNOWEP', 'PACKI', 'ALBEDO', 'MOSTHT', 'NEGHTS', 'MNEGHS', 'NEGHT',
+          'PACKWC', 'PACKW', 'HR6FG', 'XLNMLT', 'GMELTR', 'PAKTMP', 'SNOCOV', 'MELT', 'PRAIN', 'SNOWE',
+          'WYIELD')
+X = namedtuple('SnowStates', STATES)(*range(len(STATES)))
+
+# timeseries computed by snow_step()
+OUTPUTS = ('ALBEDO', 'COVINX', 'DEWTMP', 'DULL', 'MELT', 'NEGHTS', 'PACKF', 'PACKI', 'PACKW', 'PACK',
+           'PAKTMP', 'PDEPTH', 'PRAIN', 'RAINF', 'RDENPF', 'SKYCLR', 'SNOCOV', 'SNOTMP', 'SNOWE', 'SNOWF',
+           'WYIELD', 'XLNMLT')
+O = namedtuple('SnowOutputs', OUTPUTS)(*range(len(OUTPUTS)))
+
+# constants of snow_step()
+PARMS = ('DELT', 'CLOUDFG', 'ICEFG', 'MELEV', 'RDCSN', 'SNOPFG', 'TBASE', 'TSNOW')
+P = namedtuple('SnowParms', PARMS)(*range(len(PARMS)))
+
+
+def snow_setup(store, siminfo, uci, ts):
+    ''' prepare the inputs of snow_step(); returns the parameter vector, the initial state
+    and the inputs as a TSBlock'''
+    steps = siminfo['steps']                # number of simulation timesteps
 
     ts['SVP']     = store['TIMESERIES/Saturated_Vapor_Pressure_Table'].to_numpy()
     ts['SEASONS'] = monthval(siminfo, store['TIMESERIES/SEASONS_Table'])
@@ -60,11 +108,6 @@ def snow(store, siminfo, uci, ts):
             siminfo['ICEFG'] = uci['FLAGS']['ICEFG']
 
     ui = make_numba_dict(uci)  # Note: all values coverted to float automatically
-    ui['steps']   = steps
-    ui['delt']    = siminfo['delt']
-    ui['errlen']  = len(ERRMSGS)
-    ui['cloudfg'] = cloudfg
-
     u = uci['PARAMETERS']
 
     vkmfg = 0
@@ -74,98 +117,42 @@ def snow(store, siminfo, uci, ts):
             vkmfg = uf['VKMFG']
     ts['KMELT'] = initm(siminfo, uci, vkmfg, 'MONTHLY_KMELT', u['KMELT'])
 
-    ############################################################################
-    errors = _snow_(ui, ts)
-    ############################################################################
-
-    if siminfo['delt'] > 360 and int(siminfo['ICEFLG']):
-        errors[0] += 1
-
-    return errors, ERRMSGS
+    pm = array([siminfo['delt'], cloudfg, ui.get('ICEFG', 0.0), ui['MELEV'], ui['RDCSN'], ui.get('SNOPFG', 0.0),
+        ui['TBASE'], ui['TSNOW']], dtype=float)
+    inp = TSBlock(steps, INPUTS)
+    inp.load(ts, INPUTS)
+    x = snow_state(ui, inp.data[I.COVIND, 0], inp.data[I.HR6IND, 0])
+    return pm, x, inp
 
 
-# @njit(cache=True)
-def _snow_(ui, ts):
-    ''' SNOW processing '''
-    errors = zeros(int(ui['errlen'])).astype(int64)
+@njit(cache=True)
+def _snow_(pm, x, inp, AIRTMP, SVP, out):
+    ''' SNOW processing, out holds the OUTPUTS rows '''
+    errors = zeros(len(ERRMSGS)).astype(int64)
+    o = zeros(len(OUTPUTS))
+    for step in range(out.shape[1]):
+        snow_step(step, AIRTMP[step], x, o, inp, SVP, pm)
+        out[:, step] = o
+    return errors
 
-    steps  = int(ui['steps'])              # number of simulation points
-    delt   = ui['delt']                    # simulation interval in minutes
-    delt60 = delt / 60.0                   # hours in simulation interval
 
-    cloudfg = int(ui['cloudfg'])
+@njit(cache=True)
+def snow_state(ui, covind, hr6ind):
+    ''' state vector at the start of the run from the SNOW initial conditions'''
+    x = zeros(len(STATES))
     covinx = ui['COVINX']
     dull   = ui['DULL']
-
-    icefg = 0
-    if 'ICEFG' in ui:
-        icefg  = int(ui['ICEFG'])
-
-    melev  = ui['MELEV']
     packf  = ui['PACKF']     # inital df.PKSNOW += df.PKICE fixed in uciReader
     packi  = ui['PACKI']
     packw  = ui['PACKW']
     paktmp = ui['PAKTMP']
-    rdcsn  = ui['RDCSN']
     rdenpf = ui['RDENPF']
     skyclr = ui['SKYCLR']
-
-    snopfg = 0
-    if 'SNOPFG' in ui:
-        snopfg = int(ui['SNOPFG'])
-
-    tbase  = ui['TBASE']
-    tsnow  = ui['TSNOW']
     xlnmlt = ui['XLNMLT']
 
-    # get required time series
-    AIRTMP  = ts['AIRTMP']
-    CCFACT  = ts['CCFACT']
-    CLOUD   = ts['CLOUD']
-    COVIND  = ts['COVIND']
-    DTMPG   = ts['DTMPG']
-    HR6IND   = ts['HR6IND'].astype(int64)
-    HRFG    = ts['HRFG'].astype(int64)
-    KMELT   = ts['KMELT']  * delt/1440.0     # time conversion
-    MGMELT  = ts['MGMELT'] * delt/1440.0     # time conversion
-    MWATER  = ts['MWATER']
-    PREC    = ts['PREC']
-    SEASONS = ts['SEASONS'].astype(int64)
-    SHADE   = ts['SHADE']
-    SNOEVP  = ts['SNOEVP']
-    SNOWCF  = ts['SNOWCF']
-    SOLRAD  = ts['SOLRAD']
-    SVP     = ts['SVP']
-    WINMOV  = ts['WINMOV']
-
-    # like MATLAB, much faster to preallocate arrays! Storing in ts Dict
-    ts['ALBEDO'] = ALBEDO = zeros(steps)
-    ts['COVINX'] = COVINX = zeros(steps)
-    ts['DEWTMP'] = DEWTMP = zeros(steps)
-    ts['DULL']   = DULL   = zeros(steps)
-    ts['MELT']   = MELT   = zeros(steps) # not initialized
-    ts['NEGHTS'] = NEGHTS = zeros(steps)
-    ts['PACKF']  = PACKF  = zeros(steps)
-    ts['PACKI']  = PACKI  = zeros(steps)
-    ts['PACKW']  = PACKW  = zeros(steps)
-    ts['PACK']   = PACK   = zeros(steps)
-    ts['PAKTMP'] = PAKTMP = zeros(steps)
-    ts['PDEPTH'] = PDEPTH = zeros(steps)
-    ts['PRAIN']  = PRAIN  = zeros(steps) # not initialized
-    ts['RAINF']  = RAINF  = zeros(steps)
-    ts['RDENPF'] = RDENPF = zeros(steps)
-    ts['SKYCLR'] = SKYCLR = zeros(steps)
-    ts['SNOCOV'] = SNOCOV = zeros(steps)
-    ts['SNOTMP'] = SNOTMP = zeros(steps)
-    ts['SNOWE']  = SNOWE  = zeros(steps) # not initialized
-    ts['SNOWF']  = SNOWF  = zeros(steps)
-    ts['WYIELD'] = WYIELD = zeros(steps) # not initialized
-    ts['XLNMLT'] = XLNMLT = zeros(steps)
-
     if packf + packw <= 1.0e-5:             # reset state variables
         # NOPACK
-        albedo = 0.0
-        covinx = 0.1 * COVIND[0]
+        covinx = 0.1 * covind
         dull   = 0.0
         neghts = 0.0
         packf  = 0.0
@@ -175,380 +162,441 @@ def _snow_(ui, ts):
         pdepth = 0.0
         rdenpf = nan
         snocov = 0.0
-        snowe  = 0.0
-        snowep = 0.0
         # END NOPACK
     else:
         if covinx < 1.0e-5:
-            covinx = 0.1 * COVIND[0]
+            covinx = 0.1 * covind
         pdepth = packf / rdenpf
         snocov = packf / covinx if packf < covinx else 1.0
         neghts = (32.0 - paktmp) * 0.00695 * packf
 
-    melt   = 0.0
-    mneghs = 0.0
-    packwc = 0.0
-    prain  = 0.0
-    prec   = 0.0
-    snotmp = tsnow
-    snowe  = 0.0
-    wyield = 0.0
-
-    # needed by Numba 0.31
-    albedo = 0.0
-    compct = 0.0
-    dewtmp = 0.0
-    gmeltr = 0.0
-    mostht = 0.0
-    neght  = 0.0
-    rdnsn  = 0.0
-    satvap = 0.0
-    snowep = 0.0
-    vap    = 0.0
-
-    if HR6IND[0] > 0:
-        hr6fg = 1
+    x[X.SNOTMP] = ui['TSNOW']
+    x[X.SKYCLR] = skyclr
+    x[X.DULL]   = dull
+    x[X.PACKF]  = packf
+    x[X.PDEPTH] = pdepth
+    x[X.COVINX] = covinx
+    x[X.RDENPF] = rdenpf
+    x[X.PACKI]  = packi
+    x[X.NEGHTS] = neghts
+    x[X.PACKW]  = packw
+    x[X.HR6FG]  = 1.0 if hr6ind > 0 else 0.0
+    x[X.XLNMLT] = xlnmlt
+    x[X.PAKTMP] = paktmp
+    x[X.SNOCOV] = snocov
+    return x
+
+
+@njit(cache=True)
+def snow_step(step, airtmp, x, o, inp, SVP, pm):
+    ''' advance the snow pack one interval; x carries the state between intervals and
+    o receives the OUTPUTS of the interval'''
+    delt    = pm[P.DELT]                   # simulation interval in minutes
+    delt60  = delt / 60.0                  # hours in simulation interval
+    cloudfg = int(pm[P.CLOUDFG])
+    icefg   = int(pm[P.ICEFG])
+    melev   = pm[P.MELEV]
+    rdcsn   = pm[P.RDCSN]
+    snopfg  = int(pm[P.SNOPFG])
+    tbase   = pm[P.TBASE]
+    tsnow   = pm[P.TSNOW]
+
+    oldprec = x[X.PREC]
+    dewtmp  = x[X.DEWTMP]
+    snotmp  = x[X.SNOTMP]
+    skyclr  = x[X.SKYCLR]
+    rdnsn   = x[X.RDNSN]
+    dull    = x[X.DULL]
+    packf   = x[X.PACKF]
+    pdepth  = x[X.PDEPTH]
+    covinx  = x[X.COVINX]
+    rdenpf  = x[X.RDENPF]
+    compct  = x[X.COMPCT]
+    vap     = x[X.VAP]
+    satvap  = x[X.SATVAP]
+    snowep  = x[X.SNOWEP]
+    packi   = x[X.PACKI]
+    albedo  = x[X.ALBEDO]
+    mostht  = x[X.MOSTHT]
+    neghts  = x[X.NEGHTS]
+    mneghs  = x[X.MNEGHS]
+    neght   = x[X.NEGHT]
+    packwc  = x[X.PACKWC]
+    packw   = x[X.PACKW]
+    hr6fg   = int(x[X.HR6FG])
+    xlnmlt  = x[X.XLNMLT]
+    gmeltr  = x[X.GMELTR]
+    paktmp  = x[X.PAKTMP]
+    snocov  = x[X.SNOCOV]
+    melt    = x[X.MELT]
+    prain   = x[X.PRAIN]
+    snowe   = x[X.SNOWE]
+    wyield  = x[X.WYIELD]
+
+    # pay for indexing once per interval
+    mgmelt = inp[I.MGMELT, step] * delt / 1440.0   # time conversion
+    covind = inp[I.COVIND, step]
+    dtmpg  = inp[I.DTMPG, step]
+    hr6ind = int(inp[I.HR6IND, step])
+    hrfg   = int(inp[I.HRFG, step])
+    mwater = inp[I.MWATER, step]
+    prec   = inp[I.PREC, step]
+    shade  = inp[I.SHADE, step]
+    snowcf = inp[I.SNOWCF, step]
+    solrad = inp[I.SOLRAD, step]
+    winmov = inp[I.WINMOV, step]
+
+    reltmp = airtmp - 32.0            # needed in many places, compute once
+
+    ''
+    # METEOR
+    if prec > 0.0:
+        fprfg = (oldprec == 0.0)
     else:
-        hr6fg = 0
-
-    # MAIN LOOP
-    for step in range(steps):
-        oldprec = prec
-
-        # pay for indexing once per loop
-        mgmelt = MGMELT[step]
-        airtmp = AIRTMP[step]
-        covind = COVIND[step]
-        dtmpg  = DTMPG[step]
-        hr6ind = HR6IND[step]
-        hrfg   = HRFG[step]
-        mwater = MWATER[step]
-        prec   = PREC[step]
-        shade  = SHADE[step]
-        snowcf = SNOWCF[step]
-        solrad = SOLRAD[step]
-        winmov = WINMOV[step]
-
-        reltmp = airtmp - 32.0            # needed in many places, compute once
-
-        ''
-        # METEOR
-        if prec > 0.0:
-            fprfg = (oldprec == 0.0)
-        else:
-            fprfg = False
+        fprfg = False
 
-        if hrfg:  # estimate the dewpoint
-            dewtmp = airtmp if (prec > 0.0 and airtmp > tsnow) or dtmpg > airtmp else dtmpg
+    if hrfg:  # estimate the dewpoint
+        dewtmp = airtmp if (prec > 0.0 and airtmp > tsnow) or dtmpg > airtmp else dtmpg
 
-        if prec > 0.0:
-            # find the temperature which divides snow from rain, and compute snow or rain fall
-            if hrfg or fprfg:
-                dtsnow = (airtmp - dewtmp) * (0.12 + 0.008 * airtmp)
-                snotmp = tsnow + min(1.0, dtsnow)
-            if snopfg == 0:
-                skyclr = 0.15
+    if prec > 0.0:
+        # find the temperature which divides snow from rain, and compute snow or rain fall
+        if hrfg or fprfg:
+            dtsnow = (airtmp - dewtmp) * (0.12 + 0.008 * airtmp)
+            snotmp = tsnow + min(1.0, dtsnow)
+        if snopfg == 0:
+            skyclr = 0.15
 
-            if airtmp < snotmp:
-                snowf = prec * snowcf
-                rainf = 0.0
-                if  hrfg or fprfg:
-                    rdnsn = rdcsn + (airtmp/100.0)**2 if airtmp > 0.0 else rdcsn
-            else:
-                rainf = prec
-                snowf = 0.0
-        else:
+        if airtmp < snotmp:
+            snowf = prec * snowcf
             rainf = 0.0
+            if  hrfg or fprfg:
+                rdnsn = rdcsn + (airtmp/100.0)**2 if airtmp > 0.0 else rdcsn
+        else:
+            rainf = prec
             snowf = 0.0
-            if snopfg == 0 and skyclr < 1.0:
-                skyclr += (0.0004 * delt)
-                if skyclr > 1.0:
-                    skyclr = 1.0
-
-        if snopfg == 0 and cloudfg:
-            skyclr = max(0.15, 1.0 - (CLOUD[step] / 10.0))
-        #END METEOR
-
-        if packf > 0.0 or snowf > 0.0:
-            # there is a snowpack or it is snowing,
-            # simulate snow accumulation and melt
-            if packf == 0.0:
-                iregfg = 1
-                if snopfg == 0:
-                    dull = 0.0
-            else:
-                iregfg = hrfg
-
-            # EFFPRC
-            if snowf > 0.0:
-                packf  += snowf
-                pdepth += (snowf/rdnsn)
-                if packf > covinx:
-                    covinx = covind if packf > covind else packf
-                if snopfg == 0:
-                    dummy = 1000.0 * snowf
-                    dull = 0.0 if dummy >= dull else dull - dummy
-                prain = 0.0
-            else:
-                prain = rainf * snocov if rainf > 0.0 else 0.0
+    else:
+        rainf = 0.0
+        snowf = 0.0
+        if snopfg == 0 and skyclr < 1.0:
+            skyclr += (0.0004 * delt)
+            if skyclr > 1.0:
+                skyclr = 1.0
+
+    if snopfg == 0 and cloudfg:
+        skyclr = max(0.15, 1.0 - (inp[I.CLOUD, step] / 10.0))
+    #END METEOR
+
+    if packf > 0.0 or snowf > 0.0:
+        # there is a snowpack or it is snowing,
+        # simulate snow accumulation and melt
+        if packf == 0.0:
+            iregfg = 1
             if snopfg == 0:
-                if dull < 800:
-                    dull += delt60
-            #END EFFPRC
-
-            # COMPAC
-            if iregfg:
-                rdenpf = packf / pdepth
-                dummy = 1.0 - (0.00002 * delt60 * pdepth * (0.55 - rdenpf))
-                compct = dummy if rdenpf < 0.55 else 1.0
-            if compct < 1.0:
-                pdepth *= compct
-            #END COMPAC
-
+                dull = 0.0
+        else:
+            iregfg = hrfg
+
+        # EFFPRC
+        if snowf > 0.0:
+            packf  += snowf
+            pdepth += (snowf/rdnsn)
+            if packf > covinx:
+                covinx = covind if packf > covind else packf
             if snopfg == 0:
-                # SNOWEV
-                if iregfg:
-                    vap    = vapor(SVP, dewtmp)
-                    satvap = vapor(SVP, airtmp)
-                    dummy = SNOEVP[step] * 0.0002 * winmov * (satvap - vap) * snocov
-                    snowep = 0.0 if vap >= 6.108 else  dummy
-
-                if snowep >= packf:
-                    snowe = packf
-                    pdepth = 0.0
-                    packi  = 0.0
-                    packf  = 0.0
-                else:
-                    pdepth *=  (1.0 - snowep / packf)
-                    packf -= snowep
-                    snowe = snowep
-                    if packi > packf:
-                        packi = packf
-                #END SNOWEV
-            else:
-                snowe = 0.0
-
+                dummy = 1000.0 * snowf
+                dull = 0.0 if dummy >= dull else dull - dummy
+            prain = 0.0
+        else:
+            prain = rainf * snocov if rainf > 0.0 else 0.0
+        if snopfg == 0:
+            if dull < 800:
+                dull += delt60
+        #END EFFPRC
+
+        # COMPAC
+        if iregfg:
+            rdenpf = packf / pdepth
+            dummy = 1.0 - (0.00002 * delt60 * pdepth * (0.55 - rdenpf))
+            compct = dummy if rdenpf < 0.55 else 1.0
+        if compct < 1.0:
+            pdepth *= compct
+        #END COMPAC
+
+        if snopfg == 0:
+            # SNOWEV
             if iregfg:
-                if snopfg == 0:
-                    # HEXCHR
-                    factr = CCFACT[step] * 0.00026 * winmov
-                    dummy = 8.59 *  (vap - 6.108)
-                    condht = dummy * factr if vap > 6.108 else 0.0
-
-                    dummy = reltmp * (1.0 - 0.3 * melev/10000.0) * factr
-                    convht = dummy if airtmp > 32.0 else 0.0
-
-                    # ALBEDO
-                    dummy = sqrt(dull/24.0)
-                    summer = float(max(0.45, 0.80 - 0.10*dummy))
-                    winter = float(max(0.60, 0.85 - 0.07*dummy))
-                    albedo = summer if SEASONS[step] else winter
-                    # END ALBEDO
-
-                    k = (1.0 - shade) * delt60
-                    long1 = (shade * 0.26 * reltmp) + k * (0.20 * reltmp - 6.6)
-                    long2 = (shade * 0.20 * reltmp) + k * (0.17 * reltmp - 6.6)
-                    long_ = long1 if reltmp > 0.0 else long2
-                    if long_ < 0.0:                       # back radiation
-                        long_ *= skyclr
-
-                    short = solrad  * (1.0 - albedo) * (1.0 - shade)
-                    mostht = (short + long_)/203.2 + convht + condht
-                    # END HEXCHR
-                else:
-                    # DEGDAY
-                    mostht = KMELT[step] * (airtmp - tbase)
-                    # END DEGDAY
+                vap    = vapor(SVP, dewtmp)
+                satvap = vapor(SVP, airtmp)
+                dummy = inp[I.SNOEVP, step] * 0.0002 * winmov * (satvap - vap) * snocov
+                snowep = 0.0 if vap >= 6.108 else  dummy
 
-            rnsht = reltmp * rainf / 144.0 if rainf > 0.0 else 0.0
-            sumht = mostht + rnsht
-
-            # back in PSNOW
-            if snocov < 1.0:
-                sumht = sumht * snocov
-            paktmp = 32.0 if neghts <= 0.0 else 32.0 - neghts / (0.00695 * packf)
-
-            # COOLER
-            if iregfg:
-                mneghs = 0.0 if reltmp > 0.0 else -reltmp * 0.00695 * packf/2.0
-                neght  = 0.0 if paktmp <= airtmp else 0.0007 * (paktmp - airtmp) * delt60
-
-            if sumht < 0.0:
-                if paktmp > AIRTMP[step]:
-                    neghts = min(mneghs, neghts + neght)
-                sumht = 0.0
-
-            # back in PSNOW
-            if neghts > 0.0:
-                # WARMUP
-                if sumht > 0.0:
-                    if sumht > neghts:
-                        sumht -= neghts
-                        neghts = 0.0
-                    else:
-                        neghts -= sumht
-                        sumht = 0.0
-                if prain > 0.0:
-                    if prain > neghts:
-                        rnfrz  = neghts
-                        packf += rnfrz
-                        neghts = 0.0
-                    else:
-                        rnfrz  = prain
-                        neghts -= prain
-                        packf  += prain
-
-                    if packf > pdepth:
-                        pdepth = packf
-                else:
-                    rnfrz = 0.0
-            else:
-                rnfrz = 0.0
-
-            # MELTER
-            if sumht >= packf:
-                melt   = packf
-                packf  = 0.0
+            if snowep >= packf:
+                snowe = packf
                 pdepth = 0.0
                 packi  = 0.0
-            elif sumht > 0.0:
-                melt   = sumht
-                pdepth *= (1.0 - melt / packf)
-                packf  -= melt
+                packf  = 0.0
+            else:
+                pdepth *=  (1.0 - snowep / packf)
+                packf -= snowep
+                snowe = snowep
                 if packi > packf:
                     packi = packf
-            else:
-                melt = 0.0
+            #END SNOWEV
+        else:
+            snowe = 0.0
 
-            # LIQUID
-            if iregfg and packf > 0.0:
-                rdenpf = packf / pdepth
-                if rdenpf <= 0.6:
-                    packwc = mwater
-                else:
-                    dummyf = 3.0 - 3.33 * rdenpf
-                    packwc = mwater * dummyf if dummyf >= 0.0 else 0.0
-            pwsupy = packw + melt + prain - rnfrz
-            mpws = packwc * packf
-            if (pwsupy - mpws) > (0.01 * delt60):
-                wyield = pwsupy - mpws
-                packw = mpws
+        if iregfg:
+            if snopfg == 0:
+                # HEXCHR
+                factr = inp[I.CCFACT, step] * 0.00026 * winmov
+                dummy = 8.59 *  (vap - 6.108)
+                condht = dummy * factr if vap > 6.108 else 0.0
+
+                dummy = reltmp * (1.0 - 0.3 * melev/10000.0) * factr
+                convht = dummy if airtmp > 32.0 else 0.0
+
+                # ALBEDO
+                dummy = sqrt(dull/24.0)
+                summer = float(max(0.45, 0.80 - 0.10*dummy))
+                winter = float(max(0.60, 0.85 - 0.07*dummy))
+                albedo = summer if int(inp[I.SEASONS, step]) else winter
+                # END ALBEDO
+
+                k = (1.0 - shade) * delt60
+                long1 = (shade * 0.26 * reltmp) + k * (0.20 * reltmp - 6.6)
+                long2 = (shade * 0.20 * reltmp) + k * (0.17 * reltmp - 6.6)
+                long_ = long1 if reltmp > 0.0 else long2
+                if long_ < 0.0:                       # back radiation
+                    long_ *= skyclr
+
+                short = solrad  * (1.0 - albedo) * (1.0 - shade)
+                mostht = (short + long_)/203.2 + convht + condht
+                # END HEXCHR
             else:
-                packw = pwsupy
-                wyield = 0.0
-
-            # back in psnow
-            if icefg:
-                # ICING
-                if hr6ind < 1:
-                    if hr6fg != 0:
-                        if snocov < 1.0:
-                            xlnem = -reltmp * 0.01
-                            if xlnem > xlnmlt:
-                                xlnmlt = xlnem
-                        hr6fg = 0
+                # DEGDAY
+                mostht = (inp[I.KMELT, step] * delt / 1440.0) * (airtmp - tbase)
+                # END DEGDAY
+
+        rnsht = reltmp * rainf / 144.0 if rainf > 0.0 else 0.0
+        sumht = mostht + rnsht
+
+        # back in PSNOW
+        if snocov < 1.0:
+            sumht = sumht * snocov
+        paktmp = 32.0 if neghts <= 0.0 else 32.0 - neghts / (0.00695 * packf)
+
+        # COOLER
+        if iregfg:
+            mneghs = 0.0 if reltmp > 0.0 else -reltmp * 0.00695 * packf/2.0
+            neght  = 0.0 if paktmp <= airtmp else 0.0007 * (paktmp - airtmp) * delt60
+
+        if sumht < 0.0:
+            if paktmp > airtmp:
+                neghts = min(mneghs, neghts + neght)
+            sumht = 0.0
+
+        # back in PSNOW
+        if neghts > 0.0:
+            # WARMUP
+            if sumht > 0.0:
+                if sumht > neghts:
+                    sumht -= neghts
+                    neghts = 0.0
                 else:
-                    # set the flag so that the freezing capacity will be updated next time 6 am is passed
-                    hr6fg = 1
-
-                if wyield > 0.0 and xlnmlt > 0.0:
-                    if wyield < xlnmlt:
-                        freeze  = wyield
-                        xlnmlt -= wyield
-                        wyield  = 0.0
-                    else:
-                        freeze  = xlnmlt
-                        wyield -= xlnmlt
-                        xlnmlt  = 0.0
-                    packf  += freeze
-                    packi  += freeze
-                    pdepth += freeze
-
-            # GMELT
-            if iregfg:
-                if paktmp >= 32.0:
-                    gmeltr = mgmelt
-                elif paktmp > 5.0:
-                    gmeltr = mgmelt * (1.0 - 0.03 * (32.0 - paktmp))
+                    neghts -= sumht
+                    sumht = 0.0
+            if prain > 0.0:
+                if prain > neghts:
+                    rnfrz  = neghts
+                    packf += rnfrz
+                    neghts = 0.0
                 else:
-                    gmeltr = mgmelt * 0.19
-            if packf <= gmeltr:
-                wyield = wyield + packf + packw
-                packf  = 0.0
-                packi  = 0.0
-                packw  = 0.0
-                pdepth = 0.0
-                neghts = 0.0
+                    rnfrz  = prain
+                    neghts -= prain
+                    packf  += prain
+
+                if packf > pdepth:
+                    pdepth = packf
             else:
-                dummy = 1.0 - (gmeltr / packf)
-                packw  += gmeltr
-                pdepth *= dummy
-                neghts *= dummy
-                packf  -= gmeltr
-                packi = packi - gmeltr if packi > gmeltr else 0.0
-            #END GMELT
-
-            if packf > 0.005:
-                rdenpf = packf / pdepth
-                paktmp = 32.0 if neghts == 0.0 else 32.0 - neghts/(0.00695 * packf)
-                snocov = packf / covinx if packf < covinx else 1.0
+                rnfrz = 0.0
+        else:
+            rnfrz = 0.0
+
+        # MELTER
+        if sumht >= packf:
+            melt   = packf
+            packf  = 0.0
+            pdepth = 0.0
+            packi  = 0.0
+        elif sumht > 0.0:
+            melt   = sumht
+            pdepth *= (1.0 - melt / packf)
+            packf  -= melt
+            if packi > packf:
+                packi = packf
+        else:
+            melt = 0.0
+
+        # LIQUID
+        if iregfg and packf > 0.0:
+            rdenpf = packf / pdepth
+            if rdenpf <= 0.6:
+                packwc = mwater
             else:
-                melt   += packf
-                wyield += packf + packw
-
-                # NOPACK
-                hr6fg  = 1
-                covinx = 0.1 * covind
-                mneghs = nan
-                neghts = 0.0
-                packf  = 0.0
-                packi  = 0.0
-                packw  = 0.0
-                paktmp = 32.0
-                pdepth = 0.0
-                prain  = 0.0
-                rdenpf = nan
-                snocov = 0.0
-                snowe  = 0.0
-                xlnmlt = 0.0
-
-                # pbd -- need this set for energy balance method?
-                dull = -1.0E30
-                albedo = -1.0E30
-                snowep = -1.0E30
-                vap = -1.0E30
+                dummyf = 3.0 - 3.33 * rdenpf
+                packwc = mwater * dummyf if dummyf >= 0.0 else 0.0
+        pwsupy = packw + melt + prain - rnfrz
+        mpws = packwc * packf
+        if (pwsupy - mpws) > (0.01 * delt60):
+            wyield = pwsupy - mpws
+            packw = mpws
         else:
-            # there is no snow or pack
-            prain = 0.0
-            snowe = 0.0
+            packw = pwsupy
             wyield = 0.0
-            melt = 0.0
-            # RAINF[step] = prec
-
-        # save calculations
-        ALBEDO[step] = albedo
-        COVINX[step] = covinx
-        DEWTMP[step] = dewtmp
-        DULL[step]   = dull
-        MELT[step]   = melt
-        NEGHTS[step] = neghts
-        PACKF[step]  = packf
-        PACKI[step]  = packi
-        PACKW[step]  = packw
-        PACK[step]   = packf + packi + packw
-        PAKTMP[step] = paktmp
-        PDEPTH[step] = pdepth
-        PRAIN[step]  = prain
-        RAINF[step]  = rainf
-        RDENPF[step] = rdenpf
-        SKYCLR[step] = skyclr
-        SNOCOV[step] = snocov
-        SNOTMP[step] = snotmp
-        SNOWE[step]  = snowe
-        SNOWF[step]  = snowf
-        WYIELD[step] = wyield
-        XLNMLT[step] = xlnmlt
-    return errors
+
+        # back in psnow
+        if icefg:
+            # ICING
+            if hr6ind < 1:
+                if hr6fg != 0:
+                    if snocov < 1.0:
+                        xlnem = -reltmp * 0.01
+                        if xlnem > xlnmlt:
+                            xlnmlt = xlnem
+                    hr6fg = 0
+            else:
+                # set the flag so that the freezing capacity will be updated next time 6 am is passed
+                hr6fg = 1
+
+            if wyield > 0.0 and xlnmlt > 0.0:
+                if wyield < xlnmlt:
+                    freeze  = wyield
+                    xlnmlt -= wyield
+                    wyield  = 0.0
+                else:
+                    freeze  = xlnmlt
+                    wyield -= xlnmlt
+                    xlnmlt  = 0.0
+                packf  += freeze
+                packi  += freeze
+                pdepth += freeze
+
+        # GMELT
+        if iregfg:
+            if paktmp >= 32.0:
+                gmeltr = mgmelt
+            elif paktmp > 5.0:
+                gmeltr = mgmelt * (1.0 - 0.03 * (32.0 - paktmp))
+            else:
+                gmeltr = mgmelt * 0.19
+        if packf <= gmeltr:
+            wyield = wyield + packf + packw
+            packf  = 0.0
+            packi  = 0.0
+            packw  = 0.0
+            pdepth = 0.0
+            neghts = 0.0
+        else:
+            dummy = 1.0 - (gmeltr / packf)
+            packw  += gmeltr
+            pdepth *= dummy
+            neghts *= dummy
+            packf  -= gmeltr
+            packi = packi - gmeltr if packi > gmeltr else 0.0
+        #END GMELT
+
+        if packf > 0.005:
+            rdenpf = packf / pdepth
+            paktmp = 32.0 if neghts == 0.0 else 32.0 - neghts/(0.00695 * packf)
+            snocov = packf / covinx if packf < covinx else 1.0
+        else:
+            melt   += packf
+            wyield += packf + packw
+
+            # NOPACK
+            hr6fg  = 1
+            covinx = 0.1 * covind
+            mneghs = nan
+            neghts = 0.0
+            packf  = 0.0
+            packi  = 0.0
+            packw  = 0.0
+            paktmp = 32.0
+            pdepth = 0.0
+            prain  = 0.0
+            rdenpf = nan
+            snocov = 0.0
+            snowe  = 0.0
+            xlnmlt = 0.0
+
+            # pbd -- need this set for energy balance method?
+            dull = -1.0E30
+            albedo = -1.0E30
+            snowep = -1.0E30
+            vap = -1.0E30
+    else:
+        # there is no snow or pack
+        prain = 0.0
+        snowe = 0.0
+        wyield = 0.0
+        melt = 0.0
+
+    x[X.PREC]   = prec
+    x[X.DEWTMP] = dewtmp
+    x[X.SNOTMP] = snotmp
+    x[X.SKYCLR] = skyclr
+    x[X.RDNSN]  = rdnsn
+    x[X.DULL]   = dull
+    x[X.PACKF]  = packf
+    x[X.PDEPTH] = pdepth
+    x[X.COVINX] = covinx
+    x[X.RDENPF] = rdenpf
+    x[X.COMPCT] = compct
+    x[X.VAP]    = vap
+    x[X.SATVAP] = satvap
+    x[X.SNOWEP] = snowep
+    x[X.PACKI]  = packi
+    x[X.ALBEDO] = albedo
+    x[X.MOSTHT] = mostht
+    x[X.NEGHTS] = neghts
+    x[X.MNEGHS] = mneghs
+    x[X.NEGHT]  = neght
+    x[X.PACKWC] = packwc
+    x[X.PACKW]  = packw
+    x[X.HR6FG]  = hr6fg
+    x[X.XLNMLT] = xlnmlt
+    x[X.GMELTR] = gmeltr
+    x[X.PAKTMP] = paktmp
+    x[X.SNOCOV] = snocov
+    x[X.MELT]   = melt
+    x[X.PRAIN]  = prain
+    x[X.SNOWE]  = snowe
+    x[X.WYIELD] = wyield
+
+    # save calculations
+    o[O.ALBEDO] = albedo
+    o[O.COVINX] = covinx
+    o[O.DEWTMP] = dewtmp
+    o[O.DULL]   = dull
+    o[O.MELT]   = melt
+    o[O.NEGHTS] = neghts
+    o[O.PACKF]  = packf
+    o[O.PACKI]  = packi
+    o[O.PACKW]  = packw
+    o[O.PACK]   = packf + packi + packw
+    o[O.PAKTMP] = paktmp
+    o[O.PDEPTH] = pdepth
+    o[O.PRAIN]  = prain
+    o[O.RAINF]  = rainf
+    o[O.RDENPF] = rdenpf
+    o[O.SKYCLR] = skyclr
+    o[O.SNOCOV] = snocov
+    o[O.SNOTMP] = snotmp
+    o[O.SNOWE]  = snowe
+    o[O.SNOWF]  = snowf
+    o[O.WYIELD] = wyield
+    o[O.XLNMLT] = xlnmlt
+    return
 
 
 @njit(cache=True)
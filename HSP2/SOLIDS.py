@@ -4,7 +4,7 @@ License: LGPL2
 
 Conversion of HSPF HIMPSLD.FOR module into Python''' 
 
-from numpy import zeros, where, full
+from numpy import zeros, where, full, float64
 from numba import njit
 from HSP2.utilities  import initm, make_numba_dict, hourflag
 
@@ -14,6 +14,7 @@ MFACTA = 1.0  # english units
 ERRMSG = []
 
 
+
 def solids(store, siminfo, uci, ts):
 	'''Accumulate and remove solids from the impervious land segment'''
 	
@@ -22,29 +23,11 @@ def solids(store, siminfo, uci, ts):
 	simlen = siminfo['steps']
 	tindex = siminfo['tindex']
 
-	ui = make_numba_dict(uci)  # Note: all values converted to float automatically
-	if 'SDOPFG' in ui:
-		SDOPFG = ui['SDOPFG']
-	else:
-	    SDOPFG = 0
-	keim   = ui['KEIM']
-	jeim   = ui['JEIM']
-	slds   = ui['SLDS']
-	
 	for name in ['SURO', 'SURS', 'PREC', 'SLSLD']:
 		if name not in ts:
 			ts[name] = zeros(simlen)
-	SURO  = ts['SURO']
-	SURS  = ts['SURS']	
-	PREC  = ts['PREC']
-	SLSLD = ts['SLSLD']  # lateral input of solids is considered
-	
-	# preallocate output arrays
-	SOSLD = ts['SOSLD'] = zeros(simlen)
-	SLDS  = ts['SLDS']  = zeros(simlen)
 
-	drydfg = 1  # assume day is dry
-	DAYFG = hourflag(siminfo, 0, dofirst=True).astype(bool)
+	ts['DAYFG'] = hourflag(siminfo, 0, dofirst=True).astype(float64)  # numba Dict limitation
 
 	u = uci['PARAMETERS']
 	# process optional monthly arrays to return interpolated data or constant array
@@ -56,8 +39,41 @@ def solids(store, siminfo, uci, ts):
 		ts['REMSDP'] = initm(siminfo, uci, u['VRSDFG'], 'REMSDM', u['REMSDP'])
 	else:
 		ts['REMSDP'] = full(simlen, u['REMSDP'])
+
+	ui = make_numba_dict(uci)  # Note: all values converted to float automatically
+	ui['simlen'] = simlen
+	ui['delt60'] = delt60
+
+	############################################################################
+	_solids_(ui, ts)
+	############################################################################
+
+	return errorsV, ERRMSG
+
+
+@njit(cache=True)
+def _solids_(ui, ts):
+	''' Wash off, accumulate and remove solids on an impervious land segment '''
+	simlen = int(ui['simlen'])
+	delt60 = ui['delt60']
+
+	SDOPFG = ui['SDOPFG'] if 'SDOPFG' in ui else 0.0
+	keim   = ui['KEIM']
+	jeim   = ui['JEIM']
+
+	SURO   = ts['SURO']
+	SURS   = ts['SURS']
+	PREC   = ts['PREC']
+	SLSLD  = ts['SLSLD']  # lateral input of solids is considered
 	ACCSDP = ts['ACCSDP']
 	REMSDP = ts['REMSDP']
+	DAYFG  = ts['DAYFG']
+
+	# preallocate output arrays
+	ts['SOSLD'] = SOSLD = zeros(simlen)
+	ts['SLDS']  = SLDS  = zeros(simlen)
+
+	drydfg = 1  # assume day is dry
 
 	slds = ui['SLDS']
 	for loop in range(simlen):
@@ -112,4 +128,5 @@ def solids(store, siminfo, uci, ts):
 
 		SOSLD[loop] = sosld  # * MFACTA
 		SLDS[loop]  = slds   # * MFACTA
-	return errorsV, ERRMSG
+	return
+
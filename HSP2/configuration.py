@@ -26,6 +26,7 @@ from HSP2.HTRCH import htrch, expand_HTRCH_masslinks
 from HSP2.SEDTRN import sedtrn, expand_SEDTRN_masslinks
 from HSP2.CONS import cons, expand_CONS_masslinks
 from HSP2.GQUAL import gqual, expand_GQUAL_masslinks
+from HSP2.RQUAL import rqual, rqual_section, expand_RQUAL_masslinks
 
 def noop (store, siminfo, ui, ts):
     ERRMSGS = []
@@ -40,8 +41,8 @@ activities = {
   'IMPLND': {'ATEMP':atemp, 'SNOW':snow, 'IWATER':iwater, 'SOLIDS':solids,
      'IWTGAS':iwtgas, 'IQUAL':iqual},
   'RCHRES': {'HYDR':hydr, 'ADCALC':adcalc, 'CONS':cons, 'HTRCH':htrch,
-     'SEDTRN':sedtrn, 'GQUAL':gqual, 'OXRX':noop, 'NUTRX':noop, 'PLANK':noop,
-     'PHCARB':noop}}
+     'SEDTRN':sedtrn, 'GQUAL':gqual, 'OXRX':rqual, 'NUTRX':rqual_section,
+     'PLANK':rqual_section, 'PHCARB':rqual_section}}
 
 def expand_masslinks(flags, uci, dat, recs):
     recs = expand_HYDR_masslinks(flags, uci, dat, recs)
@@ -49,6 +50,7 @@ def expand_masslinks(flags, uci, dat, recs):
     recs = expand_CONS_masslinks(flags, uci, dat, recs)
     recs = expand_SEDTRN_masslinks(flags, uci, dat, recs)
     recs = expand_GQUAL_masslinks(flags, uci, dat, recs)
+    recs = expand_RQUAL_masslinks(flags, uci, dat, recs)
     return recs
 
 # NOTE: the flowtype (Python set) at the top of utilities.py may need to be
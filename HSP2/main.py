@@ -3,19 +3,22 @@ Author: Robert Heaphy, Ph.D.
 License: LGPL2
 '''
 
-from numpy import float64, float32
+from numpy import float64, float32, empty
 from pandas import HDFStore, Timestamp, read_hdf, DataFrame, date_range
 from pandas.tseries.offsets import Minute
 from numba import types
 from numba.typed import Dict
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime as dt
 import os
-from HSP2.utilities import transform, versions
+from HSP2.utilities import transform, versions, TransformCache, clocks
 from HSP2.configuration import activities, noop, expand_masslinks
+from HSP2.RQUAL import INFLOWS
+from HSP2.PHYDRO import phydro, phydro_batch, SECTIONS as PHYDRO_SECTIONS
 
 
-def main(hdfname, saveall=False, jupyterlab=True):
+def main(hdfname, saveall=False, jupyterlab=True, workers=1, tscache=256, fused=False, batch=False):
     '''Runs main HSP2 program.
 
     Parameters
@@ -25,6 +28,25 @@ def main(hdfname, saveall=False, jupyterlab=True):
     saveall: Boolean
         [optional] Default is False.
         Saves all calculated data ignoring SAVE tables.
+    workers: int
+        [optional] Default is 1, runs OP_SEQUENCE serially.
+        Number of processes used to run independent PERLND and IMPLND
+        segments in parallel, None uses all cores. RCHRES operations always
+        run in this process after their upstream operations.
+    tscache: float
+        [optional] Default is 256.
+        Memory cap (MB) for transformed external timeseries shared between
+        segments, 0 disables the cache.
+    fused: Boolean
+        [optional] Default is False.
+        Runs the ATEMP, SNOW and PWATER (PERLND) or IWATER (IMPLND) sections
+        in one time loop that only stores saved timeseries and those read by
+        later sections.
+    batch: Boolean
+        [optional] Default is False, used only when workers is 1.
+        Runs the fused sections of the PERLND or IMPLND segments of each
+        OP_SEQUENCE level that share DELT and enabled sections in one
+        compiled call, in parallel over the segments (NUMBA_NUM_THREADS).
     '''
 
     if not os.path.exists(hdfname):
@@ -33,98 +55,29 @@ def main(hdfname, saveall=False, jupyterlab=True):
 
     with HDFStore(hdfname, 'a') as store:
         msg = messages()
+        clocks.clear()   # SimClock calendars of an earlier run are not kept
         msg(1, f'Processing started for file {hdfname}; saveall={saveall}')
 
         # read user control, parameters, states, and flags  from HDF5 file
         opseq, ddlinks, ddmasslinks, ddext_sources, uci, siminfo = get_uci(store)
         start, stop = siminfo['start'], siminfo['stop']
+        siminfo['fused'] = fused
 
         # main processing loop
         msg(1, f'Simulation Start: {start}, Stop: {stop}')
-        for _, operation, segment, delt in opseq.itertuples():
-            msg(2, f'{operation} {segment} DELT(minutes): {delt}')
-            siminfo['delt']      = delt
-            siminfo['tindex']    = date_range(start, stop, freq=Minute(delt))[0:-1]
-            siminfo['steps']     = len(siminfo['tindex'])
-
-            # now conditionally execute all activity modules for the op, segment
-            ts = get_timeseries(store,ddext_sources[(operation,segment)],siminfo)
-            flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
-            if operation == 'RCHRES':
-                get_flows(store, ts, flags, uci, segment, ddlinks, ddmasslinks, siminfo['steps'], msg)
-
-            for activity, function in activities[operation].items():
-                if function == noop or not flags[activity]:
-                    continue
-
-                msg(3, f'{activity}')
-
-                ui = uci[(operation, activity, segment)]   # ui is a dictionary
-                if operation == 'PERLND' and activity == 'SEDMNT':
-                    # special exception here to make CSNOFG available
-                    ui['PARAMETERS']['CSNOFG'] = uci[(operation, 'PWATER', segment)]['PARAMETERS']['CSNOFG']
-                if operation == 'PERLND' and activity == 'PSTEMP':
-                    # special exception here to make AIRTFG available
-                    ui['PARAMETERS']['AIRTFG'] = flags['ATEMP']
-                if operation == 'PERLND' and activity == 'PWTGAS':
-                    # special exception here to make CSNOFG available
-                    ui['PARAMETERS']['CSNOFG'] = uci[(operation, 'PWATER', segment)]['PARAMETERS']['CSNOFG']
-                if operation == 'RCHRES':
-                    if not 'PARAMETERS' in ui:
-                        ui['PARAMETERS'] = {}
-                    ui['PARAMETERS']['NEXITS'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['NEXITS']
-                    if activity == 'ADCALC':
-                        ui['PARAMETERS']['ADFG'] = flags['ADCALC']
-                        ui['PARAMETERS']['KS']   = uci[(operation, 'HYDR', segment)]['PARAMETERS']['KS']
-                        ui['PARAMETERS']['VOL']  = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
-                    if activity == 'HTRCH':
-                        ui['PARAMETERS']['ADFG'] = flags['ADCALC']
-                        ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
-                        # ui['STATES']['VOL'] = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
-                    if activity == 'CONS':
-                        ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
-                    if activity == 'SEDTRN':
-                        ui['PARAMETERS']['ADFG'] = flags['ADCALC']
-                        ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
-                        # ui['STATES']['VOL'] = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
-                        ui['PARAMETERS']['HTFG'] = flags['HTRCH']
-                        if flags['HYDR']:
-                            ui['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
-                            ui['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
-                            ui['PARAMETERS']['DB50'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DB50']
-                    if activity == 'GQUAL':
-                        ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
-                        ui['PARAMETERS']['HTFG'] = flags['HTRCH']
-                        ui['PARAMETERS']['SEDFG'] = flags['SEDTRN']
-                        # ui['PARAMETERS']['REAMFG'] = uci[(operation, 'OXRX', segment)]['PARAMETERS']['REAMFG']
-                        ui['PARAMETERS']['HYDRFG'] = flags['HYDR']
-                        if flags['HYDR']:
-                            ui['PARAMETERS']['LKFG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LKFG']
-                            ui['PARAMETERS']['AUX1FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX1FG']
-                            ui['PARAMETERS']['AUX2FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX2FG']
-                            ui['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
-                            ui['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
-                        if flags['OXRX']:
-                            ui['PARAMETERS']['CFOREA'] = uci[(operation, 'OXRX', segment)]['PARAMETERS']['CFOREA']
-                        if flags['SEDTRN']:
-                            ui['PARAMETERS']['SSED1'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED1']
-                            ui['PARAMETERS']['SSED2'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED2']
-                            ui['PARAMETERS']['SSED3'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED3']
-                        if flags['HTRCH']:
-                            ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['CFSAEX']
-                        elif flags['PLANK']:
-                            if 'CFSAEX' in uci[(operation, 'PLANK', segment)]['PARAMETERS']:
-                                ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'PLANK', segment)]['PARAMETERS']['CFSAEX']
-
-                ############ calls activity function like snow() ##############
-                errors, errmessages = function(store, siminfo, ui, ts)
-                ###############################################################
-
-                for errorcnt, errormsg in zip(errors, errmessages):
-                    if errorcnt > 0:
-                        msg(4, f'Error count {errorcnt}: {errormsg}')
-                if 'SAVE' in ui:
-                    save_timeseries(store,ts,ui['SAVE'],siminfo,saveall,operation,segment,activity,jupyterlab)
+        bus   = ResultBus(opseq, ddlinks)
+        cache = TransformCache(tscache)
+        if workers == 1 and batch:
+            run_batched(store, opseq, uci, siminfo, ddlinks, ddmasslinks,
+             ddext_sources, saveall, jupyterlab, msg, bus, cache)
+        elif workers == 1:
+            for _, operation, segment, delt in opseq.itertuples():
+                run_operation(store, operation, segment, delt, uci, siminfo,
+                 ddlinks, ddmasslinks, ddext_sources, saveall, jupyterlab, msg, bus, cache)
+        else:
+            run_parallel(store, opseq, uci, siminfo, ddlinks, ddmasslinks,
+             ddext_sources, saveall, jupyterlab, workers, msg, bus, cache)
+        msg(1, cache.stats())
         msglist = msg(1, 'Done', final=True)
 
         df = DataFrame(msglist, columns=['logfile'])
@@ -137,6 +90,303 @@ def main(hdfname, saveall=False, jupyterlab=True):
     return
 
 
+def run_operation(store, operation, segment, delt, uci, siminfo, ddlinks,
+ ddmasslinks, ddext_sources, saveall, jupyterlab, msg, bus, cache=None):
+    '''runs all activities for one OP_SEQUENCE row and saves their results'''
+    msg(2, f'{operation} {segment} DELT(minutes): {delt}')
+    set_delt(siminfo, delt)
+
+    # now conditionally execute all activity modules for the op, segment
+    ts = get_timeseries(store,ddext_sources[(operation,segment)],siminfo,cache)
+    flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
+    if operation == 'RCHRES':
+        get_flows(store, ts, flags, uci, segment, ddlinks, ddmasslinks, siminfo['steps'], msg, bus)
+        bus.release(ddlinks, segment)
+
+    exits = {}   # name -> (steps, nexits) outputs of a multi exit reach, shared by its activities
+    for activity, ui in run_activities(store, siminfo, uci, ts, operation, segment, msg, exits, saveall):
+        if 'SAVE' in ui:
+            save_timeseries(store,ts,ui['SAVE'],siminfo,saveall,operation,segment,activity,jupyterlab,bus,exits)
+    exits.clear()
+    return
+
+
+def run_activities(store, siminfo, uci, ts, operation, segment, msg, exits=None, saveall=False, hydro=None):
+    '''generator that executes the enabled activities of one operation in
+    order, yields (activity, ui) after each so the caller can save results.
+    RCHRES activities find the per exit arrays in ui['EXITS'] (exits).
+    With siminfo['fused'] the land hydrology sections run together in phydro(),
+    hydro is the phydro() result of a segment already run by phydro_batch()'''
+    flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
+    fused = {}
+    if operation in PHYDRO_SECTIONS and (siminfo.get('fused') or hydro is not None):
+        fused = fused_uci(uci, operation, segment)
+    results = hydro
+    for activity, function in activities[operation].items():
+        if function == noop or not flags[activity]:
+            continue
+
+        msg(3, f'{activity}')
+
+        ui = uci[(operation, activity, segment)]   # ui is a dictionary
+        if operation == 'PERLND' and activity == 'SEDMNT':
+            # special exception here to make CSNOFG available
+            ui['PARAMETERS']['CSNOFG'] = uci[(operation, 'PWATER', segment)]['PARAMETERS']['CSNOFG']
+        if operation == 'PERLND' and activity == 'PSTEMP':
+            # special exception here to make AIRTFG available
+            ui['PARAMETERS']['AIRTFG'] = flags['ATEMP']
+        if operation == 'PERLND' and activity == 'PWTGAS':
+            # special exception here to make CSNOFG available
+            ui['PARAMETERS']['CSNOFG'] = uci[(operation, 'PWATER', segment)]['PARAMETERS']['CSNOFG']
+        if operation == 'RCHRES':
+            if not 'PARAMETERS' in ui:
+                ui['PARAMETERS'] = {}
+            ui['PARAMETERS']['NEXITS'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['NEXITS']
+            ui['EXITS'] = exits if exits is not None else {}
+            if activity == 'ADCALC':
+                ui['PARAMETERS']['ADFG'] = flags['ADCALC']
+                ui['PARAMETERS']['KS']   = uci[(operation, 'HYDR', segment)]['PARAMETERS']['KS']
+                ui['PARAMETERS']['VOL']  = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
+            if activity == 'HTRCH':
+                ui['PARAMETERS']['ADFG'] = flags['ADCALC']
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+                # ui['STATES']['VOL'] = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
+            if activity == 'CONS':
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+            if activity == 'SEDTRN':
+                ui['PARAMETERS']['ADFG'] = flags['ADCALC']
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+                # ui['STATES']['VOL'] = uci[(operation, 'HYDR', segment)]['STATES']['VOL']
+                ui['PARAMETERS']['HTFG'] = flags['HTRCH']
+                if flags['HYDR']:
+                    ui['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
+                    ui['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
+                    ui['PARAMETERS']['DB50'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DB50']
+            if activity == 'GQUAL':
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+                ui['PARAMETERS']['HTFG'] = flags['HTRCH']
+                ui['PARAMETERS']['SEDFG'] = flags['SEDTRN']
+                # ui['PARAMETERS']['REAMFG'] = uci[(operation, 'OXRX', segment)]['PARAMETERS']['REAMFG']
+                ui['PARAMETERS']['HYDRFG'] = flags['HYDR']
+                if flags['HYDR']:
+                    ui['PARAMETERS']['LKFG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LKFG']
+                    ui['PARAMETERS']['AUX1FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX1FG']
+                    ui['PARAMETERS']['AUX2FG'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['AUX2FG']
+                    ui['PARAMETERS']['LEN'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
+                    ui['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
+                if flags['OXRX']:
+                    ui['PARAMETERS']['CFOREA'] = uci[(operation, 'OXRX', segment)]['PARAMETERS']['CFOREA']
+                if flags['SEDTRN']:
+                    ui['PARAMETERS']['SSED1'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED1']
+                    ui['PARAMETERS']['SSED2'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED2']
+                    ui['PARAMETERS']['SSED3'] = uci[(operation, 'SEDTRN', segment)]['STATES']['SSED3']
+                if flags['HTRCH']:
+                    ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['CFSAEX']
+                elif flags['PLANK']:
+                    if 'CFSAEX' in uci[(operation, 'PLANK', segment)]['PARAMETERS']:
+                        ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'PLANK', segment)]['PARAMETERS']['CFSAEX']
+            if activity == 'OXRX':
+                ui['advectData'] = uci[(operation, 'ADCALC', segment)]['adcalcData']
+                ui['PARAMETERS']['HTFG']  = flags['HTRCH']
+                ui['PARAMETERS']['SEDFG'] = flags['SEDTRN']
+                ui['PARAMETERS']['NUTFG'] = flags['NUTRX']
+                ui['PARAMETERS']['PLKFG'] = flags['PLANK']
+                ui['PARAMETERS']['PHFG']  = flags['PHCARB']
+                if flags['HYDR']:
+                    ui['PARAMETERS']['LKFG']  = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LKFG']
+                    ui['PARAMETERS']['LEN']   = uci[(operation, 'HYDR', segment)]['PARAMETERS']['LEN']
+                    ui['PARAMETERS']['DELTH'] = uci[(operation, 'HYDR', segment)]['PARAMETERS']['DELTH']
+                if flags['HTRCH']:
+                    ui['PARAMETERS']['CFSAEX'] = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['CFSAEX']
+                    ui['PARAMETERS']['ELEV']   = uci[(operation, 'HTRCH', segment)]['PARAMETERS']['ELEV']
+                # the other RQUAL sections are simulated with OXRX and select their saved timeseries there
+                for name in ('RQUAL', 'NUTRX', 'PLANK', 'PHCARB'):
+                    ui[name] = uci[(operation, name, segment)]
+
+        if activity in fused:
+            if results is None:   # first fused section runs them all
+                results = phydro(store, siminfo, fused, ts, flags, saveall, operation)
+            errors, errmessages = results[activity]
+        else:
+            ############ calls activity function like snow() ##############
+            errors, errmessages = function(store, siminfo, ui, ts)
+            ###############################################################
+
+        for errorcnt, errormsg in zip(errors, errmessages):
+            if errorcnt > 0:
+                msg(4, f'Error count {errorcnt}: {errormsg}')
+        yield activity, ui
+    return
+
+
+def fused_uci(uci, operation, segment):
+    '''ui of each enabled phydro() section of a land segment'''
+    flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
+    return {name: uci[(operation, name, segment)] for name in PHYDRO_SECTIONS[operation] if flags[name]}
+
+
+def set_delt(siminfo, delt):
+    '''sets the timing entries of siminfo for an operation's DELT(minutes)'''
+    siminfo['delt']      = delt
+    siminfo['tindex']    = date_range(siminfo['start'], siminfo['stop'], freq=Minute(delt))[0:-1]
+    siminfo['steps']     = len(siminfo['tindex'])
+    return siminfo
+
+
+def operation_levels(opseq, ddlinks):
+    '''groups OP_SEQUENCE rows into topological levels of the LINKS graph.
+    Operations in a level do not depend on each other; every operation is in
+    a later level than all of its upstream operations.'''
+    level  = {}
+    levels = defaultdict(list)
+    for _, operation, segment, delt in opseq.itertuples():
+        sources = [level[x] for x in upstream(ddlinks, segment) if x in level]
+        n = max(sources) + 1 if sources else 0
+        level[f'{operation}_{segment}'] = n
+        levels[n].append((operation, segment, delt))
+    return [levels[n] for n in sorted(levels)]
+
+
+def upstream(ddlinks, segment):
+    '''set of operations, like PERLND_P001, linked into segment'''
+    return {f'{x.SVOL}_{x.SVOLNO}' for x in ddlinks[segment]}
+
+
+class ResultBus:
+    '''In memory copies of saved RESULTS frames for get_flows. A frame is kept
+    only while its operation has RCHRES consumers in OP_SEQUENCE that have not
+    yet read their inflows; the HDF5 file is the persistent copy. Paths are
+    RESULTS/..., root replaces RESULTS in the HDF5 file (DOE_RESULTS/RUN1).'''
+
+    def __init__(self, opseq, ddlinks, root='RESULTS'):
+        self.root   = root
+        self.refs   = defaultdict(int)     # remaining consumers per operation
+        self.frames = defaultdict(dict)    # operation -> {path: DataFrame}
+        for _, operation, segment, _ in opseq.itertuples():
+            if operation == 'RCHRES':
+                for source in upstream(ddlinks, segment):
+                    self.refs[source] += 1
+
+    def put(self, path, df):
+        source = path.split('/')[1]
+        if self.refs[source] > 0 and not df.empty:
+            self.frames[source][path] = df
+
+    def get(self, store, path):
+        '''frame for path from memory, else read once from store; None if missing'''
+        source = path.split('/')[1]
+        frames = self.frames[source]
+        if path not in frames:
+            if self.where(path) not in store:
+                return None
+            frames[path] = store[self.where(path)]
+        return frames[path]
+
+    def where(self, path):
+        '''HDF5 path of a RESULTS/... path'''
+        return self.root + path[len('RESULTS'):]
+
+    def release(self, ddlinks, segment):
+        '''segment has read its inflows, evict frames without other consumers'''
+        for source in upstream(ddlinks, segment):
+            self.refs[source] -= 1
+            if self.refs[source] <= 0:
+                self.frames.pop(source, None)
+
+
+def run_parallel(store, opseq, uci, siminfo, ddlinks, ddmasslinks, ddext_sources,
+ saveall, jupyterlab, workers, msg, bus, cache=None):
+    '''runs OP_SEQUENCE level by level; PERLND and IMPLND segments of a level
+    run in a process pool while its RCHRES operations run here in order'''
+
+    # the only store data read by land activities are the small lookup tables
+    tables = {path[1:]: store[path] for path in store.keys()
+     if path.startswith('/TIMESERIES/') and path.endswith('_Table')}
+
+    segment_uci = defaultdict(dict)
+    for key, value in uci.items():
+        segment_uci[key[0], key[2]][key] = value
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for level in operation_levels(opseq, ddlinks):
+            futures = []
+            for operation, segment, delt in level:
+                if operation != 'RCHRES':
+                    info = set_delt(dict(siminfo), delt)
+                    ts = get_timeseries(store, ddext_sources[(operation,segment)], info, cache)
+                    future = pool.submit(run_segment, tables, operation, segment,
+                     info, segment_uci[operation, segment], dict(ts), saveall)
+                    futures.append((operation, segment, delt, future))
+
+            for operation, segment, delt in level:
+                if operation == 'RCHRES':
+                    run_operation(store, operation, segment, delt, uci, siminfo,
+                     ddlinks, ddmasslinks, ddext_sources, saveall, jupyterlab, msg, bus, cache)
+
+            for operation, segment, delt, future in futures:
+                frames, mlist = future.result()
+                msg(2, f'{operation} {segment} DELT(minutes): {delt}')
+                for indent, message in mlist:
+                    msg(indent, message)
+                for path, df in frames:
+                    write_frame(store, path, df, jupyterlab, bus)
+    return
+
+
+def run_batched(store, opseq, uci, siminfo, ddlinks, ddmasslinks, ddext_sources,
+ saveall, jupyterlab, msg, bus, cache=None):
+    '''runs OP_SEQUENCE level by level; the PERLND and IMPLND segments of a
+    level that share DELT and enabled hydrology sections run those sections
+    in one phydro_batch() call, then their other activities one by one'''
+    for level in operation_levels(opseq, ddlinks):
+        batches = defaultdict(list)
+        for operation, segment, delt in level:
+            if operation in PHYDRO_SECTIONS:
+                key = (operation, delt, tuple(fused_uci(uci, operation, segment)))
+                batches[key].append(segment)
+
+        for (operation, delt, sections), segments in batches.items():
+            set_delt(siminfo, delt)
+            tss = [get_timeseries(store, ddext_sources[(operation,segment)], siminfo, cache)
+             for segment in segments]
+            results = [None] * len(segments)
+            if sections:
+                results = phydro_batch(store, siminfo, [fused_uci(uci, operation, s) for s in segments], tss,
+                 [uci[(operation, 'GENERAL', s)]['ACTIVITY'] for s in segments], saveall, operation)
+
+            for segment, ts, hydro in zip(segments, tss, results):
+                msg(2, f'{operation} {segment} DELT(minutes): {delt}')
+                for activity, ui in run_activities(store, siminfo, uci, ts, operation, segment, msg,
+                 saveall=saveall, hydro=hydro):
+                    if 'SAVE' in ui:
+                        save_timeseries(store,ts,ui['SAVE'],siminfo,saveall,operation,segment,activity,jupyterlab,bus)
+
+        for operation, segment, delt in level:
+            if operation == 'RCHRES':
+                run_operation(store, operation, segment, delt, uci, siminfo,
+                 ddlinks, ddmasslinks, ddext_sources, saveall, jupyterlab, msg, bus, cache)
+    return
+
+
+def run_segment(tables, operation, segment, siminfo, uci, ts, saveall):
+    '''worker process entry; runs one PERLND or IMPLND segment and returns
+    the (path, DataFrame) results to save and its log messages'''
+    mlist = []
+    def msg(indent, message):
+        mlist.append((indent, message))
+
+    uci = defaultdict(dict, uci)
+    tsd = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
+    for name, values in ts.items():
+        tsd[name] = values
+
+    frames = []
+    for activity, ui in run_activities(tables, siminfo, uci, tsd, operation, segment, msg, saveall=saveall):
+        if 'SAVE' in ui:
+            frames.append(timeseries_frame(tsd, ui['SAVE'], siminfo, saveall, operation, segment, activity))
+    return frames, mlist
+
+
 def messages():
     '''Closure routine; msg() prints messages to screen and run log'''
     start = dt.now()
@@ -186,24 +436,29 @@ def get_uci(store):
     return opseq, ddlinks, ddmasslinks, ddext_sources, uci, siminfo
 
 
-def get_timeseries(store, ext_sourcesdd, siminfo):
+def get_timeseries(store, ext_sourcesdd, siminfo, cache=None):
     ''' makes timeseries for the current timestep and trucated to the sim interval'''
     # explicit creation of Numba dictionary with signatures
     ts = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
     for row in ext_sourcesdd:
-        if row.SVOL == '*':
-            path = f'TIMESERIES/{row.SVOLNO}'
-            if path in store:
-                temp1 = store[path]
+        path = f'TIMESERIES/{row.SVOLNO}'
+        key = cache.key(path, row, siminfo) if cache else None
+        t = cache.get(key) if cache else None
+        if t is None:
+            if row.SVOL == '*':
+                if path in store:
+                    temp1 = store[path]
+                else:
+                    print('Get Timeseries ERROR for', path)
+                    continue
             else:
-                print('Get Timeseries ERROR for', path)
-                continue
-        else:
-            temp1 = read_hdf(row.SVOL, path)
+                temp1 = read_hdf(row.SVOL, path)
 
-        if row.MFACTOR != 1.0:
-            temp1 *= row.MFACTOR
-        t = transform(temp1, row.TMEMN, row.TRAN, siminfo)
+            if row.MFACTOR != 1.0:
+                temp1 *= row.MFACTOR
+            t = transform(temp1, row.TMEMN, row.TRAN, siminfo)
+            if cache:
+                cache.put(key, t)
 
         tname = f'{row.TMEMN}{row.TMEMSB}'
         if tname in ts:
@@ -213,33 +468,58 @@ def get_timeseries(store, ext_sourcesdd, siminfo):
     return ts
 
 
-def save_timeseries(store, ts, savedict, siminfo, saveall, operation, segment, activity, jupyterlab=True):
+def save_timeseries(store, ts, savedict, siminfo, saveall, operation, segment, activity, jupyterlab=True, bus=None, exits=None):
     # save computed timeseries (at computation DELT)
+    path, df = timeseries_frame(ts, savedict, siminfo, saveall, operation, segment, activity, exits)
+    write_frame(store, path, df, jupyterlab, bus)
+    return
+
+
+def timeseries_frame(ts, savedict, siminfo, saveall, operation, segment, activity, exits=None):
+    # DataFrame of the timeseries selected by the SAVE table and its HDF5 path
     save = {k for k,v in savedict.items() if v or saveall}
-    df = DataFrame(index=siminfo['tindex'])
+    columns = {}
     if (operation == 'IMPLND' and activity == 'IQUAL') or (operation == 'PERLND' and activity == 'PQUAL'):
         for y in save:
             for z in set(ts.keys()):
                 if '/' + y in z:
                     zrep = z.replace('/','_')
                     zrep2 = zrep.replace(' ', '')
-                    df[zrep2] = ts[z]
+                    columns[zrep2] = ts[z]
                 if '_' + y in z:
-                    df[z] = ts[z]
-        df = df.astype(float32).sort_index(axis='columns')
+                    columns[z] = ts[z]
     elif (operation == 'RCHRES' and (activity == 'CONS' or activity == 'GQUAL')):
         for y in save:
             for z in set(ts.keys()):
                 if '_' + y in z:
-                    df[z] = ts[z]
+                    columns[z] = ts[z]
         for y in (save & set(ts.keys())):
-            df[y] = ts[y]
-        df = df.astype(float32).sort_index(axis='columns')
+            columns[y] = ts[y]
     else:
         for y in (save & set(ts.keys())):
-            df[y] = ts[y]
-        df = df.astype(float32).sort_index(axis='columns')
+            columns[y] = ts[y]
+
+    # (steps, nexits) outputs are saved as columns name1, name2, ... (SAVE tables list them so)
+    for name, values in (exits or {}).items():
+        for i in range(values.shape[1]):
+            if f'{name}{i+1}' in save:
+                columns[f'{name}{i+1}'] = values[:, i]
+
+    # one float32 block, each column is cast while copied into it
+    names = sorted(columns)
+    data = empty((len(siminfo['tindex']), len(names)), dtype=float32, order='F')
+    for j, name in enumerate(names):
+        data[:, j] = columns[name]
+    df = DataFrame(data, index=siminfo['tindex'], columns=names)
     path = f'RESULTS/{operation}_{segment}/{activity}'
+    return path, df
+
+
+def write_frame(store, path, df, jupyterlab=True, bus=None):
+    # HDF5 is the persistent copy, bus keeps frames needed downstream in memory
+    if bus is not None:
+        bus.put(path, df)
+        path = bus.where(path)
     if not df.empty:
         if jupyterlab:
             df.to_hdf(store, path, complib='blosc', complevel=9) # This is the official version
@@ -250,7 +530,7 @@ def save_timeseries(store, ts, savedict, siminfo, saveall, operation, segment, a
     return
 
 
-def get_flows(store, ts, flags, uci, segment, ddlinks, ddmasslinks, steps, msg):
+def get_flows(store, ts, flags, uci, segment, ddlinks, ddmasslinks, steps, msg, bus):
     # get inflows to this operation
     for x in ddlinks[segment]:
         mldata = ddmasslinks[x.MLNO]
@@ -299,8 +579,13 @@ def get_flows(store, ts, flags, uci, segment, ddlinks, ddmasslinks, steps, msg):
                 afactr = x.AFACTR
                 factor = afactr * mfactor
 
+                if (tmemn, str(tmemsb1)) in INFLOWS:   # RQUAL inflow groups, one timeseries per member
+                    tmemn = INFLOWS[(tmemn, str(tmemsb1))]
+
                 # KLUDGE until remaining HSP2 modules are available.
-                if tmemn not in {'IVOL', 'ICON', 'IHEAT', 'ISED', 'ISED1', 'ISED2', 'ISED3', 'IDQAL', 'ISQAL1', 'ISQAL2', 'ISQAL3'}:
+                if tmemn not in {'IVOL', 'ICON', 'IHEAT', 'ISED', 'ISED1', 'ISED2', 'ISED3', 'IDQAL', 'ISQAL1', 'ISQAL2', 'ISQAL3'} | set(INFLOWS.values()):
+                    if tmemn in {'OXIF', 'NUIF1', 'NUIF2', 'PKIF', 'PHIF'}:   # RQUAL inflows not simulated yet
+                        msg(4, f'{x.SVOL} {x.SVOLNO} {sgrpn} {smemn} to {tmemn} {tmemsb1} is not simulated, link skipped')
                     continue
                 if (sgrpn == 'OFLOW' and smemn == 'OVOL') or (sgrpn == 'ROFLOW' and smemn == 'ROVOL'):
                      sgrpn = 'HYDR'
@@ -312,6 +597,9 @@ def get_flows(store, ts, flags, uci, segment, ddlinks, ddmasslinks, steps, msg):
                      sgrpn = 'GQUAL'
                 if (sgrpn == 'OFLOW' and smemn == 'OSQAL') or (sgrpn == 'ROFLOW' and smemn == 'ROSQAL'):
                      sgrpn = 'GQUAL'
+                if sgrpn == 'IQUAL' or sgrpn == 'PQUAL':   # land quality outputs are saved per constituent
+                    smemn = f"IQUAL{smemsb1 if smemsb1 else '1'}_{smemn}"   # pqual() names them IQUALn too
+                    smemsb1 = ''
                 if tmemn == 'ISED' or tmemn == 'ISQAL':
                     tmemn = tmemn + tmemsb1    # need to add sand, silt, clay subscript
 
@@ -322,15 +610,17 @@ def get_flows(store, ts, flags, uci, segment, ddlinks, ddmasslinks, steps, msg):
                 AFname = f'{x.SVOL}{x.SVOLNO}_AFACTR'
                 data = f'{smemn}{smemsb1}{smemsb2}'
 
-                if path in store:
-                    if data in store[path]:
-                        t = store[path][data].astype(float64).to_numpy()[0:steps]
+                df = bus.get(store, path)
+                if df is not None:
+                    if data in df:
+                        t = df[data].astype(float64).to_numpy()[0:steps]
                     else:
                         data = f'{smemn}'
-                        if data in store[path]:
-                            t = store[path][data].astype(float64).to_numpy()[0:steps]
+                        if data in df:
+                            t = df[data].astype(float64).to_numpy()[0:steps]
                         else:
                             print('ERROR in FLOWS, cant resolve ', path + ' ' + smemn)
+                            continue
                     if MFname in ts and AFname in ts:
                         t *= ts[MFname][:steps] * ts[AFname][0:steps]
                         msg(4, f'MFACTOR modified by timeseries {MFname}')
@@ -3,20 +3,25 @@ Author: Robert Heaphy, Ph.D.
 License: LGPL2
 '''
 
-from numpy import float64, float32
-from pandas import HDFStore, Timestamp, read_hdf, DataFrame, date_range
-from pandas.tseries.offsets import Minute
-from numba import types
+from pandas import HDFStore, DataFrame
+from numpy import ndarray, float64
+from numba import types, config, set_num_threads
 from numba.typed import Dict
 from collections import defaultdict
-from datetime import datetime as dt
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+from math import ceil
+from types import SimpleNamespace
 import os
 from copy import deepcopy
-from HSP2.utilities import transform, versions
-from HSP2.configuration import activities, noop
+from HSP2.utilities import versions, TransformCache, clocks
+from HSP2.main import (get_uci, get_timeseries, get_flows, set_delt, run_activities, timeseries_frame,
+ write_frame, messages, fused_uci, ResultBus)
+from HSP2.PHYDRO import phydro_batch, SECTIONS as PHYDRO_SECTIONS
 
 
-def main(hdfname, doe, doename='DOE_RESULTS', saveall=False):
+def main(hdfname, doe, doename='DOE_RESULTS', saveall=False, jupyterlab=True, ensemble=64, tscache=256,
+ workers=1):
     '''
     Runs main HSP2 program with a Design of Experiments.
 
@@ -77,6 +82,25 @@ def main(hdfname, doe, doename='DOE_RESULTS', saveall=False):
     saveall: Boolean
         [optional] Default is False.
         Saves all calculated data ignoring SAVE tables.
+    jupyterlab: Boolean
+        [optional] Default is True.
+        Saves results compressed and records the jupyterlab and notebook
+        versions, as main() does.
+    ensemble: int
+        [optional] Default is 64.
+        Number of runs simulated together. The forcing of an operation is
+        read once for them and the ATEMP, SNOW and PWATER or IWATER sections
+        of a land segment run for all of them in one compiled call along an
+        ensemble axis (see PHYDRO.phydro_batch). 1 runs one run at a time.
+    tscache: float
+        [optional] Default is 256.
+        Memory cap (MB) for transformed forcing shared between runs and
+        segments, 0 disables the cache.
+    workers: int
+        [optional] Default is 1, runs in this process.
+        Number of processes running groups of at most ensemble runs, None
+        uses all cores. The forcing is read once into shared memory for
+        all workers and this process writes all results.
 
     Returns
     -------
@@ -89,114 +113,208 @@ def main(hdfname, doe, doename='DOE_RESULTS', saveall=False):
 
     with HDFStore(hdfname) as store:
         msg = messages()
+        clocks.clear()   # SimClock calendars of an earlier run are not kept
         msg(1, f'Processing started for file {hdfname}; saveall={saveall}')
 
         # read user control, parameters, states, and flags  from HDF5 file
-        opseq, ddlinks, ddmasslinks, ddext_sources, originaluci, siminfo = get_uci(store)
+        opseq, ddlinks, ddmasslinks, ddext_sources, uci, siminfo = get_uci(store)
         start, stop = siminfo['start'], siminfo['stop']
 
         # construct dictionary parallel in form to uciorginal from doe
         rundict = make_runlist(store, doe, doename)
+        runs = list(rundict)
+        cache = TransformCache(tscache)
 
-        # main processing loop
+        # main processing loop, OP_SEQUENCE is run for a group of runs at a time
         msg(1, f'Simulation Start: {start}, Stop: {stop}')
-        for run in rundict:
-            savepath = f'{doename}/RUN{run}'
-            msg(2, f'Starting Run {run}; saving as {savepath}')
-
-            uci = deepcopy(originaluci)
-            for _, operation, segment, delt in opseq.itertuples():
-                msg(3, f'{operation} {segment} DELT(minutes): {delt}')
-                siminfo['delt']      = delt
-                siminfo['tindex']    = date_range(start, stop, freq=Minute(delt))[0:-1]
-                siminfo['steps']     = len(siminfo['tindex'])
-
-                # now conditionally execute all activity modules for the op, segment
-                ts = get_timeseries(store,ddext_sources[(operation,segment)],siminfo)
-                flags = uci[(operation, 'GENERAL', segment)]['ACTIVITY']
-                for activity, function in activities[operation].items():
-                    if function == noop or not flags[activity]:
-                        continue
-
-                    msg(4, f'{activity}')
-                    if operation == 'RCHRES':
-                        get_flows(store,ts,activity,segment,ddlinks,ddmasslinks,siminfo['steps'],msg,savepath)
-                    ui = uci[operation, activity, segment] # ui is a dictionary
-
-                    # update deep copy of UCI dict with run dict
-                    ruci = rundict[run]
-                    if (operation, activity, segment) in ruci:
-                        for table in ruci[operation, activity, segment]:
-                            msg(5, str(ruci[operation, activity, segment][table]))
-                            ui[table].update(ruci[operation, activity, segment][table])
-
-                    ############ calls activity function like snow() ##############
-                    errors, errmessages = function(store, siminfo, ui, ts)
-                    ###############################################################
-
-                    for errorcnt, errormsg in zip(errors, errmessages):
-                        if errorcnt > 0:
-                            msg(5, f'Error count {errorcnt}: {errormsg}')
-                    save_timeseries(store,ts,ui['SAVE'],siminfo,saveall,operation,segment,activity, savepath)
+        size = max(1, int(ensemble))
+        if workers == 1:
+            def save(path, df, bus):
+                write_frame(store, path, df, jupyterlab, bus)
+
+            for first in range(0, len(runs), size):
+                group = runs[first:first+size]
+                msg(2, f'Starting Runs {", ".join(group)}; saving as {doename}/RUNx')
+                buses = [ResultBus(opseq, ddlinks, f'{doename}/RUN{run}') for run in group]
+                for _, operation, segment, delt in opseq.itertuples():
+                    msg(3, f'{operation} {segment} DELT(minutes): {delt}')
+                    set_delt(siminfo, delt)
+                    forcing = get_timeseries(store, ddext_sources[(operation,segment)], siminfo, cache)
+                    run_group(store, operation, segment, uci, siminfo, rundict, group, buses, ddlinks,
+                     ddmasslinks, forcing, saveall, msg, size > 1, save)
+        else:
+            workers = workers or os.cpu_count()
+            run_pool(store, opseq, uci, siminfo, rundict, ddlinks, ddmasslinks, ddext_sources, doename,
+             saveall, jupyterlab, min(size, ceil(len(runs) / workers)), workers, msg, cache)
+        msg(1, cache.stats())
 
         # print Done message with timing and write logfile to HDF5 file
         msglist = msg(1, 'Done', final=True)
         df = DataFrame(msglist, columns=['logfile'])
         df.to_hdf(store, 'RUN_INFO/LOGFILE', data_columns=True, format='t')
 
-        df = versions(['jupyterlab', 'notebook'])
-        df.to_hdf(store, 'RUN_INFO/VERSIONS', data_columns=True, format='t')
-        print('\n\n', df)
+        if jupyterlab:
+            df = versions(['jupyterlab', 'notebook'])
+            df.to_hdf(store, 'RUN_INFO/VERSIONS', data_columns=True, format='t')
+            print('\n\n', df)
     return
 
 
-def messages():
-    '''Closure routine; msg() prints messages to screen and run log'''
-    start = dt.now()
+def run_pool(store, opseq, uci, siminfo, rundict, ddlinks, ddmasslinks, ddext_sources, doename,
+ saveall, jupyterlab, size, workers, msg, cache):
+    '''runs groups of size runs through the whole OP_SEQUENCE in a process pool. The forcing
+    of every OP_SEQUENCE row is read once into one shared memory block the workers attach to;
+    workers return their results and this process is the only writer of the HDF5 file'''
+
+    # the only store data read by activities are the small lookup tables and the FTABLES
+    tables = Tables({path[1:]: store[path] for path in store.keys()
+     if (path.startswith('/TIMESERIES/') and path.endswith('_Table')) or path.startswith('/FTABLES/')})
+
+    rows = []
+    for _, operation, segment, delt in opseq.itertuples():
+        rows.append(get_timeseries(store, ddext_sources[(operation,segment)], set_delt(dict(siminfo), delt), cache))
+    index, offset = [], 0   # per row [(name, start, length)] in the shared block
+    for forcing in rows:
+        names = []
+        for name, values in forcing.items():
+            names.append((name, offset, len(values)))
+            offset += len(values)
+        index.append(names)
+
+    shm = SharedMemory(create=True, size=max(offset, 1) * 8)
+    block = None
+    try:
+        block = ndarray(offset, dtype=float64, buffer=shm.buf)
+        for forcing, names in zip(rows, index):
+            for name, start, length in names:
+                block[start:start+length] = forcing[name]
+        block = rows = None
+
+        threads = max(1, config.NUMBA_NUM_THREADS // workers)
+        links, masslinks = portable(ddlinks), portable(ddmasslinks)
+        runs = list(rundict)
+        with ProcessPoolExecutor(max_workers=workers, initializer=set_num_threads, initargs=(threads,)) as pool:
+            futures = {}
+            for first in range(0, len(runs), size):
+                group = runs[first:first+size]
+                future = pool.submit(run_doe_group, tables, shm.name, index, opseq, uci, siminfo,
+                 {run: rundict[run] for run in group}, group, links, masslinks, doename, saveall,
+                 size > 1)
+                futures[future] = group
+
+            for future in as_completed(futures):
+                frames, mlist = future.result()
+                msg(2, f'Finished Runs {", ".join(futures[future])}; saving as {doename}/RUNx')
+                for indent, message in mlist:
+                    msg(indent, message)
+                for path, df in frames:
+                    write_frame(store, path, df, jupyterlab)
+    finally:
+        block = None   # views into shm.buf must be released before close()
+        shm.close()
+        shm.unlink()
+    return
+
+
+def run_doe_group(tables, shmname, index, opseq, uci, siminfo, rundict, group, ddlinks, ddmasslinks,
+ doename, saveall, batch):
+    '''worker process entry; runs the OP_SEQUENCE for the runs of group with the forcing in the
+    shared memory block shmname and returns the (path, DataFrame) results to save and its log messages'''
     mlist = []
-    def msg(indent, message, final=False):
-        now = dt.now()
-        m = str(now)[:22] + '   ' * indent + message
-        if final:
-            mn,sc = divmod((now-start).seconds, 60)
-            ms = (now-start).microseconds // 100_000
-            m = '; '.join((m, f'Run time is about {mn:02}:{sc:02}.{ms} (mm:ss)'))
-        print(m)
-        mlist.append(m)
-        return mlist
-    return msg
-
-
-def get_uci(store):
-    # read user control and user data from HDF5 file
-    uci = defaultdict(dict)
-    siminfo = {}
-    for path in store.keys():   # finds ALL data sets into HDF5 file
-        op, module, *other = path[1:].split(sep='/', maxsplit=3)
-        s = '_'.join(other)
-        if op == 'CONTROL':
-            if module =='GLOBAL':
-                temp = store[path].to_dict()['Info']
-                siminfo['start'] = Timestamp(temp['Start'])
-                siminfo['stop']  = Timestamp(temp['Stop'])
-            elif module == 'LINKS':
-                ddlinks = defaultdict(list)
-                for row in store[path].itertuples():
-                    ddlinks[row.TVOLNO].append(row)
-            elif module == 'MASS_LINKS':
-                ddmasslinks = defaultdict(list)
-                for row in store[path].itertuples():
-                    ddmasslinks[row.MLNO].append(row)
-            elif module == 'EXT_SOURCES':
-                ddext_sources = defaultdict(list)
-                for row in store[path].itertuples():
-                    ddext_sources[(row.TVOL, row.TVOLNO)].append(row)
-            elif module == 'OP_SEQUENCE':
-                opseq = store[path]
-        elif op in {'PERLND', 'IMPLND', 'RCHRES'}:
-            for id, vdict in store[path].to_dict('index').items():
-                uci[(op, module, id)][s] = vdict
-    return opseq, ddlinks, ddmasslinks, ddext_sources, uci, siminfo
+    def msg(indent, message):
+        mlist.append((indent, message))
+
+    frames = []
+    def save(path, df, bus):
+        bus.put(path, df)
+        frames.append((bus.where(path), df))
+
+    shm = SharedMemory(name=shmname)
+    block = None
+    try:
+        block = ndarray(sum(length for names in index for _, _, length in names), dtype=float64, buffer=shm.buf)
+        buses = [ResultBus(opseq, ddlinks, f'{doename}/RUN{run}') for run in group]
+        for (_, operation, segment, delt), names in zip(opseq.itertuples(), index):
+            msg(3, f'{operation} {segment} DELT(minutes): {delt}')
+            set_delt(siminfo, delt)
+            # copied out of the block, no view into shm.buf outlives this frame when run_group raises
+            forcing = {name: block[start:start+length].copy() for name, start, length in names}
+            run_group(tables, operation, segment, uci, siminfo, rundict, group, buses, ddlinks,
+             ddmasslinks, forcing, saveall, msg, batch, save)
+    finally:
+        block = None   # views into shm.buf must be released before close()
+        shm.close()
+    return frames, mlist
+
+
+def portable(dd):
+    '''copy of a LINKS or MASS_LINKS dictionary that can be sent to workers, the itertuples rows
+    become namespaces with the same attributes'''
+    return defaultdict(list, {key: [SimpleNamespace(**row._asdict()) for row in rows] for key, rows in dd.items()})
+
+
+class Tables(dict):
+    '''store tables shipped to workers; hashable and weakly referable like an HDFStore
+    for the per store caches of the activities'''
+    __hash__ = object.__hash__
+
+
+def run_group(store, operation, segment, uci, siminfo, rundict, group, buses, ddlinks, ddmasslinks,
+ forcing, saveall, msg, batch, save):
+    '''runs one OP_SEQUENCE row for each run in group from the shared forcing; with batch, the
+    land hydrology sections of all runs are simulated by one phydro_batch() call. save(path, df, bus)
+    stores each result frame'''
+    ucis = [run_uci(uci, rundict[run], operation, segment, msg) for run in group]
+    tss = [copy_timeseries(forcing) for run in group]
+
+    results = [None] * len(group)
+    if batch and operation in PHYDRO_SECTIONS:
+        # runs can only share a call when the same sections are enabled
+        batches = defaultdict(list)
+        for i, u in enumerate(ucis):
+            batches[tuple(fused_uci(u, operation, segment))].append(i)
+        for sections, members in batches.items():
+            if sections:
+                hydro = phydro_batch(store, siminfo, [fused_uci(ucis[i], operation, segment) for i in members],
+                 [tss[i] for i in members], [ucis[i][(operation, 'GENERAL', segment)]['ACTIVITY'] for i in members],
+                 saveall, operation)
+                for i, h in zip(members, hydro):
+                    results[i] = h
+
+    for run, u, ts, hydro, bus in zip(group, ucis, tss, results, buses):
+        msg(4, f'Run {run}')
+        if operation == 'RCHRES':
+            flags = u[(operation, 'GENERAL', segment)]['ACTIVITY']
+            get_flows(store, ts, flags, u, segment, ddlinks, ddmasslinks, siminfo['steps'], msg, bus)
+            bus.release(ddlinks, segment)
+
+        exits = {}   # name -> (steps, nexits) outputs of a multi exit reach, shared by its activities
+        for activity, ui in run_activities(store, siminfo, u, ts, operation, segment, msg, exits, saveall, hydro):
+            if 'SAVE' in ui:
+                save(*timeseries_frame(ts, ui['SAVE'], siminfo, saveall, operation, segment, activity, exits), bus)
+    return
+
+
+def run_uci(uci, changes, operation, segment, msg):
+    '''copy of the UCI tables of one segment with the changes of a run applied'''
+    ruci = defaultdict(dict)
+    for key, value in uci.items():
+        if key[0] == operation and key[2] == segment:
+            ruci[key] = deepcopy(value)
+    for key, tables in changes.items():
+        if key[0] == operation and key[2] == segment:
+            for table, values in tables.items():
+                msg(5, f'{key[1]} {table} {dict(values)}')
+                ruci[key].setdefault(table, {}).update(values)
+    return ruci
+
+
+def copy_timeseries(ts):
+    '''numba Dict with copies of the arrays of ts, activities may modify them'''
+    tsd = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
+    for name, values in ts.items():
+        tsd[name] = values.copy()
+    return tsd
 
 
 def make_runlist(store, doe, doename):
@@ -216,112 +334,6 @@ def make_runlist(store, doe, doename):
     return rundict
 
 
-def get_timeseries(store, ext_sourcesdd, siminfo):
-    ''' makes timeseries for the current timestep and trucated to the sim interval'''
-    # explicit creation of Numba dictionary with signatures
-    ts = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
-    for row in ext_sourcesdd:
-        if row.SVOL == '*':
-            path = f'TIMESERIES/{row.SVOLNO}'
-            if path in store:
-                temp1 = store[path]
-            else:
-                print('Get Timeseries ERROR for', path)
-                continue
-        else:
-            temp1 = read_hdf(row.SVOL, path)
-
-        if row.MFACTOR != 1.0:
-            temp1 *= row.MFACTOR
-        t = transform(temp1, row.TMEMN, row.TRAN, siminfo)
-
-        tname = f'{row.TMEMN}{row.TMEMSB}'
-        if tname in ts:
-            ts[tname] += t
-        else:
-            ts[tname]  = t
-    return ts
-
-
-def save_timeseries(store,ts,savedict,siminfo,saveall,operation,segment,activity,savepath):
-    # save computed timeseries (at computation DELT)
-    save = {k for k,v in savedict.items() if v or saveall}
-    df = DataFrame(index=siminfo['tindex'])
-    for y in (save & set(ts.keys())):
-        df[y] = ts[y]
-    df = df.astype(float32).sort_index(axis='columns')
-    path = f'{savepath}/{operation}_{segment}/{activity}'
-    if not df.empty:
-        store.put(path, df)
-    else:
-        print('Save DataFrame Empty for', path)
-    return
-
-
-def get_flows(store, ts, activity, segment, ddlinks, ddmasslinks, steps, msg, savepath):
-    for x in ddlinks[segment]:
-        mldata = ddmasslinks[x.MLNO]
-        for dat in mldata:
-            if x.MLNO == '':  # Data from NETWORK part of Links table
-                mfactor = x.MFACTOR
-                sgrpn   = x.SGRPN
-                smemn   = x.SMEMN
-                smemsb  = x.SMEMSB
-                tmemn   = x.TMEMN
-                tmemsb  = x.TMEMSB
-            else:   # Data from SCHEMATIC part of Links table
-                mfactor = dat.MFACTOR
-                sgrpn   = dat.SGRPN
-                smemn   = dat.SMEMN
-                smemsb  = dat.SMEMSB
-                tmemn   = dat.TMEMN
-                tmemsb  = dat.TMEMSB
-
-            afactr = x.AFACTR
-            factor = afactr * mfactor
-
-            # KLUDGE until remaining HSP2 modules are available.
-            if tmemn not in {'IVOL', ''}:
-                continue
-            if sgrpn == 'OFLOW' and dat.SVOL == 'RCHRES':
-                tmemn = 'IVOL'
-                smemn = 'OVOL'
-                sgrpn = 'HYDR'
-            if sgrpn == 'ROFLOW' and dat.SVOL == 'RCHRES':
-                tmemn = 'IVOL'
-                smemn = 'ROVOL'
-                sgrpn = 'HYDR'
-
-            path = f'{savepath}/{x.SVOL}_{x.SVOLNO}/{sgrpn}'
-            MFname = f'{x.SVOL}{x.SVOLNO}_MFACTOR'
-            AFname = f'{x.SVOL}{x.SVOLNO}_AFACTR'
-            data = f'{smemn}{smemsb}'
-
-            if path in store:
-                t = store[path][data].astype(float64).to_numpy()[0:steps]
-                if MFname in ts and AFname in ts:
-                    t *= ts[MFname][:steps] * ts[AFname][0:steps]
-                    msg(4, f'MFACTOR modified by timeseries {MFname}')
-                    msg(4, f'AFACTR modified by timeseries {AFname}')
-                elif MFname in ts:
-                    t *= afactr * ts[MFname][0:steps]
-                    msg(4, f'MFACTOR modified by timeseries {MFname}')
-                elif AFname in ts:
-                    t *= mfactor * ts[AFname][0:steps]
-                    msg(4, f'AFACTR modified by timeseries {AFname}')
-                else:
-                    t *= factor
-
-                # ??? ISSUE: can fetched data be at different frequency - don't know how to transform.
-                if tmemn in ts:
-                    ts[tmemn] += t
-                else:
-                    ts[tmemn] = t
-            else:
-                print('ERROR in FLOWS for', path)
-    return
-
-
 '''
 
     # This table defines the expansion to INFLOW, ROFLOW, OFLOW for RCHRES networks
@@ -4,13 +4,17 @@ License: LGPL2
 General routines for HSP2 '''
 
 
-from pandas import Series, date_range
+from pandas import Timestamp, date_range
 from pandas.tseries.offsets import Minute
-from numpy import zeros, full, tile, float64
+from numpy import zeros, full, float64, int64, asarray, arange, append, where, nan
+from numpy import interp, maximum, minimum, add
 from numba import types
 from numba.typed import Dict
+from collections import OrderedDict
 
 
+DAYNS = 86_400_000_000_000   # nanoseconds per day
+
 flowtype = {
   # EXTERNAL FLOWS
   'PREC','WIND','WINMOV','SOLRAD','PETINP','POTEV','SURLI','IFWLI','AGWLI',
@@ -57,6 +61,62 @@ def make_numba_dict(uci):
 
 
 
+class TSBlock:
+    '''
+    Struct of arrays timeseries storage for compiled kernels.
+
+    Every series is a row of one C contiguous (rows, steps) float64 array.
+    Names are resolved to rows here, before the kernel runs, so hot loops
+    index rows by integer slot and never hash strings. A name may own several
+    consecutive rows (one per exit for example) which stay a contiguous 2-D
+    block, something the numba ts Dict can't hold.
+
+    Parameters
+    ----------
+    steps : int
+        Number of simulation steps, the length of every row.
+    layout : sequence
+        Names in slot order, a (name, nrows) pair reserves nrows rows.
+    '''
+
+    def __init__(self, steps, layout):
+        self.steps = steps
+        self.slots = {}     # name -> (first row, nrows), nrows None for a single series
+        start = 0
+        for entry in layout:
+            name, nrows = (entry, None) if isinstance(entry, str) else entry
+            self.slots[name] = (start, nrows)
+            start += 1 if nrows is None else nrows
+        self.data = zeros((start, steps))
+
+    def __contains__(self, name):
+        return name in self.slots
+
+    def __getitem__(self, name):
+        '''row view of a series, (nrows, steps) view of a multi row name'''
+        start, nrows = self.slots[name]
+        return self.data[start] if nrows is None else self.data[start:start+nrows]
+
+    def slot(self, name):
+        '''first row of name in data'''
+        return self.slots[name][0]
+
+    def load(self, ts, names):
+        '''copy the named ts series into their rows'''
+        for name in names:
+            self[name][:] = ts[name][0:self.steps]
+
+    def publish(self, ts, names):
+        '''put row views (no copy) into ts, rows of a multi row name become name1, name2, ...'''
+        for name in names:
+            start, nrows = self.slots[name]
+            if nrows is None:
+                ts[name] = self.data[start]
+            else:
+                for i in range(nrows):
+                    ts[f'{name}{i+1}'] = self.data[start+i]
+
+
 def transform(ts, name, how, siminfo):
     '''
      upsample (disaggregate) /downsample (aggregate) ts to freq and trim to [start:stop]
@@ -64,75 +124,238 @@ def transform(ts, name, how, siminfo):
          disaggregate: LAST, SAME, DIV, ZEROFILL, INTERPOLATE
          aggregate: MEAN, SUM, MAX, MIN
     NOTE: these routines work for both regular and sparse timeseries input
+    The input Series is not modified; when its frequency matches DELT the
+    result may be a view of its data.
     '''
 
     tsfreq = ts.index.freq
     freq   = Minute(siminfo['delt'])
-    stop   = siminfo['stop']
+    start, stop, steps = siminfo['start'], siminfo['stop'], siminfo['steps']
 
-    # append duplicate of last point to force processing last full interval
-    if ts.index[-1] < stop:
-        ts[stop] = ts[-1]
+    times  = ts.index.asi8           # int64 nanoseconds
+    values = ts.to_numpy()
+    extend = times[-1] < stop.value
 
     if freq == tsfreq:
-        pass
-    elif tsfreq == None:     # Sparse time base, frequency not defined
-        ts = ts.reindex(siminfo['tbase']).ffill().bfill()
-    elif how == 'SAME':
-        ts = ts.resample(freq).ffill()  # tsfreq >= freq assumed, or bad user choice
+        lo = times.searchsorted(start.value)
+        hi = times.searchsorted(stop.value, side='right')
+        t = append(values[lo:hi], values[-1:]) if extend else values[lo:hi]
+        return asarray(t, dtype=float64)[0:steps]
+
+    # append duplicate of last point to force processing last full interval
+    if extend:
+        times  = append(times, stop.value)
+        values = append(values, values[-1:])
+
+    if tsfreq == None:     # Sparse time base, frequency not defined
+        grid = date_range(start, stop, freq=freq).asi8
+        t = values[maximum(times.searchsorted(grid, side='right') - 1, 0)]
+        return asarray(t, dtype=float64)[0:steps]
+
+    grid = resample_grid(times, freq.nanos, start.value, stop.value)[0:steps]
+    if how == 'SAME' or how == 'LAST':
+        t = ffill(times, values, grid)
     elif not how:
         if name in flowtype:
             if 'Y' in str(tsfreq) or 'M' in str(tsfreq) or tsfreq > freq:
                 if   'M' in str(tsfreq):  ratio = 1.0/730.5
                 elif 'Y' in str(tsfreq):  ratio = 1.0/8766.0
                 else:                     ratio = freq / tsfreq
-                ts = (ratio * ts).resample(freq).ffill()   # HSP2 how = div
+                t = ffill(times, values, grid) * ratio     # HSP2 how = div
             else:
-                ts = ts.resample(freq).sum()
+                t = aggregate(times, values, grid, freq.nanos, 'SUM')
         else:
             if 'Y' in str(tsfreq) or 'M' in str(tsfreq) or tsfreq > freq:
-                ts = ts.resample(freq).ffill()
+                t = ffill(times, values, grid)
             else:
-                ts = ts.resample(freq).mean()
-    elif how == 'MEAN':        ts = ts.resample(freq).mean()
-    elif how == 'SUM':         ts = ts.resample(freq).sum()
-    elif how == 'MAX':         ts = ts.resample(freq).max()
-    elif how == 'MIN':         ts = ts.resample(freq).min()
-    elif how == 'LAST':        ts = ts.resample(freq).ffill()
-    elif how == 'DIV':         ts = (ts * (freq / ts.index.freq)).resample(freq).ffill()
-    elif how == 'ZEROFILL':    ts = ts.resample(freq).fillna(0.0)
-    elif how == 'INTERPOLATE': ts = ts.resample(freq).interpolate()
+                t = aggregate(times, values, grid, freq.nanos, 'MEAN')
+    elif how in {'MEAN', 'SUM', 'MAX', 'MIN'}:
+        t = aggregate(times, values, grid, freq.nanos, how)
+    elif how == 'DIV':         t = ffill(times, values, grid) * (freq / tsfreq)
+    elif how == 'ZEROFILL':    t = asfreq(times, values, grid, 0.0)
+    elif how == 'INTERPOLATE': t = interpolate(times, values, grid, freq.nanos)
     else:
         print(f'UNKNOWN method in TRANS, {how}')
         return zeros(1)
+    return asarray(t, dtype=float64)
+
+
+def resample_grid(times, f, start, stop):
+    '''int64 times of the pandas resample bins (origin at midnight of the
+    first day, labels on the left) that fall within [start, stop]'''
+    origin = times[0] - times[0] % DAYNS
+    first  = max((times[0] - origin) // f, -((origin - start) // f))   # ceil
+    last   = min((times[-1] - origin) // f, (stop - origin) // f)
+    return origin + arange(first, last + 1, dtype=int64) * f
+
+
+def ffill(times, values, grid):
+    '''value of the last source point at or before each grid time'''
+    idx = times.searchsorted(grid, side='right') - 1
+    t = values[maximum(idx, 0)]
+    if len(idx) and idx[0] < 0:
+        t = t.astype(float64)
+        t[idx < 0] = nan
+    return t
+
+
+def asfreq(times, values, grid, fill):
+    '''source values at matching grid times, fill elsewhere'''
+    pos = minimum(times.searchsorted(grid), len(times) - 1)
+    hit = times[pos] == grid
+    return where(hit, values[pos], fill)
+
+
+def interpolate(times, values, grid, f):
+    '''linear interpolation between the source points that fall on the
+    resample bins, constant after the last one and NaN before the first one'''
+    on = (times - (times[0] - times[0] % DAYNS)) % f == 0
+    if not on.any():
+        return full(len(grid), nan)
+    t = interp(grid, times[on], values[on].astype(float64))
+    t[grid < times[on][0]] = nan
+    return t
+
+
+def aggregate(times, values, grid, f, how):
+    '''MEAN, SUM, MAX or MIN of the source points within [grid, grid + f)'''
+    lo = times.searchsorted(grid)
+    hi = times.searchsorted(grid + f)
+    count = hi - lo
+    t = full(len(grid), 0.0 if how == 'SUM' else nan)
+    if len(grid) == 0 or hi[-1] == lo[0]:
+        return t.astype(values.dtype)
+    # bins are contiguous, so each non-empty bin runs to the next one's start
+    segment = values[lo[0]:hi[-1]].astype(float64)
+    ok  = count > 0
+    idx = lo[ok] - lo[0]
+    if   how == 'MAX':  t[ok] = maximum.reduceat(segment, idx)
+    elif how == 'MIN':  t[ok] = minimum.reduceat(segment, idx)
+    elif how == 'SUM':  t[ok] = add.reduceat(segment, idx)
+    else:               t[ok] = add.reduceat(segment, idx) / count[ok]
+    return t.astype(values.dtype)
+
+
+class TransformCache:
+    '''
+    Run scoped LRU cache of transformed external timeseries.
+
+    Many segments read the same TIMESERIES with the same TRAN, MFACTOR and
+    DELT; the cache returns a copy of the already resampled float64 array.
+
+    Parameters
+    ----------
+    maxmb : float, optional
+        Memory cap in megabytes, least recently used arrays are evicted first.
+        The default is 256. Zero disables caching.
+    '''
+
+    def __init__(self, maxmb=256):
+        self.maxbytes = maxmb * 1_000_000
+        self.nbytes   = 0
+        self.hits     = 0
+        self.misses   = 0
+        self.data     = OrderedDict()
+
+    def key(self, path, row, siminfo):
+        '''only the flowtype class of TMEMN changes the default transform'''
+        return (row.SVOL, path, row.TMEMN in flowtype, row.TRAN, row.MFACTOR,
+         siminfo['delt'], siminfo['start'], siminfo['stop'])
+
+    def get(self, key):
+        if key in self.data:
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key].copy()    # callers may modify ts arrays
+        self.misses += 1
+        return None
+
+    def put(self, key, t):
+        if t.nbytes > self.maxbytes:
+            return
+        self.data[key] = t.copy()
+        self.nbytes += t.nbytes
+        while self.nbytes > self.maxbytes:
+            _, old = self.data.popitem(last=False)
+            self.nbytes -= old.nbytes
+
+    def stats(self):
+        return f'Timeseries cache: {self.hits} hits, {self.misses} misses, {len(self.data)} arrays, {self.nbytes / 1_000_000:.1f} MB'
+
+
+class SimClock:
+    '''
+    Calendar of the simulation grid for one (start, stop, delt).
+
+    Built once and shared by all activities (see simclock), it holds integer
+    arrays for the grid points start, start+delt, ..., stop and caches the
+    hourly flag and lapse vectors requested by the activities; monthly and
+    daily vectors are single gathers and are not cached. Results match the
+    former pandas resampling helpers.
+    '''
 
-    start, steps = siminfo['start'], siminfo['steps']
-    return ts[start:stop].to_numpy().astype(float64)[0:steps]
+    def __init__(self, start, stop, delt):
+        self.start = start
+        self.stop  = stop
+        self.delt  = delt
+
+        index = date_range(start, stop, freq=Minute(delt))
+        self.hour      = index.hour.to_numpy()
+        self.minute    = index.minute.to_numpy()
+        self.day       = index.day.to_numpy()
+        self.month     = index.month.to_numpy()
+        self.dayofyear = index.dayofyear.to_numpy()
+        self.daysinmonth = index.days_in_month.to_numpy()
+        self.daystart  = (self.hour == 0) & (self.minute == 0)   # day boundaries
+
+        # HSPF legacy: dofirst flags Jan 1 00:00 of the start year
+        self.newyear = start == Timestamp(start.year, 1, 1)
+        self.cache = {}
+
+    def hoursval(self, hours24, dofirst=False, lapselike=False):
+        '''hours flags, flag on the hour or lapse table over full simulation'''
+        hours24 = asarray(hours24, dtype=float64)
+        key = ('hours', tuple(hours24), dofirst, lapselike)
+        if key not in self.cache:
+            if self.delt > 60:      # aggregate the hours within each interval
+                table = hours24[(self.hour[:, None] + arange(self.delt // 60)) % 24]
+                if dofirst and self.newyear:
+                    table[0, 0] = 1.0
+                values = table.mean(axis=1) if lapselike else table.max(axis=1)
+            else:
+                values = hours24[self.hour]
+                if dofirst and self.newyear:
+                    values[0] = 1.0
+                if not lapselike:   # flag only on the hour
+                    values[self.minute != 0] = 0.0
+            self.cache[key] = values
+        return self.cache[key].copy()
+
+    def monthval(self, monthly):
+        '''value at start of month for all times within the month'''
+        monthly = asarray(monthly, dtype=float64)
+        return monthly[self.month - 1]
+
+    def dayval(self, monthly):
+        '''HSPF interpolation of monthly values to the day, constant within day'''
+        monthly = asarray(monthly, dtype=float64)
+        this = monthly[self.month - 1]
+        slope = (monthly[self.month % 12] - this) / self.daysinmonth
+        return slope * (self.day - 1) + this
+
+
+clocks = {}   # cleared by main() at the start of each run
+def simclock(siminfo):
+    '''shared SimClock for the start, stop and delt in siminfo'''
+    key = (siminfo['start'], siminfo['stop'], siminfo['delt'])
+    if key not in clocks:
+        clocks[key] = SimClock(*key)
+    return clocks[key]
 
 
 def hoursval(siminfo, hours24, dofirst=False, lapselike=False):
     '''create hours flags, flag on the hour or lapse table over full simulation'''
-    start = siminfo['start']
-    stop  = siminfo['stop']
-    freq  = Minute(siminfo['delt'])
-
-    dr = date_range(start=f'{start.year}-01-01', end=f'{stop.year}-12-31', freq=Minute(60))
-    hours = tile(hours24, (len(dr) + 23) // 24).astype(float)
-    if dofirst:
-        hours[0] = 1
-
-    ts = Series(hours[0:len(dr)], dr)
-    if lapselike:
-        if ts.index.freq > freq:     # upsample
-            ts = ts.resample(freq).asfreq().ffill()
-        elif ts.index.freq < freq:   # downsample
-            ts = ts.resample(freq).mean()
-    else:
-        if ts.index.freq > freq:     # upsample
-            ts = ts.resample(freq).asfreq().fillna(0.0)
-        elif ts.index.freq < freq:   # downsample
-            ts = ts.resample(freq).max()
-    return ts.truncate(start, stop).to_numpy()
+    return simclock(siminfo).hoursval(hours24, dofirst, lapselike)
 
 
 def hourflag(siminfo, hourfg, dofirst=False):
@@ -144,39 +367,13 @@ def hourflag(siminfo, hourfg, dofirst=False):
 
 def monthval(siminfo, monthly):
     ''' returns value at start of month for all times within the month'''
-    start = siminfo['start']
-    stop  = siminfo['stop']
-    freq  = Minute(siminfo['delt'])
-
-    months = tile(monthly, stop.year - start.year + 1).astype(float)
-    dr = date_range(start=f'{start.year}-01-01', end=f'{stop.year}-12-31',
-     freq='MS')
-    ts = Series(months, index=dr).resample('D').ffill()
-
-    if ts.index.freq > freq:     # upsample
-        ts = ts.resample(freq).asfreq().ffill()
-    elif ts.index.freq < freq:   # downsample
-        ts = ts.resample(freq).mean()
-    return ts.truncate(start, stop).to_numpy()
+    return simclock(siminfo).monthval(monthly)
 
 
 def dayval(siminfo, monthly):
     '''broadcasts HSPF monthly data onto timeseries at desired freq with HSPF
     interpolation to day, but constant within day'''
-    start = siminfo['start']
-    stop  = siminfo['stop']
-    freq  = Minute(siminfo['delt'])
-
-    months = tile(monthly, stop.year - start.year + 1).astype(float)
-    dr = date_range(start=f'{start.year}-01-01', end=f'{stop.year}-12-31',
-     freq='MS')
-    ts = Series(months, index=dr).resample('D').interpolate('time')
-
-    if ts.index.freq > freq:     # upsample
-        ts = ts.resample(freq).ffill()
-    elif ts.index.freq < freq:   # downsample
-        ts = ts.resample(freq).mean()
-    return ts.truncate(start, stop).to_numpy()
+    return simclock(siminfo).dayval(monthly)
 
 
 def initm(siminfo, ui, flag, monthly, default):
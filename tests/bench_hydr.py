@@ -0,0 +1,145 @@
+''' Times the HYDR kernel _hydr_ on one reach for two versions of HSP2/HYDR.py.
+
+The default pair is the commit that made demand() fill caller owned buffers
+(e0738d2) and its parent. Each version is taken from git, so the inputs,
+the driver hydr() and the rest of HSP2 are the same for both; only the timed
+_hydr_ call differs. The outputs RO, ROVOL and VOL of the two are compared.
+
+usage: python tests/bench_hydr.py [--reach R001] [--repeat 50] [--before REV] [--after REV] [hdfname]
+    REV is a git revision or "working" for the HYDR.py in this tree. Without
+    hdfname, tests/test10/HSP2results/test10.uci and test10.wdm are converted
+    into a temporary HDF5 file first.
+'''
+
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from copy import deepcopy
+
+import pandas as pd
+from numba import types
+from numba.typed import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from HSP2 import main                            # noqa: E402
+from HSP2.configuration import activities        # noqa: E402
+from HSP2tools import readUCI, readWDM           # noqa: E402
+
+OUTPUTS = ('RO', 'ROVOL', 'VOL')
+
+
+class Done(Exception):
+    ''' stops the HSP2 run once the reach has been timed'''
+
+
+def load_hydr(rev, tmpdir):
+    ''' HSP2/HYDR.py at git revision rev as a module of its own'''
+    path = os.path.join(tmpdir, f"hydr_{rev.replace('~', '_').replace('^', '_')}.py")
+    if rev == 'working':
+        shutil.copy(os.path.join(ROOT, 'HSP2', 'HYDR.py'), path)
+    else:
+        source = subprocess.run(['git', 'show', f'{rev}:HSP2/HYDR.py'], cwd=ROOT,
+            check=True, capture_output=True, text=True).stdout
+        with open(path, 'w') as f:
+            f.write(source)
+    spec = importlib.util.spec_from_file_location(os.path.basename(path)[:-3], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def time_hydr(module, store, siminfo, uci, ts, repeat):
+    ''' best wall time of module._hydr_ over repeat runs of module.hydr(), and the outputs'''
+    kernel = module._hydr_
+    elapsed = []
+
+    def timed(*args):
+        t0 = time.perf_counter()
+        errors = kernel(*args)
+        elapsed.append(time.perf_counter() - t0)
+        return errors
+
+    module._hydr_ = timed
+    try:
+        for _ in range(repeat + 1):        # first run compiles or loads the numba cache
+            tsc = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:])
+            for name, value in ts.items():
+                tsc[name] = value.copy()
+            module.hydr(store, siminfo, deepcopy(uci), tsc)
+    finally:
+        module._hydr_ = kernel
+    return min(elapsed[1:]), {name: tsc[name].copy() for name in OUTPUTS}
+
+
+def main_args():
+    parser = argparse.ArgumentParser(description='time _hydr_ on one reach before and after a change')
+    parser.add_argument('hdfname', nargs='?', help='HSP2 HDF5 file, default test10 converted')
+    parser.add_argument('--reach', default='R001')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--before', default='e0738d2~1')
+    parser.add_argument('--after', default='e0738d2')
+    return parser.parse_args()
+
+
+def bench(args, tmpdir):
+    hdfname = os.path.join(tmpdir, 'bench.h5')
+    if args.hdfname:
+        shutil.copy(args.hdfname, hdfname)
+    else:
+        data = os.path.join(ROOT, 'tests', 'test10', 'HSP2results')
+        with contextlib.redirect_stdout(io.StringIO()):
+            readUCI(os.path.join(data, 'test10.uci'), hdfname)
+            readWDM(os.path.join(data, 'test10.wdm'), hdfname, jupyterlab=False)
+
+    with pd.HDFStore(hdfname, 'r') as store:
+        opseq = store['CONTROL/OP_SEQUENCE']
+    reaches = list(opseq[opseq.OPERATION == 'RCHRES'].SEGMENT)
+    target = reaches.index(args.reach)   # hydr() is called once per reach in OP_SEQUENCE order
+
+    versions = [(rev, load_hydr(rev, tmpdir)) for rev in (args.before, args.after)]
+    hydr = activities['RCHRES']['HYDR']
+    calls, results = [], []
+
+    def capture(store, siminfo, uci, ts):
+        calls.append(siminfo['steps'])
+        if len(calls) - 1 == target:
+            results.extend((rev,) + time_hydr(module, store, siminfo, uci, ts, args.repeat) for rev, module in versions)
+            raise Done
+        return hydr(store, siminfo, uci, ts)
+
+    activities['RCHRES']['HYDR'] = capture
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):   # the run's log
+            main(hdfname, jupyterlab=False)
+    except Done:
+        pass
+    finally:
+        activities['RCHRES']['HYDR'] = hydr
+    report(args, calls[-1], results)
+
+
+def report(args, steps, results):
+    (rev0, t0, out0), (rev1, t1, out1) = results
+    same = all((out0[name] == out1[name]).all() for name in OUTPUTS)
+    print(f'{args.reach}, {steps} steps, best of {args.repeat}')
+    print(f'  {rev0:>12}  {t0 * 1000.0:8.2f} ms')
+    print(f'  {rev1:>12}  {t1 * 1000.0:8.2f} ms   {t0 / t1:.1f}x')
+    print(f"  {', '.join(OUTPUTS)} {'bit-identical' if same else 'DIFFER'}")
+
+
+if __name__ == '__main__':
+    warnings.filterwarnings('ignore')
+    args = main_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bench(args, tmpdir)
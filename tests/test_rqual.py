@@ -0,0 +1,145 @@
+''' Compares the test10 RQUAL results with HSPF's results for the same UCI.
+
+HSPF reference data:
+    tests/test10/HSPFresults/test10.d66    daily mean DOX of R001 and R005 (DISPLY 1 and 3)
+    tests/test10/HSPFresults/test10.p95    6 hourly pH of R004 (PLTGEN, LAST value)
+    tests/test10b/HSPFresults/hspf.h5      monthly RCHRES tables (end of month states and
+                                           monthly flux totals) read from HSPF's HBN file
+
+Tolerances, set from the differences seen when the test was written:
+    DOX     daily mean within 2.0 mg/l, annual mean within 0.6 mg/l. The day R005 falls
+            almost dry (VOL under 0.001 ac-ft) is skipped, the concentration there is
+            mass over a vanishing volume in both models.
+    pH      R004 6 hourly within 1.0 at every step and within 0.2 at 95% of the steps,
+            end of month within 0.2 in every reach
+    BOD     end of month within 0.05 mg/l
+    PHYTO   end of month within 0.01 mg/l
+    PHYDOX  monthly totals within 10% (or 0.05 mg/l) of DOXFLUXPHYTO, same sign
+
+The run takes about half a minute. Run from the repository root with: python -m pytest tests
+'''
+
+
+import contextlib
+import io
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from HSP2 import main
+from HSP2tools import readUCI, readWDM
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+HSPF = os.path.join(TESTS, 'test10', 'HSPFresults')
+HBN  = os.path.join(TESTS, 'test10b', 'HSPFresults', 'hspf.h5')
+REACHES = ('001', '002', '003', '004', '005')
+UNDEFINED = -1.0e29            # HSPF and HSP2 write -1.0E30 while a reach is dry
+
+
+def read_d66(path, title):
+    ''' daily values of the DISPLY annual table whose title contains title'''
+    with open(path) as f:
+        lines = f.read().replace('\r', '').split('\n')
+    first = next(i for i, line in enumerate(lines) if title in line)
+    header = next(i for i in range(first, len(lines)) if lines[i].split()[:2] == ['Day', 'JAN'])
+    year = int(lines[header - 2].split()[-1].split('/')[0])   # "Summary for period ending 1976/12"
+    values = {}
+    for line in lines[header + 1:]:
+        if line.strip().startswith('AVER'):
+            break
+        if not line.strip():
+            continue
+        day = int(line[0:7])
+        for month in range(12):                # right aligned, JAN ends in column 18
+            field = line[10 + 8 * month: 18 + 8 * month].strip()
+            if field and '*' not in field:     # blank past month end, stars when undefined
+                values[pd.Timestamp(year, month + 1, day)] = float(field)
+    return pd.Series(values).sort_index()
+
+
+def read_p95(path, curve):
+    ''' values of PLTGEN curve number curve (0 based), indexed by the end of each interval'''
+    values = {}
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 7 or fields[0] != 'SIMU' or not fields[1].isdigit():
+                continue
+            year, month, day, hour = map(int, fields[1:5])
+            values[pd.Timestamp(year, month, day) + pd.Timedelta(hours=hour)] = float(fields[6 + curve])
+    return pd.Series(values)
+
+
+def hbn(table, reach):
+    ''' HSPF monthly table; HSPF labels a month by the first day of the next one'''
+    df = pd.read_hdf(HBN, f'/RCHRES_{table}_{reach}_4')
+    df.index = df.index - pd.DateOffset(months=1)
+    return df
+
+
+@pytest.fixture(scope='module')
+def results(tmp_path_factory):
+    hdfname = str(tmp_path_factory.mktemp('test10') / 'test10.h5')
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        readUCI(os.path.join(TESTS, 'test10', 'HSP2results', 'test10.uci'), hdfname)
+        readWDM(os.path.join(TESTS, 'test10', 'HSP2results', 'test10.wdm'), hdfname, jupyterlab=False)
+        main(hdfname, saveall=True, jupyterlab=False)
+
+    def get(reach, table):
+        return pd.read_hdf(hdfname, f'/RESULTS/RCHRES_R{reach}/{table}')
+    return get
+
+
+def end_of_month(series):
+    return series.resample('MS').last()
+
+
+@pytest.mark.parametrize('reach, title', [('001', 'O2 CONC, MEIER POND'), ('005', 'O2 CONC,LOWER KITTLE')])
+def test_dox_daily(results, reach, title):
+    hspf = read_d66(os.path.join(HSPF, 'test10.d66'), title)
+    ours = results(reach, 'OXRX').DOX.resample('D').mean().reindex(hspf.index)
+    wet  = results(reach, 'HYDR').VOL.resample('D').min().reindex(hspf.index) > 0.001
+    diff = (ours - hspf)[wet]
+    assert len(diff) > 200
+    assert diff.abs().max() < 2.0
+    assert abs(ours[wet].mean() - hspf[wet].mean()) < 0.6
+
+
+def test_ph_r004(results):
+    hspf = read_p95(os.path.join(HSPF, 'test10.p95'), 2)
+    ours = results('004', 'PHCARB').PH
+    ours.index = ours.index + pd.Timedelta(hours=1)       # HSP2 labels an interval by its start
+    ours = ours.reindex(hspf.index)
+    defined = (hspf.abs() < -UNDEFINED) & (ours.abs() < -UNDEFINED)
+    diff = (ours - hspf)[defined].abs()
+    assert len(diff) > 800
+    assert diff.max() < 1.0
+    assert (diff < 0.2).mean() > 0.95
+
+
+@pytest.mark.parametrize('reach', REACHES)
+def test_monthly_states(results, reach):
+    oxrx, plank, phcarb = hbn('OXRX', reach), hbn('PLANK', reach), hbn('PHCARB', reach)
+    wet = oxrx.index[oxrx.BODCONC > UNDEFINED]
+    assert len(wet) > 0
+    compare = [
+        (end_of_month(results(reach, 'OXRX').BOD), oxrx.BODCONC, 0.05),
+        (end_of_month(results(reach, 'PLANK').PHYTO), plank.PHYTO, 0.01),
+        (end_of_month(results(reach, 'PHCARB').PH), phcarb.PH, 0.2),
+    ]
+    for ours, hspf, atol in compare:
+        assert np.allclose(ours[wet], hspf[wet], rtol=0.0, atol=atol)
+
+
+@pytest.mark.parametrize('reach', REACHES)
+def test_phydox(results, reach):
+    # below the minimum phytoplankton level the growth term is reduced, so the flux is negative
+    hspf = hbn('OXRX', reach).DOXFLUXPHYTO
+    hspf = hspf[hspf > UNDEFINED]
+    ours = results(reach, 'PLANK').PHYDOX.resample('MS').sum()[hspf.index]
+    assert np.allclose(ours, hspf, rtol=0.1, atol=0.05)
+    assert (np.sign(ours[hspf.abs() > 0.05]) == np.sign(hspf[hspf.abs() > 0.05])).all()
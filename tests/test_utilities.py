@@ -0,0 +1,199 @@
+''' Tests of the TSBlock, TransformCache and SimClock helpers in HSP2.utilities.
+
+Run from the repository root with: python -m pytest tests
+'''
+
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import Series, date_range
+from pandas.tseries.offsets import Minute
+
+from HSP2.utilities import TSBlock, TransformCache, SimClock, simclock, clocks
+
+
+# pandas versions of hoursval, monthval and dayval as they were before SimClock
+
+def pandas_hoursval(siminfo, hours24, dofirst=False, lapselike=False):
+    start, stop, freq = siminfo['start'], siminfo['stop'], Minute(siminfo['delt'])
+    dr = date_range(start=f'{start.year}-01-01', end=f'{stop.year}-12-31', freq=Minute(60))
+    hours = np.tile(hours24, (len(dr) + 23) // 24).astype(float)
+    if dofirst:
+        hours[0] = 1
+    ts = Series(hours[0:len(dr)], dr)
+    if lapselike:
+        if ts.index.freq > freq:
+            ts = ts.resample(freq).asfreq().ffill()
+        elif ts.index.freq < freq:
+            ts = ts.resample(freq).mean()
+    else:
+        if ts.index.freq > freq:
+            ts = ts.resample(freq).asfreq().fillna(0.0)
+        elif ts.index.freq < freq:
+            ts = ts.resample(freq).max()
+    return ts.truncate(start, stop).to_numpy()
+
+
+def pandas_monthly(siminfo, monthly, daily):
+    start, stop, freq = siminfo['start'], siminfo['stop'], Minute(siminfo['delt'])
+    months = np.tile(monthly, stop.year - start.year + 1).astype(float)
+    dr = date_range(start=f'{start.year}-01-01', end=f'{stop.year}-12-31', freq='MS')
+    ts = Series(months, index=dr).resample('D')
+    ts = ts.interpolate('time') if daily else ts.ffill()
+    if ts.index.freq > freq:
+        ts = ts.resample(freq).ffill() if daily else ts.resample(freq).asfreq().ffill()
+    elif ts.index.freq < freq:
+        ts = ts.resample(freq).mean()
+    return ts.truncate(start, stop).to_numpy()
+
+
+# Nov 2019 to Apr 2021: the 2020 leap day and both 2020 US DST changes (Mar 8, Nov 1).
+# HSP2 times are naive, the clock must not skip or repeat an hour on those days.
+START = pd.Timestamp('2019-11-01')
+STOP  = pd.Timestamp('2021-04-01')
+MONTHLY = np.array([3.1, 4.7, 2.2, 8.9, 5.5, 1.0, 0.4, 6.6, 7.3, 2.8, 9.0, 3.3])
+LAPSE24 = np.linspace(0.0020, 0.0045, 24)
+
+
+def steps(delt):
+    return len(date_range(START, STOP, freq=Minute(delt))) - 1
+
+
+@pytest.fixture(params=[15, 60, 120, 240, 1440])
+def clock(request):
+    delt = request.param
+    return SimClock(START, STOP, delt), {'start': START, 'stop': STOP, 'delt': delt}
+
+
+def test_tsblock_slots():
+    block = TSBlock(5, ('A', ('O', 3), 'B'))
+    assert block.data.shape == (5, 5)
+    assert block.data.flags['C_CONTIGUOUS']
+    assert [block.slot(name) for name in ('A', 'O', 'B')] == [0, 1, 4]
+    assert block['O'].shape == (3, 5)
+    assert 'O' in block and 'O1' not in block
+
+
+def test_tsblock_round_trip():
+    block = TSBlock(4, ('A', ('O', 2), 'B'))
+    ts = {'A': np.arange(6.0), 'B': np.arange(4.0) * 2.0}
+    block.load(ts, ('A', 'B'))
+    assert np.array_equal(block['A'], ts['A'][0:4])
+    assert np.array_equal(block.data[block.slot('B')], ts['B'])
+
+    block['O'][:] = [[1.0, 2.0, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0]]
+    out = {}
+    block.publish(out, ('A', 'O'))
+    assert sorted(out) == ['A', 'O1', 'O2']
+    assert np.array_equal(out['O2'], [5.0, 6.0, 7.0, 8.0])
+
+    # published rows are views, later kernel writes show through
+    block.data[block.slot('O') + 1, 0] = -1.0
+    assert out['O2'][0] == -1.0
+    assert np.shares_memory(out['A'], block.data)
+
+
+def row(tmemn='PREC', tran='', mfactor=1.0):
+    return SimpleNamespace(SVOL='*', TMEMN=tmemn, TRAN=tran, MFACTOR=mfactor)
+
+
+def test_transformcache_hit_and_miss():
+    cache = TransformCache()
+    siminfo = {'delt': 60, 'start': START, 'stop': STOP}
+    key = cache.key('/TIMESERIES/TS001', row(), siminfo)
+    assert cache.get(key) is None
+    t = np.arange(10.0)
+    cache.put(key, t)
+    t[0] = 99.0                  # cache holds its own copy
+    hit = cache.get(key)
+    assert np.array_equal(hit, np.arange(10.0))
+    hit[1] = 99.0                # and hands out copies
+    assert cache.get(key)[1] == 1.0
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.stats() == 'Timeseries cache: 2 hits, 1 misses, 1 arrays, 0.0 MB'
+
+
+def test_transformcache_key():
+    cache = TransformCache()
+    hourly = {'delt': 60, 'start': START, 'stop': STOP}
+    daily  = dict(hourly, delt=1440)
+    path = '/TIMESERIES/TS001'
+    assert cache.key(path, row(), hourly) != cache.key(path, row(), daily)
+    assert cache.key(path, row(), hourly) != cache.key(path, row(tran='SUM'), hourly)
+    assert cache.key(path, row(), hourly) != cache.key(path, row(mfactor=2.0), hourly)
+    # names of the same flowtype class share the default transform
+    assert cache.key(path, row('PREC'), hourly) == cache.key(path, row('IVOL'), hourly)
+    assert cache.key(path, row('PREC'), hourly) != cache.key(path, row('GATMP'), hourly)
+
+
+def test_transformcache_eviction():
+    cache = TransformCache(maxmb=0.0002)   # 200 bytes, two 80 byte arrays
+    a, b, c = (np.full(10, float(i)) for i in range(3))
+    cache.put('a', a)
+    cache.put('b', b)
+    cache.get('a')               # b is now least recently used
+    cache.put('c', c)
+    assert list(cache.data) == ['a', 'c']
+    assert cache.nbytes == 160
+    cache.put('big', np.zeros(100))        # larger than the cap, not kept
+    assert 'big' not in cache.data and cache.nbytes == 160
+    assert len(TransformCache(maxmb=0).data) == 0
+
+
+def test_simclock_calendar():
+    c = SimClock(START, STOP, 60)
+    index = date_range(START, STOP, freq='H')
+    assert np.array_equal(c.hour, index.hour)
+    assert np.array_equal(c.day, index.day)
+    assert np.array_equal(c.month, index.month)
+    feb29 = (c.month == 2) & (c.day == 29)
+    assert feb29.sum() == 24
+    for day in ('2020-03-08', '2020-11-01'):
+        first = (pd.Timestamp(day) - START) // pd.Timedelta(hours=1)
+        assert np.array_equal(c.hour[first:first + 25], np.append(np.arange(24), 0))
+        assert (c.day[first:first + 24] == pd.Timestamp(day).day).all()
+
+
+def test_simclock_monthval(clock):
+    c, siminfo = clock
+    n = steps(siminfo['delt'])
+    assert np.allclose(c.monthval(MONTHLY)[0:n], pandas_monthly(siminfo, MONTHLY, False)[0:n], rtol=1e-12)
+
+
+def test_simclock_dayval(clock):
+    c, siminfo = clock
+    n = steps(siminfo['delt'])
+    assert np.allclose(c.dayval(MONTHLY)[0:n], pandas_monthly(siminfo, MONTHLY, True)[0:n], rtol=1e-12)
+
+
+@pytest.mark.parametrize('lapselike', [False, True])
+def test_simclock_hoursval(clock, lapselike):
+    c, siminfo = clock
+    n = steps(siminfo['delt'])
+    hours24 = LAPSE24 if lapselike else (np.arange(24) == 7).astype(float)
+    new = c.hoursval(hours24, lapselike=lapselike)[0:n]
+    assert np.allclose(new, pandas_hoursval(siminfo, hours24, lapselike=lapselike)[0:n], rtol=1e-12)
+
+
+def test_simclock_dofirst():
+    start = pd.Timestamp('2020-01-01')
+    siminfo = {'start': start, 'stop': pd.Timestamp('2020-03-01'), 'delt': 60}
+    c = SimClock(start, siminfo['stop'], 60)
+    flags = c.hoursval(np.zeros(24), dofirst=True)
+    assert np.array_equal(flags, pandas_hoursval(siminfo, np.zeros(24), dofirst=True)[0:len(flags)])
+    assert flags[0] == 1.0 and flags[1:].sum() == 0.0
+
+
+def test_simclock_shared():
+    clocks.clear()
+    siminfo = {'start': START, 'stop': STOP, 'delt': 60}
+    assert simclock(siminfo) is simclock(dict(siminfo))
+    assert simclock(siminfo) is not simclock(dict(siminfo, delt=1440))
+    # cached vectors are handed out as copies
+    c = simclock(siminfo)
+    c.hoursval(LAPSE24, lapselike=True)[0] = -1.0
+    assert c.hoursval(LAPSE24, lapselike=True)[0] == LAPSE24[0]
+    clocks.clear()